@@ -0,0 +1,252 @@
+# -*- coding: utf-8 -*-
+"""
+Scale benchmark of the distributed tick loop.
+
+Sweeps the vehicle count, the number of vehicle client processes and
+perception on/off. Every sweep point runs the ecloud_4lane_scenario_dist_config
+scenario, which starts the eCloud server, against local vehiclesim.py clients
+for a fixed number of ticks. The timing reports of the runs are gathered into
+one json report, optionally compared against the report of a baseline commit.
+
+With --headless the runs use the kinematic headless backend instead of a
+CARLA server. Its world lives in the scenario process, so the vehicles run
+sequentially there (num_processes 0) with perception off.
+
+Example:
+    python benchmark.py -n 8,16,32 --perception both -b benchmark_baseline.json
+    python benchmark.py --headless -n 8,16,32,64,128
+"""
+# License: TDG-Attribution-NonCommercial-NoDistrib
+
+import os
+import sys
+import time
+import logging
+import argparse
+import platform
+import tempfile
+import subprocess
+
+import coloredlogs
+
+from opencda.scenario_testing.utils.yaml_utils import load_yaml, save_yaml
+from opencda.scenario_testing.evaluations.benchmark import \
+    DEFAULT_TOLERANCE, compare_reports, load_report, run_key, save_report
+
+logger = logging.getLogger(__name__)
+
+SCENARIO = 'ecloud_4lane_scenario_dist_config'
+BASE_YAML = 'opencda/scenario_testing/config_yaml/ecloud_4lane_scenario_dist_128_car.yaml'
+
+
+def int_list(text):
+    return [int(value) for value in text.split(',')]
+
+
+def arg_parse():
+    parser = argparse.ArgumentParser(description="distributed tick loop scale benchmark.")
+    parser.add_argument('-n', "--num_cars", type=int_list, default=[8, 16, 32],
+                        help='comma separated vehicle counts to sweep. DEFAULT: 8,16,32')
+    parser.add_argument('-p', "--num_processes", type=int_list, default=None,
+                        help='comma separated vehicle client process counts to sweep; 0 runs the '
+                             'scenario sequentially. DEFAULT: one process per vehicle')
+    parser.add_argument("--perception", choices=['off', 'on', 'both'], default='off',
+                        help='run with perception off, on or both. DEFAULT: off')
+    parser.add_argument('-s', "--steps", type=int, default=200,
+                        help='number of ticks of every run. DEFAULT: 200')
+    parser.add_argument("--base_yaml", type=str, default=BASE_YAML,
+                        help='scenario yaml the vehicles are taken from. DEFAULT: %s' % BASE_YAML)
+    parser.add_argument('-o', "--output", type=str, default=None,
+                        help='report file. DEFAULT: benchmark_<commit>.json')
+    parser.add_argument('-b', "--baseline", type=str, default=None,
+                        help='report of a baseline commit to check the runs against')
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help='relative slowdown reported as a regression. DEFAULT: %s' % DEFAULT_TOLERANCE)
+    parser.add_argument("--compare_only", action='store_true',
+                        help='compare the existing --output report against --baseline without running')
+    parser.add_argument("--startup_delay", type=float, default=10.0,
+                        help='seconds to wait for the eCloud server before starting the clients. DEFAULT: 10')
+    parser.add_argument("--timeout", type=float, default=1800.0,
+                        help='seconds after which a run is aborted. DEFAULT: 1800')
+    parser.add_argument("--tick_stream", action='store_true',
+                        help='clients receive ticks over a stream instead of a push server')
+    parser.add_argument("--headless", action='store_true',
+                        help='run on the headless backend instead of a CARLA server; '
+                             'the vehicles run sequentially with perception off')
+    parser.add_argument('-v', "--verbose", action='store_true',
+                        help="enables DEBUG level logging; otherwise defaults to INFO")
+    opt = parser.parse_args()
+    return opt
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'],
+                                       stderr=subprocess.DEVNULL).decode('utf-8').strip()
+    except (subprocess.CalledProcessError, OSError):
+        return 'unknown'
+
+
+def write_scenario_yaml(params, num_cars, distributed, perception, path):
+    """
+    Write the scenario yaml of a sweep point, keeping the first num_cars
+    vehicles of the loaded base yaml params.
+    """
+    params.pop('current_time', None)
+    params['distributed'] = distributed
+    params['perception_active'] = perception
+    params['vehicle_base']['sensing']['perception']['activate'] = perception
+
+    params['scenario']['single_cav_list'] = params['scenario']['single_cav_list'][:num_cars]
+    for cav in params['scenario']['single_cav_list']:
+        cav['sensing']['perception']['activate'] = perception
+
+    save_yaml(params, path)
+
+
+def stop_processes(processes, timeout):
+    deadline = time.time() + timeout
+    for process in processes:
+        try:
+            process.wait(max(deadline - time.time(), 0))
+        except subprocess.TimeoutExpired:
+            logger.warning('killing process %s', process.pid)
+            process.kill()
+            process.wait()
+
+
+def run_point(opt, num_cars, num_processes, perception, work_dir):
+    """
+    Run the scenario at one sweep point and return its timing report.
+    """
+    name = f'{num_cars}_cars_{num_processes}_processes_{"with" if perception else "no"}_perception'
+    config_yaml = os.path.join(work_dir, f'{name}.yaml')
+    run_report = os.path.join(work_dir, f'{name}.json')
+    write_scenario_yaml(load_yaml(opt.base_yaml), num_cars, num_processes > 0, perception, config_yaml)
+
+    scenario_cmd = [sys.executable, 'opencda.py', '-t', SCENARIO, '--config_yaml', config_yaml,
+                    '--steps', str(opt.steps), '--report', run_report]
+    if opt.headless:
+        scenario_cmd.append('--headless')
+    client_cmd = [sys.executable, 'vehiclesim.py']
+    if perception:
+        scenario_cmd.append('--apply_ml')
+        client_cmd.append('--apply_ml')
+    if opt.tick_stream:
+        client_cmd.append('--tick_stream')
+
+    logger.info('running %s', name)
+    start_time = time.time()
+    scenario = subprocess.Popen(scenario_cmd)
+    clients = []
+    if num_processes > 0:
+        # the scenario starts the eCloud server, which must be up before the clients register
+        time.sleep(opt.startup_delay)
+        # spread the vehicles as evenly as possible over the client processes
+        for container_id in range(num_processes):
+            vehicles = num_cars // num_processes + (1 if container_id < num_cars % num_processes else 0)
+            clients.append(subprocess.Popen(client_cmd + [f'--container_id={container_id}',
+                                                          f'--vehicles={vehicles}']))
+
+    try:
+        scenario.wait(opt.timeout)
+    except subprocess.TimeoutExpired:
+        logger.error('%s timed out after %ss', name, opt.timeout)
+        scenario.kill()
+        scenario.wait()
+    stop_processes(clients, 30)
+
+    if not os.path.isfile(run_report):
+        logger.error('%s did not produce a report', name)
+        report = {'num_cars': num_cars, 'error': 'no report'}
+    else:
+        report = load_report(run_report)
+    report.update(num_processes=num_processes, perception=perception,
+                  wall_time_s=time.time() - start_time)
+    return report
+
+
+def log_regressions(regressions, tolerance):
+    if not regressions:
+        logger.info('no regression beyond %s%% against the baseline', round(tolerance * 100))
+        return
+    for regression in regressions:
+        if regression['metric'] == 'error':
+            logger.error('run at (num_cars, num_processes, perception) %s failed: %s',
+                         regression['run'], regression['current'])
+        elif regression['metric'] == 'missing':
+            logger.error('run at (num_cars, num_processes, perception) %s of the baseline is missing',
+                         regression['run'])
+        else:
+            logger.error('regression at (num_cars, num_processes, perception) %s: %s %s -> %s',
+                         regression['run'], regression['metric'],
+                         round(regression['baseline'], 2), round(regression['current'], 2))
+
+
+def main():
+    opt = arg_parse()
+    level = 'DEBUG' if opt.verbose else 'INFO'
+    coloredlogs.install(level=level, logger=logger)
+
+    commit = git_commit()
+    output = opt.output if opt.output else f'benchmark_{commit}.json'
+
+    if opt.compare_only:
+        if opt.baseline is None:
+            sys.exit('--compare_only requires --baseline')
+        report = load_report(output)
+
+    else:
+        if opt.headless:
+            if opt.perception != 'off':
+                sys.exit('--headless runs with perception off: its cameras and lidars never emit')
+            if opt.num_processes not in (None, [0]):
+                logger.warning('--headless runs the vehicles in the scenario process; '
+                               'ignoring --num_processes %s', opt.num_processes)
+            opt.num_processes = [0]
+
+        perceptions = {'off': [False], 'on': [True], 'both': [False, True]}[opt.perception]
+        max_cars = len(load_yaml(opt.base_yaml)['scenario']['single_cav_list'])
+
+        runs = []
+        with tempfile.TemporaryDirectory() as work_dir:
+            for num_cars in opt.num_cars:
+                if num_cars > max_cars:
+                    logger.warning('skipping %s cars: %s only has %s', num_cars, opt.base_yaml, max_cars)
+                    continue
+                num_processes_list = opt.num_processes if opt.num_processes is not None else [num_cars]
+                for num_processes in num_processes_list:
+                    if num_processes > num_cars:
+                        logger.warning('skipping %s cars on %s processes: more processes than vehicles',
+                                       num_cars, num_processes)
+                        continue
+                    for perception in perceptions:
+                        runs.append(run_point(opt, num_cars, num_processes, perception, work_dir))
+
+        report = {'commit': commit,
+                  'host': platform.node(),
+                  'headless': opt.headless,
+                  'timestamp': time.strftime('%Y-%m-%d %X'),
+                  'steps': opt.steps,
+                  'runs': runs}
+        save_report(report, output)
+        logger.info('benchmark report written to %s', output)
+
+        for run in runs:
+            if 'error' not in run:
+                logger.info('%s: %s vehicle steps/s over %s ticks', run_key(run),
+                            round(run['throughput'], 1), run['ticks'])
+
+    if opt.baseline is not None:
+        baseline = load_report(opt.baseline)
+        logger.info('comparing against baseline commit %s', baseline.get('commit'))
+        if baseline.get('headless', False) != report.get('headless', False):
+            logger.warning('comparing runs on the headless backend against runs on CARLA')
+        regressions = compare_reports(baseline, report, opt.tolerance)
+        log_regressions(regressions, opt.tolerance)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -40,6 +40,20 @@ def arg_parse():
                             help="Make no noise")
     parser.add_argument('-b', "--build", action="store_true",
                             help="Rebuild gRPC proto files")
+    parser.add_argument("--headless", action="store_true",
+                        help='run the scenario on the kinematic headless '
+                             'backend instead of a CARLA server; distributed '
+                             'scenarios then run their vehicles sequentially, '
+                             'if they support it (sequential in their SCENARIO_OPTIONS)')
+    parser.add_argument("--config_yaml", type=str, default=None,
+                        help='use this yaml instead of the one named after the scenario '
+                             'in opencda/scenario_testing/config_yaml')
+    parser.add_argument("--steps", type=int, default=None,
+                        help='number of ticks to run, for the scenarios with a step count '
+                             '(steps in their SCENARIO_OPTIONS)')
+    parser.add_argument("--report", type=str, default=None,
+                        help='write the timing report of the run to this json file, '
+                             'for the scenarios that support it (report in their SCENARIO_OPTIONS)')
     opt = parser.parse_args()
     return opt
 
@@ -48,15 +62,44 @@ def main():
     opt = arg_parse()
     print("OpenCDA Version: %s" % __version__)
 
+    if opt.headless:
+        # must replace carla before the scenario modules import it
+        from opencda.headless import install
+        install()
+
     try:
         testing_scenario = importlib.import_module("opencda.scenario_testing.%s" % opt.test_scenario)
     except ModuleNotFoundError:
         sys.exit("ERROR: %s.py not found under opencda/scenario_testing" % opt.test_scenario)
 
-    config_yaml = os.path.join(os.path.dirname(os.path.realpath(__file__)),
-                               'opencda/scenario_testing/config_yaml/%s.yaml' % opt.test_scenario)
-    if not os.path.isfile(config_yaml):
-        sys.exit("opencda/scenario_testing/config_yaml/%s.yaml not found!" % opt.test_scenario)
+    # the options most scenarios ignore are refused rather than silently dropped
+    scenario_options = getattr(testing_scenario, 'SCENARIO_OPTIONS', ())
+    for option in ['steps', 'report']:
+        if getattr(opt, option) is not None and option not in scenario_options:
+            sys.exit("ERROR: %s does not support --%s" % (opt.test_scenario, option))
+
+    if opt.config_yaml:
+        config_yaml = opt.config_yaml
+        if not os.path.isfile(config_yaml):
+            sys.exit("%s not found!" % config_yaml)
+    else:
+        config_yaml = os.path.join(os.path.dirname(os.path.realpath(__file__)),
+                                   'opencda/scenario_testing/config_yaml/%s.yaml' % opt.test_scenario)
+        if not os.path.isfile(config_yaml):
+            sys.exit("opencda/scenario_testing/config_yaml/%s.yaml not found!" % opt.test_scenario)
+
+    if opt.headless:
+        from opencda.headless import sequential_config
+        headless_yaml = sequential_config(config_yaml)
+        if headless_yaml != config_yaml:
+            if 'sequential' not in scenario_options:
+                # the non-distributed branch of most distributed scenarios never steps the vehicles
+                os.remove(headless_yaml)
+                sys.exit("ERROR: %s cannot run %s sequentially, which --headless requires"
+                         % (opt.test_scenario, config_yaml))
+            logger.warning('the headless backend runs the vehicles in the scenario process; '
+                           'running %s sequentially from %s', config_yaml, headless_yaml)
+            config_yaml = headless_yaml
 
     # eCLoud
     if opt.build:
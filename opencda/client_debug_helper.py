@@ -162,42 +162,24 @@ class ClientDebugHelper(PlanDebugHelper):
     def update_lane_invasions(self, lane_invasion_info=None):
         self.lane_invasion_list.append(lane_invasion_info)
 
-    def serialize_debug_info(self, proto_debug_helper):
-        # TODO: extend instead of append? or [:] = ?
-
-        for obj in self.perception_time_list:
-            proto_debug_helper.perception_time_list.append(obj)
-
-        for obj in self.localization_time_list:
-            proto_debug_helper.localization_time_list.append(obj)
-
-        for obj in self.update_info_time_list:
-            proto_debug_helper.update_info_time_list.append(obj)
-        
-        for obj in self.agent_update_info_time_list:
-            proto_debug_helper.agent_update_info_time_list.append(obj)
-
-        for obj in self.controller_update_info_time_list:
-            proto_debug_helper.controller_update_info_time_list.append(obj)
-        
-        for obj in self.agent_step_time_list:
-            proto_debug_helper.agent_step_time_list.append(obj)
-        
-        for obj in self.vehicle_step_time_list:
-            proto_debug_helper.vehicle_step_time_list.append(obj)
-        
-        for obj in self.controller_step_time_list:
-            proto_debug_helper.controller_step_time_list.append(obj)
-
-        for obj in self.control_time_list:
-            proto_debug_helper.control_time_list.append(obj)
-
-        for obj in self.timestamps_list:
+    # float lists mirrored 1:1 by the ClientDebugHelper protobuf
+    TIME_LIST_KEYS = ['perception_time_list', 'localization_time_list',
+                      'update_info_time_list', 'agent_update_info_time_list',
+                      'controller_update_info_time_list', 'agent_step_time_list',
+                      'vehicle_step_time_list', 'controller_step_time_list',
+                      'control_time_list']
+
+    def serialize_debug_info(self, proto_debug_helper, delta=False):
+        for key in self.TIME_LIST_KEYS:
+            getattr(proto_debug_helper, key).extend(
+                self.delta_tracker.unsent(key, getattr(self, key), delta))
+
+        for obj in self.delta_tracker.unsent('timestamps_list', self.timestamps_list, delta):
             t = ecloud.Timestamps()
             t.CopyFrom(obj)
             proto_debug_helper.timestamps_list.append(t)
 
-        for obj in self.collisions_event_list:
+        for obj in self.delta_tracker.unsent('collisions_event_list', self.collisions_event_list, delta):
             collision_event = ecloud.CollisionEvent()
             collision_event.type_id = obj.get_dict()['type']
             collision_event.other_actor_id = obj.get_dict()['id']
@@ -206,60 +188,32 @@ class ClientDebugHelper(PlanDebugHelper):
             collision_event.location.z = obj.get_dict()['z']
             proto_debug_helper.collisions_event_list.append(collision_event)
 
-        for obj in self.lane_invasions_list:
+        for obj in self.delta_tracker.unsent('lane_invasions_list', self.lane_invasions_list, delta):
             lane_invasion_event = ecloud.LaneInvasionEvent()
-            lane_invasion_event.location.x = obj.get_dict()['x']
-            lane_invasion_event.location.y = obj.get_dict()['y']
-            lane_invasion_event.location.z = obj.get_dict()['z']
-            proto_debug_helper.lane_invasions_list.append(obj)
+            lane_invasion_event.actor_location.x = obj.get_dict()['x']
+            lane_invasion_event.actor_location.y = obj.get_dict()['y']
+            lane_invasion_event.actor_location.z = obj.get_dict()['z']
+            proto_debug_helper.lane_invasions_list.append(lane_invasion_event)
 
-
-    def deserialize_debug_info(self, proto_debug_helper):
+    def deserialize_debug_info(self, proto_debug_helper, append=False):
         # call from Sim API to populate locally
+        # append merges an incremental (delta) chunk instead of replacing
+
+        if not append:
+            for key in self.TIME_LIST_KEYS:
+                getattr(self, key).clear()
+            self.timestamps_list.clear()
+            self.collisions_event_list.clear()
+            self.lane_invasions_list.clear()
+
+        for key in self.TIME_LIST_KEYS:
+            getattr(self, key).extend(getattr(proto_debug_helper, key))
 
-        self.perception_time_list.clear()
-        for obj in proto_debug_helper.perception_time_list:
-            self.perception_time_list.append(obj)
-
-        self.localization_time_list.clear()
-        for obj in proto_debug_helper.localization_time_list:
-            self.localization_time_list.append(obj)
-
-        self.update_info_time_list.clear()
-        for obj in proto_debug_helper.update_info_time_list:
-            self.update_info_time_list.append(obj)
- 
-        self.agent_update_info_time_list.clear()
-        for obj in proto_debug_helper.agent_update_info_time_list:
-            self.agent_update_info_time_list.append(obj)
- 
-        self.controller_update_info_time_list.clear()
-        for obj in proto_debug_helper.controller_update_info_time_list:
-            self.controller_update_info_time_list.append(obj)
- 
-        self.agent_step_time_list.clear()
-        for obj in proto_debug_helper.agent_step_time_list:
-            self.agent_step_time_list.append(obj)
- 
-        self.vehicle_step_time_list.clear()
-        for obj in proto_debug_helper.vehicle_step_time_list:
-            self.vehicle_step_time_list.append(obj)
- 
-        self.controller_step_time_list.clear()
-        for obj in proto_debug_helper.controller_step_time_list:
-            self.controller_step_time_list.append(obj)
-
-        self.control_time_list.clear()
-        for obj in proto_debug_helper.control_time_list:
-            self.control_time_list.append(obj)
-
-        self.timestamps_list.clear()
         for obj in proto_debug_helper.timestamps_list:
             t = ecloud.Timestamps()
             t.CopyFrom(obj)
             self.timestamps_list.append(t)
- 
-        self.collisions_event_list.clear()
+
         for obj in proto_debug_helper.collisions_event_list:
             collision_event = TrafficEvent()
             collision_event.set_dict({
@@ -270,7 +224,6 @@ class ClientDebugHelper(PlanDebugHelper):
               'z': obj.location.z})
             self.collisions_event_list.append(collision_event)
 
-        self.lane_invasions_list.clear()
         for obj in proto_debug_helper.lane_invasions_list:
             lane_invasion_event = TrafficEvent()
             lane_invasion_event.set_dict({
@@ -279,4 +232,3 @@ class ClientDebugHelper(PlanDebugHelper):
               'z': obj.actor_location.z})
 
             self.lane_invasions_list.append(lane_invasion_event)
- 
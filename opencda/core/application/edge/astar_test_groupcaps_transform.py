@@ -8,6 +8,7 @@ from opencda.core.application.edge.collab_sandbox import Car
 
 import numpy as np
 import itertools
+import heapq
 
 import scipy.io
 import matplotlib.pyplot as plt
@@ -123,6 +124,13 @@ logger = logging.getLogger(__name__)
 #
 class AStarPlanner:
 
+    # number of nodes on a finished plan, the start included
+    plan_length = 4
+    # time (s) one search step advances the tracked positions
+    step_dt = 0.2
+    # smallest gap (m) to a car in the same lane
+    min_gap = 10
+
     def __init__(self, cars, ov, oy, resolution, rr=1, cars_on_road=None, slicenum=0):
         """
         Initialize grid map for a star planning
@@ -155,13 +163,19 @@ class AStarPlanner:
         self.obstacle_map = None
         self.v_width, self.y_width = 0, 0
         self.motion_v, self.motion_y = self.get_motion_model(len(cars))
+        # every velocity action with every lane action, the lane action
+        # varying fastest: row k of both arrays is one joint action
+        self.action_v = np.repeat(self.motion_v, len(self.motion_y), axis=0)
+        self.action_y = np.tile(self.motion_y, (len(self.motion_v), 1))
         self.calc_obstacle_map(ov, oy)
+        self.init_state_keys()
 
         self.cars_on_road = cars_on_road
         self.slicenum=slicenum
+        self.calc_occupancy()
 
     class Node:
-        def __init__(self, sv, sy, x_start, vt, cost, parent_index):
+        def __init__(self, sv, sy, x_start, vt, cost, parent_index, depth=1):
 
             self.v = np.array(sv)  # index of grid
             self.y = np.array(sy)  # index of grid
@@ -171,20 +185,13 @@ class AStarPlanner:
 
             self.cost = cost
             self.parent_index = parent_index
+            self.depth = depth  # number of nodes on the path from the start
 
         def __str__(self):
             return str(self.v) + "," + str(self.y) + "," + str(
                 self.x_tracked) + "," + str(self.cost)
 
-        def length_of_path(self,node_set,pathlen=0):
-            if self.parent_index == -1:
-                pathlen += 1
-                return pathlen
-            else:
-                pathlen += 1
-                return node_set[self.parent_index].length_of_path(node_set=node_set,pathlen=pathlen)
-
-    def planning(self):
+    def planning(self, deadline=None):
         """
         A star path search
         input:
@@ -192,9 +199,11 @@ class AStarPlanner:
             s_y: start y position [m]
             gv: goal v position [m]
             gy: goal y position [m]
+            deadline: time.time() after which the search is abandoned
         output:
             rx: x position list of the final path
             ry: y position list of the final path
+            None instead if the deadline passed
         """
         sv = self.v
         sy = self.y
@@ -208,12 +217,29 @@ class AStarPlanner:
 
         start_node.x_tracked = self.x_start
 
+        # The open set is a binary heap of (f, order, push, key, node) entries next
+        # to a dict of the live node per state. order is the rank at which a
+        # state was first opened, so ties on f pop the earliest opened state.
+        # Entries of nodes replaced by a cheaper path are skipped when popped.
         open_set, closed_set = dict(), dict()
-        open_set[self.calc_grid_index(start_node)] = start_node
+        open_heap = []
+        open_order = dict()
+        push_count = itertools.count()
+
+        def push(n_id, node, f):
+            open_set[n_id] = node
+            order = open_order.setdefault(n_id, len(open_order))
+            heapq.heappush(open_heap, (f, order, next(push_count), n_id, node))
+
+        push(self.calc_grid_index(start_node), start_node,
+             start_node.cost + self.calc_heuristic(start_node, goal_node))
 
         empty_flag = 0
 
         while 1:
+            if deadline is not None and time.time() > deadline:
+                return None
+
             if len(open_set) == 0:
                 logger.warning("Open set is empty..")
                 empty_flag = 1
@@ -224,24 +250,11 @@ class AStarPlanner:
                 goal_node.x_tracked = current.x_tracked
                 break
 
-            c_id = min(
-                open_set,
-                key=lambda o: open_set[o].cost + self.calc_heuristic(open_set[
-                                                                         o],goal_node))
-            current = open_set[c_id]
-
-            # show graph
-            # if show_animation:  # pragma: no cover
-            #     plt.plot(self.calc_grid_position(current.x, self.min_x),
-            #              self.calc_grid_position(current.y, self.min_y), "xc")
-            #     # for stopping simulation with the esc key.
-            #     plt.gcf().canvas.mpl_connect('key_release_event',
-            #                                  lambda event: [exit(
-            #                                      0) if event.key == 'escape' else None])
-            #     if len(closed_set.keys()) % 10 == 0:
-            #         plt.pause(0.001)
-
-            if (current.length_of_path(node_set=closed_set) >= 4): #Was 4 #current.x == goal_node.x and current.y == goal_node.y:
+            _, _, _, c_id, current = heapq.heappop(open_heap)
+            if open_set.get(c_id) is not current:
+                continue
+
+            if current.depth >= self.plan_length: #current.x == goal_node.x and current.y == goal_node.y:
                 logger.warning("Find goal")
                 goal_node.parent_index = current.parent_index
                 goal_node.cost = current.cost
@@ -256,36 +269,32 @@ class AStarPlanner:
             # Add it to the closed set
             closed_set[c_id] = current
 
-            # expand_grid search grid based on motion model
-            # for i, _ in enumerate(self.motion):
-            for i in range(0,len(self.motion_v)):
-                for j in range(0,len(self.motion_y)):
-                    node = self.Node(current.v + np.array(self.motion_v[i]),
-                                     current.y + np.array(self.motion_y[j]), self.x_start, self.vt,
-                                     current.cost, c_id)
-                    node.cost = self.calc_heuristic(node,current) #+ np.sum(abs(closed_set[c_id].y - node.y))
-                    node.x_tracked = current.x_tracked + (node.v * 0.2)
-                    node.x_tracked = node.x_tracked.astype(int)
-
-                    n_id = self.calc_grid_index(node)
-
-                    # If the node is not safe, do nothing
-                    if not self.verify_node(node,current):
-                        if node.y.any() > 1:
-                            logger.warning("Node Not Viable: ", node.__str__())
-                        continue
-
-                    if n_id in closed_set:
-                        continue
-
-                    if n_id not in open_set:
-                        open_set[n_id] = node  # discovered a new node
-                        # print(node.__str__())
-                        #print(np.sum(abs(node.v - node.vt)))
-                    else:
-                        if open_set[n_id].cost > node.cost:
-                            # This path is the best until now. record it
-                            open_set[n_id] = node
+            # expand_grid search grid based on motion model, dropping the
+            # children that are not safe before any node is built
+            child_v = current.v + self.action_v
+            child_y = current.y + self.action_y
+            child_x = (current.x_tracked + child_v * self.step_dt).astype(int)
+            safe = np.flatnonzero(self.verify_nodes(child_v, child_y, child_x, current.y))
+            child_v, child_y, child_x = child_v[safe], child_y[safe], child_x[safe]
+
+            child_cost = self.heuristic(child_v, self.vt, child_y, current.y) #+ np.sum(abs(closed_set[c_id].y - node.y))
+            child_f = child_cost + self.heuristic(child_v, self.vt, child_y, goal_node.y)
+            child_id = self.pack_states(child_x, child_y)
+
+            for k in range(0,len(child_id)):
+                n_id = int(child_id[k])
+
+                if n_id in closed_set:
+                    continue
+
+                # a known state is only replaced by a cheaper path
+                if n_id in open_set and open_set[n_id].cost <= child_cost[k]:
+                    continue
+
+                node = self.Node(child_v[k], child_y[k], self.x_start, self.vt,
+                                 child_cost[k], c_id, current.depth + 1)
+                node.x_tracked = child_x[k]
+                push(n_id, node, child_f[k])
 
         rv, ry, rx = self.calc_final_path(goal_node, closed_set)
 
@@ -308,12 +317,17 @@ class AStarPlanner:
 
     @staticmethod
     def calc_heuristic(n1,n2=0):
+        return AStarPlanner.heuristic(n1.v, n1.vt, n1.y, n2.y)
+
+    @staticmethod
+    def heuristic(v, vt, y, y_ref):
+        """
+        Velocity error and lane changes of nodes, summed over the cars. v and
+        y hold one node per row; each row is compared to vt and y_ref.
+        """
         w = 10.0  # weight of heuristic
         w_lane = 0.5 # weight of lane changes (for now), was 0.5 earlier.
-        d = 0
-        for i in range(0,len(n1.v)):
-            d += w * abs(n1.v[i] - n1.vt[i]) + w_lane*abs(n1.y[i]-n2.y[i])# math.hypot(n1.x - n2.x, n1.y - n2.y)
-        return d
+        return np.sum(w * np.abs(v - vt) + w_lane * np.abs(y - y_ref), axis=-1)
 
     def calc_grid_position(self, index, min_position):
         """
@@ -330,55 +344,116 @@ class AStarPlanner:
             position[i] = round((position[i]) / self.resolution)
         return position
 
+    def init_state_keys(self):
+        """
+        Set up the packing of a node's state, the tracked x and the lane of
+        every car, into one integer. Each car's x is stored relative to its
+        start, which a plan moves by less than x_margin, and its lane within
+        the lane limits that verify_node enforces.
+        """
+        v_limit = max(abs(self.min_v), abs(self.max_v)) / self.resolution
+        x_margin = self.plan_length * (math.ceil(v_limit * self.step_dt) + 1)
+        self.x_origin = np.floor(self.x_start).astype(np.int64) - x_margin
+        self.x_radix = 2 * x_margin + 1
+        self.y_origin = math.floor(self.min_y / self.resolution)
+        self.y_radix = math.ceil(self.max_y / self.resolution) - self.y_origin + 1
+
+        car_radix = self.x_radix * self.y_radix
+        numcars = len(self.x_start)
+        # python ints once the packed key no longer fits in an int64
+        dtype = np.int64 if car_radix ** numcars < 2 ** 63 else object
+        car_weight = np.array([car_radix ** i for i in range(numcars)], dtype=dtype)
+        self.x_weight = car_weight * self.y_radix
+        self.y_weight = car_weight
+
     def calc_grid_index(self, node):
-        coord_tracked = []
-        for i in range(0,len(node.x_tracked)):
-            coord_tracked.append(node.x_tracked[i])
-            coord_tracked.append(node.y[i])
-        str1 = ''.join(str(e) for e in coord_tracked)
-        return hash(str1)
+        x_key = node.x_tracked - self.x_origin
+        y_key = node.y.astype(np.int64) - self.y_origin
+        if (not np.issubdtype(node.x_tracked.dtype, np.integer)
+                or np.any(x_key < 0) or np.any(x_key >= self.x_radix)
+                or np.any(y_key < 0) or np.any(y_key >= self.y_radix)):
+            # only the start can hold a fractional or out of grid state, which
+            # no expanded node reaches. -1 is taken by the start's parent_index
+            return None
+        return int(self.pack_states(node.x_tracked, node.y))
+
+    def pack_states(self, x_tracked, y):
+        """
+        Packed keys of the states in the rows of x_tracked and y. Only valid
+        for states that pass the verify_node limits.
+        """
+        return np.dot(x_tracked - self.x_origin, self.x_weight) + \
+            np.dot(y.astype(np.int64) - self.y_origin, self.y_weight)
 
     def verify_node(self, node, current=None):
+        current_y = None if current is None else current.y
+        return bool(self.verify_nodes(node.v[np.newaxis], node.y[np.newaxis],
+                                      node.x_tracked[np.newaxis], current_y)[0])
 
-        for i in range(0,len(node.v)): #Check to see if within lane and velocity limits
-            px = self.calc_grid_position(node.v[i], self.min_v)
-            py = self.calc_grid_position(node.y[i], self.min_y)
-
-            if px < self.min_v:
-                return False
-            elif py < self.min_y:
-                return False
-            elif px >= self.max_v:
-                return False
-            elif py >= self.max_y:
-                return False
+    def verify_nodes(self, v, y, x_tracked, current_y=None):
+        """
+        Check a batch of nodes against the velocity and lane limits and for
+        collisions.
+
+        Parameters
+        ----------
+        v, y, x_tracked : np.ndarray
+            Velocity and lane indices and tracked x of the nodes, one node
+            per row and one car per column.
+
+        current_y : np.ndarray
+            Lanes of the parent node. If given, a car may not move into the
+            lane its neighbour just left without clearance.
+
+        Returns
+        -------
+        safe : np.ndarray
+            Boolean mask of the nodes that pass.
+        """
+        #Check to see if within lane and velocity limits
+        pv = self.calc_grid_position(v, self.min_v)
+        py = self.calc_grid_position(y, self.min_y)
+        safe = np.all((pv >= self.min_v) & (py >= self.min_y) &
+                      (pv < self.max_v) & (py < self.max_y), axis=1)
 
         #collision check: For all pairs in slice, check collisions
-        for i in range(0,len(node.v)):
-            for j in range(i+1,len(node.v)):
-                if node.y[i] == node.y[j] and abs(node.x_tracked[j]-node.x_tracked[i]) <= 10:
-                    # print("False for constraint")
-                    return False
+        first, second = np.triu_indices(v.shape[1], 1)
+        close = np.abs(x_tracked[:, second] - x_tracked[:, first]) <= self.min_gap
+        safe &= ~np.any((y[:, first] == y[:, second]) & close, axis=1)
         #Added to prevent easy swapping of lanes in a single iteration, requires sufficient clearance between vehicles now: Added on 05/05/22
-        if current is not None:
-            for i in range(0,len(node.v)):
-                for j in range(i+1,len(node.v)):
-                    if node.y[i] == current.y[j] and abs(node.x_tracked[j]-node.x_tracked[i]) <= 10:
-                        return False
+        if current_y is not None:
+            safe &= ~np.any((y[:, first] == current_y[second]) & close, axis=1)
 
-        # collision check: Other cars: For every vehicle in slice (i in range), check all other non slice vehicles (j + j.slice condition)
+        # collision check: Other cars: the lanes occupied or claimed by
+        # vehicles of the other slices
+        if len(self.occupied_y):
+            blocked = (y[:, :, np.newaxis] == self.occupied_y) & \
+                (np.abs(x_tracked[:, :, np.newaxis] - self.occupied_x) <= self.min_gap)
+            safe &= ~np.any(blocked, axis=(1, 2))
+
+        return safe
+
+    def calc_occupancy(self):
+        """
+        Collect the lanes that vehicles outside this slice occupy, or are
+        changing into, with their positions.
+        """
+        occupied_y = []
+        occupied_x = []
         if self.cars_on_road is not None:
-            for i in range(0,len(node.v)):
-                for j in self.cars_on_road:
-                    if j.slice != self.slicenum:
-                        if node.y[i] == j.lane and abs(node.x_tracked[i]-j.pos_x) <= 10:
-                            return False
-                        if (j.intentions == "Lane Change -1" and node.y[i] == j.lane-1) and abs(node.x_tracked[i]-j.pos_x) <= 10:
-                            return False
-                        if (j.intentions == "Lane Change 1" and node.y[i] == j.lane+1) and abs(node.x_tracked[i]-j.pos_x) <= 10:
-                            return False
-
-        return True
+            for j in self.cars_on_road:
+                if j.slice != self.slicenum:
+                    occupied_y.append(j.lane)
+                    occupied_x.append(j.pos_x)
+                    if j.intentions == "Lane Change -1":
+                        occupied_y.append(j.lane-1)
+                        occupied_x.append(j.pos_x)
+                    if j.intentions == "Lane Change 1":
+                        occupied_y.append(j.lane+1)
+                        occupied_x.append(j.pos_x)
+
+        self.occupied_y = np.array(occupied_y)
+        self.occupied_x = np.array(occupied_x)
 
     def calc_obstacle_map(self, ov, oy):
 
@@ -409,34 +484,15 @@ class AStarPlanner:
 
     @staticmethod
     def get_motion_model(numcars):
+        """
+        Velocity and lane actions of a slice: every combination of -1, 0 and
+        1 for each car, as (3^numcars x numcars) arrays with the last car
+        varying fastest.
+        """
+        motion_atomic = [-1,0,1]
+        motion = np.array(list(itertools.product(motion_atomic, repeat=numcars))).reshape(-1, numcars)
 
-        motion_v_atomic = [-1,0,1] #np.arange(-1,1,step=1)
-        motion_y_atomic = [-1,0,1]
-        motion_y = []
-        motion_v = []
-        for element in itertools.product(motion_y_atomic, motion_y_atomic):
-            motion_y.append(element)
-        for element in itertools.product(motion_v_atomic, motion_v_atomic):
-            motion_v.append(element)
-
-        motion_y_final = motion_y_atomic
-        motion_v_final = motion_v_atomic
-
-        for i in range(0,numcars-1):
-            motion_y_interim = []
-            for j in motion_y_final:
-                for k in motion_y_atomic:
-                    motion_y_interim.append(np.append(j,k))
-            motion_y_final = motion_y_interim
-
-        for i in range(0,numcars-1):
-            motion_v_interim = []
-            for j in motion_v_final:
-                for k in motion_v_atomic:
-                    motion_v_interim.append(np.append(j,k))
-            motion_v_final = motion_v_interim
-
-        return motion_v_final, motion_y_final
+        return motion, motion.copy()
 
 def get_states_carlist(car_list):
     carnum = 0
@@ -446,6 +502,62 @@ def get_states_carlist(car_list):
         logger.info("Velocity of ", carnum, " Is: ", i.v)
         carnum += 1
 
+def plan_slice(cars_on_road, slicenum, ov, oy, resolution, rr, planning_budget=None):
+    """
+    Plan the cars of one slice. Only reads cars_on_road, so slices can be
+    planned concurrently on copies of the same traffic state.
+
+    The planning budget (s) starts when the slice's planning does, so a
+    slice queued behind others, e.g. on a busy process pool, gets all of it.
+
+    Returns
+    -------
+    plan : tuple
+        The next lanes and velocities of the slice's cars, in cars_on_road
+        order, or None if the search ran past the planning budget.
+    """
+    deadline = None if planning_budget is None else time.time() + planning_budget
+    cars = [car for car in cars_on_road if car.slice == slicenum]
+    a_star = AStarPlanner(cars, ov, oy, resolution, rr, cars_on_road, slicenum)
+    path = a_star.planning(deadline)
+    if path is None:
+        return None
+
+    rv, ry, rx_tracked = path
+    if len(ry) >= 2: #If there is some planner result, then we move ahead on using it
+        return ry[-2], rv[-2]
+    #If the planner returns an empty list, continue as before - use emergency responses.
+    return ry[0], ry[0]
+
+def plan_slices(cars_on_road, slice_indices, lanechange_command, vel_array, ov, oy, resolution, rr,
+                planning_budget=None, pool=None):
+    """
+    Plan the given slices, on a process pool if one is given, and store
+    their next lanes and velocities in lanechange_command and vel_array.
+    A slice whose search ran past the planning budget keeps its entries.
+
+    Returns
+    -------
+    over_budget : list
+        The slices left without a plan.
+    """
+    if pool is not None:
+        # every worker plans on its own pickled copy of the traffic state
+        futures = [pool.submit(plan_slice, cars_on_road, i, ov, oy, resolution, rr, planning_budget)
+                   for i in slice_indices]
+        plans = [future.result() for future in futures]
+    else:
+        plans = [plan_slice(cars_on_road, i, ov, oy, resolution, rr, planning_budget)
+                 for i in slice_indices]
+
+    over_budget = []
+    for i, plan in zip(slice_indices, plans):
+        if plan is None:
+            over_budget.append(i)
+            continue
+        lanechange_command[i], vel_array[i] = plan
+    return over_budget
+
 def get_slice_plans(Traffic_Tracker, ov, oy, slice_length=15, map_length=1000):
 
     slice_list = []
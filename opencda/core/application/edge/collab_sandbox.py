@@ -73,6 +73,9 @@ class Car():
 		self.pos_x = self.pos_x % map_length
 
 class Traffic():
+	# smallest spacing (m) between consecutive cars of a lane at spawn
+	spawn_spacing = 3
+
 	def __init__(self, dt, numlanes, numcars, map_length, x_initial=None, y_initial=None, v_initial=None):
 		self.numlanes = numlanes
 		self.dt=dt
@@ -80,6 +83,10 @@ class Traffic():
 		self.cars_on_road = []
 		self.time=0
 		self.map_length = map_length
+		self.lane_vehicles = np.zeros((self.map_length,self.numlanes))
+		#Per lane sorted grid cells of the cars and their indices, for gap queries
+		self.lane_positions = []
+		self.lane_cars = []
 
 		#Utilities for checking lane constraints
 		if x_initial is None:
@@ -117,10 +124,20 @@ class Traffic():
 		# self.printstates()
 
 	def respawn_vehicles(self,xcars, ycars, vel):
+		#Move the existing cars to new observed states in place, leaving the tracker as a freshly constructed one would be
+		assert len(xcars) == len(ycars) == len(vel) == self.numcars, "respawn needs a state for each of the %s cars" % self.numcars
+		self.time = 0
 		for i in range(0,self.numcars):
-			self.cars_on_road[i].pos_x = xcars[i]
-			self.cars_on_road[i].lane = ycars[i]
-			self.cars_on_road[i].v = vel[i]
+			car = self.cars_on_road[i]
+			car.pos_x = int(xcars[i])
+			car.lane = int(ycars[i])
+			car.v = vel[i]
+			car.target_velocity = vel[i]
+			car.intentions = 'None'
+			car.target_lane = None
+			car.changed_roads = False
+			car.scrolled = False
+			car.slice = None
 		self.update_grid_occupancies()
 		self.check_spawn_constraints()
 
@@ -132,33 +149,42 @@ class Traffic():
 			print("Velocity of ", carnum, " Is: ", i.v)
 			carnum += 1
 
+	def car_cells(self):
+		#Grid cells (x, lane) of all cars
+		cells = np.array([car.pos_x for car in self.cars_on_road]).astype(int)
+		lanes = np.array([car.lane for car in self.cars_on_road]).astype(int)
+		return cells, lanes
+
 	def update_grid_occupancies(self):
-		self.lane_vehicles = np.zeros((self.map_length,self.numlanes))
-		carnum = 0
-		for i in self.cars_on_road:
-			self.lane_vehicles[int(i.pos_x),int(i.lane)] = carnum+1
-			carnum = carnum + 1
+		self.lane_vehicles.fill(0)
+		cells, lanes = self.car_cells()
+		#A later car overwrites an earlier one in the same cell
+		for carnum in range(0,len(cells)):
+			self.lane_vehicles[cells[carnum],lanes[carnum]] = carnum+1
+
+		self.lane_positions = []
+		self.lane_cars = []
+		for i in range(0,self.numlanes):
+			positions = np.flatnonzero(self.lane_vehicles[:,i])
+			self.lane_positions.append(positions)
+			self.lane_cars.append(self.lane_vehicles[positions,i].astype(int)-1)
 
 	def check_spawn_constraints(self):
-		#At present a bruteforce check for spacing between cars and a crude solution, can be optimized later
-		for i in range(0,self.numlanes):
-			indices_of_interest = np.nonzero(self.lane_vehicles[:,i])
-			indices_of_interest = indices_of_interest[0]
-			logger.info("indices of interest:")
-			logger.info(indices_of_interest)
-			if len(indices_of_interest) <= 1:
-				continue
-			else:
-				for j in range(0,len(indices_of_interest)):
-					for k in range(j+1,len(indices_of_interest)):
-						distance_between = indices_of_interest[j] - indices_of_interest[k]
-						coord_j = int(self.lane_vehicles[indices_of_interest[j],i]-1)
-						coord_k = int(self.lane_vehicles[indices_of_interest[k],i]-1)
-						if (distance_between < 3) and (distance_between > 0):
-							self.cars_on_road[coord_j].pos_x = (self.cars_on_road[coord_k].pos_x+3) % self.map_length
-						elif (distance_between > -3) and (distance_between < 0):
-							self.cars_on_road[coord_k].pos_x = (self.cars_on_road[coord_k].pos_x+3) % self.map_length
-						self.update_grid_occupancies()
+		#Push every car that is less than spawn_spacing ahead of the car behind it in its lane forward by spawn_spacing, in one pass
+		if len(self.cars_on_road) <= 1:
+			return
+
+		cells, lanes = self.car_cells()
+		order = np.lexsort((cells, lanes))
+		same_lane = lanes[order[1:]] == lanes[order[:-1]]
+		too_close = same_lane & (cells[order[1:]] - cells[order[:-1]] < self.spawn_spacing)
+		if not np.any(too_close):
+			return
+
+		for carnum in order[1:][too_close]:
+			car = self.cars_on_road[carnum]
+			car.pos_x = (car.pos_x+self.spawn_spacing) % self.map_length
+		self.update_grid_occupancies()
 
 	def check_adjacent_occupancies(self,car):
 
@@ -223,31 +249,25 @@ class Traffic():
 		#margin_ahead = 11
 		indice_ahead = int(min(car.pos_x+margin_ahead,self.map_length-1))
 
-		grid_slice_required =self.lane_vehicles[int(car.pos_x+1):indice_ahead,int(car.lane)]
-		vehicle_ahead = None
-
-		for i in range(0,len(grid_slice_required)):
-			if grid_slice_required[i] == 0:
-				continue
-			else:
-				vehicle_ahead = int(grid_slice_required[i]-1)
-				break
+		vehicle_ahead = self.first_car_in(int(car.lane), int(car.pos_x+1), indice_ahead)
 
 		if (car.pos_x + margin_ahead > self.map_length-1) and (vehicle_ahead is None):
 			indice_ahead = int((car.pos_x+margin_ahead)%self.map_length)
-			grid_slice_required = self.lane_vehicles[0:indice_ahead+1,int(car.lane)]
-
-			for i in range(0,len(grid_slice_required)):
-				if grid_slice_required[i] == 0:
-					continue
-				else:
-					vehicle_ahead = int(grid_slice_required[i]-1)
-					break
+			vehicle_ahead = self.first_car_in(int(car.lane), 0, indice_ahead+1)
 
 		# print("Vehicle Ahead: ", vehicle_ahead)
 
 		return vehicle_ahead
 
+	def first_car_in(self, lane, start, stop):
+		#Index of the car in the lowest cell of lane_vehicles[start:stop, lane], None if there is none
+		cells = range(self.map_length)[start:stop]
+		positions = self.lane_positions[lane]
+		k = np.searchsorted(positions, cells.start)
+		if k < len(positions) and positions[k] < cells.stop:
+			return int(self.lane_cars[lane][k])
+		return None
+
 	def time_tick(self,mode='Auto'):
 		margin_safety = 10
 
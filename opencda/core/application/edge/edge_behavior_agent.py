@@ -68,7 +68,8 @@ class EdgeBehaviorAgent(BehaviorAgent):
             self).__init__(
             vehicle,
             carla_map,
-            behavior_yaml)
+            behavior_yaml,
+            cav_world=v2x_manager.cav_world)
 
         self.vehicle_manager = weakref.ref(vehicle_manager)()
         # communication manager
@@ -8,6 +8,8 @@
 
 import uuid
 import weakref
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor, wait
 
 import carla
 import matplotlib.pyplot as plt
@@ -106,6 +108,19 @@ class EdgeManager(object):
         self.search_dt = config_yaml['search_dt'] if 'search_dt' in config_yaml else 2.00
         self.numlanes = config_yaml['num_lanes'] if 'num_lanes' in config_yaml else 4
 
+        # slices are planned on a process pool if planner_workers > 0. A
+        # slice whose search takes longer than planning_budget (s) keeps
+        # its cars' current lanes and speeds for the tick; searches are
+        # not limited unless a budget is set
+        self.planner_workers = config_yaml['planner_workers'] if 'planner_workers' in config_yaml else 0
+        self.planning_budget = config_yaml['planning_budget'] if 'planning_budget' in config_yaml else None
+        self.planner_pool = None
+        if self.planner_workers > 0:
+            # spawn rather than fork: the edge process holds a carla client
+            # and grpc channels that must not be shared with the workers
+            self.planner_pool = ProcessPoolExecutor(self.planner_workers,
+                                                    mp_context=mp.get_context('spawn'))
+
     def start_edge(self):
       self.get_four_lane_waypoints_dict()
       self.processor = transform_processor(self.waypoints_dict)
@@ -119,11 +134,11 @@ class EdgeManager(object):
       #       print("Current indice is: ", k[0,0])
       #       self.secondary_offset = -k[0,0]
 
+      locations = [vehicle_manager.vehicle.get_location() for vehicle_manager in self.vehicle_manager_list]
+      spawn_x, spawn_y = self.processor.process_waypoints_forward([location.x for location in locations],
+                                                                  [location.y for location in locations])
       for vehicle_manager in self.vehicle_manager_list:
-          spawn_coords = vehicle_manager.vehicle.get_location()
-          spawn_coords = np.array([spawn_coords.x,spawn_coords.y]).reshape((2,1))
-          # print(spawn_coords)
-          spawn_coords = self.processor.process_single_waypoint_forward(spawn_coords[0,0],spawn_coords[1,0])
+          spawn_coords = (spawn_x[i], spawn_y[i])
           # print(spawn_coords)
           # sys.exit()
           # self.spawn_x.append(vehicle_manager.vehicle.get_location().x)
@@ -142,6 +157,11 @@ class EdgeManager(object):
           #vehicle_manager.agent.get_local_planner().get_waypoint_buffer().clear() # clear waypoint buffer at start
       self.Traffic_Tracker = Traffic(self.search_dt,self.numlanes,numcars=self.numcars,map_length=200,x_initial=self.spawn_x,y_initial=self.spawn_y,v_initial=self.spawn_v)
 
+      if self.planner_pool is not None:
+          # start the workers and load the planner there before the first
+          # tick counts against the planning budget
+          wait([self.planner_pool.submit(generate_limits_grid) for _ in range(self.planner_workers)])
+
     def get_four_lane_waypoints_dict(self):
       world = self.carla_client.get_world()
       self._dao = GlobalRoutePlannerDAO(world.get_map(), 2)
@@ -335,8 +355,12 @@ class EdgeManager(object):
         # end_time = time.time()
         # logger.debug("Vehicle Manager Update Info Time: %s", (end_time - start_time))
         start_time = time.time()
+        locations = [vehicle_manager.vehicle.get_location() for vehicle_manager in self.vehicle_manager_list]
+        # all cars are transformed in one go
+        x_array, y_array = self.processor.process_waypoints_forward([location.x for location in locations],
+                                                                    [location.y for location in locations])
         for i in range(len(self.vehicle_manager_list)):
-            x,y = self.processor.process_single_waypoint_forward(self.vehicle_manager_list[i].vehicle.get_location().x, self.vehicle_manager_list[i].vehicle.get_location().y)
+            x, y = x_array[i], y_array[i]
             v = self.vehicle_manager_list[i].vehicle.get_velocity()
             v_scalar = math.sqrt(v.x**2 + v.y**2 + v.z**2)
             self.spawn_x.append(x)
@@ -352,7 +376,11 @@ class EdgeManager(object):
         start_time = time.time()
         #Added in to check if traffic tracker updating would fix waypoint deque issue
         # TODO: data drive num cars
-        self.Traffic_Tracker = Traffic(self.search_dt,self.numlanes,numcars=self.numcars,map_length=200,x_initial=self.spawn_x,y_initial=self.spawn_y,v_initial=self.spawn_v)
+        if self.Traffic_Tracker is None:
+            self.Traffic_Tracker = Traffic(self.search_dt,self.numlanes,numcars=self.numcars,map_length=200,x_initial=self.spawn_x,y_initial=self.spawn_y,v_initial=self.spawn_v)
+        else:
+            # the tracker's cars are moved to the observed states in place
+            self.Traffic_Tracker.respawn_vehicles(self.spawn_x, self.spawn_y, self.spawn_v)
         end_time = time.time()
         logger.debug("Traffic Tracker Time: %s", (end_time - start_time))
 
@@ -371,20 +399,18 @@ class EdgeManager(object):
 
         slice_list, vel_array, lanechange_command = get_slices_clustered(self.Traffic_Tracker, self.numcars)
 
-        for i in range(len(slice_list)-1,-1,-1): #Iterate through all slices
-            if len(slice_list[i]) >= 2: #If the slice has more than one vehicle, run the graph planner. Else it'll move using existing
-            #responses - slow down on seeing a vehicle ahead that has slower velocities, else hit target velocity.
-            #Somewhat suboptimal, ideally the other vehicle would be
-            #folded into existing groups. No easy way to do that yet.
-                #print("Slicing")
-                a_star = AStarPlanner(slice_list[i], self.ov, self.oy, self.grid_size, self.robot_radius, self.Traffic_Tracker.cars_on_road, i)
-                rv, ry, rx_tracked = a_star.planning()
-                if len(ry) >= 2: #If there is some planner result, then we move ahead on using it
-                    lanechange_command[i] = ry[-2]
-                    vel_array[i] = rv[-2]
-                else: #If the planner returns an empty list, continue as before - use emergency responses.
-                    lanechange_command[i] = ry[0]
-                    vel_array[i] = ry[0]
+        #If the slice has more than one vehicle, run the graph planner. Else it'll move using existing
+        #responses - slow down on seeing a vehicle ahead that has slower velocities, else hit target velocity.
+        #Somewhat suboptimal, ideally the other vehicle would be
+        #folded into existing groups. No easy way to do that yet.
+        planned_slices = [i for i in range(len(slice_list)-1,-1,-1) if len(slice_list[i]) >= 2]
+
+        over_budget = plan_slices(self.Traffic_Tracker.cars_on_road, planned_slices, lanechange_command, vel_array,
+                                  self.ov, self.oy, self.grid_size, self.robot_radius, self.planning_budget,
+                                  self.planner_pool)
+        for i in over_budget:
+            # no command: the slice's cars continue as before
+            logger.warning("slice %s search exceeded the %ss planning budget", i, self.planning_budget)
 
         #print("Sliced")
         for i in range(len(slice_list)-1,-1,-1): #Relay lane change commands and new velocities to vehicles where needed
@@ -449,31 +475,8 @@ class EdgeManager(object):
         #   waypoints_rev[7] = np.hstack((waypoints_rev[7],back[6]))
         #   waypoints_rev[8] = np.hstack((waypoints_rev[8],back[7]))
 
-        waypoints_rev = {}
-        car_locations = {}
-        for cars in range(1,self.numcars+1):
-            waypoints_rev[str(cars)] = np.empty((2,0))
-            car_locations[str(cars)] = []
-
-        for i in range(0,self.xcars.shape[1]):
-          processed_array = []
-          for j in range(0,self.numcars):
-            x_res = self.xcars[j,i]
-            y_res = self.ycars[j,i]
-            processed_array.append(np.array([[x_res],[y_res]]))
-            #print("Appending to waypoints_rev")
-          #print(processed_array)
-          back = self.processor.process_back(processed_array)
-
-          #print(waypoints_rev)
-          #print(waypoints_rev.keys())
-          for j in range(0,self.numcars):
-            #print(len(back))
-            #print(j)
-            # print(waypoints_rev[str(j+1)])
-            # print(back[str(j)])
-            # print(np.hstack((waypoints_rev[str(j+1)],back[str(j)])))
-            waypoints_rev[str(j+1)] = np.hstack((waypoints_rev[str(j+1)],back[j]))
+        # every car over the whole horizon is transformed back in one go
+        back_x, back_y = self.processor.process_waypoints_back(self.xcars, self.ycars)
 
         # processed_array = []
         # for k in range(0,4): #Added 16/03 outer loop to check if waypoint horizon influenced things, it did not seem to.
@@ -493,9 +496,10 @@ class EdgeManager(object):
         # car_locations = {1 : [], 2 : [], 3 : [], 4 : [], 5 : [], 6 : [], 7 : [], 8 : []}
 
         logger.warning("CREATING OVERRIDE WAYPOINTS")
-        for car, car_array in waypoints_rev.items():
-          for i in range(0,len(car_array[0])):
-            location = self._dao.get_waypoint(carla.Location(x=car_array[0][i], y=car_array[1][i], z=0.0))
+        for j in range(0,self.numcars):
+          car = str(j+1)
+          for i in range(0,back_x.shape[1]):
+            location = self._dao.get_waypoint(carla.Location(x=back_x[j,i], y=back_y[j,i], z=0.0))
             logger.info("algorithm_step: car_%s location - %s", car, location)
             self.locations.append(location)
 
@@ -648,5 +652,8 @@ class EdgeManager(object):
         """
         Destroy edge vehicles actors inside simulation world.
         """
+        if self.planner_pool is not None:
+            # algorithm_step waits for all of its plans, so none is pending
+            self.planner_pool.shutdown(wait=True)
         for vm in self.vehicle_manager_list:
             vm.destroy()
@@ -78,7 +78,39 @@ class NetworkEmulator:
         return None
     
     def update_waypoints(self):
+        NetworkEmulator.update_waypoints_batch([self])
+
+    @staticmethod
+    def update_waypoints_batch(network_emulators):
+        '''
+        update_waypoints for several vehicles at once, e.g. all the vehicles hosted by one process
+        the routes of the vehicles the edge sends to a new destination are searched together
+        '''
+        reroutes = {} # road graph -> list of (agent, (start waypoint, end waypoint))
+        for network_emulator in network_emulators:
+            waypoints = network_emulator._apply_waypoints()
+            if waypoints is not None:
+                agent = network_emulator.vehicle_manager.agent
+                planner = agent.get_global_planner()
+                reroutes.setdefault(id(planner.get_graph()[0]), []).append((agent, waypoints))
+
+        for group in reroutes.values():
+            planner = group[0][0].get_global_planner()
+            route_traces = planner.trace_routes([(start.transform.location, end.transform.location)
+                                                 for _, (start, end) in group])
+            for (agent, (_, end)), route_trace in zip(group, route_traces):
+                if route_trace is None:
+                    logger.error("no route to edge destination %s", end.transform.location)
+                    continue
+                agent.set_route_trace(route_trace, clean=True)
+
+    def _apply_waypoints(self):
+        '''
+        applies the latest waypoints from the edge
+        returns the (start, end) waypoints of the new destination still to be routed, if the edge set one
+        '''
         is_wp_valid = False
+        destination_waypoints = None
         waypoint_proto = self.fetch_wp()
         if waypoint_proto != None:
             '''
@@ -98,7 +130,7 @@ class NetworkEmulator:
                     cur_location = self.vehicle_manager.vehicle.get_location()
                     start_location = carla.Location(x=cur_location.x, y=cur_location.y, z=cur_location.z)
                     end_location = carla.Location(x=wp.transform.location.x, y=wp.transform.location.y, z=wp.transform.location.z)
-                    self.vehicle_manager.set_destination(start_location, end_location, clean=True, end_reset=True)
+                    destination_waypoints = self.vehicle_manager.agent.prepare_destination(start_location, end_location, clean=True, end_reset=True)
                     logger.info("edge set destination to %s", end_location)
 
                 elif is_wp_valid:
@@ -117,3 +149,5 @@ class NetworkEmulator:
         waypoints_buffer_printer = self.vehicle_manager.agent.get_local_planner().get_waypoint_buffer()
         for waypoints in waypoints_buffer_printer:
             logger.debug("waypoint_proto: waypoints transform for Vehicle: %s", waypoints[0].transform)
+
+        return destination_waypoints
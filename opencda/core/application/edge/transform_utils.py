@@ -31,6 +31,22 @@ def get_base_offset(x,y,rotation_mat):
     rot_base = np.matmul(rotation_mat,rot_base)
     return -rot_base
 
+def transform_array(x,y,rotation_mat,offset):
+    """
+    transform for many points at once: x and y are arrays of the same shape,
+    and the transformed coordinates come back in that shape.
+    """
+    x = np.asarray(x, dtype=float)
+    points = np.vstack((x.ravel(), np.asarray(y, dtype=float).ravel()))
+    points = (np.matmul(rotation_mat,points) + offset).astype(int)
+    return points[0].reshape(x.shape), points[1].reshape(x.shape)
+
+def inverse_transform_array(x,y,rotation_mat,offset):
+    x = np.asarray(x, dtype=float)
+    points = np.vstack((x.ravel(), np.asarray(y, dtype=float).ravel()))
+    points = np.matmul(rotation_mat,points+offset)
+    return points[0].reshape(x.shape), points[1].reshape(x.shape)
+
 def transform(waypoint_x,waypoint_y,rotation_mat,offset):
     point_vec = np.array([[waypoint_x],[waypoint_y]])
     return (np.matmul(rotation_mat,point_vec) + offset).astype(int)
@@ -126,21 +142,34 @@ class transform_processor():
         self.offset = get_base_offset(waypoints[1]['x'][0],waypoints[1]['y'][0],self.rotation_mat)
         self.scaling = get_scaling(waypoints)
         self.scaling = [1] + self.scaling
+        self.scaling_array = np.array(self.scaling)
         self.waypoints = waypoints
         self.lanewidth = 3 #Difference between adjacent lane indices, rounded to int, has to be found or coded as 'edge configuration' parameter
 
     def process_single_waypoint_forward(self, waypoint_x, waypoint_y):
-        np_waypoint = transform(waypoint_x, waypoint_y, self.rotation_mat, self.offset)
-        # print("Preprocessed Waypoint: ", np_waypoint)
-        lane_number = -int(np_waypoint[1,0]/self.lanewidth) #Sign change present since all waypoints turned out negative, handle that case later more cleanly
-        lane_number = max(lane_number,0)
-        lane_number = min(lane_number,3) #4 lanes, hardcoded for now.
-        # print("Lane Found: ", lane_number)
-        np_waypoint[1,0] = lane_number # max(np_waypoint[1,0]*self.scaling[lane_number] - 1,0) #Handle edge case of zero lane
-        # print("Scaling: %s " %self.scaling)
-        # print("Waypoint Processed: ", np_waypoint)
-        # sys.exit()
-        return (np_waypoint[0,0], np_waypoint[1,0])
+        x, lane_number = self.process_waypoints_forward([waypoint_x], [waypoint_y])
+        return (x[0], lane_number[0])
+
+    def process_waypoints_forward(self, waypoints_x, waypoints_y):
+        """
+        Map world positions, e.g. of all cars or whole horizons, to
+        (x, lane number) with one matrix multiply.
+
+        Parameters
+        ----------
+        waypoints_x, waypoints_y : np.ndarray
+            World coordinates of the points, of any (matching) shape.
+
+        Returns
+        -------
+        x, lane_number : np.ndarray
+            Integer x along the road and lane of every point, in the shape
+            of the inputs.
+        """
+        x, y = transform_array(waypoints_x, waypoints_y, self.rotation_mat, self.offset)
+        lane_number = -np.trunc(y/self.lanewidth).astype(int) #Sign change present since all waypoints turned out negative, handle that case later more cleanly
+        lane_number = np.clip(lane_number,0,3) #4 lanes, hardcoded for now.
+        return x, lane_number
 
     def process_waypoints_bidirectional(self,indice): #Present for test purposes mainly
         initial_compute_flag = 0
@@ -185,20 +214,31 @@ class transform_processor():
         return rot_end
 
     def process_back(self,processed_forward_array):
-        initial_compute_flag = 0
-        counter = 0
-        rot_inverted = []
-
-        for i in range(0,len(processed_forward_array)):# len(self.waypoints.keys())):
-            if processed_forward_array[i][1,0] != 0:
-                processed_forward_array[i][1,0] = (processed_forward_array[i][1,0]+1)/self.scaling[int(processed_forward_array[i][1,0])]# counter]
-
-            rot_inverted.append(inverse_transform(processed_forward_array[i][0,0],processed_forward_array[i][1,0],
-                self.inverse_rotation_mat,-self.offset))
-            #print("Inverted: ", rot_inverted[-1])
-            counter += 1
-
-        return rot_inverted
+        points = np.hstack(processed_forward_array)
+        x, y = self.process_waypoints_back(points[0], points[1])
+        return [np.array([[x[i]],[y[i]]]) for i in range(0,len(x))]
+
+    def process_waypoints_back(self, x, lane_number):
+        """
+        Map (x, lane number) points, e.g. all cars over a whole horizon,
+        back to world positions with one matrix multiply.
+
+        Parameters
+        ----------
+        x, lane_number : np.ndarray
+            Road coordinates of the points, of any (matching) shape.
+
+        Returns
+        -------
+        waypoints_x, waypoints_y : np.ndarray
+            World coordinates of every point, in the shape of the inputs.
+        """
+        lane_number = np.asarray(lane_number, dtype=float)
+        y = lane_number.copy()
+        scaled = lane_number != 0
+        y[scaled] = (lane_number[scaled]+1)/self.scaling_array[lane_number[scaled].astype(int)]
+
+        return inverse_transform_array(x, y, self.inverse_rotation_mat, -self.offset)
 
 #waypoints = load_obj('waypoints')
 #print(waypoints.keys())
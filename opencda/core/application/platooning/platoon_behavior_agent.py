@@ -74,7 +74,8 @@ class PlatooningBehaviorAgent(BehaviorAgent):
             self).__init__(
             vehicle,
             carla_map,
-            behavior_yaml)
+            behavior_yaml,
+            cav_world=v2x_manager.cav_world)
 
         self.vehicle_manager = weakref.ref(vehicle_manager)()
         # communication manager
@@ -623,11 +624,11 @@ class PlatooningBehaviorAgent(BehaviorAgent):
         frontal_vehicle = frontal_vehicle_manager.vehicle
         frontal_vehicle_speed = \
             frontal_vehicle_manager.v2x_manager.get_ego_speed()
-        frontal_lane = self._map.get_waypoint(
+        frontal_lane = self._lane_index.project(
             frontal_vehicle_manager.v2x_manager.get_ego_pos().location).lane_id
 
         ego_vehicle_loc = self._ego_pos.location
-        ego_vehicle_lane = self._map.get_waypoint(ego_vehicle_loc).lane_id
+        ego_vehicle_lane = self._lane_index.project(ego_vehicle_loc).lane_id
         ego_vehicle_yaw = self._ego_pos.rotation.yaw
 
         distance, angle = cal_distance_angle(frontal_vehicle.get_location(),
@@ -701,7 +702,7 @@ class PlatooningBehaviorAgent(BehaviorAgent):
         # the platooning
         frontal_vehicle = frontal_vehicle_manager.vehicle
         frontal_speed = frontal_vehicle_manager.v2x_manager.get_ego_speed()
-        frontal_lane = self._map.get_waypoint(
+        frontal_lane = self._lane_index.project(
             frontal_vehicle_manager.v2x_manager.get_ego_pos().location).lane_id
 
         # retrieve the platooning's destination
@@ -843,8 +844,8 @@ class PlatooningBehaviorAgent(BehaviorAgent):
         rear_vehicle_speed = rear_vehicle_manager.v2x_manager.get_ego_speed()
 
         rear_lane = \
-            self._map.get_waypoint(rear_vehicle_manager.v2x_manager.
-                                   get_ego_pos().location).lane_id
+            self._lane_index.project(rear_vehicle_manager.v2x_manager.
+                                     get_ego_pos().location).lane_id
 
         # retrieve the platooning's destination
         platooning_manager, _ = \
@@ -28,6 +28,9 @@ class PlatooningManager(object):
     cav_world : opencda object
         CAV world that stores all CAV information.
 
+    command_batch : opencda.core.common.command_batch.CommandBatch
+        If given, the members' controls are sent in one batch per step.
+
     Attributes
     ----------
     pmid : int
@@ -46,7 +49,7 @@ class PlatooningManager(object):
         The counter that record the number of speed recovery attempts.
     """
 
-    def __init__(self, config_yaml, cav_world):
+    def __init__(self, config_yaml, cav_world, command_batch=None):
 
         self.pmid = str(uuid.uuid1())
 
@@ -61,6 +64,8 @@ class PlatooningManager(object):
         self.origin_leader_target_speed = 0
         self.recover_speed_counter = 0
 
+        self.command_batch = command_batch
+
         cav_world.update_platooning(self)
         self.cav_world = weakref.ref(cav_world)()
 
@@ -229,8 +234,14 @@ class PlatooningManager(object):
                 self.leader_target_speed)
             control_list.append(control)
 
-        for (i, control) in enumerate(control_list):
-            self.vehicle_manager_list[i].vehicle.apply_control(control)
+        if self.command_batch is not None:
+            for (i, control) in enumerate(control_list):
+                self.command_batch.apply_control(
+                    self.vehicle_manager_list[i].vehicle, control)
+            self.command_batch.flush()
+        else:
+            for (i, control) in enumerate(control_list):
+                self.vehicle_manager_list[i].vehicle.apply_control(control)
 
         return control_list
 
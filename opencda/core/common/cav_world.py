@@ -4,6 +4,11 @@
 # License: TDG-Attribution-NonCommercial-NoDistrib
 
 import importlib
+import math
+import os
+
+from opencda.core.common.world_snapshot import WorldActorSnapshot
+from opencda.core.plan.lane_index import LaneIndex
 
 
 class CavWorld(object):
@@ -18,6 +23,10 @@ class CavWorld(object):
         Whether apply ml/dl models in this simulation, please make sure
         you have install torch/sklearn before setting this to True.
 
+    route_cache_dir : str
+        Directory of the on-disk road graph cache. None disables the disk
+        cache; the graph is then still shared in memory.
+
     Attributes
     ----------
     vehicle_id_set : set
@@ -31,9 +40,38 @@ class CavWorld(object):
 
     ml_manager : opencda object.
         The machine learning manager class.
+
+    _v2x_grid : dict
+        Uniform grid over the positions CAVs broadcast through v2x. Key is
+        the (i, j) cell index and value is a dict of the vids in the cell.
+
+    _v2x_positions : dict
+        The latest broadcast (x, y, z) of each CAV, keyed by vid.
+
+    _world_snapshot : WorldActorSnapshot
+        Vehicle and traffic light state of the latest simulation frame,
+        shared by the CAVs' ground-truth perception.
+
+    _route_graphs : dict
+        Road graphs for global route planning, keyed by
+        (map name, sampling resolution).
+
+    _route_caches : dict
+        Route caches shared by the planners using each road graph, with
+        the same keys as _route_graphs.
+
+    _lane_indices : dict
+        Lane centerline indices, keyed by map name.
     """
 
-    def __init__(self, apply_ml=False):
+    # edge length (m) of a v2x grid cell
+    V2X_GRID_SIZE = 50.0
+
+    DEFAULT_ROUTE_CACHE_DIR = \
+        os.path.join(os.path.expanduser('~'), '.cache', 'opencda')
+
+    def __init__(self, apply_ml=False,
+                 route_cache_dir=DEFAULT_ROUTE_CACHE_DIR):
 
         self.vehicle_id_set = set()
         self._vehicle_manager_dict = {}
@@ -42,6 +80,16 @@ class CavWorld(object):
         self._scenario_manager = None
         self.ml_manager = None
 
+        self._v2x_grid = {}
+        self._v2x_positions = {}
+
+        self._world_snapshot = None
+
+        self.route_cache_dir = route_cache_dir
+        self._route_graphs = {}
+        self._route_caches = {}
+        self._lane_indices = {}
+
         if apply_ml:
             # we import in this way so the user don't need to install ml
             # packages unless they require to
@@ -113,6 +161,205 @@ class CavWorld(object):
         """
         self.sumo2carla_ids = sumo2carla_ids
 
+    def _v2x_cell(self, x, y):
+        return int(math.floor(x / self.V2X_GRID_SIZE)), \
+               int(math.floor(y / self.V2X_GRID_SIZE))
+
+    def update_v2x_position(self, vid, location):
+        """
+        Update the position a CAV currently broadcasts to other CAVs.
+
+        Parameters
+        ----------
+        vid : str
+            The vehicle manager's uuid.
+
+        location : carla.Location
+            The broadcast location, with v2x noise and lag already applied.
+        """
+        position = (location.x, location.y, location.z)
+        cell = self._v2x_cell(location.x, location.y)
+
+        old_position = self._v2x_positions.get(vid)
+        if old_position is not None:
+            old_cell = self._v2x_cell(old_position[0], old_position[1])
+            if old_cell != cell:
+                old_bucket = self._v2x_grid[old_cell]
+                del old_bucket[vid]
+                if not old_bucket:
+                    del self._v2x_grid[old_cell]
+
+        self._v2x_grid.setdefault(cell, {})[vid] = None
+        self._v2x_positions[vid] = position
+
+    def remove_v2x_position(self, vid):
+        """
+        Stop indexing a CAV, e.g. once it is destroyed.
+
+        Parameters
+        ----------
+        vid : str
+            The vehicle manager's uuid.
+        """
+        position = self._v2x_positions.pop(vid, None)
+        if position is None:
+            return
+
+        cell = self._v2x_cell(position[0], position[1])
+        bucket = self._v2x_grid[cell]
+        del bucket[vid]
+        if not bucket:
+            del self._v2x_grid[cell]
+
+    def search_v2x_nearby(self, location, radius):
+        """
+        Find the CAVs whose broadcast position is within radius of location.
+
+        Parameters
+        ----------
+        location : carla.Location
+            Center of the search.
+
+        radius : float
+            Search radius in meters.
+
+        Returns
+        -------
+        vids : list
+            The uuids of the CAVs in range.
+        """
+        cx, cy = self._v2x_cell(location.x, location.y)
+        reach = int(math.ceil(radius / self.V2X_GRID_SIZE))
+
+        if (2 * reach + 1) ** 2 < len(self._v2x_grid):
+            buckets = [self._v2x_grid.get((i, j), ())
+                       for i in range(cx - reach, cx + reach + 1)
+                       for j in range(cy - reach, cy + reach + 1)]
+        else:
+            # range covers more cells than are occupied
+            buckets = self._v2x_grid.values()
+
+        radius_sq = radius * radius
+        vids = []
+        for bucket in buckets:
+            for vid in bucket:
+                x, y, z = self._v2x_positions[vid]
+                dx = x - location.x
+                dy = y - location.y
+                dz = z - location.z
+                if dx * dx + dy * dy + dz * dz < radius_sq:
+                    vids.append(vid)
+
+        return vids
+
+    def get_world_snapshot(self, world):
+        """
+        Return the actor snapshot of the current frame, building it on the
+        first request of each frame. A snapshot that is at least as recent
+        as the client's frame, e.g. one injected by set_world_snapshot while
+        this client lags behind the ticking process, is kept.
+
+        Parameters
+        ----------
+        world : carla.World
+            The carla world.
+
+        Returns
+        -------
+        world_snapshot : WorldActorSnapshot
+            Vehicle and traffic light state of the current frame.
+        """
+        snapshot = world.get_snapshot()
+        if self._world_snapshot is None or \
+                self._world_snapshot.frame < snapshot.frame:
+            self._world_snapshot = WorldActorSnapshot(world, snapshot,
+                                                      self._world_snapshot)
+        return self._world_snapshot
+
+    def set_world_snapshot(self, world_snapshot):
+        """
+        Use a snapshot built elsewhere, e.g. by the process ticking the
+        world, for its frame.
+
+        Parameters
+        ----------
+        world_snapshot : WorldActorSnapshot
+            Vehicle and traffic light state of the current frame.
+        """
+        self._world_snapshot = world_snapshot
+
+    def get_route_graph(self, carla_map, sampling_resolution):
+        """
+        Return the road graph for global route planning, loading or building
+        it on the first request for a map and resolution.
+
+        Parameters
+        ----------
+        carla_map : carla.Map
+            The HD map of the simulation world.
+
+        sampling_resolution : float
+            Sampling distance between waypoints.
+
+        Returns
+        -------
+        route_graph : tuple
+            (graph, id_map, road_id_to_edge) for
+            GlobalRoutePlanner.set_graph.
+        """
+        key = (carla_map.name, sampling_resolution)
+        if key not in self._route_graphs:
+            # imported here so carla is only needed once routing is used
+            get_route_graph = getattr(importlib.import_module(
+                "opencda.core.plan.route_graph_cache"), 'get_route_graph')
+            self._route_graphs[key] = get_route_graph(
+                carla_map, sampling_resolution, self.route_cache_dir)
+        return self._route_graphs[key]
+
+    def get_route_cache(self, carla_map, sampling_resolution):
+        """
+        Return the route cache shared by the global route planners using
+        the road graph of a map and resolution.
+
+        Parameters
+        ----------
+        carla_map : carla.Map
+            The HD map of the simulation world.
+
+        sampling_resolution : float
+            Sampling distance between waypoints.
+
+        Returns
+        -------
+        route_cache : RouteCache
+            LRU cache of graph routes.
+        """
+        key = (carla_map.name, sampling_resolution)
+        if key not in self._route_caches:
+            route_cache = getattr(importlib.import_module(
+                "opencda.core.plan.global_route_planner"), 'RouteCache')
+            self._route_caches[key] = route_cache()
+        return self._route_caches[key]
+
+    def get_lane_index(self, carla_map):
+        """
+        Return the lane centerline index of a map, building it on the first
+        request.
+
+        Parameters
+        ----------
+        carla_map : carla.Map
+            The HD map of the simulation world.
+
+        Returns
+        -------
+        lane_index : LaneIndex
+            Nearest-lane lookups shared by every CAV on the map.
+        """
+        if carla_map.name not in self._lane_indices:
+            self._lane_indices[carla_map.name] = LaneIndex(carla_map)
+        return self._lane_indices[carla_map.name]
+
     def get_vehicle_managers(self):
         """
         Return vehicle manager dictionary.
@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+"""
+Batched submission of carla commands.
+"""
+# License: TDG-Attribution-NonCommercial-NoDistrib
+
+import logging
+import time
+
+import carla
+
+logger = logging.getLogger(__name__)
+
+
+def _actor_id(actor):
+    return actor.id if hasattr(actor, 'id') else actor
+
+
+class CommandBatch(object):
+    """
+    Collects the carla commands of one tick, e.g. the controls of every
+    vehicle, and submits them in a single apply_batch_sync round trip
+    instead of one RPC per actor. Commands run in the order they were
+    added.
+
+    Parameters
+    ----------
+    client : carla.Client
+        The client the batch is submitted through.
+    """
+
+    def __init__(self, client):
+        self.client = client
+        self._commands = []
+        self._flush_callbacks = []
+
+    def __len__(self):
+        return len(self._commands)
+
+    def add(self, command):
+        """
+        Queue a carla.command.
+
+        Returns
+        -------
+        index : int
+            Position of the command's response in the result of flush.
+        """
+        self._commands.append(command)
+        return len(self._commands) - 1
+
+    def add_flush_callback(self, callback):
+        """
+        Call callback with the duration (ms) of the next flush's round trip
+        once it completes, e.g. to time the delivery of a queued control.
+        """
+        self._flush_callbacks.append(callback)
+
+    def apply_control(self, actor, control):
+        return self.add(carla.command.ApplyVehicleControl(_actor_id(actor),
+                                                          control))
+
+    def apply_transform(self, actor, transform):
+        return self.add(carla.command.ApplyTransform(_actor_id(actor),
+                                                     transform))
+
+    def set_autopilot(self, actor, enabled, tm_port=8000):
+        return self.add(carla.command.SetAutopilot(_actor_id(actor), enabled,
+                                                   tm_port))
+
+    def destroy(self, actor):
+        return self.add(carla.command.DestroyActor(_actor_id(actor)))
+
+    def spawn(self, blueprint, transform, autopilot=False, tm_port=8000):
+        """
+        Queue an actor spawn. The response of the command carries the id
+        of the new actor.
+
+        Parameters
+        ----------
+        blueprint : carla.ActorBlueprint
+            The blueprint of the actor.
+
+        transform : carla.Transform
+            The spawn transform.
+
+        autopilot : bool
+            Hand the spawned vehicle to the traffic manager.
+
+        tm_port : int
+            The traffic manager port.
+        """
+        command = carla.command.SpawnActor(blueprint, transform)
+        if autopilot:
+            command = command.then(carla.command.SetAutopilot(
+                carla.command.FutureActor, True, tm_port))
+        return self.add(command)
+
+    def flush(self, due_tick_cue=False, log_level=logging.WARNING):
+        """
+        Submit the queued commands in one round trip and clear the batch.
+
+        Parameters
+        ----------
+        due_tick_cue : bool
+            Tick the world right after the batch is applied.
+
+        log_level : int
+            Level failed commands are logged at; spawns at occupied
+            positions, for instance, are expected to fail.
+
+        Returns
+        -------
+        responses : list
+            carla.command.Response of every command, in the order they
+            were added. Failed commands have has_error() set.
+        """
+        if not self._commands:
+            return []
+
+        commands, self._commands = self._commands, []
+        callbacks, self._flush_callbacks = self._flush_callbacks, []
+        start_time = time.time()
+        responses = self.client.apply_batch_sync(commands, due_tick_cue)
+        flush_time = (time.time() - start_time) * 1000
+        for callback in callbacks:
+            callback(flush_time)
+        for command, response in zip(commands, responses):
+            if response.has_error():
+                logger.log(log_level, "batched %s on actor %s failed: %s",
+                           type(command).__name__, response.actor_id,
+                           response.error)
+        return responses
@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+"""
+Bookkeeping for incremental (delta) serialization of the debug helpers.
+"""
+# License: TDG-Attribution-NonCommercial-NoDistrib
+
+
+class DeltaTracker(object):
+    """
+    Remembers how many items of each growing debug list have been delivered,
+    so a delta serialization only carries the items added since then.
+
+    Offsets only advance once the delivery of a chunk is confirmed; a chunk
+    whose push fails is discarded and its items go out with the next one.
+
+    Attributes
+    ----------
+    sent_counts : dict
+        List name -> number of items whose delivery was confirmed.
+
+    pending_counts : dict
+        List name -> list length at the last, not yet confirmed, serialization.
+    """
+
+    def __init__(self):
+        self.sent_counts = {}
+        self.pending_counts = {}
+
+    def unsent(self, key, items, delta):
+        """
+        Return the items to serialize: all of them, or with delta only those
+        not yet confirmed as delivered.
+
+        Parameters
+        ----------
+        key : str
+            Name of the list.
+
+        items : list
+            The list itself.
+
+        delta : bool
+            Whether this is an incremental serialization.
+
+        Returns
+        -------
+        items : list
+        """
+        if not delta:
+            return items
+        self.pending_counts[key] = len(items)
+        return items[self.sent_counts.get(key, 0):]
+
+    def confirm(self):
+        """
+        The last serialized chunk was delivered: advance the offsets.
+        """
+        self.sent_counts.update(self.pending_counts)
+        self.pending_counts.clear()
+
+    def discard(self):
+        """
+        The last serialized chunk was lost: keep its items for the next one.
+        """
+        self.pending_counts.clear()
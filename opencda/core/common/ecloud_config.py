@@ -38,6 +38,9 @@ class EcloudConfig(object):
             "client_world_time_factor" : 0.9, # what percentage of last world time to wait initially
             "client_ping_spawn_s" : 0.05, # sleep to wait between pings after spawn
             "client_ping_tick_s" : 0.01, # minimum sleep to wait between pings after spawn
+            "packed_state" : False, # send transform & velocity as a packed binary record rather than nested protos
+            "debug_flush_ticks" : 0, # > 0: vehicles upload debug info deltas every N ticks rather than all at once at the end
+            "parallel_workers" : 0, # > 0: sequential runs step the vehicles on this many local worker processes
         }
 
         self.ecloud_scenario = {
@@ -93,6 +96,18 @@ class EcloudConfig(object):
         self.logger.debug("client_world_time_factor: %s", self.ecloud_base['client_world_time_factor'])
         return self.ecloud_base['client_world_time_factor']
 
+    def get_packed_state(self):
+        self.logger.debug("packed_state: %s", self.ecloud_base['packed_state'])
+        return self.ecloud_base['packed_state']
+
+    def get_debug_flush_ticks(self):
+        self.logger.debug("debug_flush_ticks: %s", self.ecloud_base['debug_flush_ticks'])
+        return self.ecloud_base['debug_flush_ticks']
+
+    def get_parallel_workers(self):
+        self.logger.debug("parallel_workers: %s", self.ecloud_base['parallel_workers'])
+        return self.ecloud_base['parallel_workers']
+
     def get_num_cars(self):
         self.logger.debug("num_cars: %s", self.ecloud_scenario['num_cars'] if self.ecloud_scenario['num_cars'] != 0 else len(self.config_json['scenario']['single_cav_list']))
         return self.ecloud_scenario['num_cars'] if self.ecloud_scenario['num_cars'] != 0 else \
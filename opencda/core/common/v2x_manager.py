@@ -13,7 +13,6 @@ import numpy as np
 
 from opencda.core.application.platooning.platooning_plugin \
     import PlatooningPlugin
-from opencda.core.common.misc import compute_distance
 
 
 class V2XManager(object):
@@ -94,6 +93,9 @@ class V2XManager(object):
         """
         self.ego_pos.append(ego_pos)
         self.ego_spd.append(ego_spd)
+        # sample the noisy/lagged broadcast position once per tick
+        self.cav_world.update_v2x_position(self.vid,
+                                           self.get_ego_pos().location)
         self.search()
 
         # the ego pos in platooning_plugin is used for self-localization,
@@ -153,19 +155,22 @@ class V2XManager(object):
         """
         vehicle_manager_dict = self.cav_world.get_vehicle_managers()
 
-        for vid, vm in vehicle_manager_dict.items():
-            # avoid the Nonetype error at the first simulation step
-            if not vm.v2x_manager.get_ego_pos():
-                continue
+        # only CAVs that have broadcast a position are in the index
+        for vid in self.cav_world.search_v2x_nearby(
+                self.ego_pos[-1].location, self.communication_range):
             # avoid add itself as the cav nearby
             if vid == self.vid:
                 continue
-            distance = compute_distance(
-                self.ego_pos[-1].location,
-                vm.v2x_manager.get_ego_pos().location)
-
-            if distance < self.communication_range:
+            vm = vehicle_manager_dict.get(vid)
+            if vm is not None:
                 self.cav_nearby.update({vid: vm})
+
+    def destroy(self):
+        """
+        Withdraw the ego broadcast position from the shared v2x index.
+        """
+        self.cav_world.remove_v2x_position(self.vid)
+
     """
     -----------------------------------------------------------
                  Below is platooning related 
@@ -157,7 +157,11 @@ class VehicleManager(object):
 
         else: # run_distributed == True
 
-            self.initialize_process() # get world & map info
+            if carla_world is None:
+                self.initialize_process() # get world & map info
+            else: # hosted by a multi-vehicle worker sharing one client
+                self.world = carla_world
+                self.carla_map = carla_map
             self.carla_version = carla_version
 
             # if the spawn position is a single scalar, we need to use map
@@ -297,7 +301,7 @@ class VehicleManager(object):
                 platoon_config,
                 self.carla_map)
         else:
-            self.agent = BehaviorAgent(self.vehicle, self.carla_map, behavior_config, is_dist=self.run_distributed)
+            self.agent = BehaviorAgent(self.vehicle, self.carla_map, behavior_config, is_dist=self.run_distributed, cav_world=cav_world)
             logger.debug("BehaviorAgent created")
 
         # Control module
@@ -526,10 +530,26 @@ class VehicleManager(object):
 
         return control
 
-    def apply_control(self, control):
+    def apply_control(self, control, command_batch=None):
         """
         Apply the controls to the vehicle
+
+        Parameters
+        ----------
+        control : carla.VehicleControl
+            The control to apply.
+
+        command_batch : opencda.core.common.command_batch.CommandBatch
+            If given, the control is queued on the batch and sent when the
+            batch is flushed. The control time is then the round trip of
+            that flush, recorded once it completes.
         """
+        if command_batch is not None:
+            command_batch.apply_control(self.vehicle, control)
+            command_batch.add_flush_callback(
+                self.debug_helper.update_control_time)
+            return
+
         start_time = time.time()
         self.vehicle.apply_control(control)
         end_time = time.time()
@@ -541,4 +561,5 @@ class VehicleManager(object):
         """
         self.perception_manager.destroy()
         self.localizer.destroy()
+        self.v2x_manager.destroy()
         self.vehicle.destroy()
@@ -156,7 +156,7 @@ class VehicleManagerProxy(object):
                 platoon_config,
                 self.carla_map)
         else:
-            self.agent = BehaviorAgent(self.vehicle, self.carla_map, behavior_config)
+            self.agent = BehaviorAgent(self.vehicle, self.carla_map, behavior_config, cav_world=self.cav_world)
 
         # Control module
         self.controller = ControlManager(control_config)
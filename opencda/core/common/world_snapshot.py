@@ -0,0 +1,284 @@
+# -*- coding: utf-8 -*-
+"""
+Per-tick snapshot of the vehicles and traffic lights in the carla world,
+shared by every CAV's ground-truth perception.
+"""
+# License: TDG-Attribution-NonCommercial-NoDistrib
+
+import importlib
+
+import numpy as np
+
+# columns of a packed snapshot row: actor id, location, rotation (pitch, yaw,
+# roll), velocity, bounding box location and bounding box extent
+SNAPSHOT_COLUMNS = 16
+
+
+def _xyz_array(vectors):
+    """
+    Stack carla.Location/carla.Vector3D objects into an (N, 3) array.
+    """
+    return np.array([[v.x, v.y, v.z] for v in vectors],
+                    dtype=np.float64).reshape(-1, 3)
+
+
+class SnapshotVehicle(object):
+    """
+    Read-only stand-in for a carla.Vehicle whose pose and velocity come from
+    a world snapshot. It exposes the subset of the carla.Vehicle interface
+    ObstacleVehicle reads, so no per-actor query is needed.
+
+    Parameters
+    ----------
+    actor_id : int
+        The carla actor id.
+
+    transform : carla.Transform
+        The vehicle transform at the snapshot frame.
+
+    velocity : carla.Vector3D
+        The vehicle velocity at the snapshot frame.
+
+    bounding_box : carla.BoundingBox
+        The vehicle bounding box.
+    """
+
+    def __init__(self, actor_id, transform, velocity, bounding_box):
+        self.id = actor_id
+        self.bounding_box = bounding_box
+        self._transform = transform
+        self._velocity = velocity
+
+    def get_transform(self):
+        return self._transform
+
+    def get_location(self):
+        return self._transform.location
+
+    def get_velocity(self):
+        return self._velocity
+
+
+class WorldActorSnapshot(object):
+    """
+    Vehicle and traffic light state at one simulation frame.
+
+    The actor list is only re-queried from the server when the set of
+    actors in the snapshot changes; poses and velocities are read from
+    the carla.WorldSnapshot. Vehicles spawned after the snapshot was taken
+    are left out until the snapshot of a later frame contains them.
+
+    Parameters
+    ----------
+    world : carla.World
+        The carla world.
+
+    snapshot : carla.WorldSnapshot
+        The snapshot of the current frame.
+
+    previous : WorldActorSnapshot
+        The snapshot of an earlier frame, whose actor lists are reused if
+        no actor was spawned or destroyed since.
+
+    Attributes
+    ----------
+    frame : int
+        The simulation frame of the snapshot.
+
+    vehicles : list
+        SnapshotVehicle for every vehicle in the world.
+
+    vehicle_ids : np.ndarray
+        Carla ids of the vehicles, shape (N,).
+
+    vehicle_locations : np.ndarray
+        Vehicle locations, shape (N, 3).
+
+    vehicle_velocities : np.ndarray
+        Vehicle velocities, shape (N, 3).
+
+    vehicle_extents : np.ndarray
+        Vehicle bounding box extents, shape (N, 3).
+
+    traffic_light_locations : np.ndarray
+        Traffic light locations, shape (M, 3).
+    """
+
+    def __init__(self, world, snapshot, previous=None):
+        self.frame = snapshot.frame
+        self.actor_ids = frozenset(a.id for a in snapshot)
+
+        if previous is not None and previous.actor_ids == self.actor_ids:
+            self._vehicle_actors = previous._vehicle_actors
+            self._bounding_boxes = previous._bounding_boxes
+            self._traffic_lights = previous._traffic_lights
+            self.vehicle_ids = previous.vehicle_ids
+            self.vehicle_extents = previous.vehicle_extents
+            self.traffic_light_locations = previous.traffic_light_locations
+            self._traffic_light_carla_locations = \
+                previous._traffic_light_carla_locations
+        else:
+            actors = world.get_actors()
+            self._vehicle_actors = [v for v in actors.filter('*vehicle*')
+                                    if v.id in self.actor_ids]
+            self._bounding_boxes = \
+                [v.bounding_box for v in self._vehicle_actors]
+            self._traffic_lights = \
+                list(actors.filter('traffic.traffic_light*'))
+            self.vehicle_ids = np.array([v.id for v in self._vehicle_actors],
+                                        dtype=np.int64)
+            self.vehicle_extents = \
+                _xyz_array([bb.extent for bb in self._bounding_boxes])
+            # traffic lights never move
+            self._traffic_light_carla_locations = \
+                [tl.get_location() for tl in self._traffic_lights]
+            self.traffic_light_locations = \
+                _xyz_array(self._traffic_light_carla_locations)
+
+        self.vehicles = []
+        for actor, bounding_box in zip(self._vehicle_actors,
+                                       self._bounding_boxes):
+            actor_snapshot = snapshot.find(actor.id)
+            self.vehicles.append(
+                SnapshotVehicle(actor.id,
+                                actor_snapshot.get_transform(),
+                                actor_snapshot.get_velocity(),
+                                bounding_box))
+
+        self.vehicle_locations = \
+            _xyz_array([v.get_location() for v in self.vehicles])
+        self.vehicle_velocities = \
+            _xyz_array([v.get_velocity() for v in self.vehicles])
+
+    def to_array(self):
+        """
+        Pack the vehicle state into one float64 row per vehicle.
+
+        Returns
+        -------
+        rows : np.ndarray
+            Shape (N, SNAPSHOT_COLUMNS).
+        """
+        rows = np.empty((len(self.vehicles), SNAPSHOT_COLUMNS),
+                        dtype=np.float64)
+        rows[:, 0] = self.vehicle_ids
+        rows[:, 1:4] = self.vehicle_locations
+        rotations = [v.get_transform().rotation for v in self.vehicles]
+        rows[:, 4:7] = np.array([[r.pitch, r.yaw, r.roll]
+                                 for r in rotations]).reshape(-1, 3)
+        rows[:, 7:10] = self.vehicle_velocities
+        rows[:, 10:13] = \
+            _xyz_array([bb.location for bb in self._bounding_boxes])
+        rows[:, 13:16] = self.vehicle_extents
+        return rows
+
+    @classmethod
+    def from_array(cls, frame, rows, traffic_lights=()):
+        """
+        Rebuild a snapshot from rows packed by to_array, e.g. in a process
+        that does not own the world.
+
+        Parameters
+        ----------
+        frame : int
+            The simulation frame of the rows.
+
+        rows : np.ndarray
+            Shape (N, SNAPSHOT_COLUMNS).
+
+        traffic_lights : list
+            (carla.TrafficLight, carla.Location) pairs of the world.
+
+        Returns
+        -------
+        world_snapshot : WorldActorSnapshot
+        """
+        # imported here so only processes rebuilding snapshots need carla
+        carla = importlib.import_module('carla')
+
+        world_snapshot = cls.__new__(cls)
+        world_snapshot.frame = frame
+        world_snapshot.vehicle_ids = rows[:, 0].astype(np.int64)
+        world_snapshot.vehicle_locations = rows[:, 1:4].copy()
+        world_snapshot.vehicle_velocities = rows[:, 7:10].copy()
+        world_snapshot.vehicle_extents = rows[:, 13:16].copy()
+
+        world_snapshot._bounding_boxes = []
+        world_snapshot.vehicles = []
+        for actor_id, row in zip(world_snapshot.vehicle_ids, rows):
+            transform = carla.Transform(
+                carla.Location(x=row[1], y=row[2], z=row[3]),
+                carla.Rotation(pitch=row[4], yaw=row[5], roll=row[6]))
+            bounding_box = carla.BoundingBox(
+                carla.Location(x=row[10], y=row[11], z=row[12]),
+                carla.Vector3D(x=row[13], y=row[14], z=row[15]))
+            world_snapshot._bounding_boxes.append(bounding_box)
+            world_snapshot.vehicles.append(
+                SnapshotVehicle(int(actor_id), transform,
+                                carla.Vector3D(x=row[7], y=row[8], z=row[9]),
+                                bounding_box))
+        world_snapshot._vehicle_actors = world_snapshot.vehicles
+
+        world_snapshot._traffic_lights = [tl for tl, _ in traffic_lights]
+        world_snapshot._traffic_light_carla_locations = \
+            [location for _, location in traffic_lights]
+        world_snapshot.traffic_light_locations = \
+            _xyz_array(world_snapshot._traffic_light_carla_locations)
+        world_snapshot.actor_ids = frozenset(
+            [int(i) for i in world_snapshot.vehicle_ids] +
+            [tl.id for tl in world_snapshot._traffic_lights])
+        return world_snapshot
+
+    @staticmethod
+    def _in_range(locations, location, radius):
+        center = np.array([location.x, location.y, location.z])
+        distances = np.linalg.norm(locations - center, axis=1)
+        return np.flatnonzero(distances < radius)
+
+    def vehicles_in_range(self, location, radius, exclude_id=None):
+        """
+        Retrieve the vehicles within radius of a location.
+
+        Parameters
+        ----------
+        location : carla.Location
+            Center of the search.
+
+        radius : float
+            Search radius in meters.
+
+        exclude_id : int
+            Carla id to leave out, usually the ego vehicle.
+
+        Returns
+        -------
+        vehicles : list
+            The SnapshotVehicle objects in range.
+        """
+        return [self.vehicles[i]
+                for i in self._in_range(self.vehicle_locations,
+                                        location, radius)
+                if self.vehicle_ids[i] != exclude_id]
+
+    def traffic_lights_in_range(self, location, radius):
+        """
+        Retrieve the traffic lights within radius of a location.
+
+        Parameters
+        ----------
+        location : carla.Location
+            Center of the search.
+
+        radius : float
+            Search radius in meters.
+
+        Returns
+        -------
+        traffic_lights : list
+            (carla.TrafficLight, carla.Location) pairs in range.
+        """
+        return [(self._traffic_lights[i],
+                 self._traffic_light_carla_locations[i])
+                for i in self._in_range(self.traffic_light_locations,
+                                        location, radius)]
+
@@ -21,6 +21,7 @@ from opencda.core.plan.collision_check import CollisionChecker
 from opencda.core.plan.local_planner_behavior import LocalPlanner
 from opencda.core.plan.global_route_planner import GlobalRoutePlanner
 from opencda.core.plan.global_route_planner_dao import GlobalRoutePlannerDAO
+from opencda.core.plan.lane_index import LaneIndex
 from opencda.core.plan.planer_debug_helper import PlanDebugHelper
 
 logger = logging.getLogger(__name__)
@@ -42,6 +43,13 @@ class BehaviorAgent(object):
     config_yaml : dict
         The configuration dictionary of the localization module.
 
+    is_dist : boolean
+        Whether the vehicle runs in a distributed vehicle process.
+
+    cav_world : opencda object
+        CAV World object. If given, the global route graph is shared
+        through it instead of being built by every agent.
+
     Attributes
     ----------
     _ego_pos : carla.position
@@ -53,6 +61,10 @@ class BehaviorAgent(object):
     _map : carla.map
         The HD map of the current simulation world.
 
+    _lane_index : LaneIndex
+        Lane centerline index of the map, used for lane id and yaw lookups
+        that do not need a carla.Waypoint.
+
     max_speed : float
         The current speed limit of the ego vehicles.
 
@@ -88,7 +100,8 @@ class BehaviorAgent(object):
         The helper class that help with the debug functions.
     """
 
-    def __init__(self, vehicle, carla_map, config_yaml, is_dist=False):
+    def __init__(self, vehicle, carla_map, config_yaml, is_dist=False,
+                 cav_world=None):
 
         self.vehicle = vehicle
         # ego pos(transform) and speed(km/h) retrieved from localization module
@@ -96,6 +109,9 @@ class BehaviorAgent(object):
         self._ego_speed = 0.0
         self._map = carla_map
         self._is_dist = is_dist
+        self._cav_world = cav_world
+        self._lane_index = cav_world.get_lane_index(carla_map) \
+            if cav_world is not None else LaneIndex(carla_map)
 
         # speed related, check yaml file to see the meaning
         self.max_speed = config_yaml['max_speed']
@@ -110,7 +126,8 @@ class BehaviorAgent(object):
         self.ttc = 1000
         # collision checker
         self._collision_check = CollisionChecker(
-            time_ahead=config_yaml['collision_time_ahead'])
+            time_ahead=config_yaml['collision_time_ahead'],
+            lane_index=self._lane_index)
         self.ignore_traffic_light = config_yaml['ignore_traffic_light']
         self.overtake_allowed = config_yaml['overtake_allowed']
         self.overtake_allowed_origin = config_yaml['overtake_allowed']
@@ -212,35 +229,27 @@ class BehaviorAgent(object):
         new_obstacle_list : list
             The new list of obstacles.
         """
-        new_obstacle_list = []
-
-        for o in obstacles:
-            flag = False
-            o_x = o.get_location().x
-            o_y = o.get_location().y
-
-            o_waypoint = self._map.get_waypoint(o.get_location())
-            o_lane_id = o_waypoint.lane_id
-
-            for vm in self.white_list:
-                pos = vm.v2x_manager.get_ego_pos()
-                vm_x = pos.location.x
-                vm_y = pos.location.y
-
-                w_waypoint = self._map.get_waypoint(pos.location)
-                w_lane_id = w_waypoint.lane_id
-
-                # if the id is different, then not matched for sure
-                if o_lane_id != w_lane_id:
-                    continue
-
-                if abs(vm_x - o_x) <= 3.0 and abs(vm_y - o_y) <= 3.0:
-                    flag = True
-                    break
-            if not flag:
-                new_obstacle_list.append(o)
-
-        return new_obstacle_list
+        if not obstacles or not self.white_list:
+            return list(obstacles)
+
+        o_locations = np.array(
+            [[loc.x, loc.y, loc.z]
+             for loc in (o.get_location() for o in obstacles)])
+        w_locations = np.array(
+            [[loc.x, loc.y, loc.z]
+             for loc in (vm.v2x_manager.get_ego_pos().location
+                         for vm in self.white_list)])
+        o_lane_ids = self._lane_index.lane_ids_of(o_locations)
+        w_lane_ids = self._lane_index.lane_ids_of(w_locations)
+
+        # an obstacle matches a white list member in the same lane that is
+        # within 3 meters along both axes
+        matched = (o_lane_ids[:, np.newaxis] == w_lane_ids) & \
+            np.all(np.abs(o_locations[:, np.newaxis, :2] -
+                          w_locations[np.newaxis, :, :2]) <= 3.0, axis=-1)
+
+        return [o for o, flag in zip(obstacles, matched.any(axis=1))
+                if not flag]
 
     def set_destination(
             self,
@@ -272,6 +281,42 @@ class BehaviorAgent(object):
         clean_history : boolean
             Flag to clean the waypoint history.
         """
+        waypoints = self.prepare_destination(start_location, end_location,
+                                             clean, end_reset, clean_history,
+                                             waypoint_limit)
+        if waypoints is None:
+            return -1
+
+        route_trace = self._trace_route(*waypoints)
+
+        self.set_route_trace(route_trace, clean)
+
+        return 0
+
+    def prepare_destination(
+            self,
+            start_location,
+            end_location,
+            clean=False,
+            end_reset=True,
+            clean_history=False,
+            waypoint_limit=SET_DESTINATION_WAYPOINT_LIMIT):
+        """
+        The part of set_destination that precedes the route search: clean
+        the buffers and find the start and end waypoints. The route between
+        them can then be searched together with those of other vehicles and
+        applied with set_route_trace.
+
+        Parameters
+        ----------
+        See set_destination.
+
+        Returns
+        -------
+        waypoints : tuple
+            (start carla.Waypoint, end carla.Waypoint), or None if no valid
+            start waypoint was found.
+        """
         if clean:
             self.get_local_planner().get_waypoints_queue().clear()
             self.get_local_planner().get_trajectory().clear()
@@ -302,17 +347,27 @@ class BehaviorAgent(object):
                     break
 
         if unable_to_find_wp:
-            return -1
+            return None
 
         end_waypoint = self._map.get_waypoint(end_location)
         if end_reset:
             self.end_waypoint = end_waypoint
 
-        route_trace = self._trace_route(self.start_waypoint, end_waypoint)
+        return self.start_waypoint, end_waypoint
 
-        self._local_planner.set_global_plan(route_trace, clean)
+    def set_route_trace(self, route_trace, clean=False):
+        """
+        Follow a route traced between the waypoints of prepare_destination.
 
-        return 0
+        Parameters
+        ----------
+        route_trace : list
+            List of (carla.Waypoint, RoadOption) from the global planner.
+
+        clean : boolean
+            Flag to clean the waypoint queue.
+        """
+        self._local_planner.set_global_plan(route_trace, clean)
 
     def get_local_planner(self):
         """
@@ -355,22 +410,33 @@ class BehaviorAgent(object):
         end_waypoint : carla.waypoint
             Final position.
         """
-        # Setting up global router
-        if self._global_planner is None:
-            wld = self.vehicle.get_world()
-            dao = GlobalRoutePlannerDAO(
-                wld.get_map(), sampling_resolution=self._sampling_resolution)
-            grp = GlobalRoutePlanner(dao)
-            grp.setup()
-            self._global_planner = grp
-
         # Obtain route plan
-        route = self._global_planner.trace_route(
+        route = self.get_global_planner().trace_route(
             start_waypoint.transform.location,
             end_waypoint.transform.location)
 
         return route
 
+    def get_global_planner(self):
+        """
+        Return the global router, setting it up on first use.
+        """
+        if self._global_planner is None:
+            dao = GlobalRoutePlannerDAO(
+                self._map, sampling_resolution=self._sampling_resolution)
+            if self._cav_world is not None:
+                grp = GlobalRoutePlanner(
+                    dao, self._cav_world.get_route_cache(
+                        self._map, self._sampling_resolution))
+                grp.set_graph(*self._cav_world.get_route_graph(
+                    self._map, self._sampling_resolution))
+            else:
+                grp = GlobalRoutePlanner(dao)
+                grp.setup()
+            self._global_planner = grp
+
+        return self._global_planner
+
     def traffic_light_manager(self, waypoint):
         """
         This method is in charge of behaviors for red lights and stops.
@@ -452,20 +518,21 @@ class BehaviorAgent(object):
         min_distance = 100000
         target_vehicle = None
 
-        for vehicle in self.obstacle_vehicles:
-            collision_free = self._collision_check.collision_circle_check(
-                rx, ry, ryaw, vehicle, self._ego_speed / 3.6, self._map,
-                adjacent_check=adjacent_check)
-            if not collision_free:
-                vehicle_state = True
+        collision_free, _ = self._collision_check.collision_circle_check_batch(
+            rx, ry, ryaw, self.obstacle_vehicles, self._ego_speed / 3.6,
+            self._map, adjacent_check=adjacent_check)
+
+        for i in np.flatnonzero(~collision_free):
+            vehicle = self.obstacle_vehicles[i]
+            vehicle_state = True
 
-                # the vehicle length is typical 3 meters,
-                # so we need to consider that when calculating the distance
-                distance = positive(dist(vehicle) - 3)
+            # the vehicle length is typical 3 meters,
+            # so we need to consider that when calculating the distance
+            distance = positive(dist(vehicle) - 3)
 
-                if distance < min_distance:
-                    min_distance = distance
-                    target_vehicle = vehicle
+            if distance < min_distance:
+                min_distance = distance
+                target_vehicle = vehicle
 
         return vehicle_state, target_vehicle, min_distance
 
@@ -568,8 +635,7 @@ class BehaviorAgent(object):
         vehicle_state : boolean
             Whether the lane change is dangerous.
         """
-        ego_wpt = self._map.get_waypoint(self._ego_pos.location)
-        ego_lane_id = ego_wpt.lane_id
+        ego_lane_id = self._lane_index.project(self._ego_pos.location).lane_id
         target_wpt = None
 
         # check the closest waypoint on the adjacent lane
@@ -920,8 +986,9 @@ class BehaviorAgent(object):
         elif is_hazard and self.overtake_allowed and \
                 self.overtake_counter <= 0:
             obstacle_speed = get_speed(obstacle_vehicle)
-            obstacle_lane_id = self._map.get_waypoint(obstacle_vehicle.get_location()).lane_id
-            ego_lane_id = self._map.get_waypoint(
+            obstacle_lane_id = self._lane_index.project(
+                obstacle_vehicle.get_location()).lane_id
+            ego_lane_id = self._lane_index.project(
                 self._ego_pos.location).lane_id
             # overtake the obstacle vehicle only when speed is bigger and the
             # lane id is the same
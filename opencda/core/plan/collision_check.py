@@ -3,10 +3,6 @@
 
 # Author: Runsheng Xu <rxx3386@ucla.edu>
 # License: TDG-Attribution-NonCommercial-NoDistrib
-import math
-from math import sin, cos
-from scipy import spatial
-
 import carla
 import numpy as np
 
@@ -26,9 +22,16 @@ class CollisionChecker:
         The radius of the collision checking circle.
     circle_offsets : float
         The offset between collision checking circle and the trajectory point.
+    lane_index : LaneIndex
+        Index of the map lanes. If given, lane ids and yaws are looked up
+        in it instead of through carla.Map.get_waypoint.
     """
 
-    def __init__(self, time_ahead=1.2, circle_radius=1.0, circle_offsets=None):
+    # signs of the four bbx corners and the center, relative to the center
+    _BBX_CORNER_SIGNS = np.array([[-1, -1], [-1, 1], [0, 0], [1, -1], [1, 1]])
+
+    def __init__(self, time_ahead=1.2, circle_radius=1.0, circle_offsets=None,
+                 lane_index=None):
 
         self.time_ahead = time_ahead
         self._circle_offsets = [-1.0,
@@ -36,6 +39,9 @@ class CollisionChecker:
                                 1.0] \
             if circle_offsets is None else circle_offsets
         self._circle_radius = circle_radius
+        self._lane_index = lane_index
+        # (obstacle list, arrays) of the latest batch check
+        self._obstacle_cache = None
 
     def is_in_range(
             self,
@@ -84,8 +90,20 @@ class CollisionChecker:
                 candidate_loc.y <= min_y - 2 or candidate_loc.y >= max_y + 2:
             return False
 
-        candidate_wpt = carla_map.get_waypoint(candidate_loc)
-        target_wpt = carla_map.get_waypoint(target_loc)
+        if self._lane_index is not None:
+            candidate_wpt = self._lane_index.project(candidate_loc)
+            target_wpt = self._lane_index.project(target_loc)
+            candidate_wpt_loc = carla.Location(
+                candidate_wpt.x, candidate_wpt.y, candidate_wpt.z)
+            target_wpt_loc = carla.Location(
+                target_wpt.x, target_wpt.y, target_wpt.z)
+            candidate_yaw = candidate_wpt.yaw
+        else:
+            candidate_wpt = carla_map.get_waypoint(candidate_loc)
+            target_wpt = carla_map.get_waypoint(target_loc)
+            candidate_wpt_loc = candidate_wpt.transform.location
+            target_wpt_loc = target_wpt.transform.location
+            candidate_yaw = candidate_wpt.transform.rotation.yaw
 
         # if the candidate vehicle is right behind the target vehicle, then it
         # is blocking
@@ -99,8 +117,7 @@ class CollisionChecker:
 
         # check the angle
         distance, angle = cal_distance_angle(
-            target_wpt.transform.location, candidate_wpt.transform.location,
-            candidate_wpt.transform.rotation.yaw)
+            target_wpt_loc, candidate_wpt_loc, candidate_yaw)
 
         return True if angle <= 3 else False
 
@@ -120,12 +137,12 @@ class CollisionChecker:
              used to draw debug lines.
 
         Returns:
-            -rx (list): the x coordinates of the collision check line in
-             the adjacent lane
-            -ry (list): the y coordinates of the collision check line in
+            -rx (np.ndarray): the x coordinates of the collision check line in
              the adjacent lane
-            -ryaw (list): the yaw angle of the the collision check line in
+            -ry (np.ndarray): the y coordinates of the collision check line in
              the adjacent lane
+            -ryaw (np.ndarray): the yaw angle of the the collision check line
+             in the adjacent lane
         """
         # we first need to consider the vehicle on the other lane in front
         if overtake:
@@ -157,18 +174,13 @@ class CollisionChecker:
         sp = Spline2D(x, y)
         s = np.arange(sp.s[0], sp.s[-1], ds)
 
-        debug_tmp = []
-
         # calculate interpolation points
-        rx, ry, ryaw = [], [], []
-        for i_s in s:
-            ix, iy = sp.calc_position(i_s)
-            rx.append(ix)
-            ry.append(iy)
-            ryaw.append(sp.calc_yaw(i_s))
-            debug_tmp.append(carla.Transform(carla.Location(ix, iy, 0)))
+        rx, ry = sp.calc_position_array(s)
+        ryaw = sp.calc_yaw_array(s)
 
         # draw yellow line for overtaking, white line for lane change
+        # debug_tmp = [carla.Transform(carla.Location(ix, iy, 0))
+        #              for ix, iy in zip(rx, ry)]
         # draw_trajetory_points(
         #     world, debug_tmp, color=carla.Color(
         #         255, 255, 0) if overtake else carla.Color(
@@ -176,18 +188,71 @@ class CollisionChecker:
 
         return rx, ry, ryaw
 
-    def collision_circle_check(
+    def _gather_obstacle_arrays(self, obstacle_vehicles, carla_map):
+        """
+        Gather obstacle locations, bounding box extents and lane yaw
+        angles into arrays.
+
+        Parameters
+        ----------
+        obstacle_vehicles : list
+            The obstacle vehicles of the current tick.
+
+        carla_map : carla.map
+            Carla map of the current simulation world.
+
+        Returns
+        -------
+        locations : np.ndarray
+            Obstacle locations, shape (N, 3).
+
+        extents : np.ndarray
+            Obstacle bounding box x/y extents, shape (N, 2).
+
+        yaws : np.ndarray
+            Yaw (degrees) of the lane each obstacle is on, shape (N,).
+        """
+        locations = np.zeros((len(obstacle_vehicles), 3))
+        extents = np.zeros((len(obstacle_vehicles), 2))
+        yaws = np.zeros(len(obstacle_vehicles))
+        for i, obstacle_vehicle in enumerate(obstacle_vehicles):
+            loc = obstacle_vehicle.get_location()
+            locations[i] = loc.x, loc.y, loc.z
+            extents[i] = obstacle_vehicle.bounding_box.extent.x, \
+                obstacle_vehicle.bounding_box.extent.y
+            if self._lane_index is None:
+                yaws[i] = carla_map.get_waypoint(loc).transform.rotation.yaw
+        if self._lane_index is not None and len(obstacle_vehicles) > 0:
+            yaws = self._lane_index.yaws[self._lane_index.query(locations)]
+
+        return locations, extents, yaws
+
+    def _obstacle_arrays(self, obstacle_vehicles, carla_map):
+        """
+        Same as _gather_obstacle_arrays, but cached until a different
+        obstacle list object is passed in, so the waypoint lookups for
+        the lane yaw only happen once per tick.
+        """
+        if self._obstacle_cache is not None and \
+                self._obstacle_cache[0] is obstacle_vehicles:
+            return self._obstacle_cache[1]
+
+        arrays = self._gather_obstacle_arrays(obstacle_vehicles, carla_map)
+        self._obstacle_cache = (obstacle_vehicles, arrays)
+        return arrays
+
+    def collision_circle_check_batch(
             self,
             path_x,
             path_y,
             path_yaw,
-            obstacle_vehicle,
+            obstacle_vehicles,
             speed,
             carla_map,
             adjacent_check=False):
         """
-        Use circled collision check to see whether potential hazard on
-        the forwarding path.
+        Circled collision check of the forwarding path against all
+        obstacle vehicles at once.
 
         Args:
             -adjacent_check (boolean): Indicator of whether do adjacent check.
@@ -196,68 +261,97 @@ class CollisionChecker:
             -path_yaw (float): a list of yaw angles
             -path_x (list): a list of x coordinates
             -path_y (list): a list of y coordinates
-            -obstacle_vehicle (carla.vehicle): potention hazard vehicle
-             on the way
+            -obstacle_vehicles (list): potential hazard vehicles on the way.
+             Pass the same list object within a tick to reuse the cached
+             obstacle lane yaws.
         Returns:
-            -collision_free (boolean): Flag indicate whether the
-             current range is collision free.
+            -collision_free (np.ndarray): (N,) flags indicating whether the
+             current range is collision free from each obstacle.
+            -clearance (np.ndarray): (N,) smallest distance between the
+             checking circles and each obstacle's bbx points, minus the
+             circle radius. Negative means collision.
+        """
+        return self._circle_clearance(
+            path_x, path_y, path_yaw,
+            self._obstacle_arrays(obstacle_vehicles, carla_map),
+            speed, adjacent_check)
+
+    def _circle_clearance(self, path_x, path_y, path_yaw, obstacle_arrays,
+                          speed, adjacent_check):
+        """
+        Circled collision check of the forwarding path against the
+        obstacle arrays of _gather_obstacle_arrays. See
+        collision_circle_check_batch.
         """
-        collision_free = True
+        locations, extents, yaws = obstacle_arrays
+
         # detect x second ahead. in case the speed is very slow,
         # there is some minimum threshold for the check distance
         distance_check = min(max(int(self.time_ahead * speed / 0.1), 90),
                              len(path_x)) \
             if not adjacent_check else len(path_x)
 
-        obstacle_vehicle_loc = obstacle_vehicle.get_location()
-        obstacle_vehicle_yaw = \
-            carla_map.get_waypoint(obstacle_vehicle_loc).transform.rotation.yaw
+        if len(locations) == 0 or distance_check <= 0:
+            return np.ones(len(locations), dtype=bool), \
+                   np.full(len(locations), np.inf)
 
         # every step is 0.1m, so we check every 10 points
-        for i in range(0, distance_check, 10):
-            ptx, pty, yaw = path_x[i], path_y[i], path_yaw[i]
-
-            circle_locations = np.zeros((len(self._circle_offsets), 2))
-            circle_offsets = np.array(self._circle_offsets)
-            circle_locations[:, 0] = ptx + circle_offsets * cos(yaw)
-            circle_locations[:, 1] = pty + circle_offsets * sin(yaw)
-
-            # calculate bbx coords under world coordinate system
-            corrected_extent_x = obstacle_vehicle.bounding_box.extent.x * \
-                                 math.cos(math.radians(obstacle_vehicle_yaw))
-            corrected_extent_y = obstacle_vehicle.bounding_box.extent.y * \
-                                 math.sin(math.radians(obstacle_vehicle_yaw))
-
-            # we need compute the four corner of the bbx
-            obstacle_vehicle_bbx_array = \
-                np.array([[obstacle_vehicle_loc.x -
-                           corrected_extent_x,
-                           obstacle_vehicle_loc.y -
-                           corrected_extent_y],
-                          [obstacle_vehicle_loc.x -
-                           corrected_extent_x,
-                           obstacle_vehicle_loc.y +
-                           corrected_extent_y],
-                          [obstacle_vehicle_loc.x,
-                           obstacle_vehicle_loc.y],
-                          [obstacle_vehicle_loc.x +
-                           corrected_extent_x,
-                           obstacle_vehicle_loc.y -
-                           corrected_extent_y],
-                          [obstacle_vehicle_loc.x +
-                           corrected_extent_x,
-                           obstacle_vehicle_loc.y +
-                           corrected_extent_y]])
-
-            # compute whether the distance between the four corners of the
-            # vehicle to the trajectory point
-            collision_dists = spatial.distance.cdist(
-                obstacle_vehicle_bbx_array, circle_locations)
-
-            collision_dists = np.subtract(collision_dists, self._circle_radius)
-            collision_free = collision_free and not np.any(collision_dists < 0)
-
-            if not collision_free:
-                break
-
-        return collision_free
+        index = np.arange(0, distance_check, 10)
+        ptx = np.asarray(path_x)[index]
+        pty = np.asarray(path_y)[index]
+        yaw = np.asarray(path_yaw)[index]
+
+        # (P*C, 2) circle centers along the path
+        circle_offsets = np.asarray(self._circle_offsets)
+        circle_locations = np.stack(
+            [ptx[:, None] + circle_offsets * np.cos(yaw)[:, None],
+             pty[:, None] + circle_offsets * np.sin(yaw)[:, None]],
+            axis=-1).reshape(-1, 2)
+
+        # calculate bbx coords under world coordinate system
+        corrected_extent = extents * np.stack(
+            [np.cos(np.radians(yaws)), np.sin(np.radians(yaws))], axis=1)
+        # (N, 5, 2) four corners plus center of each bbx
+        obstacle_bbx_array = locations[:, None, :2] + \
+            self._BBX_CORNER_SIGNS * corrected_extent[:, None, :]
+
+        # distance between every bbx point and every circle center
+        collision_dists = np.linalg.norm(
+            obstacle_bbx_array[:, :, None, :] -
+            circle_locations[None, None, :, :], axis=-1)
+
+        clearance = collision_dists.min(axis=(1, 2)) - self._circle_radius
+        return clearance >= 0, clearance
+
+    def collision_circle_check(
+            self,
+            path_x,
+            path_y,
+            path_yaw,
+            obstacle_vehicle,
+            speed,
+            carla_map,
+            adjacent_check=False):
+        """
+        Use circled collision check to see whether potential hazard on
+        the forwarding path.
+
+        Args:
+            -adjacent_check (boolean): Indicator of whether do adjacent check.
+             Note: always give full path for adjacent lane check.
+            -speed (float): ego vehicle speed in m/s.
+            -path_yaw (float): a list of yaw angles
+            -path_x (list): a list of x coordinates
+            -path_y (list): a list of y coordinates
+            -obstacle_vehicle (carla.vehicle): potention hazard vehicle
+             on the way
+        Returns:
+            -collision_free (boolean): Flag indicate whether the
+             current range is collision free.
+        """
+        # a one-off list would evict the per-tick obstacle cache
+        collision_free, _ = self._circle_clearance(
+            path_x, path_y, path_yaw,
+            self._gather_obstacle_arrays([obstacle_vehicle], carla_map),
+            speed, adjacent_check)
+        return bool(collision_free[0])
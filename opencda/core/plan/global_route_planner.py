@@ -9,6 +9,8 @@ This module provides GlobalRoutePlanner implementation.
 """
 
 import math
+from collections import OrderedDict
+
 import numpy as np
 import networkx as nx
 
@@ -17,6 +19,44 @@ from opencda.core.plan.local_planner_behavior import RoadOption
 from opencda.core.common.misc import vector
 
 
+class RouteCache(object):
+    """
+    Least recently used cache of graph routes, keyed by the
+    (start edge, end edge) pair the route connects. It only depends on the
+    road graph, so planners sharing a graph can share the cache.
+
+    Parameters
+    ----------
+    maxsize : int
+        The maximum number of cached routes.
+    """
+
+    def __init__(self, maxsize=256):
+        self.maxsize = maxsize
+        self._routes = OrderedDict()
+
+    def __len__(self):
+        return len(self._routes)
+
+    def get(self, key):
+        """
+        Return the cached route for key, or None on a miss.
+        """
+        route = self._routes.get(key)
+        if route is not None:
+            self._routes.move_to_end(key)
+        return route
+
+    def put(self, key, route):
+        self._routes[key] = tuple(route)
+        self._routes.move_to_end(key)
+        while len(self._routes) > self.maxsize:
+            self._routes.popitem(last=False)
+
+    def clear(self):
+        self._routes.clear()
+
+
 class GlobalRoutePlanner(object):
     """
     This class provides a very high level route plan.
@@ -28,6 +68,10 @@ class GlobalRoutePlanner(object):
     dao : carla.dao
         A global plan that contains routes from start to end.
 
+    route_cache : RouteCache
+        Cache of graph routes. Pass the same cache to planners that share a
+        road graph; a private cache is created if None.
+
     Attributes
     ----------
     _topology : carla.topology
@@ -47,9 +91,12 @@ class GlobalRoutePlanner(object):
 
     _previous_decision : carla.RoadOption
         The previous behavioral option of the ego vehicle.
+
+    _route_cache : RouteCache
+        Graph routes found by earlier searches.
     """
 
-    def __init__(self, dao):
+    def __init__(self, dao, route_cache=None):
 
         self._dao = dao
         self._topology = None
@@ -58,6 +105,8 @@ class GlobalRoutePlanner(object):
         self._road_id_to_edge = None
         self._intersection_end_node = -1
         self._previous_decision = RoadOption.VOID
+        self._route_cache = route_cache if route_cache is not None \
+            else RouteCache()
 
     def setup(self):
         """
@@ -68,6 +117,43 @@ class GlobalRoutePlanner(object):
         self._graph, self._id_map, self._road_id_to_edge = self._build_graph()
         self._find_loose_ends()
         self._lane_change_link()
+        self._route_cache.clear()
+
+    def get_graph(self):
+        """
+        Return the road graph built by setup, so it can be shared with
+        other planners on the same map.
+
+        Returns
+        -------
+        route_graph : tuple
+            (graph, id_map, road_id_to_edge).
+        """
+        return self._graph, self._id_map, self._road_id_to_edge
+
+    def set_graph(self, graph, id_map, road_id_to_edge):
+        """
+        Use a road graph built elsewhere instead of calling setup. The graph
+        is only read during route planning, so it can be shared.
+
+        Parameters
+        ----------
+        graph : nx.DiGraph
+            The node-edge graph of the map.
+
+        id_map : dict
+            Mapping from (x,y,z) to node id.
+
+        road_id_to_edge : dict
+            Map from road id to edge in the graph.
+
+        Notes
+        -----
+        The route cache is kept, so it must hold routes of this graph only.
+        """
+        self._graph = graph
+        self._id_map = id_map
+        self._road_id_to_edge = road_id_to_edge
 
     def _build_graph(self):
         """
@@ -198,7 +284,18 @@ class GlobalRoutePlanner(object):
         Returns:
             -edge (string) : pair node ids representing an edge in the graph.
         """
-        waypoint = self._dao.get_waypoint(location)
+        return self._localize_waypoint(self._dao.get_waypoint(location))
+
+    def _localize_waypoint(self, waypoint):
+        """
+        This function finds the road segment a waypoint lies on.
+
+        Args:
+            -waypoint (carla.Waypoint) : waypoint to be localized
+            in the graph.
+        Returns:
+            -edge (string) : pair node ids representing an edge in the graph.
+        """
         edge = None
         try:
             edge = \
@@ -297,12 +394,79 @@ class GlobalRoutePlanner(object):
         """
 
         start, end = self._localize(origin), self._localize(destination)
+        return self._edge_route(start, end)
 
-        route = nx.astar_path(
-            self._graph, source=start[0], target=end[0],
-            heuristic=self._distance_heuristic, weight='length')
-        route.append(end[1])
-        return route
+    def _edge_route(self, start, end):
+        """
+        Shortest path between two graph edges, served from the route cache
+        when the pair was searched before.
+
+        Routes are searched with A* and the distance heuristic.
+
+        Args:
+            -start (tuple): edge (node pair) of the start position.
+            -end (tuple): edge (node pair) of the end position.
+        Returns:
+            -route (list): path as list of node ids.
+        Raises:
+            -nx.NetworkXNoPath: if end is not reachable from start.
+        """
+        route = self._route_cache.get((start, end))
+        if route is None:
+            route = nx.astar_path(
+                self._graph, source=start[0], target=end[0],
+                heuristic=self._distance_heuristic, weight='length')
+            route.append(end[1])
+            self._route_cache.put((start, end), route)
+        return list(route)
+
+    def _edge_routes(self, edge_pairs):
+        """
+        Shortest paths for many (start edge, end edge) pairs.
+
+        Pairs missing from the route cache are grouped by their start node,
+        and each group with more than one end is answered from a single
+        Dijkstra tree instead of one search per pair. Groups with one end
+        are searched with _edge_route. Among routes of equal length, a tree
+        may pick another one than A* would.
+
+        Args:
+            -edge_pairs (list): (start edge, end edge) pairs.
+        Returns:
+            -routes (list): path as list of node ids for each pair, or None
+             if the end of that pair is not reachable from its start.
+        """
+        routes = {}
+        groups = {}
+        for pair in set(edge_pairs):
+            route = self._route_cache.get(pair)
+            if route is not None:
+                routes[pair] = route
+            else:
+                groups.setdefault(pair[0][0], []).append(pair)
+
+        for root, pairs in groups.items():
+            if len({end[0] for _, end in pairs}) == 1:
+                for pair in pairs:
+                    try:
+                        routes[pair] = self._edge_route(*pair)
+                    except nx.NetworkXNoPath:
+                        routes[pair] = None
+                continue
+
+            paths = nx.single_source_dijkstra_path(self._graph, root,
+                                                   weight='length')
+            for start, end in pairs:
+                path = paths.get(end[0])
+                if path is None:
+                    routes[(start, end)] = None
+                    continue
+                route = path + [end[1]]
+                self._route_cache.put((start, end), route)
+                routes[(start, end)] = route
+
+        return [None if routes[pair] is None else list(routes[pair])
+                for pair in edge_pairs]
 
     def _successive_last_intersection_edge(self, index, route):
         """
@@ -436,10 +600,62 @@ class GlobalRoutePlanner(object):
         from origin to destination.
         """
 
-        route_trace = []
-        route = self._path_search(origin, destination)
         current_waypoint = self._dao.get_waypoint(origin)
         destination_waypoint = self._dao.get_waypoint(destination)
+        route = self._edge_route(
+            self._localize_waypoint(current_waypoint),
+            self._localize_waypoint(destination_waypoint))
+
+        return self._trace_graph_route(route, destination,
+                                       current_waypoint, destination_waypoint)
+
+    def trace_routes(self, origin_destination_pairs):
+        """
+        Route many (origin, destination) pairs in one call, e.g. every
+        vehicle rerouted by the edge in the same tick. The graph searches
+        are shared between pairs with a common start or end road segment.
+
+        Parameters
+        ----------
+        origin_destination_pairs : list
+            (carla.Location, carla.Location) pairs of route start and end.
+
+        Returns
+        -------
+        route_traces : list
+            List of (carla.Waypoint, RoadOption) for each pair, as returned
+            by trace_route, or None for a pair whose destination cannot be
+            reached from its origin.
+        """
+        waypoints = [(self._dao.get_waypoint(origin),
+                      self._dao.get_waypoint(destination))
+                     for origin, destination in origin_destination_pairs]
+        routes = self._edge_routes(
+            [(self._localize_waypoint(current_waypoint),
+              self._localize_waypoint(destination_waypoint))
+             for current_waypoint, destination_waypoint in waypoints])
+
+        route_traces = []
+        for route, (_, destination), (current_waypoint,
+                                      destination_waypoint) in \
+                zip(routes, origin_destination_pairs, waypoints):
+            if route is None:
+                route_traces.append(None)
+                continue
+            # every pair is an independent route
+            self._intersection_end_node = -1
+            self._previous_decision = RoadOption.VOID
+            route_traces.append(self._trace_graph_route(
+                route, destination, current_waypoint, destination_waypoint))
+        return route_traces
+
+    def _trace_graph_route(self, route, destination,
+                           current_waypoint, destination_waypoint):
+        """
+        Turn a path of graph nodes into a list of
+        (carla.Waypoint, RoadOption).
+        """
+        route_trace = []
         resolution = self._dao.get_resolution()
 
         for i in range(len(route) - 1):
@@ -0,0 +1,183 @@
+# -*- coding: utf-8 -*-
+"""
+In-process index of the lane centerlines of a map, answering nearest-lane
+projections without a carla.Map.get_waypoint call per query.
+"""
+# License: TDG-Attribution-NonCommercial-NoDistrib
+
+from collections import namedtuple
+
+import numpy as np
+from scipy.spatial import cKDTree
+
+# projection of a point onto the closest lane centerline
+LaneProjection = namedtuple(
+    'LaneProjection',
+    ['x', 'y', 'z', 'road_id', 'section_id', 'lane_id', 's',
+     'yaw', 'pitch', 'roll', 'lane_width'])
+
+
+class LaneIndex(object):
+    """
+    KD-tree over waypoints sampled along every driving lane of a map.
+
+    A query returns the sample closest to a point, which identifies the
+    lane the point would be projected on by carla.Map.get_waypoint. The
+    projection is then moved along the lane direction to the foot of the
+    point, so its location and s do not depend on the sampling step.
+
+    Parameters
+    ----------
+    carla_map : carla.Map
+        The HD map of the simulation world.
+
+    resolution : float
+        Distance (m) between samples along a lane.
+
+    Attributes
+    ----------
+    locations : np.ndarray
+        Sample locations, shape (N, 3).
+
+    road_ids, section_ids, lane_ids : np.ndarray
+        OpenDRIVE ids of the lane each sample is on, shape (N,).
+
+    s : np.ndarray
+        OpenDRIVE s of each sample, shape (N,).
+
+    yaws, pitches, rolls : np.ndarray
+        Lane orientation (degrees) at each sample, shape (N,).
+
+    lane_widths : np.ndarray
+        Lane width (m) at each sample, shape (N,).
+    """
+
+    def __init__(self, carla_map, resolution=1.0):
+        self.carla_map = carla_map
+        self.resolution = resolution
+
+        waypoints = carla_map.generate_waypoints(resolution)
+        transforms = [w.transform for w in waypoints]
+
+        self.locations = np.array(
+            [[t.location.x, t.location.y, t.location.z] for t in transforms],
+            dtype=np.float64).reshape(-1, 3)
+        self.road_ids = np.array([w.road_id for w in waypoints],
+                                 dtype=np.int64)
+        self.section_ids = np.array([w.section_id for w in waypoints],
+                                    dtype=np.int64)
+        self.lane_ids = np.array([w.lane_id for w in waypoints],
+                                 dtype=np.int64)
+        self.s = np.array([w.s for w in waypoints], dtype=np.float64)
+        self.yaws = np.array([t.rotation.yaw for t in transforms],
+                             dtype=np.float64)
+        self.pitches = np.array([t.rotation.pitch for t in transforms],
+                                dtype=np.float64)
+        self.rolls = np.array([t.rotation.roll for t in transforms],
+                              dtype=np.float64)
+        self.lane_widths = np.array([w.lane_width for w in waypoints],
+                                    dtype=np.float64)
+
+        self._tree = cKDTree(self.locations)
+
+    def __len__(self):
+        return len(self.locations)
+
+    def query(self, points):
+        """
+        Find the closest lane sample of each point.
+
+        Parameters
+        ----------
+        points : np.ndarray
+            Query points, shape (M, 3).
+
+        Returns
+        -------
+        indices : np.ndarray
+            Index of the closest sample of each point, shape (M,).
+        """
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+        _, indices = self._tree.query(points)
+        return indices
+
+    def project_array(self, points):
+        """
+        Project points onto their closest lane centerline.
+
+        Parameters
+        ----------
+        points : np.ndarray
+            Query points, shape (M, 3).
+
+        Returns
+        -------
+        indices : np.ndarray
+            Index of the closest sample of each point, shape (M,). Lane ids,
+            width and orientation are read from the attribute arrays.
+
+        locations : np.ndarray
+            The projected locations, shape (M, 3).
+
+        s : np.ndarray
+            OpenDRIVE s of the projected locations, shape (M,).
+        """
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+        indices = self.query(points)
+
+        yaw = np.radians(self.yaws[indices])
+        direction = np.stack([np.cos(yaw), np.sin(yaw)], axis=1)
+        # signed distance along the lane, kept within the sample's own
+        # stretch of the centerline
+        offset = np.sum((points[:, :2] - self.locations[indices, :2]) *
+                        direction, axis=1)
+        offset = np.clip(offset, -self.resolution / 2, self.resolution / 2)
+
+        locations = self.locations[indices].copy()
+        locations[:, :2] += offset[:, np.newaxis] * direction
+        # lanes with a negative id are driven towards increasing s
+        s = self.s[indices] + np.where(self.lane_ids[indices] < 0,
+                                       offset, -offset)
+        return indices, locations, s
+
+    def project(self, location):
+        """
+        Project a single location onto its closest lane centerline.
+
+        Parameters
+        ----------
+        location : carla.Location
+            The location to project.
+
+        Returns
+        -------
+        projection : LaneProjection
+            The projected location with the ids, orientation and width of
+            its lane.
+        """
+        indices, locations, s = self.project_array(
+            [location.x, location.y, location.z])
+        i = indices[0]
+        x, y, z = locations[0]
+        return LaneProjection(x, y, z,
+                              int(self.road_ids[i]),
+                              int(self.section_ids[i]),
+                              int(self.lane_ids[i]),
+                              s[0],
+                              self.yaws[i],
+                              self.pitches[i],
+                              self.rolls[i],
+                              self.lane_widths[i])
+
+    def lane_ids_of(self, points):
+        """
+        Lane id of each point, shape (M,).
+        """
+        return self.lane_ids[self.query(points)]
+
+    def get_waypoint(self, location):
+        """
+        Fetch the carla.Waypoint of a location, for callers that need the
+        waypoint itself, e.g. to walk the lane with next/previous.
+        """
+        return self.carla_map.get_waypoint(location)
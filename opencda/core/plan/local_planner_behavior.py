@@ -7,7 +7,6 @@ low-level waypoint following based on PID controllers. """
 
 from collections import deque
 from enum import Enum
-import statistics
 import math
 import logging
 import time
@@ -18,6 +17,7 @@ import numpy as np
 from opencda.core.common.misc import distance_vehicle, draw_trajetory_points, \
     cal_distance_angle, compute_distance
 from opencda.core.plan.spline import Spline2D
+from opencda.core.plan.trajectory_buffer import TrajectoryBuffer
 
 logger = logging.getLogger(__name__)
 
@@ -73,9 +73,10 @@ class LocalPlanner(object):
 
     _long_plan_debug : list
         A list that stores the waypoints of global plan for debug purposes.
+        Only filled when debug_trajectory is enabled.
 
-    _trajectory_buffer : deque
-        A deque buffer that stores the current trajectory.
+    _trajectory_buffer : TrajectoryBuffer
+        An array-backed buffer that stores the current trajectory.
 
     _history_buffer : deque
         A deque buffer that stores the trajectory history of the ego vehicle.
@@ -109,7 +110,7 @@ class LocalPlanner(object):
         self._waypoint_buffer = deque(maxlen=self._buffer_size)
         # trajectory buffer
         self._long_plan_debug = []
-        self._trajectory_buffer = deque(maxlen=30)
+        self._trajectory_buffer = TrajectoryBuffer(maxlen=30)
         self._history_buffer = deque(maxlen=3)
         self.trajectory_update_freq = config_yaml['trajectory_update_freq']
         self.waypoint_update_freq = config_yaml['waypoint_update_freq']
@@ -175,7 +176,7 @@ class LocalPlanner(object):
 
         Returns :
         ----------
-        self._trajectory_buffer : deque
+        self._trajectory_buffer : TrajectoryBuffer
             Trajectory buffer.
 
         """
@@ -237,17 +238,17 @@ class LocalPlanner(object):
 
         Returns :
         ----------
-        rx : list
-            List of planned path points' x coordinates.
+        rx : np.ndarray
+            Planned path points' x coordinates.
 
-        ry : list
-            List of planned path points' y coordinates.
+        ry : np.ndarray
+            Planned path points' y coordinates.
 
-        ryaw : list
-            List of planned path points' yaw angles.
+        ryaw : np.ndarray
+            Planned path points' yaw angles.
 
-        rk : list
-            List of planned path points' curvatures.
+        rk : np.ndarray
+            Planned path points' curvatures.
 
         """
 
@@ -361,12 +362,9 @@ class LocalPlanner(object):
             x.append(cur_x)
             y.append(cur_y)
 
-        # calculate interpolation points
-        rx, ry, ryaw, rk = [], [], [], []
-
         # Cubic Spline Interpolation calculation
         if len(x) < 2 or len(y) < 2:
-            return rx, ry, rk, ryaw
+            return np.empty(0), np.empty(0), np.empty(0), np.empty(0)
 
         #start_time = time.time()
         sp = Spline2D(x, y)
@@ -381,19 +379,20 @@ class LocalPlanner(object):
         s = np.arange(diff_s, sp.s[-1], ds)
 
         #start_time = time.time()
-        self._long_plan_debug = []
+        ix, iy = sp.calc_position_array(s)
         # we only need the interpolation points until next waypoint
-        for (i, i_s) in enumerate(s):
-            ix, iy = sp.calc_position(i_s)
-            if abs(ix - x[index]) <= ds and abs(iy - y[index]) <= ds:
-                continue
-            if i <= len(s) // 2:
-                self._long_plan_debug.append(
-                    carla.Transform(carla.Location(ix, iy, 0)))
-            rx.append(ix)
-            ry.append(iy)
-            rk.append(max(min(sp.calc_curvature(i_s), 0.2), -0.2))
-            ryaw.append(sp.calc_yaw(i_s))
+        keep = ~((np.abs(ix - x[index]) <= ds) & (np.abs(iy - y[index]) <= ds))
+        if self.debug_trajectory:
+            keep_index = np.flatnonzero(keep)
+            self._long_plan_debug = [
+                carla.Transform(carla.Location(ix[i], iy[i], 0))
+                for i in keep_index[keep_index <= len(s) // 2]]
+
+        s = s[keep]
+        rx = ix[keep]
+        ry = iy[keep]
+        rk = np.clip(sp.calc_curvature_array(s), -0.2, 0.2)
+        ryaw = sp.calc_yaw_array(s)
         #end_time = time.time()
         #logger.debug("interpolate: %s", (end_time - start_time)*1000)
 
@@ -405,17 +404,14 @@ class LocalPlanner(object):
 
         Parameters
         ----------
-        rx : list
-            List of planned path points' x coordinates.
+        rx : np.ndarray
+            Planned path points' x coordinates.
 
-        ry : list
-            List of planned path points' y coordinates.
+        ry : np.ndarray
+            Planned path points' y coordinates.
 
-        rk : list
-            List of planned path points' curvatures.
-
-        debug : boolean
-            whether to draw the whole plan path
+        rk : np.ndarray
+            Planned path points' curvatures.
 
         """
         # unit distance for interpolation points
@@ -429,13 +425,11 @@ class LocalPlanner(object):
         # sample the trajectory by 0.1 second
         sample_num = 2.0 // dt
 
-        break_flag = False
         current_speed = current_speed / 3.6
-        sample_resolution = 0
 
         # use mean curvature to constrain the speed
 
-        mean_k = 0.0001 if len(rk) < 2 else abs(statistics.mean(rk))
+        mean_k = 0.0001 if len(rk) < 2 else abs(np.mean(rk))
         # v^2 <= a_lat_max / curvature, we assume 3.6 is the maximum lateral
         # acceleration
         target_speed = min(target_speed, np.sqrt(5.0 / (mean_k + 10e-6)) * 3.6)
@@ -445,31 +439,27 @@ class LocalPlanner(object):
         acceleration = max(
             min(max_acc, (target_speed / 3.6 - current_speed) / dt), -6.5)
 
-        for i in range(1, int(sample_num) + 1):
-            sample_resolution += current_speed * dt + \
-                                 0.5 * acceleration * dt ** 2
-            current_speed += acceleration * dt
-
-            # print(sample_resolution)
-            if int(sample_resolution // ds - 1) >= len(rx):
-                sample_x = rx[-1]
-                sample_y = ry[-1]
-                break_flag = True
-
-            else:
-                sample_x = rx[max(0, int(sample_resolution // ds - 1))]
-                sample_y = ry[max(0, int(sample_resolution // ds - 1))]
-
-            self._trajectory_buffer.append(
-                (carla.Transform(
-                    carla.Location(
-                        sample_x,
-                        sample_y,
-                        self._waypoint_buffer[0][0].transform.location.z +
-                        0.5)),
-                 target_speed))
-            if break_flag:
-                break
+        # speed before each sample step, accumulated in the same order as
+        # stepping sample by sample
+        step_speeds = np.cumsum(
+            np.r_[current_speed,
+                  np.full(max(int(sample_num) - 1, 0), acceleration * dt)]
+        )[:int(sample_num)]
+        sample_resolution = np.cumsum(
+            step_speeds * dt + 0.5 * acceleration * dt ** 2)
+        sample_index = (sample_resolution // ds - 1).astype(int)
+
+        # stop at the first sample beyond the end of the path
+        beyond = np.flatnonzero(sample_index >= len(rx))
+        if len(beyond) > 0:
+            sample_index = sample_index[:beyond[0] + 1]
+        sample_index = np.clip(sample_index, 0, len(rx) - 1)
+
+        self._trajectory_buffer.set(
+            np.asarray(rx)[sample_index],
+            np.asarray(ry)[sample_index],
+            self._waypoint_buffer[0][0].transform.location.z + 0.5,
+            target_speed)
 
     def buffer_filter(self):
         """
@@ -554,15 +544,14 @@ class LocalPlanner(object):
                         self._waypoint_buffer.popleft())
 
         if self._trajectory_buffer:
-            max_index = -1
-            for i, (waypoint, _,) in enumerate(self._trajectory_buffer):
-                if distance_vehicle(
-                        waypoint, vehicle_transform) < \
-                        max(self._min_distance - 1, 1):
-                    max_index = i
-            if max_index >= 0:
-                for i in range(max_index + 1):
-                    self._trajectory_buffer.popleft()
+            trajectory_xy = self._trajectory_buffer.locations[:, :2]
+            distances = np.hypot(
+                trajectory_xy[:, 0] - vehicle_transform.location.x,
+                trajectory_xy[:, 1] - vehicle_transform.location.y)
+            reached = np.flatnonzero(
+                distances < max(self._min_distance - 1, 1))
+            if len(reached) > 0:
+                self._trajectory_buffer.popleft(reached[-1] + 1)
 
     def run_step(
             self,
@@ -632,7 +621,7 @@ class LocalPlanner(object):
                 return 0, None
             self.generate_trajectory(rx, ry, rk)
         elif trajectory:
-            self._trajectory_buffer = trajectory.copy()
+            self._trajectory_buffer.assign(trajectory)
 
         # Target waypoint
         self.target_waypoint, self._target_speed = \
@@ -11,6 +11,7 @@ import numpy as np
 import matplotlib.pyplot as plt
 
 import opencda.core.plan.drive_profile_plotting as open_plt
+from opencda.core.common.delta_tracker import DeltaTracker
 
 import ecloud_pb2 as ecloud
 
@@ -57,6 +58,7 @@ class PlanDebugHelper(object):
         ] # index corresponds to specific decision instance in BehaviorAgent.run_step
 
         self.count = 0
+        self.delta_tracker = DeltaTracker()
 
     def get_agent_step_list(self):
         return self.agent_step_list
@@ -138,42 +140,32 @@ class PlanDebugHelper(object):
 
         return figure, perform_txt
 
-    def serialize_debug_info(self, proto_debug_helper):
+    def serialize_debug_info(self, proto_debug_helper, delta=False):
         # seems we only ever access [0] anywhere...
         # but need to consider this when de-serializing info from protobuf
-        # TODO: extend instead of append? or [:] = ?
 
-        for obj in self.speed_list[0]:
-            proto_debug_helper.speed_list.append(obj)
+        proto_debug_helper.speed_list.extend(self.delta_tracker.unsent('speed_list', self.speed_list[0], delta))
+        proto_debug_helper.acc_list.extend(self.delta_tracker.unsent('acc_list', self.acc_list[0], delta))
+        proto_debug_helper.ttc_list.extend(self.delta_tracker.unsent('ttc_list', self.ttc_list[0], delta))
 
-        for obj in self.acc_list[0]:
-            proto_debug_helper.acc_list.append(obj)
-
-        for obj in self.ttc_list[0]:
-            proto_debug_helper.ttc_list.append(obj)
-
-        for sub_step_time_list in self.agent_step_list:
+        for idx, sub_step_time_list in enumerate(self.agent_step_list):
             step_list = proto_debug_helper.agent_step_list.add()
-            for obj in sub_step_time_list:
-                step_list.time_list.append(obj)
+            step_list.time_list.extend(self.delta_tracker.unsent(f'agent_step_list_{idx}', sub_step_time_list, delta))
 
-    def deserialize_debug_info(self, proto_debug_helper):
+    def deserialize_debug_info(self, proto_debug_helper, append=False):
         # call from Sim API to populate locally
+        # append merges an incremental (delta) chunk instead of replacing
 
-        self.ttc_list[0].clear()
-        for obj in proto_debug_helper.ttc_list:
-            self.ttc_list[0].append(obj)
-
-        self.acc_list[0].clear()
-        for obj in proto_debug_helper.acc_list:
-            self.acc_list[0].append(obj)
+        if not append:
+            self.ttc_list[0].clear()
+            self.acc_list[0].clear()
+            self.speed_list[0].clear()
+            for time_list in self.agent_step_list:
+                time_list.clear()
 
-        self.speed_list[0].clear()
-        for obj in proto_debug_helper.speed_list:
-            self.speed_list[0].append(obj)
+        self.ttc_list[0].extend(proto_debug_helper.ttc_list)
+        self.acc_list[0].extend(proto_debug_helper.acc_list)
+        self.speed_list[0].extend(proto_debug_helper.speed_list)
 
-        for time_list in self.agent_step_list:
-            time_list.clear()
         for idx, proto_agent_list in enumerate(proto_debug_helper.agent_step_list):
-            for obj in proto_agent_list.time_list:
-                self.agent_step_list[idx].append(obj)
+            self.agent_step_list[idx].extend(proto_agent_list.time_list)
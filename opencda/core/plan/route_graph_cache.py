@@ -0,0 +1,185 @@
+# -*- coding: utf-8 -*-
+"""
+On-disk cache of the GlobalRoutePlanner road graph.
+
+Building the graph walks the whole map topology at the sampling
+resolution, which every agent used to pay again at startup. The graph is
+saved once per map and resolution, with its carla.Waypoint attributes
+stored as (road_id, section_id, lane_id, s, x, y, z) keys, and turned back
+into waypoints with carla.Map.get_waypoint_xodr when loaded.
+"""
+# License: TDG-Attribution-NonCommercial-NoDistrib
+
+import hashlib
+import logging
+import os
+import pickle
+
+import carla
+import networkx as nx
+
+from opencda.core.plan.global_route_planner import GlobalRoutePlanner
+from opencda.core.plan.global_route_planner_dao import GlobalRoutePlannerDAO
+
+logger = logging.getLogger(__name__)
+
+# bump whenever the graph layout produced by GlobalRoutePlanner changes
+ROUTE_GRAPH_CACHE_VERSION = 1
+
+# edge attributes that hold a single carla.Waypoint
+_WAYPOINT_ATTRIBUTES = ('entry_waypoint', 'exit_waypoint', 'change_waypoint')
+
+
+def route_graph_cache_path(cache_dir, map_name, sampling_resolution):
+    """
+    Path of the cache file for a map and sampling resolution.
+    """
+    map_name = map_name.replace('/', '_').replace('\\', '_')
+    return os.path.join(cache_dir, 'route_graph_%s_%s_v%d.pkl' %
+                        (map_name, sampling_resolution,
+                         ROUTE_GRAPH_CACHE_VERSION))
+
+
+def _opendrive_hash(carla_map):
+    """
+    Fingerprint of the map content, so an edited map that keeps its name
+    does not load a stale graph.
+    """
+    return hashlib.sha1(carla_map.to_opendrive().encode('utf-8')).hexdigest()
+
+
+def _waypoint_key(waypoint):
+    location = waypoint.transform.location
+    return (waypoint.road_id, waypoint.section_id, waypoint.lane_id,
+            waypoint.s, location.x, location.y, location.z)
+
+
+def _encode_graph(graph):
+    encoded = nx.DiGraph()
+    encoded.add_nodes_from(graph.nodes(data=True))
+    for n1, n2, attributes in graph.edges(data=True):
+        attributes = dict(attributes)
+        for name in _WAYPOINT_ATTRIBUTES:
+            if name in attributes:
+                attributes[name] = _waypoint_key(attributes[name])
+        attributes['path'] = [_waypoint_key(w) for w in attributes['path']]
+        encoded.add_edge(n1, n2, **attributes)
+    return encoded
+
+
+def _decode_graph(encoded, carla_map):
+    waypoints = {}
+
+    def waypoint(key):
+        if key not in waypoints:
+            road_id, _, lane_id, s, x, y, z = key
+            wp = carla_map.get_waypoint_xodr(road_id, lane_id, s)
+            if wp is None:
+                wp = carla_map.get_waypoint(carla.Location(x=x, y=y, z=z))
+            waypoints[key] = wp
+        return waypoints[key]
+
+    for _, _, attributes in encoded.edges(data=True):
+        for name in _WAYPOINT_ATTRIBUTES:
+            if name in attributes:
+                attributes[name] = waypoint(attributes[name])
+        attributes['path'] = [waypoint(k) for k in attributes['path']]
+    return encoded
+
+
+def save_route_graph(path, carla_map, sampling_resolution,
+                     graph, id_map, road_id_to_edge):
+    """
+    Write a road graph to the cache. The file is written to a temporary
+    name first so concurrent readers never see a partial file.
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    content = {'version': ROUTE_GRAPH_CACHE_VERSION,
+               'map_name': carla_map.name,
+               'opendrive_hash': _opendrive_hash(carla_map),
+               'sampling_resolution': sampling_resolution,
+               'graph': _encode_graph(graph),
+               'id_map': id_map,
+               'road_id_to_edge': road_id_to_edge}
+    tmp_path = '%s.%d.tmp' % (path, os.getpid())
+    with open(tmp_path, 'wb') as f:
+        pickle.dump(content, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, path)
+
+
+def load_route_graph(path, carla_map, sampling_resolution):
+    """
+    Read a road graph from the cache.
+
+    Returns
+    -------
+    route_graph : tuple
+        (graph, id_map, road_id_to_edge), or None if there is no usable
+        cache entry for this map and resolution.
+    """
+    if not os.path.isfile(path):
+        return None
+    try:
+        with open(path, 'rb') as f:
+            content = pickle.load(f)
+    except (OSError, pickle.UnpicklingError, EOFError,
+            AttributeError, ImportError) as e:
+        logger.warning("ignoring unreadable route graph cache %s: %s", path, e)
+        return None
+
+    if content.get('version') != ROUTE_GRAPH_CACHE_VERSION or \
+            content.get('map_name') != carla_map.name or \
+            content.get('sampling_resolution') != sampling_resolution or \
+            content.get('opendrive_hash') != _opendrive_hash(carla_map):
+        logger.warning("ignoring stale route graph cache %s", path)
+        return None
+
+    graph = _decode_graph(content['graph'], carla_map)
+    return graph, content['id_map'], content['road_id_to_edge']
+
+
+def get_route_graph(carla_map, sampling_resolution, cache_dir=None):
+    """
+    Load the road graph of a map from the cache, building and caching it
+    on a miss.
+
+    Parameters
+    ----------
+    carla_map : carla.Map
+        The HD map of the simulation world.
+
+    sampling_resolution : float
+        Sampling distance between waypoints.
+
+    cache_dir : str
+        Cache directory. If None, the graph is always built and not saved.
+
+    Returns
+    -------
+    route_graph : tuple
+        (graph, id_map, road_id_to_edge) as built by
+        GlobalRoutePlanner.setup.
+    """
+    path = None
+    if cache_dir is not None:
+        path = route_graph_cache_path(cache_dir, carla_map.name,
+                                      sampling_resolution)
+        route_graph = load_route_graph(path, carla_map, sampling_resolution)
+        if route_graph is not None:
+            logger.info("loaded route graph from %s", path)
+            return route_graph
+
+    grp = GlobalRoutePlanner(
+        GlobalRoutePlannerDAO(carla_map, sampling_resolution))
+    grp.setup()
+    route_graph = grp.get_graph()
+
+    if path is not None:
+        try:
+            save_route_graph(path, carla_map, sampling_resolution,
+                             *route_graph)
+            logger.info("saved route graph to %s", path)
+        except OSError as e:
+            logger.warning("could not save route graph cache %s: %s", path, e)
+
+    return route_graph
@@ -4,9 +4,8 @@ Cubic spline planner
 Author: Atsushi Sakai(@Atsushi_twi)
 
 """
-import math
 import numpy as np
-import bisect
+from scipy.linalg import solve_banded
 
 
 class Spline:
@@ -14,6 +13,10 @@ class Spline:
     Cubic Spline class for calculte curvature
      (Author: Atsushi Sakai(@Atsushi_twi)).
 
+    The natural spline system is tridiagonal, so the coefficients are solved
+    with a banded solver. Every calc method accepts a scalar or an array of
+    t; the *_array methods evaluate a whole array at once.
+
     Parameters
     -x : float
         The x coordinate.
@@ -21,44 +24,34 @@ class Spline:
         The y coordinate.
 
     Attributes
-    -b : float
+    -b : np.ndarray
         The spline coefficient b.
-    -c : float
+    -c : np.ndarray
         The spline coefficient c.
-    -d : float
+    -d : np.ndarray
         The spline coefficient d.
-    -w : float
-        The spline coefficient w.
     -nx : float
         The dimension of x.
-    -h : float
-        The n-th discrete difference along the x-axis.
     """
 
     def __init__(self, x, y):
-        self.b, self.c, self.d, self.w = [], [], [], []
-
         self.x = x
         self.y = y
 
         self.nx = len(x)  # dimension of x
-        h = np.diff(x)
+        self._x = np.asarray(x, dtype=np.float64)
+        h = np.diff(self._x)
 
-        # calc coefficient c
-        self.a = [iy for iy in y]
+        # calc coefficient a
+        self.a = np.asarray(y, dtype=np.float64)
 
         # calc coefficient c
-        A = self.__calc_A(h)
-        B = self.__calc_B(h)
-        self.c = np.linalg.solve(A, B)
-        #  print(self.c1)
+        self.c = solve_banded((1, 1), self.__calc_A(h), self.__calc_B(h))
 
         # calc spline coefficient b and d
-        for i in range(self.nx - 1):
-            self.d.append((self.c[i + 1] - self.c[i]) / (3.0 * h[i]))
-            tb = (self.a[i + 1] - self.a[i]) / h[i] - h[i] * \
-                (self.c[i + 1] + 2.0 * self.c[i]) / 3.0
-            self.b.append(tb)
+        self.d = (self.c[1:] - self.c[:-1]) / (3.0 * h)
+        self.b = (self.a[1:] - self.a[:-1]) / h - \
+            h * (self.c[1:] + 2.0 * self.c[:-1]) / 3.0
 
     def calc(self, t):
         """
@@ -71,71 +64,81 @@ class Spline:
               If t is outside the range of x, return None.
 
         """
-
-        if t < self.x[0]:
-            return None
-        elif t > self.x[-1]:
+        if t < self.x[0] or t > self.x[-1]:
             return None
-
-        i = self.__search_index(t)
-        dx = t - self.x[i]
-        result = self.a[i] + self.b[i] * dx + \
-            self.c[i] * dx ** 2.0 + self.d[i] * dx ** 3.0
-
-        return result
+        return float(self.calc_array(t))
 
     def calcd(self, t):
         """
         Calc first derivative. If t is outside of the input x, return None.
         """
-
-        if t < self.x[0]:
-            return None
-        elif t > self.x[-1]:
+        if t < self.x[0] or t > self.x[-1]:
             return None
-
-        i = self.__search_index(t)
-        dx = t - self.x[i]
-        result = self.b[i] + 2.0 * self.c[i] * dx + 3.0 * self.d[i] * dx ** 2.0
-        return result
+        return float(self.calcd_array(t))
 
     def calcdd(self, t):
         """
         Calc second derivative, If t is outside of the input x, return None.
         """
-
-        if t < self.x[0]:
-            return None
-        elif t > self.x[-1]:
+        if t < self.x[0] or t > self.x[-1]:
             return None
+        return float(self.calcdd_array(t))
+
+    def calc_array(self, t):
+        """
+        Calc position for an array of t. Entries outside of the input x
+        are nan.
+        """
+        t, i, dx = self.__search_index(t)
+        result = self.a[i] + self.b[i] * dx + \
+            self.c[i] * dx ** 2.0 + self.d[i] * dx ** 3.0
+        return self.__mask_out_of_range(t, result)
+
+    def calcd_array(self, t):
+        """
+        Calc first derivative for an array of t. Entries outside of the
+        input x are nan.
+        """
+        t, i, dx = self.__search_index(t)
+        result = self.b[i] + 2.0 * self.c[i] * dx + 3.0 * self.d[i] * dx ** 2.0
+        return self.__mask_out_of_range(t, result)
 
-        i = self.__search_index(t)
-        dx = t - self.x[i]
+    def calcdd_array(self, t):
+        """
+        Calc second derivative for an array of t. Entries outside of the
+        input x are nan.
+        """
+        t, i, dx = self.__search_index(t)
         result = 2.0 * self.c[i] + 6.0 * self.d[i] * dx
-        return result
+        return self.__mask_out_of_range(t, result)
 
-    def __search_index(self, x):
+    def __search_index(self, t):
         """
-        Search data segment index.
+        Search data segment index. t at the last knot is evaluated on the
+        last segment.
         """
-        return bisect.bisect(self.x, x) - 1
+        t = np.asarray(t, dtype=np.float64)
+        i = np.clip(np.searchsorted(self._x, t, side='right') - 1,
+                    0, self.nx - 2)
+        return t, i, t - self._x[i]
+
+    def __mask_out_of_range(self, t, result):
+        return np.where((t < self._x[0]) | (t > self._x[-1]), np.nan, result)
 
     def __calc_A(self, h):
         """
-        Calculate matrix A for spline coefficient a.
+        Calculate the tridiagonal matrix A for spline coefficient c, in the
+        (upper, diagonal, lower) banded form used by solve_banded.
         """
-        A = np.zeros((self.nx, self.nx))
-        A[0, 0] = 1.0
-        for i in range(self.nx - 1):
-            if i != (self.nx - 2):
-                A[i + 1, i + 1] = 2.0 * (h[i] + h[i + 1])
-            A[i + 1, i] = h[i]
-            A[i, i + 1] = h[i]
-
-        A[0, 1] = 0.0
-        A[self.nx - 1, self.nx - 2] = 0.0
-        A[self.nx - 1, self.nx - 1] = 1.0
-        #  print(A)
+        A = np.zeros((3, self.nx))
+        # upper diagonal, A[i, i + 1]
+        A[0, 2:] = h[1:]
+        # diagonal
+        A[1, 0] = 1.0
+        A[1, 1:-1] = 2.0 * (h[:-1] + h[1:])
+        A[1, -1] = 1.0
+        # lower diagonal, A[i + 1, i]
+        A[2, :-2] = h[:-1]
         return A
 
     def __calc_B(self, h):
@@ -143,9 +146,8 @@ class Spline:
         Calculate matrix B for spline coefficient b.
         """
         B = np.zeros(self.nx)
-        for i in range(self.nx - 2):
-            B[i + 1] = 3.0 * (self.a[i + 2] - self.a[i + 1]) / \
-                h[i + 1] - 3.0 * (self.a[i + 1] - self.a[i]) / h[i]
+        B[1:-1] = 3.0 * (self.a[2:] - self.a[1:-1]) / h[1:] - \
+            3.0 * (self.a[1:-1] - self.a[:-2]) / h[:-1]
         return B
 
 
@@ -161,18 +163,12 @@ class Spline2D:
         The y coordinate.
 
     Attributes
-    -b : float
-        The spline coefficient b.
-    -c : float
-        The spline coefficient c.
-    -d : float
-        The spline coefficient d.
-    -w : float
-        The spline coefficient w.
-    -nx : float
-        The dimension of x.
-    -h : float
-        The n-th discrete difference along the x-axis.
+    -s : list
+        The cumulative arc length at each input point.
+    -sx : Spline
+        The spline of x over s.
+    -sy : Spline
+        The spline of y over s.
 
     """
 
@@ -202,21 +198,38 @@ class Spline2D:
         """
         Calculate curvature.
         """
-        dx = self.sx.calcd(s)
-        ddx = self.sx.calcdd(s)
-        dy = self.sy.calcd(s)
-        ddy = self.sy.calcdd(s)
-        k = (ddy * dx - ddx * dy) / ((dx ** 2 + dy ** 2)**(3 / 2))
-        return k
+        return float(self.calc_curvature_array(s))
 
     def calc_yaw(self, s):
         """
         Calculate yaw.
         """
-        dx = self.sx.calcd(s)
-        dy = self.sy.calcd(s)
-        yaw = math.atan2(dy, dx)
-        return yaw
+        return float(self.calc_yaw_array(s))
+
+    def calc_position_array(self, s):
+        """
+        Calculate positions for an array of s.
+        """
+        return self.sx.calc_array(s), self.sy.calc_array(s)
+
+    def calc_curvature_array(self, s):
+        """
+        Calculate curvatures for an array of s.
+        """
+        dx = self.sx.calcd_array(s)
+        ddx = self.sx.calcdd_array(s)
+        dy = self.sy.calcd_array(s)
+        ddy = self.sy.calcdd_array(s)
+        k = (ddy * dx - ddx * dy) / ((dx ** 2 + dy ** 2)**(3 / 2))
+        return k
+
+    def calc_yaw_array(self, s):
+        """
+        Calculate yaw angles for an array of s.
+        """
+        dx = self.sx.calcd_array(s)
+        dy = self.sy.calcd_array(s)
+        return np.arctan2(dy, dx)
 
 
 def calc_spline_course(x, y, ds=0.1):
@@ -236,17 +249,13 @@ def calc_spline_course(x, y, ds=0.1):
         -s (list): List of spline course points' s values.
     """
     sp = Spline2D(x, y)
-    s = list(np.arange(0, sp.s[-1], ds))
+    s = np.arange(0, sp.s[-1], ds)
 
-    rx, ry, ryaw, rk = [], [], [], []
-    for i_s in s:
-        ix, iy = sp.calc_position(i_s)
-        rx.append(ix)
-        ry.append(iy)
-        ryaw.append(sp.calc_yaw(i_s))
-        rk.append(sp.calc_curvature(i_s))
+    rx, ry = sp.calc_position_array(s)
+    ryaw = sp.calc_yaw_array(s)
+    rk = sp.calc_curvature_array(s)
 
-    return rx, ry, ryaw, rk, s
+    return rx.tolist(), ry.tolist(), ryaw.tolist(), rk.tolist(), s.tolist()
 
 
 def main():
@@ -262,13 +271,9 @@ def main():
     sp = Spline2D(x, y)
     s = np.arange(0, sp.s[-1], ds)
 
-    rx, ry, ryaw, rk = [], [], [], []
-    for i_s in s:
-        ix, iy = sp.calc_position(i_s)
-        rx.append(ix)
-        ry.append(iy)
-        ryaw.append(sp.calc_yaw(i_s))
-        rk.append(sp.calc_curvature(i_s))
+    rx, ry = sp.calc_position_array(s)
+    ryaw = sp.calc_yaw_array(s)
+    rk = sp.calc_curvature_array(s)
 
     plt.subplots(1)
     plt.plot(x, y, "xb", label="input")
@@ -280,7 +285,7 @@ def main():
     plt.legend()
 
     plt.subplots(1)
-    plt.plot(s, [np.rad2deg(iyaw) for iyaw in ryaw], "-r", label="yaw")
+    plt.plot(s, np.rad2deg(ryaw), "-r", label="yaw")
     plt.grid(True)
     plt.legend()
     plt.xlabel("line length[m]")
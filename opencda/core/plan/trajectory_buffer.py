@@ -0,0 +1,148 @@
+# -*- coding: utf-8 -*-
+"""
+Array-backed trajectory buffer for the local planner.
+"""
+# License: TDG-Attribution-NonCommercial-NoDistrib
+
+import carla
+import numpy as np
+
+
+class TrajectoryBuffer(object):
+    """
+    Fixed-capacity buffer of trajectory points stored in numpy arrays.
+
+    It keeps the deque interface the planners and platooning code use on the
+    trajectory: points read through indexing, iteration or popleft come out
+    as (carla.Transform, speed) tuples, built only when they are read.
+
+    Parameters
+    ----------
+    maxlen : int
+        The maximum number of trajectory points. When more points are
+        loaded, the oldest ones are dropped, like a bounded deque.
+
+    Attributes
+    ----------
+    _xyz : np.ndarray
+        Point locations, shape (maxlen, 3).
+
+    _speed : np.ndarray
+        Target speed (km/h) of every point, shape (maxlen,).
+
+    _head : int
+        Index of the first live point.
+
+    _tail : int
+        One past the index of the last live point.
+    """
+
+    def __init__(self, maxlen=30):
+        self.maxlen = maxlen
+        self._xyz = np.zeros((maxlen, 3))
+        self._speed = np.zeros(maxlen)
+        self._head = 0
+        self._tail = 0
+
+    def __len__(self):
+        return self._tail - self._head
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('trajectory index out of range')
+        return self._point(self._head + index)
+
+    def __iter__(self):
+        for i in range(self._head, self._tail):
+            yield self._point(i)
+
+    def _point(self, i):
+        x, y, z = self._xyz[i]
+        return carla.Transform(carla.Location(x, y, z)), self._speed[i]
+
+    @property
+    def locations(self):
+        """
+        Locations of the live points, shape (N, 3). This is a view into
+        the buffer.
+        """
+        return self._xyz[self._head:self._tail]
+
+    @property
+    def speeds(self):
+        """
+        Target speeds of the live points, shape (N,). This is a view into
+        the buffer.
+        """
+        return self._speed[self._head:self._tail]
+
+    def clear(self):
+        self._head = 0
+        self._tail = 0
+
+    def set(self, x, y, z, speed):
+        """
+        Replace the buffer content.
+
+        Parameters
+        ----------
+        x : np.ndarray
+            The x coordinates of the points.
+
+        y : np.ndarray
+            The y coordinates of the points.
+
+        z : float or np.ndarray
+            The z coordinates of the points.
+
+        speed : float or np.ndarray
+            The target speed (km/h) of the points.
+        """
+        x = np.asarray(x)
+        n = min(len(x), self.maxlen)
+        start = len(x) - n
+        self._xyz[:n, 0] = x[start:]
+        self._xyz[:n, 1] = np.asarray(y)[start:]
+        self._xyz[:n, 2] = z if np.ndim(z) == 0 else np.asarray(z)[start:]
+        self._speed[:n] = speed if np.ndim(speed) == 0 else \
+            np.asarray(speed)[start:]
+        self._head = 0
+        self._tail = n
+
+    def assign(self, trajectory):
+        """
+        Replace the buffer content with (carla.Transform, speed) points,
+        e.g. a trajectory generated by a platoon member.
+
+        Parameters
+        ----------
+        trajectory : iterable
+            (carla.Transform, speed) pairs.
+        """
+        trajectory = list(trajectory)
+        self.set([t.location.x for t, _ in trajectory],
+                 [t.location.y for t, _ in trajectory],
+                 [t.location.z for t, _ in trajectory],
+                 [spd for _, spd in trajectory])
+
+    def popleft(self, n=1):
+        """
+        Remove the first n points.
+
+        Returns
+        -------
+        point : tuple
+            The (carla.Transform, speed) of the last removed point.
+        """
+        if n < 1 or n > len(self):
+            raise IndexError('pop from an empty trajectory')
+        self._head += n
+        return self._point(self._head - 1)
+
+    def copy(self):
+        copied = TrajectoryBuffer(self.maxlen)
+        copied.set(self.locations[:, 0], self.locations[:, 1],
+                   self.locations[:, 2], self.speeds)
+        return copied
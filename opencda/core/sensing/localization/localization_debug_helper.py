@@ -11,6 +11,8 @@ import warnings
 
 import matplotlib.pyplot as plt
 
+from opencda.core.common.delta_tracker import DeltaTracker
+
 
 class LocDebugHelper(object):
     """
@@ -61,6 +63,11 @@ class LocDebugHelper(object):
             The list of ground truth speed values.
     """
 
+    # lists mirrored 1:1 by the LocDebugHelper protobuf
+    DEBUG_INFO_KEYS = ['gnss_x', 'gnss_y', 'gnss_yaw', 'gnss_spd',
+                       'filter_x', 'filter_y', 'filter_yaw', 'filter_spd',
+                       'gt_x', 'gt_y', 'gt_yaw', 'gt_spd']
+
     def __init__(self, config_yaml, actor_id):
 
         self.show_animation = config_yaml['show_animation']
@@ -92,6 +99,7 @@ class LocDebugHelper(object):
         self.hz = np.zeros((2, 1))
 
         self.actor_id = actor_id
+        self.delta_tracker = DeltaTracker()
 
     def run_step(self, gnss_x, gnss_y, gnss_yaw, gnss_spd,
                  filter_x, filter_y, filter_yaw, filter_spd,
@@ -302,92 +310,17 @@ class LocDebugHelper(object):
 
             return figure, perform_txt
 
-    def serialize_debug_info(self, proto_debug_helper):
-        # TODO: extend instead of append? or [:] = ?
-
-        for obj in self.gnss_x:
-            proto_debug_helper.gnss_x.append(obj)
-
-        for obj in self.gnss_y:
-            proto_debug_helper.gnss_y.append(obj)
-
-        for obj in self.gnss_yaw:
-            proto_debug_helper.gnss_yaw.append(obj)
-        
-        for obj in self.gnss_spd:
-            proto_debug_helper.gnss_spd.append(obj)
-
-        for obj in self.filter_x:
-            proto_debug_helper.filter_x.append(obj)
-        
-        for obj in self.filter_y:
-            proto_debug_helper.filter_y.append(obj)
-        
-        for obj in self.filter_yaw:
-            proto_debug_helper.filter_yaw.append(obj)
-        
-        for obj in self.filter_spd:
-            proto_debug_helper.filter_spd.append(obj)
-
-        for obj in self.gt_x:
-            proto_debug_helper.gt_x.append(obj)
-        
-        for obj in self.gt_y:
-            proto_debug_helper.gt_y.append(obj)
-        
-        for obj in self.gt_yaw:
-            proto_debug_helper.gt_yaw.append(obj)
-        
-        for obj in self.gt_spd:
-            proto_debug_helper.gt_spd.append(obj)
-
-    def deserialize_debug_info(self, proto_debug_helper):
+    def serialize_debug_info(self, proto_debug_helper, delta=False):
+        for key in self.DEBUG_INFO_KEYS:
+            getattr(proto_debug_helper, key).extend(
+                self.delta_tracker.unsent(key, getattr(self, key), delta))
+
+    def deserialize_debug_info(self, proto_debug_helper, append=False):
         # call from Sim API to populate locally
+        # append merges an incremental (delta) chunk instead of replacing
 
-        self.gnss_x.clear()
-        for obj in proto_debug_helper.gnss_x:
-            self.gnss_x.append(obj)
-
-        self.gnss_y.clear()
-        for obj in proto_debug_helper.gnss_y:
-            self.gnss_y.append(obj)
-
-        self.gnss_yaw.clear()
-        for obj in proto_debug_helper.gnss_yaw:
-            self.gnss_yaw.append(obj)
-        
-        self.gnss_spd.clear()
-        for obj in proto_debug_helper.gnss_spd:
-            self.gnss_spd.append(obj)
-
-        self.filter_x.clear()
-        for obj in proto_debug_helper.filter_x:
-            self.filter_x.append(obj)
-        
-        self.filter_y.clear()
-        for obj in proto_debug_helper.filter_y:
-            self.filter_y.append(obj)
-        
-        self.filter_yaw.clear()
-        for obj in proto_debug_helper.filter_yaw:
-            self.filter_yaw.append(obj)
-        
-        self.filter_spd.clear()
-        for obj in proto_debug_helper.filter_spd:
-            self.filter_spd.append(obj)
-
-        self.gt_x.clear()
-        for obj in proto_debug_helper.gt_x:
-            self.gt_x.append(obj)
-        
-        self.gt_y.clear()
-        for obj in proto_debug_helper.gt_y:
-            self.gt_y.append(obj)
-        
-        self.gt_yaw.clear()
-        for obj in proto_debug_helper.gt_yaw:
-            self.gt_yaw.append(obj)
-        
-        self.gt_spd.clear()
-        for obj in proto_debug_helper.gt_spd:
-            self.gt_spd.append(obj)
+        for key in self.DEBUG_INFO_KEYS:
+            values = getattr(self, key)
+            if not append:
+                values.clear()
+            values.extend(getattr(proto_debug_helper, key))
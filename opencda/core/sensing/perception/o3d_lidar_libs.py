@@ -13,7 +13,6 @@ import open3d as o3d
 import numpy as np
 
 from matplotlib import cm
-from scipy.stats import mode
 
 import opencda.core.sensing.perception.sensor_transformation as st
 from opencda.core.sensing.perception.obstacle_vehicle import \
@@ -48,6 +47,19 @@ LABEL_COLORS = np.array([
     (145, 170, 100),  # Terrain
 ]) / 255.0  # normalize each channel [0-1] since is what Open3D uses
 
+# which of the eight corners returned by Open3D's
+# AxisAlignedBoundingBox.get_box_points take their x, y, z from the max bound
+AABB_CORNERS = np.array([
+    (0, 0, 0),
+    (1, 0, 0),
+    (0, 1, 0),
+    (0, 0, 1),
+    (1, 1, 1),
+    (0, 1, 1),
+    (1, 0, 1),
+    (1, 1, 0),
+], dtype=bool)
+
 
 def o3d_pointcloud_encode(raw_data, point_cloud):
     """
@@ -197,60 +209,79 @@ def o3d_camera_lidar_fusion(objects,
     else:
         yolo_bbx = yolo_bbx.detach().numpy()
 
-    for i in range(yolo_bbx.shape[0]):
-        detection = yolo_bbx[i]
-        # 2d bbx coordinates
-        x1, y1, x2, y2 = int(detection[0]), int(detection[1]),\
-            int(detection[2]), int(detection[3])
-        label = int(detection[5])
-
+    # 2d bbx coordinates and labels
+    boxes = yolo_bbx[:, :4].astype(int)
+    labels = yolo_bbx[:, 5].astype(int)
+
+    # sort the points in front of the camera by image column, so the points
+    # within the column range of a box are one slice found by binary search
+    in_front = np.flatnonzero(projected_lidar[:, 2] > 0.0)
+    order = in_front[np.argsort(projected_lidar[in_front, 0], kind='stable')]
+    columns = projected_lidar[order, 0]
+    starts = np.searchsorted(columns, boxes[:, 0], side='right')
+    ends = np.searchsorted(columns, boxes[:, 2], side='left')
+
+    box_labels = []
+    min_bounds = []
+    max_bounds = []
+    for (x1, y1, x2, y2), label, start, end in \
+            zip(boxes, labels, starts, ends):
         # choose the lidar points in the 2d yolo bounding box
-        points_in_bbx = \
-            (projected_lidar[:, 0] > x1) & (projected_lidar[:, 0] < x2) & \
-            (projected_lidar[:, 1] > y1) & (projected_lidar[:, 1] < y2) & \
-            (projected_lidar[:, 2] > 0.0)
+        candidates = order[start:end]
+        rows = projected_lidar[candidates, 1]
         # ignore intensity channel
-        select_points = lidar_3d[points_in_bbx][:, :-1]
+        select_points = lidar_3d[candidates[(rows > y1) & (rows < y2)], :3]
 
         if select_points.shape[0] == 0:
             continue
 
-        # filter out the outlier
-        x_common = mode(np.array(np.abs(select_points[:, 0]),
-                                 dtype=np.int), axis=0)[0][0]
-        y_common = mode(np.array(np.abs(select_points[:, 1]),
-                                 dtype=np.int), axis=0)[0][0]
-        points_inlier = (np.abs(select_points[:, 0]) > x_common - 3) & \
-                        (np.abs(select_points[:, 0]) < x_common + 3) & \
-                        (np.abs(select_points[:, 1]) > y_common - 3) & \
-                        (np.abs(select_points[:, 1]) < y_common + 3)
+        # filter out the outlier: keep the points within 3m of the most
+        # common integer |x| and |y|
+        abs_xy = np.abs(select_points[:, :2])
+        x_common = np.bincount(abs_xy[:, 0].astype(int)).argmax()
+        y_common = np.bincount(abs_xy[:, 1].astype(int)).argmax()
+        points_inlier = (np.abs(abs_xy[:, 0] - x_common) < 3) & \
+                        (np.abs(abs_xy[:, 1] - y_common) < 3)
         select_points = select_points[points_inlier]
 
         if select_points.shape[0] < 2:
             continue
 
-        # to visualize 3d lidar points in o3d visualizer, we need to
-        # revert the x coordinates
-        select_points[:, :1] = -select_points[:, :1]
-
-        # create o3d.PointCloud object
-        o3d_pointcloud = o3d.geometry.PointCloud()
-        o3d_pointcloud.points = o3d.utility.Vector3dVector(select_points)
+        box_labels.append(label)
+        min_bounds.append(select_points.min(axis=0))
+        max_bounds.append(select_points.max(axis=0))
+
+    if not box_labels:
+        return objects
+
+    # to visualize 3d lidar points in o3d visualizer, the x coordinates are
+    # reverted, which swaps the x bounds
+    min_bounds = np.array(min_bounds)
+    max_bounds = np.array(max_bounds)
+    o3d_min_bounds = min_bounds.copy()
+    o3d_max_bounds = max_bounds.copy()
+    o3d_min_bounds[:, 0] = -max_bounds[:, 0]
+    o3d_max_bounds[:, 0] = -min_bounds[:, 0]
+
+    # the eight corners of every box, in o3d get_box_points order, (n, 8, 3)
+    corners = np.where(AABB_CORNERS[np.newaxis],
+                       o3d_max_bounds[:, np.newaxis],
+                       o3d_min_bounds[:, np.newaxis])
+    # covert back to unreal coordinate
+    corners[:, :, 0] = -corners[:, :, 0]
+    # extend (3, 8n) to (4, 8n) for homogenous transformation and project
+    # all corners to world reference at once
+    corners = corners.reshape(-1, 3).transpose()
+    corners = np.r_[corners, [np.ones(corners.shape[1])]]
+    corners = st.sensor_to_world(corners, lidar_sensor.get_transform())
+    corners = corners[:3].transpose().reshape(-1, 8, 3)
+
+    for label, corner, min_bound, max_bound in \
+            zip(box_labels, corners, o3d_min_bounds, o3d_max_bounds):
         # add o3d bounding box
-        aabb = o3d_pointcloud.get_axis_aligned_bounding_box()
+        aabb = o3d.geometry.AxisAlignedBoundingBox(min_bound, max_bound)
         aabb.color = (0, 1, 0)
 
-        # get the eight corner of the bounding boxes.
-        corner = np.asarray(aabb.get_box_points())
-        # covert back to unreal coordinate
-        corner[:, :1] = -corner[:, :1]
-        corner = corner.transpose()
-        # extend (3, 8) to (4, 8) for homogenous transformation
-        corner = np.r_[corner, [np.ones(corner.shape[1])]]
-        # project to world reference
-        corner = st.sensor_to_world(corner, lidar_sensor.get_transform())
-        corner = corner.transpose()[:, :3]
-
         if is_vehicle_cococlass(label):
             obstacle_vehicle = ObstacleVehicle(corner, aabb)
             if 'vehicles' in objects:
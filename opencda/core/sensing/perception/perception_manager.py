@@ -368,6 +368,14 @@ class PerceptionManager:
             self.lidar = None
             self.o3d_vis = None
 
+        # lidar to image projection of every camera, reused across frames
+        if self.activate:
+            self.lidar_projections = [
+                st.LidarCameraProjection(self.lidar.sensor, rgb_camera.sensor)
+                for rgb_camera in self.rgb_camera]
+        else:
+            self.lidar_projections = None
+
         # if data dump is true, semantic lidar is also spawned
         self.data_dump = data_dump
         self.semantic_lidar = SemanticLidarSensor(vehicle,
@@ -465,11 +473,13 @@ class PerceptionManager:
 
         for (i, rgb_camera) in enumerate(self.rgb_camera):
             # lidar projection
-            rgb_image, projected_lidar = st.project_lidar_to_camera(
-                self.lidar.sensor,
-                rgb_camera.sensor, self.lidar.data, np.array(
-                    rgb_camera.image))
-            rgb_draw_images.append(rgb_image)
+            projected_lidar = \
+                self.lidar_projections[i].project(self.lidar.data)
+            # the lidar points are only painted for display
+            if self.camera_visualize:
+                rgb_draw_images.append(st.draw_lidar_points(
+                    np.array(rgb_camera.image), projected_lidar,
+                    self.lidar.data[:, 3]))
 
             # camera lidar fusion
             objects = o3d_camera_lidar_fusion(
@@ -528,13 +538,12 @@ class PerceptionManager:
             Updated object dictionary.
         """
         perception_start_time = time.time()
-        world = self.vehicle.get_world()
+        world_snapshot = \
+            self.cav_world.get_world_snapshot(self.vehicle.get_world())
 
-        vehicle_list = world.get_actors().filter("*vehicle*")
         thresh = 50 if not self.data_dump else 120
-
-        vehicle_list = [v for v in vehicle_list if self.dist(v) < thresh and
-                        v.id != self.vehicle.id]
+        vehicle_list = world_snapshot.vehicles_in_range(
+            self.ego_pos.location, thresh, self.vehicle.id)
 
         # use semantic lidar to filter out vehicles out of the range
         if self.data_dump:
@@ -673,37 +682,41 @@ class PerceptionManager:
         if 'vehicles' not in objects:
             return
 
-        world = self.vehicle.get_world()
-        vehicle_list = world.get_actors().filter("*vehicle*")
-        vehicle_list = [v for v in vehicle_list if self.dist(v) < 50 and
-                        v.id != self.vehicle.id]
+        world_snapshot = \
+            self.cav_world.get_world_snapshot(self.vehicle.get_world())
+        vehicle_list = world_snapshot.vehicles_in_range(
+            self.ego_pos.location, 50, self.vehicle.id)
+        if not vehicle_list:
+            return
+        vehicle_xy = np.array([[v.get_location().x, v.get_location().y]
+                               for v in vehicle_list])
 
         # todo: consider the minimum distance to be safer in next version
-        for v in vehicle_list:
-            loc = v.get_location()
-            for obstacle_vehicle in objects['vehicles']:
-                obstacle_speed = get_speed(obstacle_vehicle)
+        for obstacle_vehicle in objects['vehicles']:
+            obstacle_loc = obstacle_vehicle.get_location()
+            matched = np.flatnonzero(
+                np.all(np.abs(vehicle_xy - [obstacle_loc.x, obstacle_loc.y])
+                       <= 3.0, axis=1))
+            for i in matched:
                 # if speed > 0, it represents that the vehicle
                 # has been already matched.
-                if obstacle_speed > 0:
-                    continue
-                obstacle_loc = obstacle_vehicle.get_location()
-                if abs(loc.x - obstacle_loc.x) <= 3.0 and \
-                        abs(loc.y - obstacle_loc.y) <= 3.0:
-                    obstacle_vehicle.set_velocity(v.get_velocity())
-
-                    # the case where the obstacle vehicle is controled by
-                    # sumo
-                    if self.cav_world.sumo2carla_ids:
-                        sumo_speed = \
-                            get_speed_sumo(self.cav_world.sumo2carla_ids,
-                                           v.id)
-                        if sumo_speed > 0:
-                            # todo: consider the yaw angle in the future
-                            speed_vector = carla.Vector3D(sumo_speed, 0, 0)
-                            obstacle_vehicle.set_velocity(speed_vector)
-
-                    obstacle_vehicle.set_carla_id(v.id)
+                if get_speed(obstacle_vehicle) > 0:
+                    break
+                v = vehicle_list[i]
+                obstacle_vehicle.set_velocity(v.get_velocity())
+
+                # the case where the obstacle vehicle is controled by
+                # sumo
+                if self.cav_world.sumo2carla_ids:
+                    sumo_speed = \
+                        get_speed_sumo(self.cav_world.sumo2carla_ids,
+                                       v.id)
+                    if sumo_speed > 0:
+                        # todo: consider the yaw angle in the future
+                        speed_vector = carla.Vector3D(sumo_speed, 0, 0)
+                        obstacle_vehicle.set_velocity(speed_vector)
+
+                obstacle_vehicle.set_carla_id(v.id)
 
     def retrieve_traffic_lights(self, objects):
         """
@@ -720,17 +733,15 @@ class PerceptionManager:
         object : dict
             The updated dictionary.
         """
-        world = self.vehicle.get_world()
-        tl_list = world.get_actors().filter('traffic.traffic_light*')
+        world_snapshot = \
+            self.cav_world.get_world_snapshot(self.vehicle.get_world())
 
         objects.update({'traffic_lights': []})
 
-        for tl in tl_list:
-            distance = self.dist(tl)
-            if distance < 50:
-                traffic_light = TrafficLight(tl.get_location(),
-                                             tl.get_state())
-                objects['traffic_lights'].append(traffic_light)
+        for tl, tl_location in world_snapshot.traffic_lights_in_range(
+                self.ego_pos.location, 50):
+            traffic_light = TrafficLight(tl_location, tl.get_state())
+            objects['traffic_lights'].append(traffic_light)
         return objects
 
     def destroy(self):
@@ -321,88 +321,93 @@ def get_2d_bb(vehicle, sensor, senosr_transform):
     return p2d_bb
 
 
-def project_lidar_to_camera(lidar, camera, point_cloud, rgb_image):
+# (x, y, z) in UE4's sensor coordinate system to (y, -z, x) in the
+# "standard" camera coordinate system used by OpenCV:
+
+# ^ z                       . z
+# |                        /
+# |              to:      +-------> x
+# | . x                   |
+# |/                      |
+# +-------> y             v y
+UE4_TO_CAMERA = np.array([[0, 1, 0, 0],
+                          [0, 0, -1, 0],
+                          [1, 0, 0, 0]], dtype=np.float64)
+
+
+def lidar_to_image_matrix(lidar_transform, camera_transform, intrinsic):
     """
-    Project lidar to camera space.
+    Build the matrix projecting homogeneous lidar points into the image.
 
     Parameters
     ----------
-    lidar : carla.sensor
-        Lidar sensor.
+    lidar_transform : carla.Transform
+        Lidar position in the world.
 
-    camera : carla.sensor
-        RGB camera.
+    camera_transform : carla.Transform
+        Camera position in the world.
 
-    point_cloud : np.ndarray
-        Cloud points, shape: (n, 4).
-
-    rgb_image : np.ndarray
-        RGB image from camera.
+    intrinsic : np.ndarray
+        The camera intrinsic matrix, (3, 3).
 
     Returns
     -------
-    rgb_image : np.ndarray
-        New rgb image with lidar points projected.
-
-    points_2d : np.ndarrya
-        Point cloud projected to camera space.
-
+    matrix : np.ndarray
+        Lidar to (unnormalized) image coordinates, shape (3, 4).
     """
+    lidar_2_world = x_to_world_transformation(lidar_transform)
+    world_2_camera = np.linalg.inv(x_to_world_transformation(camera_transform))
+    return np.dot(intrinsic,
+                  np.dot(UE4_TO_CAMERA, np.dot(world_2_camera, lidar_2_world)))
 
-    # Lidar intensity array of shape (p_cloud_size,) but, for now, let's
-    # focus on the 3D points.
-    intensity = np.array(point_cloud[:, 3])
-
-    # Point cloud in lidar sensor space array of shape (3, p_cloud_size).
-    local_lidar_points = np.array(point_cloud[:, :3]).T
 
-    # Add an extra 1.0 at the end of each 3d point so it becomes of
-    # shape (4, p_cloud_size) and it can be multiplied by a (4, 4) matrix.
-    local_lidar_points = np.r_[
-        local_lidar_points, [np.ones(local_lidar_points.shape[1])]]
+def project_lidar_points(point_cloud, matrix):
+    """
+    Project lidar points into the image.
 
-    # This (4, 4) matrix transforms the points from lidar space to world space.
-    lidar_2_world = x_to_world_transformation(lidar.get_transform())
+    Parameters
+    ----------
+    point_cloud : np.ndarray
+        Cloud points, shape: (n, 4).
 
-    # transform lidar points from lidar space to world space
-    world_points = np.dot(lidar_2_world, local_lidar_points)
+    matrix : np.ndarray
+        Projection from lidar_to_image_matrix, (3, 4).
 
-    # project lidar world points to camera space
-    sensor_points = world_to_sensor(world_points, camera.get_transform())
+    Returns
+    -------
+    points_2d : np.ndarray
+        Pixel column, pixel row and depth of every point, shape (n, 3).
+        Points behind the camera have a depth <= 0.
+    """
+    points_2d = np.dot(point_cloud[:, :3], matrix[:, :3].T) + matrix[:, 3]
+    points_2d[:, :2] /= points_2d[:, 2:3]
+    return points_2d
 
-    # New we must change from UE4's coordinate system to an "standard"
-    # camera coordinate system (the same used by OpenCV):
 
-    # ^ z                       . z
-    # |                        /
-    # |              to:      +-------> x
-    # | . x                   |
-    # |/                      |
-    # +-------> y             v y
+def draw_lidar_points(rgb_image, points_2d, intensity):
+    """
+    Paint the projected lidar points that fall into the image, colored by
+    intensity.
 
-    # (x, y ,z) -> (y, -z, x)
-    point_in_camera_coords = np.array([
-        sensor_points[1],
-        sensor_points[2] * -1,
-        sensor_points[0]])
+    Parameters
+    ----------
+    rgb_image : np.ndarray
+        RGB image from camera, painted in place.
 
-    # retrieve camera intrinsic
-    K = get_camera_intrinsic(camera)
-    # project the 3d points in camera space to image space
-    points_2d = np.dot(K, point_in_camera_coords)
+    points_2d : np.ndarray
+        Projected points from project_lidar_points, shape (n, 3).
 
-    # normalize x,y,z
-    points_2d = np.array([
-        points_2d[0, :] / points_2d[2, :],
-        points_2d[1, :] / points_2d[2, :],
-        points_2d[2, :]])
+    intensity : np.ndarray
+        Lidar intensity of every point, shape (n,).
 
-    image_w = int(camera.attributes['image_size_x'])
-    image_h = int(camera.attributes['image_size_y'])
+    Returns
+    -------
+    rgb_image : np.ndarray
+        The image with the lidar points painted.
+    """
+    image_h, image_w = rgb_image.shape[:2]
 
     # remove points out the camera scope
-    points_2d = points_2d.T
-    intensity = intensity.T
     points_in_canvas_mask = \
         (points_2d[:, 0] > 0.0) & (points_2d[:, 0] < image_w) & \
         (points_2d[:, 1] > 0.0) & (points_2d[:, 1] < image_h) & \
@@ -411,8 +416,8 @@ def project_lidar_to_camera(lidar, camera, point_cloud, rgb_image):
     new_intensity = intensity[points_in_canvas_mask]
 
     # Extract the screen coords (uv) as integers.
-    u_coord = new_points_2d[:, 0].astype(np.int)
-    v_coord = new_points_2d[:, 1].astype(np.int)
+    u_coord = new_points_2d[:, 0].astype(int)
+    v_coord = new_points_2d[:, 1].astype(int)
 
     # Since at the time of the creation of this script, the intensity function
     # is returning high values, these are adjusted to be nicely visualized.
@@ -421,10 +426,118 @@ def project_lidar_to_camera(lidar, camera, point_cloud, rgb_image):
         np.interp(new_intensity, VID_RANGE, VIRIDIS[:, 0]) * 255.0,
         np.interp(new_intensity, VID_RANGE, VIRIDIS[:, 1]) * 255.0,
         np.interp(new_intensity, VID_RANGE, VIRIDIS[:, 2]) * 255.0]).\
-        astype(np.int).T
+        astype(int).T
+
+    # every point paints the 2x2 pixels up and left of it, points on the
+    # first row or column paint nothing, and where points overlap the
+    # later one wins
+    inside = (u_coord > 0) & (v_coord > 0)
+    u_coord, v_coord, color_map = \
+        u_coord[inside], v_coord[inside], color_map[inside]
+    pixels = (np.stack([v_coord - 1, v_coord - 1, v_coord, v_coord],
+                       axis=1) * image_w +
+              np.stack([u_coord - 1, u_coord, u_coord - 1, u_coord],
+                       axis=1)).ravel()
+    colors = np.repeat(color_map, 4, axis=0)
+    _, last = np.unique(pixels[::-1], return_index=True)
+    pixels = pixels[len(pixels) - 1 - last]
+    colors = colors[len(colors) - 1 - last]
+    rgb_image[pixels // image_w, pixels % image_w] = colors
+
+    return rgb_image
+
+
+class LidarCameraProjection(object):
+    """
+    Projection of the points of a lidar into the image of a camera. The
+    camera intrinsic is computed once, and the projection matrix only when
+    the lidar or camera transform changes.
+
+    Parameters
+    ----------
+    lidar : carla.sensor
+        Lidar sensor.
+
+    camera : carla.sensor
+        RGB camera.
+    """
 
-    for i in range(len(new_points_2d)):
-        rgb_image[v_coord[i] - 1: v_coord[i] + 1,
-                  u_coord[i] - 1: u_coord[i] + 1] = color_map[i]
+    def __init__(self, lidar, camera):
+        self.lidar = lidar
+        self.camera = camera
+        self.intrinsic = get_camera_intrinsic(camera)
+
+        self._transforms = None
+        self._matrix = None
+
+    @staticmethod
+    def _transform_key(transform):
+        location, rotation = transform.location, transform.rotation
+        return (location.x, location.y, location.z,
+                rotation.pitch, rotation.yaw, rotation.roll)
+
+    def matrix(self):
+        """
+        The lidar to image projection matrix at the current sensor
+        transforms, (3, 4).
+        """
+        lidar_transform = self.lidar.get_transform()
+        camera_transform = self.camera.get_transform()
+        transforms = (self._transform_key(lidar_transform),
+                      self._transform_key(camera_transform))
+        if transforms != self._transforms:
+            self._matrix = lidar_to_image_matrix(lidar_transform,
+                                                 camera_transform,
+                                                 self.intrinsic)
+            self._transforms = transforms
+        return self._matrix
+
+    def project(self, point_cloud):
+        """
+        Project lidar points into the image.
+
+        Parameters
+        ----------
+        point_cloud : np.ndarray
+            Cloud points, shape: (n, 4).
+
+        Returns
+        -------
+        points_2d : np.ndarray
+            Point cloud projected to camera space, shape (n, 3).
+        """
+        return project_lidar_points(point_cloud, self.matrix())
+
+
+def project_lidar_to_camera(lidar, camera, point_cloud, rgb_image):
+    """
+    Project lidar to camera space and paint the points into the image.
+    Callers projecting every frame should keep a LidarCameraProjection
+    and only draw when the image is shown.
+
+    Parameters
+    ----------
+    lidar : carla.sensor
+        Lidar sensor.
 
+    camera : carla.sensor
+        RGB camera.
+
+    point_cloud : np.ndarray
+        Cloud points, shape: (n, 4).
+
+    rgb_image : np.ndarray
+        RGB image from camera.
+
+    Returns
+    -------
+    rgb_image : np.ndarray
+        New rgb image with lidar points projected.
+
+    points_2d : np.ndarrya
+        Point cloud projected to camera space.
+
+    """
+    points_2d = LidarCameraProjection(lidar, camera).project(point_cloud)
+    rgb_image = draw_lidar_points(rgb_image, points_2d, point_cloud[:, 3])
     return rgb_image, points_2d
@@ -54,20 +54,40 @@ class EcloudClient:
     def __init__(self, channel: grpc.Channel) -> None:
         self.channel = channel
         self.stub = ecloud_rpc.EcloudStub(self.channel)
+        self.tick_stream = None
 
-    async def run(self) -> ecloud.Tick:
-        count = 0
-        pong = None
-        async for ecloud_update in self.stub.SimulationStateStream(ecloud.Tick( tick_id = self.tick_id )):
-            logger.debug("T%s:C%s", ecloud_update.tick_id, ecloud_update.command)
-            assert(self.tick_id != ecloud_update.tick_id)
-            self.tick_id = ecloud_update.tick_id
-            count += 1
-            pong = ecloud_update
+    async def open_tick_stream(self, vehicle_index: int) -> None:
+        '''
+        opens the long-lived SimulationStateStream - the first message only identifies this vehicle to the server
+        '''
+        self.tick_stream = self.stub.SimulationStateStream()
+        hello = ecloud.VehicleUpdate()
+        hello.vehicle_index = vehicle_index
+        hello.vehicle_state = ecloud.VehicleState.REGISTERING
+        await self.tick_stream.write(hello)
+
+    async def run(self, que: asyncio.Queue) -> None:
+        '''
+        forwards ticks from the tick stream to the queue - stream counterpart of ecloud_run_push_server
+        '''
+        assert self.tick_stream is not None
+        while True:
+            tick = await self.tick_stream.read()
+            if tick == grpc.aio.EOF:
+                logger.warning("tick stream closed by eCloud server")
+                break
+
+            logger.debug("T%s:C%s", tick.tick_id, tick.command)
+            assert que.empty()
+            que.put_nowait(tick)
 
-        assert(pong != None)
-        assert(count == 1)
-        return pong
+            if tick.command == ecloud.Command.END:
+                break
+
+    async def close_tick_stream(self) -> None:
+        if self.tick_stream is not None:
+            await self.tick_stream.done_writing()
+            self.tick_stream = None
 
     async def register_vehicle(self, update: ecloud.VehicleUpdate) -> ecloud.SimulationInfo:
         sim_info = await self.stub.Client_RegisterVehicle(update)
@@ -75,10 +95,25 @@ class EcloudClient:
         return sim_info
 
     async def send_vehicle_update(self, update: ecloud.VehicleUpdate) -> ecloud.Empty:
+        if self.tick_stream is not None:
+            await self.tick_stream.write(update)
+            return ecloud.Empty()
+
         empty = await self.stub.Client_SendUpdate(update)
 
         return empty
 
+    async def send_vehicle_updates(self, updates) -> None:
+        '''
+        sends the updates of every vehicle hosted by this process - in order over the tick stream, concurrently otherwise
+        '''
+        if self.tick_stream is not None:
+            for update in updates:
+                await self.tick_stream.write(update)
+            return
+
+        await asyncio.gather(*[self.stub.Client_SendUpdate(update) for update in updates])
+
     async def get_waypoints(self, request: ecloud.WaypointRequest) -> ecloud.WaypointBuffer:
         buffer = await self.stub.Client_GetWaypoints(request)
 
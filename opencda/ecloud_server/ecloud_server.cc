@@ -34,6 +34,11 @@
 #include <csignal>
 #include <unistd.h>
 #include <chrono>
+#include <functional>
+#include <algorithm>
+#include <vector>
+#include <deque>
+#include <unordered_map>
 
 #include "absl/flags/flag.h"
 #include "absl/flags/parse.h"
@@ -42,6 +47,8 @@
 #include "absl/log/flags.h"
 #include "absl/log/initialize.h"
 #include "absl/log/globals.h"
+#include "absl/synchronization/mutex.h"
+#include "absl/time/time.h"
 
 #include <grpcpp/ext/proto_server_reflection_plugin.h>
 #include <grpcpp/grpcpp.h>
@@ -62,7 +69,8 @@
 #define MAX_CARS 512
 #define INVALID_TIME 0
 #define TICK_ID_INVALID -1
-#define VEHICLE_UPDATE_BATCH_SIZE 32
+#define VEHICLE_UPDATE_SHARDS 16
+#define TICK_STREAM_ATTACH_TIMEOUT_S 30
 
 #define ECLOUD_PUSH_BASE_PORT 50101
 #define ECLOUD_PUSH_API_PORT 50061
@@ -126,36 +134,97 @@ std::vector<std::pair<int16_t, std::string>> serializedEdgeWaypoints_; // vehicl
 absl::Mutex mu_;
 
 volatile std::atomic<int16_t> numRegisteredVehicles_ ABSL_GUARDED_BY(mu_);
-std::vector<std::string> pendingReplies_ ABSL_GUARDED_BY(mu_); // TODO: Move to a hashmap serialized protobuf allows differing message types in same vector
 
-class PushClient
+// Latest pending VehicleUpdate per vehicle, sharded by vehicle index so concurrent client replies rarely contend.
+// Updates are stored parsed, so draining is a move rather than a serialize/parse round trip.
+class VehicleUpdateStore
 {
     public:
-        explicit PushClient( std::shared_ptr<grpc::Channel> channel, std::string connection ) :
-                            stub_(Ecloud::NewStub(channel)), connection_(connection) {}
+        // replaces any update from the same vehicle that has not been drained yet
+        void Put(const VehicleUpdate &update)
+        {
+            Shard &shard = shards_[ShardIndex(update.vehicle_index())];
+            absl::MutexLock lock(&shard.mu);
+            shard.updates[update.vehicle_index()] = update;
+        }
 
-        bool PushTick(int32_t tickId, Command command, int64_t lastClientDurationNS)
+        // removes every pending update; output is ordered by vehicle index
+        void Drain(std::vector<VehicleUpdate> *out)
         {
-            Tick tick;
-            tick.set_tick_id(tickId);
-            tick.set_command(command);
+            for ( Shard &shard : shards_ )
+            {
+                std::unordered_map<int32_t, VehicleUpdate> updates;
+                {
+                    absl::MutexLock lock(&shard.mu);
+                    updates.swap(shard.updates);
+                }
+                for ( auto &entry : updates )
+                    out->push_back(std::move(entry.second));
+            }
 
-            LOG_IF(INFO, command == Command::END) << "pushing END";
+            std::sort(out->begin(), out->end(), [](const VehicleUpdate &a, const VehicleUpdate &b) {
+                return a.vehicle_index() < b.vehicle_index();
+            });
+        }
 
-            tick.set_last_client_duration_ns(lastClientDurationNS);
+        size_t Size()
+        {
+            size_t size = 0;
+            for ( Shard &shard : shards_ )
+            {
+                absl::MutexLock lock(&shard.mu);
+                size += shard.updates.size();
+            }
+            return size;
+        }
 
-            grpc::ClientContext context;
-            Empty empty;
+        void Clear()
+        {
+            for ( Shard &shard : shards_ )
+            {
+                absl::MutexLock lock(&shard.mu);
+                shard.updates.clear();
+            }
+        }
+
+    private:
+        struct Shard
+        {
+            absl::Mutex mu;
+            std::unordered_map<int32_t, VehicleUpdate> updates ABSL_GUARDED_BY(mu);
+        };
+
+        static size_t ShardIndex(int32_t vehicleIndex)
+        {
+            return static_cast<size_t>(vehicleIndex) % VEHICLE_UPDATE_SHARDS;
+        }
+
+        Shard shards_[VEHICLE_UPDATE_SHARDS];
+};
+
+VehicleUpdateStore pendingUpdates_;
+
+// Anything the server can deliver a Tick to - either a reverse-dialed push server or a vehicle's tick stream
+class TickSink
+{
+    public:
+        virtual ~TickSink() = default;
+
+        // non-blocking: done fires on a gRPC-owned thread once the tick has been delivered (or failed)
+        virtual void PushTickAsync(int32_t tickId, Command command, int64_t lastClientDurationNS, std::function<void(Status)> done) = 0;
+
+        bool PushTick(int32_t tickId, Command command, int64_t lastClientDurationNS)
+        {
+            LOG_IF(INFO, command == Command::END) << "pushing END";
 
-            // The actual RPC.
             std::mutex mu;
             std::condition_variable cv;
             bool done = false;
             Status status;
-            stub_->async()->PushTick(&context, &tick, &empty,
+            PushTickAsync(tickId, command, lastClientDurationNS,
                             [&mu, &cv, &done, &status](Status s) {
-                            status = std::move(s);
                             std::lock_guard<std::mutex> lock(mu);
+                            status = std::move(s);
                             done = true;
                             cv.notify_one();
                             });
@@ -174,12 +243,282 @@ class PushClient
                 return false;
             }
         }
+};
+
+class PushClient : public TickSink
+{
+    public:
+        explicit PushClient( std::shared_ptr<grpc::Channel> channel, std::string connection ) :
+                            stub_(Ecloud::NewStub(channel)), connection_(connection) {}
+
+        void PushTickAsync(int32_t tickId, Command command, int64_t lastClientDurationNS, std::function<void(Status)> done) override
+        {
+            PushCall *call = new PushCall();
+            call->tick.set_tick_id(tickId);
+            call->tick.set_command(command);
+            call->tick.set_last_client_duration_ns(lastClientDurationNS);
+
+            stub_->async()->PushTick(&call->context, &call->tick, &call->empty,
+                            [call, done](Status s) {
+                            done(s);
+                            delete call; // context and messages must outlive the RPC
+                            });
+        }
 
     private:
+        struct PushCall
+        {
+            grpc::ClientContext context;
+            Tick tick;
+            Empty empty;
+        };
+
         std::unique_ptr<Ecloud::Stub> stub_;
         std::string connection_;
 };
 
+// Server side of SimulationStateStream: one long-lived stream per vehicle carrying Ticks down and VehicleUpdates up.
+// The first VehicleUpdate on the stream only identifies the vehicle; every later one is handled like Client_SendUpdate.
+// Reactors are intentionally never deleted - like PushClients they live for the lifetime of the scenario.
+class TickStreamReactor final : public grpc::ServerBidiReactor<VehicleUpdate, Tick>, public TickSink
+{
+    public:
+        using AttachFn = std::function<void(int32_t, TickStreamReactor *)>;
+        using UpdateFn = std::function<void(const VehicleUpdate &)>;
+
+        TickStreamReactor(AttachFn onAttach, UpdateFn onUpdate) :
+                            onAttach_(onAttach), onUpdate_(onUpdate), attached_(false),
+                            writing_(false), closing_(false), finished_(false)
+        {
+            StartRead(&update_);
+        }
+
+        void PushTickAsync(int32_t tickId, Command command, int64_t lastClientDurationNS, std::function<void(Status)> done) override
+        {
+            {
+                std::lock_guard<std::mutex> lock(mu_);
+                if ( !closing_ )
+                {
+                    PendingTick pending;
+                    pending.tick.set_tick_id(tickId);
+                    pending.tick.set_command(command);
+                    pending.tick.set_last_client_duration_ns(lastClientDurationNS);
+                    pending.done = done;
+                    queue_.push_back(std::move(pending));
+
+                    if ( !writing_ )
+                    {
+                        writing_ = true;
+                        StartWrite(&queue_.front().tick);
+                    }
+                    return;
+                }
+            }
+
+            done(Status(grpc::StatusCode::UNAVAILABLE, "tick stream closed"));
+        }
+
+        void OnWriteDone(bool ok) override
+        {
+            std::vector<std::function<void(Status)>> completed;
+            std::vector<std::function<void(Status)>> failed;
+            {
+                std::lock_guard<std::mutex> lock(mu_);
+                completed.push_back(std::move(queue_.front().done));
+                queue_.pop_front();
+
+                if ( !ok ) // stream is broken - nothing queued behind this write will ever go out
+                {
+                    for ( PendingTick &pending : queue_ )
+                        failed.push_back(std::move(pending.done));
+                    queue_.clear();
+                    closing_ = true;
+                }
+
+                if ( !queue_.empty() )
+                    StartWrite(&queue_.front().tick);
+                else
+                {
+                    writing_ = false;
+                    MaybeFinish();
+                }
+            }
+
+            for ( auto &done : completed )
+                done( ok ? Status::OK : Status(grpc::StatusCode::UNAVAILABLE, "tick stream write failed") );
+            for ( auto &done : failed )
+                done(Status(grpc::StatusCode::UNAVAILABLE, "tick stream write failed"));
+        }
+
+        void OnReadDone(bool ok) override
+        {
+            if ( !ok ) // vehicle closed its side of the stream
+            {
+                std::lock_guard<std::mutex> lock(mu_);
+                closing_ = true;
+                MaybeFinish();
+                return;
+            }
+
+            if ( !attached_ )
+            {
+                attached_ = true;
+                DLOG(INFO) << "SimulationStateStream - vehicle " << update_.vehicle_index() << " attached";
+                onAttach_(update_.vehicle_index(), this);
+            }
+            else
+            {
+                onUpdate_(update_);
+            }
+
+            StartRead(&update_);
+        }
+
+        void OnDone() override {}
+
+    private:
+        struct PendingTick
+        {
+            Tick tick;
+            std::function<void(Status)> done;
+        };
+
+        // mu_ must be held
+        void MaybeFinish()
+        {
+            if ( closing_ && !writing_ && !finished_ )
+            {
+                finished_ = true;
+                Finish(Status::OK);
+            }
+        }
+
+        AttachFn onAttach_;
+        UpdateFn onUpdate_;
+        VehicleUpdate update_;
+        bool attached_;
+
+        std::mutex mu_;
+        std::deque<PendingTick> queue_;
+        bool writing_;
+        bool closing_;
+        bool finished_;
+};
+
+// Streams a drained batch of VehicleUpdates back to the sim API, one message per write
+class VehicleUpdateWriter final : public grpc::ServerWriteReactor<VehicleUpdate>
+{
+    public:
+        explicit VehicleUpdateWriter(std::vector<VehicleUpdate> updates) :
+                            updates_(std::move(updates)), next_(0)
+        {
+            NextWrite();
+        }
+
+        void OnWriteDone(bool ok) override
+        {
+            if ( !ok )
+            {
+                LOG(ERROR) << "Server_StreamVehicleUpdates - write failed after " << next_ << " of " << updates_.size() << " updates";
+                Finish(Status(grpc::StatusCode::UNKNOWN, "vehicle update stream write failed"));
+                return;
+            }
+            NextWrite();
+        }
+
+        void OnDone() override { delete this; }
+
+    private:
+        void NextWrite()
+        {
+            if ( next_ < updates_.size() )
+                StartWrite(&updates_[next_++]);
+            else
+                Finish(Status::OK);
+        }
+
+        std::vector<VehicleUpdate> updates_;
+        size_t next_;
+};
+
+// Issues one async push per vehicle from the calling thread and gathers per-push latency.
+// Replaces spawning a detached std::thread per vehicle per tick.
+class TickFanout
+{
+    public:
+        TickFanout() : tickId_(TICK_ID_INVALID), pending_(0), failed_(0) {}
+
+        void Push(const std::vector<TickSink *> &clients, int32_t tickId, Command command, int64_t lastClientDurationNS)
+        {
+            {
+                std::lock_guard<std::mutex> lock(mu_);
+                LOG_IF(WARNING, pending_ > 0) << "fan-out for tick " << tickId_ << " still has " << pending_ << " pushes in flight";
+                tickId_ = tickId;
+                pending_ = clients.size();
+                failed_ = 0;
+                latenciesNS_.clear();
+                latenciesNS_.reserve(clients.size());
+                start_ = std::chrono::steady_clock::now();
+            }
+
+            for ( TickSink *client : clients )
+            {
+                if ( client == nullptr ) // registered for a tick stream that was never opened
+                {
+                    OnPushDone(tickId, Status(grpc::StatusCode::UNAVAILABLE, "vehicle has no tick stream attached"));
+                    continue;
+                }
+
+                client->PushTickAsync(tickId, command, lastClientDurationNS,
+                                      [this, tickId](Status s) { OnPushDone(tickId, s); });
+            }
+        }
+
+    private:
+        void OnPushDone(int32_t tickId, const Status &status)
+        {
+            const auto now = std::chrono::steady_clock::now();
+            std::lock_guard<std::mutex> lock(mu_);
+            if ( tickId != tickId_ ) // late completion from a previous fan-out
+                return;
+
+            if ( !status.ok() )
+            {
+                failed_++;
+                LOG(ERROR) << "push for tick " << tickId << " failed - " << status.error_code() << ": " << status.error_message();
+            }
+
+            latenciesNS_.push_back(std::chrono::duration_cast<std::chrono::nanoseconds>(now - start_).count());
+            pending_--;
+            if ( pending_ == 0 )
+                LogPercentiles();
+        }
+
+        // mu_ must be held
+        void LogPercentiles()
+        {
+            if ( latenciesNS_.empty() )
+                return;
+
+            std::sort(latenciesNS_.begin(), latenciesNS_.end());
+            const auto percentile = [this](double p) -> double {
+                const size_t idx = std::min( latenciesNS_.size() - 1, static_cast<size_t>( p * latenciesNS_.size() ) );
+                return latenciesNS_[idx] / 1e6;
+            };
+
+            LOG(INFO) << absl::StrFormat("tick %d fan-out: %d pushes | %d failed | p50 %.3fms | p95 %.3fms | p99 %.3fms | max %.3fms",
+                                         tickId_, latenciesNS_.size(), failed_,
+                                         percentile(0.50), percentile(0.95), percentile(0.99), latenciesNS_.back() / 1e6);
+        }
+
+        std::mutex mu_;
+        int32_t tickId_;
+        size_t pending_;
+        size_t failed_;
+        std::chrono::steady_clock::time_point start_;
+        std::vector<int64_t> latenciesNS_;
+};
+
 // Logic and data behind the server's behavior.
 class EcloudServiceImpl final : public Ecloud::CallbackService {
 public:
@@ -204,7 +543,8 @@ public:
             simAPIClient_ = new PushClient(grpc::CreateChannel(connection, grpc::InsecureChannelCredentials()), connection);
 
             vehicleClients_.clear();
-            pendingReplies_.clear();
+            tickStreamSlots_.clear();
+            pendingUpdates_.Clear();
 
             init_ = true;
         }
@@ -214,89 +554,62 @@ public:
                                const Empty* empty,
                                EcloudResponse* reply) override {
 
-        DLOG(INFO) << "Server_GetVehicleUpdates - deserializing updates.";
-
-        const int16_t replies = pendingReplies_.size();
-        for ( int i = 0; i < replies; i++ )
+        std::vector<VehicleUpdate> updates;
+        pendingUpdates_.Drain(&updates);
+        std::string *packedStates = reply->mutable_packed_states();
+        for ( VehicleUpdate &update : updates )
         {
-            VehicleUpdate *update = reply->add_vehicle_update();
-            const std::string msg = pendingReplies_.back();
-            pendingReplies_.pop_back();
-            update->ParseFromString(msg);
-            LOG(INFO) << "update: vehicle_index - " << update->vehicle_index();
-
-            if ( i == VEHICLE_UPDATE_BATCH_SIZE ) // keep from exhausting resources
-                break;
+            if ( !update.packed_state().empty() )
+            {
+                packedStates->append(update.packed_state());
+                update.clear_packed_state();
+                if ( update.vehicle_state() == VehicleState::TICK_OK && update.debug_chunk_id() == 0 ) // nothing left to send beyond the packed record
+                    continue;
+            }
+            reply->add_vehicle_update()->Swap(&update);
         }
 
-        DLOG(INFO) << "Server_GetVehicleUpdates - updates deserialized.";
+        DLOG(INFO) << "Server_GetVehicleUpdates - drained " << updates.size() << " updates.";
+
+        numRepliedVehicles_ = 0;
 
-        if ( pendingReplies_.size() == 0 )
-            numRepliedVehicles_ = 0;
-    
         ServerUnaryReactor* reactor = context->DefaultReactor();
         reactor->Finish(Status::OK);
         return reactor;
     }
 
-    ServerUnaryReactor* Client_SendUpdate(CallbackServerContext* context,
-                               const VehicleUpdate* request,
-                               Empty* empty) override {
+    // same drain as Server_GetVehicleUpdates, but one message per vehicle so large debug payloads
+    // don't have to fit in a single response
+    grpc::ServerWriteReactor<VehicleUpdate>* Server_StreamVehicleUpdates(CallbackServerContext* context,
+                               const Empty* empty) override {
 
-        if ( isEdge_ || request->vehicle_index() == SPECTATOR_INDEX || request->vehicle_state() == VehicleState::TICK_DONE || request->vehicle_state() == VehicleState::DEBUG_INFO_UPDATE )
-        {
-            std::string msg;
-            request->SerializeToString(&msg);
-            if ( isEdge_ || request->vehicle_state() == VehicleState::TICK_DONE || request->vehicle_state() == VehicleState::DEBUG_INFO_UPDATE )
-            {
-                // TODO: hashmap
-                mu_.Lock();
-                pendingReplies_.push_back(msg);
-                mu_.Unlock();
-            }
-            else
-            {
-                assert( request->vehicle_index() == SPECTATOR_INDEX );
-                pendingReplies_.push_back(msg);
-            }
-        }
+        std::vector<VehicleUpdate> updates;
+        pendingUpdates_.Drain(&updates);
 
-        repliedCars_[request->vehicle_index()] = true;
+        DLOG(INFO) << "Server_StreamVehicleUpdates - streaming " << updates.size() << " updates.";
 
-        DLOG(INFO) << "Client_SendUpdate - received reply from vehicle " << request->vehicle_index() << " for tick id:" << request->tick_id();
+        numRepliedVehicles_ = 0;
 
-        if ( request->vehicle_state() == VehicleState::TICK_DONE )
-        {
-            numCompletedVehicles_++;
-            DLOG(INFO) << "Client_SendUpdate - TICK_DONE - tick id: " << tickId_ << " vehicle id: " << request->vehicle_index();
-        }
-        else if ( request->vehicle_state() == VehicleState::TICK_OK )
-        {
-            numRepliedVehicles_++;
-        }
-        else if ( request->vehicle_state() == VehicleState::DEBUG_INFO_UPDATE )
-        {
-            numCompletedVehicles_++;
-            DLOG(INFO) << "Client_SendUpdate - DEBUG_INFO_UPDATE - tick id: " << tickId_ << " vehicle id: " << request->vehicle_index();
-        }
+        return new VehicleUpdateWriter(std::move(updates));
+    }
 
-        // BEGIN PUSH
-        const int16_t replies_ = numRepliedVehicles_.load();
-        const int16_t completions_ = numCompletedVehicles_.load();
-        const bool complete_ = ( replies_ + completions_ ) == numCars_;
+    ServerUnaryReactor* Client_SendUpdate(CallbackServerContext* context,
+                               const VehicleUpdate* request,
+                               Empty* empty) override {
 
-        LOG_IF(INFO, complete_ ) << "tick " << request->tick_id() << " COMPLETE";
-        if ( complete_ )
-        {
-            const int64_t lastClientDurationNS = request->duration_ns();
-            simAPIClient_->PushTick( request->tick_id(), command_, lastClientDurationNS );
-        }
+        HandleVehicleUpdate(request);
 
         ServerUnaryReactor* reactor = context->DefaultReactor();
         reactor->Finish(Status::OK);
         return reactor;
     }
 
+    grpc::ServerBidiReactor<VehicleUpdate, Tick>* SimulationStateStream(CallbackServerContext* context) override {
+        return new TickStreamReactor(
+                    [this](int32_t vIdx, TickStreamReactor *stream) { AttachTickStream(vIdx, stream); },
+                    [this](const VehicleUpdate &update) { HandleVehicleUpdate(&update); });
+    }
+
     // server can push WP *before* ticking world and client can fetch them before it ticks
     ServerUnaryReactor* Client_GetWaypoints(CallbackServerContext* context,
                                const WaypointRequest* request,
@@ -341,22 +654,38 @@ public:
         {
             DLOG(INFO) << "got a registration update";
 
+            // a worker hosting several vehicles registers them all at once and gets consecutive indices;
+            // it has a single push server / tick stream, so it gets a single entry in vehicleClients_
+            const int16_t vCount = std::max<int32_t>( request->vehicle_count(), 1 );
+
             mu_.Lock();
             const int16_t vIdx = numRegisteredVehicles_.load();
+            assert( vIdx + vCount <= MAX_CARS );
             reply->set_vehicle_index(vIdx);
-            const std::string connection = absl::StrFormat("%s:%d", request->vehicle_ip(), request->vehicle_port());
-            PushClient *vehicleClient = new PushClient(grpc::CreateChannel(connection, grpc::InsecureChannelCredentials()), connection);
-            vehicleClients_.push_back(std::move(vehicleClient));
-            numRegisteredVehicles_++;
+            for ( int16_t i = vIdx; i < vIdx + vCount; i++ )
+                reply->add_vehicle_indices(i);
+            if ( request->use_tick_stream() )
+            {
+                tickStreamSlots_[vIdx] = vehicleClients_.size();
+                vehicleClients_.push_back(nullptr); // filled in by AttachTickStream once the worker opens its stream
+            }
+            else
+            {
+                const std::string connection = absl::StrFormat("%s:%d", request->vehicle_ip(), request->vehicle_port());
+                PushClient *vehicleClient = new PushClient(grpc::CreateChannel(connection, grpc::InsecureChannelCredentials()), connection);
+                vehicleClients_.push_back(std::move(vehicleClient));
+            }
+            numRegisteredVehicles_ += vCount;
             mu_.Unlock();
 
             reply->set_test_scenario(configYaml_);
             reply->set_application(application_);
             reply->set_version(version_);
 
-            DLOG(INFO) << "RegisterVehicle - REGISTERING - container " << request->container_name() << " got vehicle id: " << reply->vehicle_index();
+            DLOG(INFO) << "RegisterVehicle - REGISTERING - container " << request->container_name() << " got vehicle ids: " << vIdx << "-" << vIdx + vCount - 1;
 
-            carNames_[reply->vehicle_index()] = request->container_name();
+            for ( int16_t i = vIdx; i < vIdx + vCount; i++ )
+                carNames_[i] = request->container_name();
         }
         else if ( request->vehicle_state() == VehicleState::CARLA_UPDATE )
         {
@@ -365,13 +694,11 @@ public:
 
             DLOG(INFO) << "RegisterVehicle - CARLA_UPDATE - vehicle_index: " << vIdx << " | actor_id: " << request->actor_id() << " | vid: " << request->vid();
 
-            // TODO: Hashmap
-            mu_.Lock();
-            std::string msg;
-            request->SerializeToString(&msg);
-            pendingReplies_.push_back(msg);
+            VehicleUpdate update;
+            update.set_vehicle_index(vIdx);
+            update.set_vehicle_state(VehicleState::CARLA_UPDATE);
+            pendingUpdates_.Put(update);
             numRepliedVehicles_++;
-            mu_.Unlock();
         }
         else
         {
@@ -386,7 +713,7 @@ public:
         LOG_IF(INFO, complete_ ) << "REGISTRATION COMPLETE";
         if ( complete_ )
         {
-            assert( vehState_ == VehicleState::REGISTERING && replies_ == pendingReplies_.size() );
+            assert( vehState_ == VehicleState::REGISTERING && replies_ == pendingUpdates_.Size() );
             simAPIClient_->PushTick( TICK_ID_INVALID, command_, INVALID_TIME);
         }
 
@@ -411,12 +738,17 @@ public:
             now.time_since_epoch()).count();
 
         const int32_t tickId = request->tick_id();
-        for ( int i = 0; i < vehicleClients_.size(); i++ )
-        {
-            PushClient *v = vehicleClients_[i];
-            std::thread t( &PushClient::PushTick, v, tickId, command_, INVALID_TIME );
-            t.detach();
-        }
+
+        // a worker's stream hello can still be in flight when its registration completes, and a tick
+        // pushed before its stream attached would never reach it - so wait for every stream first.
+        // AttachTickStream fills slots under mu_, so the fan-out pushes to a copy taken under it
+        const bool attached = mu_.LockWhenWithTimeout(absl::Condition(this, &EcloudServiceImpl::TickStreamsAttached),
+                                                      absl::Seconds(TICK_STREAM_ATTACH_TIMEOUT_S));
+        LOG_IF(ERROR, !attached) << "Server_DoTick - tick " << tickId << " fanned out before every tick stream attached";
+        const std::vector< TickSink * > vehicleClients = vehicleClients_;
+        mu_.Unlock();
+
+        tickFanout_.Push( vehicleClients, tickId, command_, INVALID_TIME );
 
         ServerUnaryReactor* reactor = context->DefaultReactor();
         reactor->Finish(Status::OK);
@@ -470,8 +802,14 @@ public:
         command_ = Command::END;
 
         LOG(INFO) << "pushing END";
-        for ( int i = 0; i < vehicleClients_.size(); i++ )
-            vehicleClients_[i]->PushTick(TICK_ID_INVALID, Command::END, INVALID_TIME); // don't thread --> block
+        mu_.Lock();
+        const std::vector< TickSink * > vehicleClients = vehicleClients_;
+        mu_.Unlock();
+        for ( int i = 0; i < vehicleClients.size(); i++ )
+        {
+            if ( vehicleClients[i] != nullptr )
+                vehicleClients[i]->PushTick(TICK_ID_INVALID, Command::END, INVALID_TIME); // don't thread --> block
+        }
 
         ServerUnaryReactor* reactor = context->DefaultReactor();
         reactor->Finish(Status::OK);
@@ -480,8 +818,68 @@ public:
 
     private:
 
-        std::vector< PushClient * > vehicleClients_;
+        // shared by the unary Client_SendUpdate and the SimulationStateStream paths
+        void HandleVehicleUpdate(const VehicleUpdate* request)
+        {
+            if ( isEdge_ || request->vehicle_index() == SPECTATOR_INDEX || request->vehicle_state() == VehicleState::TICK_DONE || request->vehicle_state() == VehicleState::DEBUG_INFO_UPDATE || request->debug_chunk_id() > 0 )
+            {
+                pendingUpdates_.Put(*request);
+            }
+
+            repliedCars_[request->vehicle_index()] = true;
+
+            DLOG(INFO) << "Client_SendUpdate - received reply from vehicle " << request->vehicle_index() << " for tick id:" << request->tick_id();
+
+            if ( request->vehicle_state() == VehicleState::TICK_DONE )
+            {
+                numCompletedVehicles_++;
+                DLOG(INFO) << "Client_SendUpdate - TICK_DONE - tick id: " << tickId_ << " vehicle id: " << request->vehicle_index();
+            }
+            else if ( request->vehicle_state() == VehicleState::TICK_OK )
+            {
+                numRepliedVehicles_++;
+            }
+            else if ( request->vehicle_state() == VehicleState::DEBUG_INFO_UPDATE )
+            {
+                numCompletedVehicles_++;
+                DLOG(INFO) << "Client_SendUpdate - DEBUG_INFO_UPDATE - tick id: " << tickId_ << " vehicle id: " << request->vehicle_index();
+            }
+
+            // BEGIN PUSH
+            const int16_t replies_ = numRepliedVehicles_.load();
+            const int16_t completions_ = numCompletedVehicles_.load();
+            const bool complete_ = ( replies_ + completions_ ) == numCars_;
+
+            LOG_IF(INFO, complete_ ) << "tick " << request->tick_id() << " COMPLETE";
+            if ( complete_ )
+            {
+                const int64_t lastClientDurationNS = request->duration_ns();
+                simAPIClient_->PushTick( request->tick_id(), command_, lastClientDurationNS );
+            }
+        }
+
+        // vIdx is the first vehicle index of the worker that opened the stream
+        void AttachTickStream(int32_t vIdx, TickStreamReactor *stream)
+        {
+            mu_.Lock();
+            const auto slot = tickStreamSlots_.find(vIdx);
+            if ( slot != tickStreamSlots_.end() && vehicleClients_[slot->second] == nullptr )
+                vehicleClients_[slot->second] = stream;
+            else
+                LOG(ERROR) << "SimulationStateStream - vehicle " << vIdx << " did not register for a tick stream";
+            mu_.Unlock();
+        }
+
+        // mu_ must be held
+        bool TickStreamsAttached() const
+        {
+            return std::find( vehicleClients_.begin(), vehicleClients_.end(), nullptr ) == vehicleClients_.end();
+        }
+
+        std::vector< TickSink * > vehicleClients_; // one per registered worker, in registration order
+        std::unordered_map< int32_t, size_t > tickStreamSlots_; // first vehicle index -> vehicleClients_ slot
         PushClient * simAPIClient_;
+        TickFanout tickFanout_;
 };
 
 void RunServer(uint16_t port) {
@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+"""
+Fixed-layout binary encoding of per-vehicle kinematic state.
+
+Each record is a little-endian int32 vehicle index followed by nine float32
+values: x, y, z, roll, pitch, yaw, vx, vy, vz. Records from all vehicles are
+concatenated by the eCloud server into EcloudResponse.packed_states so the
+scenario manager can decode a whole tick with a single np.frombuffer call.
+"""
+# License: TDG-Attribution-NonCommercial-NoDistrib
+
+import struct
+
+import numpy as np
+
+PACKED_STATE_DTYPE = np.dtype([('vehicle_index', '<i4'),
+                               ('x', '<f4'),
+                               ('y', '<f4'),
+                               ('z', '<f4'),
+                               ('roll', '<f4'),
+                               ('pitch', '<f4'),
+                               ('yaw', '<f4'),
+                               ('vx', '<f4'),
+                               ('vy', '<f4'),
+                               ('vz', '<f4')])
+
+_PACKED_STATE_STRUCT = struct.Struct('<i9f')
+assert _PACKED_STATE_STRUCT.size == PACKED_STATE_DTYPE.itemsize
+
+
+def pack_vehicle_state(vehicle_index, transform, velocity):
+    """
+    Encode one vehicle's transform and velocity as a packed state record.
+
+    Parameters
+    ----------
+    vehicle_index : int
+        The eCloud vehicle index.
+
+    transform : carla.Transform
+        Current vehicle transform.
+
+    velocity : carla.Vector3D
+        Current vehicle velocity.
+
+    Returns
+    -------
+    record : bytes
+        PACKED_STATE_DTYPE.itemsize bytes.
+    """
+    return _PACKED_STATE_STRUCT.pack(vehicle_index,
+                                     transform.location.x,
+                                     transform.location.y,
+                                     transform.location.z,
+                                     transform.rotation.roll,
+                                     transform.rotation.pitch,
+                                     transform.rotation.yaw,
+                                     velocity.x,
+                                     velocity.y,
+                                     velocity.z)
+
+
+def unpack_vehicle_states(packed_states):
+    """
+    Decode concatenated packed state records.
+
+    Parameters
+    ----------
+    packed_states : bytes
+        Zero or more records produced by pack_vehicle_state.
+
+    Returns
+    -------
+    states : np.ndarray
+        Structured array with PACKED_STATE_DTYPE, one row per vehicle. The
+        array is a read-only view over packed_states.
+    """
+    return np.frombuffer(packed_states, dtype=PACKED_STATE_DTYPE)
@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+"""
+Headless world backend: a kinematic stand-in for the CARLA server.
+
+Call install() before anything imports carla, e.g. with the --headless
+option of opencda.py. Maps are loaded from their .xodr file, searched in
+the directories given to install(), $OPENCDA_HEADLESS_MAPS, opencda/assets
+and $CARLA_ROOT/CarlaUE4/Content/Carla/Maps/OpenDrive, or else from their
+SUMO network <map name>.net.xml, as shipped for Town06.
+
+The world lives in the scenario process, so the vehicles of distributed
+scenarios are run there too, see sequential_config().
+"""
+# License: TDG-Attribution-NonCommercial-NoDistrib
+
+import os
+import sys
+import tempfile
+
+
+def install(map_dirs=None):
+    """
+    Register the headless backend as the carla module.
+
+    Parameters
+    ----------
+    map_dirs : list
+        Extra directories searched for the .xodr file of a map.
+
+    Returns
+    -------
+    carla : module
+        The headless carla module.
+    """
+    if 'carla' in sys.modules and \
+            not getattr(sys.modules['carla'], '__headless__', False):
+        raise RuntimeError('carla was imported before the headless backend '
+                           'was installed')
+
+    from opencda.headless import carla, command
+
+    carla.__headless__ = True
+    if map_dirs:
+        carla.MAP_SEARCH_PATH.extend(map_dirs)
+    sys.modules['carla'] = carla
+    sys.modules['carla.command'] = command
+    return carla
+
+
+def sequential_config(config_yaml):
+    """
+    Path of a scenario yaml that runs all the vehicles in the scenario
+    process. The vehiclesim clients of a distributed scenario and the local
+    workers of a parallel one connect to their own world, which cannot be
+    the headless world of the scenario process.
+
+    Parameters
+    ----------
+    config_yaml : str
+        Path of the scenario yaml.
+
+    Returns
+    -------
+    config_yaml : str
+        config_yaml if it is sequential already, otherwise a temporary copy
+        with distributed and the parallel workers turned off.
+    """
+    from opencda.scenario_testing.utils.yaml_utils import load_yaml, \
+        save_yaml
+
+    params = load_yaml(config_yaml)
+    ecloud = params.get('ecloud') or {}
+    # scenarios with an ecloud section are distributed unless told otherwise
+    if not params.get('distributed', 'ecloud' in params) and \
+            not ecloud.get('parallel_workers'):
+        return config_yaml
+
+    params.pop('current_time', None)
+    params['distributed'] = False
+    if ecloud:
+        ecloud['parallel_workers'] = 0
+    fd, path = tempfile.mkstemp(prefix='headless_', suffix='.yaml')
+    os.close(fd)
+    save_yaml(params, path)
+    return path
@@ -0,0 +1,1685 @@
+# -*- coding: utf-8 -*-
+"""
+CARLA compatible API of the headless backend.
+
+Implements the part of the carla Python API that OpenCDA uses on top of an
+OpenDRIVE road network and a kinematic vehicle model, so scenarios run
+without a CARLA server. opencda.headless.install() registers this module
+as carla. GNSS and IMU sensors report measurements; cameras, LiDARs and the
+other sensors can be spawned but never call their listeners.
+"""
+# License: TDG-Attribution-NonCommercial-NoDistrib
+
+import enum
+import fnmatch
+import glob
+import math
+import os
+import time
+
+import numpy as np
+from scipy.spatial import cKDTree
+
+from opencda.headless import command
+from opencda.headless.kinematics import BicycleModel
+from opencda.headless.opendrive import OpenDriveMap
+from opencda.headless.sumo_net import SumoNetwork
+from opencda.headless.traffic_manager import TrafficManager, speed_limit
+
+# directories searched for <map name>.xodr (or .net.xml) by load_world, in
+# addition to $OPENCDA_HEADLESS_MAPS and the maps shipped in opencda/assets
+MAP_SEARCH_PATH = []
+# map files by preference; the SUMO network stands in for a missing .xodr
+_MAP_SUFFIXES = ('.xodr', '.net.xml')
+
+# distance (m) between the lane samples used to project locations
+_SAMPLE_STEP = 1.0
+# distance (m) between the spawn points generated along every lane
+_SPAWN_POINT_STEP = 30.0
+# front wheel angle (rad) at full steer
+_MAX_STEER = math.radians(70.0)
+# extent (m) of the vehicles, the Lincoln MKZ is used for unknown models
+_DEFAULT_EXTENT = (2.45, 1.06, 0.76)
+_VEHICLE_EXTENTS = {
+    'vehicle.audi.a2': (1.86, 0.9, 0.77),
+    'vehicle.audi.tt': (2.09, 1.0, 0.69),
+    'vehicle.mini.cooperst': (1.91, 0.97, 0.74),
+    'vehicle.mini.cooper_s': (1.91, 0.97, 0.74),
+    'vehicle.nissan.micra': (1.82, 0.94, 0.77),
+    'vehicle.nissan.patrol': (2.31, 0.96, 0.93),
+    'vehicle.jeep.wrangler_rubicon': (1.93, 0.95, 0.94),
+    'vehicle.tesla.model3': (2.40, 1.08, 0.74),
+}
+_VEHICLE_BLUEPRINTS = sorted(set(list(_VEHICLE_EXTENTS) + [
+    'vehicle.audi.etron', 'vehicle.bmw.grandtourer',
+    'vehicle.chevrolet.impala', 'vehicle.citroen.c3',
+    'vehicle.dodge.charger_2020', 'vehicle.dodge.charger_police',
+    'vehicle.dodge.charger_police_2020', 'vehicle.dodge_charger.police',
+    'vehicle.ford.mustang', 'vehicle.lincoln.mkz2017',
+    'vehicle.lincoln.mkz_2017', 'vehicle.lincoln.mkz_2020',
+    'vehicle.mercedes-benz.coupe', 'vehicle.mercedes.coupe',
+    'vehicle.mercedes.coupe_2020', 'vehicle.mustang.mustang',
+    'vehicle.seat.leon', 'vehicle.toyota.prius']))
+_SENSOR_ATTRIBUTES = {
+    'sensor.other.gnss': {
+        'noise_alt_bias': '0.0', 'noise_alt_stddev': '0.0',
+        'noise_lat_bias': '0.0', 'noise_lat_stddev': '0.0',
+        'noise_lon_bias': '0.0', 'noise_lon_stddev': '0.0',
+        'noise_seed': '0', 'sensor_tick': '0.0'},
+    'sensor.other.imu': {'noise_seed': '0', 'sensor_tick': '0.0'},
+    'sensor.other.collision': {},
+    'sensor.other.lane_invasion': {},
+    'sensor.other.obstacle': {'distance': '5', 'sensor_tick': '0.0'},
+    'sensor.other.radar': {'range': '100', 'sensor_tick': '0.0'},
+    'sensor.camera.rgb': {'image_size_x': '800', 'image_size_y': '600',
+                          'fov': '90.0', 'sensor_tick': '0.0'},
+    'sensor.camera.depth': {'image_size_x': '800', 'image_size_y': '600',
+                            'fov': '90.0', 'sensor_tick': '0.0'},
+    'sensor.camera.semantic_segmentation': {
+        'image_size_x': '800', 'image_size_y': '600', 'fov': '90.0',
+        'sensor_tick': '0.0'},
+    'sensor.lidar.ray_cast': {
+        'channels': '32', 'range': '10.0', 'points_per_second': '56000',
+        'rotation_frequency': '10.0', 'upper_fov': '10.0',
+        'lower_fov': '-30.0', 'sensor_tick': '0.0'},
+    'sensor.lidar.ray_cast_semantic': {
+        'channels': '32', 'range': '10.0', 'points_per_second': '56000',
+        'rotation_frequency': '10.0', 'upper_fov': '10.0',
+        'lower_fov': '-30.0', 'sensor_tick': '0.0'},
+}
+_VEHICLE_COLORS = ['255,255,255', '0,0,0', '120,120,120', '200,20,20',
+                   '20,20,200', '20,120,20', '220,200,40']
+_EARTH_RADIUS_EQUA = 6378137.0
+_COLLISION_ERROR = 'Spawn failed because of collision at spawn position'
+
+
+# ---------------------------------------------------------------------------
+# value types
+# ---------------------------------------------------------------------------
+
+class Vector3D(object):
+    def __init__(self, x=0.0, y=0.0, z=0.0):
+        self.x, self.y, self.z = float(x), float(y), float(z)
+
+    def __add__(self, other):
+        return type(self)(self.x + other.x, self.y + other.y,
+                          self.z + other.z)
+
+    def __sub__(self, other):
+        return type(self)(self.x - other.x, self.y - other.y,
+                          self.z - other.z)
+
+    def __mul__(self, k):
+        return type(self)(self.x * k, self.y * k, self.z * k)
+
+    __rmul__ = __mul__
+
+    def __truediv__(self, k):
+        return type(self)(self.x / k, self.y / k, self.z / k)
+
+    def __eq__(self, other):
+        return isinstance(other, Vector3D) and \
+            (self.x, self.y, self.z) == (other.x, other.y, other.z)
+
+    def __ne__(self, other):
+        return not self == other
+
+    __hash__ = object.__hash__
+
+    def __repr__(self):
+        return '%s(x=%f, y=%f, z=%f)' % (type(self).__name__,
+                                         self.x, self.y, self.z)
+
+    def length(self):
+        return math.sqrt(self.x ** 2 + self.y ** 2 + self.z ** 2)
+
+    def squared_length(self):
+        return self.x ** 2 + self.y ** 2 + self.z ** 2
+
+    def distance(self, other):
+        return math.sqrt((self.x - other.x) ** 2 + (self.y - other.y) ** 2 +
+                         (self.z - other.z) ** 2)
+
+    def distance_2d(self, other):
+        return math.hypot(self.x - other.x, self.y - other.y)
+
+    def dot(self, other):
+        return self.x * other.x + self.y * other.y + self.z * other.z
+
+    def cross(self, other):
+        return Vector3D(self.y * other.z - self.z * other.y,
+                        self.z * other.x - self.x * other.z,
+                        self.x * other.y - self.y * other.x)
+
+    def make_unit_vector(self):
+        length = self.length()
+        return type(self)(self.x / length, self.y / length, self.z / length)
+
+
+class Location(Vector3D):
+    pass
+
+
+class Rotation(object):
+    def __init__(self, pitch=0.0, yaw=0.0, roll=0.0):
+        self.pitch, self.yaw, self.roll = float(pitch), float(yaw), float(roll)
+
+    def __eq__(self, other):
+        return isinstance(other, Rotation) and \
+            (self.pitch, self.yaw, self.roll) == \
+            (other.pitch, other.yaw, other.roll)
+
+    def __ne__(self, other):
+        return not self == other
+
+    __hash__ = object.__hash__
+
+    def __repr__(self):
+        return 'Rotation(pitch=%f, yaw=%f, roll=%f)' % (self.pitch, self.yaw,
+                                                        self.roll)
+
+    def _matrix(self):
+        """
+        Rotation matrix whose columns are the forward, right and up vectors.
+        """
+        cy, sy = math.cos(math.radians(self.yaw)), \
+            math.sin(math.radians(self.yaw))
+        cp, sp = math.cos(math.radians(self.pitch)), \
+            math.sin(math.radians(self.pitch))
+        cr, sr = math.cos(math.radians(self.roll)), \
+            math.sin(math.radians(self.roll))
+        return np.array([
+            [cp * cy, cy * sp * sr - sy * cr, -cy * sp * cr - sy * sr],
+            [cp * sy, sy * sp * sr + cy * cr, -sy * sp * cr + cy * sr],
+            [sp, -cp * sr, cp * cr]])
+
+    def get_forward_vector(self):
+        return Vector3D(*self._matrix()[:, 0])
+
+    def get_right_vector(self):
+        return Vector3D(*self._matrix()[:, 1])
+
+    def get_up_vector(self):
+        return Vector3D(*self._matrix()[:, 2])
+
+
+class Transform(object):
+    def __init__(self, location=None, rotation=None):
+        self.location = location if location is not None else Location()
+        self.rotation = rotation if rotation is not None else Rotation()
+
+    def __eq__(self, other):
+        return isinstance(other, Transform) and \
+            self.location == other.location and \
+            self.rotation == other.rotation
+
+    def __ne__(self, other):
+        return not self == other
+
+    __hash__ = object.__hash__
+
+    def __repr__(self):
+        return 'Transform(%r, %r)' % (self.location, self.rotation)
+
+    def transform(self, point):
+        """
+        Move a point from the local space of the transform to the world.
+        """
+        x, y, z = self.rotation._matrix().dot([point.x, point.y, point.z])
+        return Location(x + self.location.x, y + self.location.y,
+                        z + self.location.z)
+
+    def get_matrix(self):
+        matrix = np.identity(4)
+        matrix[:3, :3] = self.rotation._matrix()
+        matrix[:3, 3] = [self.location.x, self.location.y, self.location.z]
+        return matrix.tolist()
+
+    def get_inverse_matrix(self):
+        return np.linalg.inv(np.array(self.get_matrix())).tolist()
+
+    def get_forward_vector(self):
+        return self.rotation.get_forward_vector()
+
+    def get_right_vector(self):
+        return self.rotation.get_right_vector()
+
+    def get_up_vector(self):
+        return self.rotation.get_up_vector()
+
+
+def _copy_transform(transform):
+    location, rotation = transform.location, transform.rotation
+    return Transform(Location(location.x, location.y, location.z),
+                     Rotation(rotation.pitch, rotation.yaw, rotation.roll))
+
+
+class BoundingBox(object):
+    def __init__(self, location=None, extent=None):
+        self.location = location if location is not None else Location()
+        self.extent = extent if extent is not None else Vector3D()
+        self.rotation = Rotation()
+
+    def __repr__(self):
+        return 'BoundingBox(%r, Extent(x=%f, y=%f, z=%f))' % (
+            self.location, self.extent.x, self.extent.y, self.extent.z)
+
+
+class GeoLocation(object):
+    def __init__(self, latitude=0.0, longitude=0.0, altitude=0.0):
+        self.latitude = latitude
+        self.longitude = longitude
+        self.altitude = altitude
+
+    def __repr__(self):
+        return 'GeoLocation(latitude=%f, longitude=%f, altitude=%f)' % (
+            self.latitude, self.longitude, self.altitude)
+
+
+class Color(object):
+    def __init__(self, r=0, g=0, b=0, a=255):
+        self.r, self.g, self.b, self.a = r, g, b, a
+
+
+class VehicleControl(object):
+    def __init__(self, throttle=0.0, steer=0.0, brake=0.0, hand_brake=False,
+                 reverse=False, manual_gear_shift=False, gear=0):
+        self.throttle = throttle
+        self.steer = steer
+        self.brake = brake
+        self.hand_brake = hand_brake
+        self.reverse = reverse
+        self.manual_gear_shift = manual_gear_shift
+        self.gear = gear
+
+    def __repr__(self):
+        return 'VehicleControl(throttle=%f, steer=%f, brake=%f, ' \
+            'hand_brake=%s, reverse=%s)' % (self.throttle, self.steer,
+                                            self.brake, self.hand_brake,
+                                            self.reverse)
+
+
+class _Parameters(object):
+    """
+    Plain keyword parameter holder.
+    """
+    _DEFAULTS = {}
+
+    def __init__(self, **kwargs):
+        for name, value in self._DEFAULTS.items():
+            setattr(self, name, value)
+        for name, value in kwargs.items():
+            setattr(self, name, value)
+
+
+class WeatherParameters(_Parameters):
+    _DEFAULTS = {'cloudiness': 0.0, 'precipitation': 0.0,
+                 'precipitation_deposits': 0.0, 'wind_intensity': 0.0,
+                 'sun_azimuth_angle': 0.0, 'sun_altitude_angle': 0.0,
+                 'fog_density': 0.0, 'fog_distance': 0.0,
+                 'fog_falloff': 0.0, 'wetness': 0.0}
+
+
+WeatherParameters.ClearNoon = WeatherParameters(sun_altitude_angle=45.0)
+
+
+class OpendriveGenerationParameters(_Parameters):
+    _DEFAULTS = {'vertex_distance': 2.0, 'max_road_length': 50.0,
+                 'wall_height': 1.0, 'additional_width': 0.6,
+                 'smooth_junctions': True, 'enable_mesh_visibility': True}
+
+
+class WorldSettings(_Parameters):
+    _DEFAULTS = {'synchronous_mode': False, 'no_rendering_mode': False,
+                 'fixed_delta_seconds': None, 'substepping': True,
+                 'max_substep_delta_time': 0.01, 'max_substeps': 10}
+
+
+# ---------------------------------------------------------------------------
+# enums
+# ---------------------------------------------------------------------------
+
+class _NamedEnum(enum.IntEnum):
+    def __str__(self):
+        return self.name
+
+
+class AttachmentType(_NamedEnum):
+    Rigid = 0
+    SpringArm = 1
+
+
+class TrafficLightState(_NamedEnum):
+    Red = 0
+    Yellow = 1
+    Green = 2
+    Off = 3
+    Unknown = 4
+
+
+class LaneMarkingType(_NamedEnum):
+    NONE = 0
+    Other = 1
+    Broken = 2
+    Solid = 3
+    SolidSolid = 4
+    SolidBroken = 5
+    BrokenSolid = 6
+    BrokenBroken = 7
+    BottsDots = 8
+    Grass = 9
+    Curb = 10
+
+
+class LaneChange(enum.IntFlag):
+    NONE = 0
+    Right = 1
+    Left = 2
+    Both = 3
+
+    def __str__(self):
+        return self.name
+
+
+class LaneType(enum.IntFlag):
+    NONE = 1
+    Driving = 2
+    Stop = 4
+    Shoulder = 8
+    Biking = 16
+    Sidewalk = 32
+    Border = 64
+    Restricted = 128
+    Parking = 256
+    Bidirectional = 512
+    Median = 1024
+    Special1 = 2048
+    Special2 = 4096
+    Special3 = 8192
+    RoadWorks = 16384
+    Tram = 32768
+    Rail = 65536
+    Entry = 131072
+    Exit = 262144
+    OffRamp = 524288
+    OnRamp = 1048576
+    Any = 4294967294
+
+    def __str__(self):
+        return self.name
+
+
+class VehicleLightState(enum.IntFlag):
+    NONE = 0
+    Position = 1
+    LowBeam = 2
+    HighBeam = 4
+    Brake = 8
+    RightBlinker = 16
+    LeftBlinker = 32
+    Reverse = 64
+    Fog = 128
+    Interior = 256
+    Special1 = 512
+    Special2 = 1024
+    All = 4294967295
+
+
+# OpenDRIVE lane types, lower cased
+_LANE_TYPES = {'none': LaneType.NONE, 'driving': LaneType.Driving,
+               'stop': LaneType.Stop, 'shoulder': LaneType.Shoulder,
+               'biking': LaneType.Biking, 'sidewalk': LaneType.Sidewalk,
+               'border': LaneType.Border,
+               'restricted': LaneType.Restricted,
+               'parking': LaneType.Parking,
+               'bidirectional': LaneType.Bidirectional,
+               'median': LaneType.Median, 'special1': LaneType.Special1,
+               'special2': LaneType.Special2, 'special3': LaneType.Special3,
+               'roadworks': LaneType.RoadWorks, 'tram': LaneType.Tram,
+               'rail': LaneType.Rail, 'entry': LaneType.Entry,
+               'exit': LaneType.Exit, 'offramp': LaneType.OffRamp,
+               'onramp': LaneType.OnRamp}
+
+
+# ---------------------------------------------------------------------------
+# map
+# ---------------------------------------------------------------------------
+
+class LaneMarking(object):
+    def __init__(self, marking_type, lane_change, width=0.15):
+        self.type = marking_type
+        self.lane_change = lane_change
+        self.width = width
+        self.color = 'White'
+
+
+def _lane_marking(value, lane_id, left):
+    """
+    Build the lane marking on one side of a lane from its OpenDRIVE
+    laneChange value, which is relative to the lane ids.
+    """
+    if value == 'both':
+        lane_change = LaneChange.Both
+    elif value in ('increase', 'decrease'):
+        # lane ids increase to the left of the direction of s
+        crosses_to_increase = left == (lane_id < 0)
+        own_side = LaneChange.Left if left else LaneChange.Right
+        other_side = LaneChange.Right if left else LaneChange.Left
+        lane_change = own_side \
+            if (value == 'increase') == crosses_to_increase else other_side
+    else:
+        lane_change = LaneChange.NONE
+    marking_type = LaneMarkingType.Solid if lane_change == LaneChange.NONE \
+        else LaneMarkingType.Broken
+    return LaneMarking(marking_type, lane_change)
+
+
+class _LaneInfo(object):
+    """
+    Attributes shared by all the waypoints of one lane.
+    """
+
+    def __init__(self, opendrive, node):
+        road = opendrive.roads[node[0]]
+        self.junction_id = road.junction
+        self.is_junction = road.junction != -1
+        self.lane_type = _LANE_TYPES.get(opendrive.lane(node).type.lower(),
+                                         LaneType.NONE)
+        left, right = opendrive.lane_change(node)
+        self.left_lane_marking = _lane_marking(left, node[2], True)
+        self.right_lane_marking = _lane_marking(right, node[2], False)
+        self.lane_change = \
+            (self.left_lane_marking.lane_change & LaneChange.Left) | \
+            (self.right_lane_marking.lane_change & LaneChange.Right)
+
+
+class Waypoint(object):
+    """
+    A point on the center of a lane, oriented in its driving direction.
+    """
+
+    def __init__(self, carla_map, node, s, pose=None):
+        opendrive = carla_map.opendrive
+        s_start, s_end = opendrive.lane_range(node)
+        s = min(max(float(s), s_start), s_end)
+        if pose is None:
+            pose = [float(v) for v in opendrive.carla_pose(node, s)]
+        x, y, z, yaw, pitch, width = pose
+
+        self._map = carla_map
+        self._node = node
+        self.road_id, self.section_id, self.lane_id = node
+        self.s = s
+        self.transform = Transform(Location(x, y, z),
+                                   Rotation(pitch=math.degrees(pitch),
+                                            yaw=math.degrees(yaw)))
+        self.lane_width = width
+        self.id = hash((node, round(s, 3))) & 0xFFFFFFFFFFFFFFFF
+
+        info = carla_map.lane_info(node)
+        self.is_junction = info.is_junction
+        self.junction_id = info.junction_id
+        self.lane_type = info.lane_type
+        self.lane_change = info.lane_change
+        self.left_lane_marking = info.left_lane_marking
+        self.right_lane_marking = info.right_lane_marking
+
+    def __repr__(self):
+        return 'Waypoint(road_id=%d, section_id=%d, lane_id=%d, s=%f)' % (
+            self.road_id, self.section_id, self.lane_id, self.s)
+
+    def next(self, distance):
+        """
+        Waypoints distance ahead in driving direction, one per lane that
+        can be reached. Empty at the end of a lane without successors.
+        """
+        return self._map.advance(self._node, self.s, distance, True)
+
+    def previous(self, distance):
+        """
+        Waypoints distance behind in driving direction.
+        """
+        return self._map.advance(self._node, self.s, distance, False)
+
+    def next_until_lane_end(self, distance):
+        s_start, s_end = self._map.opendrive.lane_range(self._node)
+        direction = self._map.opendrive.direction(self._node)
+        remaining = s_end - self.s if direction > 0 else self.s - s_start
+        return [Waypoint(self._map, self._node, self.s + direction * d)
+                for d in np.arange(distance, remaining, distance)] + \
+            [Waypoint(self._map, self._node,
+                      s_end if direction > 0 else s_start)]
+
+    def previous_until_lane_start(self, distance):
+        s_start, s_end = self._map.opendrive.lane_range(self._node)
+        direction = self._map.opendrive.direction(self._node)
+        remaining = self.s - s_start if direction > 0 else s_end - self.s
+        return [Waypoint(self._map, self._node, self.s - direction * d)
+                for d in np.arange(distance, remaining, distance)] + \
+            [Waypoint(self._map, self._node,
+                      s_start if direction > 0 else s_end)]
+
+    def _neighbour(self, side):
+        # lane ids grow from right to left in the direction of s
+        step = side if self.lane_id < 0 else -side
+        lane_id = self.lane_id + step
+        if lane_id == 0:
+            lane_id += step
+        node = (self.road_id, self.section_id, lane_id)
+        if lane_id not in self._map.opendrive.section(node).lanes:
+            return None
+        return Waypoint(self._map, node, self.s)
+
+    def get_left_lane(self):
+        """
+        The waypoint on the lane to the left of the driving direction.
+        """
+        return self._neighbour(1)
+
+    def get_right_lane(self):
+        """
+        The waypoint on the lane to the right of the driving direction.
+        """
+        return self._neighbour(-1)
+
+    def get_landmarks(self, distance, stop_at_junction=False):
+        return []
+
+
+class _LaneSamples(object):
+    """
+    KD-tree over points sampled along the center of a set of lanes.
+    """
+
+    def __init__(self, opendrive, nodes):
+        self.nodes = list(nodes)
+        parts = []
+        for k, node in enumerate(self.nodes):
+            s_start, s_end = opendrive.lane_range(node)
+            n = max(int(math.ceil((s_end - s_start) / _SAMPLE_STEP)), 1)
+            s = np.linspace(s_start, s_end, n + 1)
+            x, y, z, yaw, pitch, width = opendrive.carla_pose(node, s)
+            parts.append((np.full(len(s), k), s, x, y, z, yaw, pitch, width,
+                          np.full(len(s), (s_end - s_start) / n / 2),
+                          np.full(len(s), opendrive.direction(node)),
+                          np.full(len(s), s_start),
+                          np.full(len(s), s_end)))
+        if not parts:
+            self.tree = None
+            return
+        (self.node_index, self.s, x, y, z, self.yaw, self.pitch, self.width,
+         self.half_step, self.direction, self.s_start, self.s_end) = \
+            [np.concatenate(p) for p in zip(*parts)]
+        self.locations = np.stack([x, y, z], axis=1)
+        self.tree = cKDTree(self.locations)
+
+    def project(self, points):
+        """
+        Project points onto the closest lane center.
+
+        Returns
+        -------
+        indices : np.ndarray
+            Closest sample of every point.
+
+        s : np.ndarray
+            s of the projection on the lane of the sample.
+
+        z : np.ndarray
+            Height of the projection.
+
+        lateral : np.ndarray
+            Distance between the points and their projection.
+        """
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+        _, indices = self.tree.query(points)
+        yaw = self.yaw[indices]
+        delta = points[:, :2] - self.locations[indices, :2]
+        offset = delta[:, 0] * np.cos(yaw) + delta[:, 1] * np.sin(yaw)
+        offset = np.clip(offset, -self.half_step[indices],
+                         self.half_step[indices])
+        lateral = -delta[:, 0] * np.sin(yaw) + delta[:, 1] * np.cos(yaw)
+        s = np.clip(self.s[indices] + self.direction[indices] * offset,
+                    self.s_start[indices], self.s_end[indices])
+        z = self.locations[indices, 2] + offset * np.tan(self.pitch[indices])
+        return indices, s, z, lateral
+
+
+class Map(object):
+    """
+    Road network of the headless world, built from an OpenDRIVE file or a
+    SUMO network.
+
+    Parameters
+    ----------
+    name : str
+        The map name.
+
+    xodr : str
+        Content of the .xodr file.
+
+    network : opencda.headless.sumo_net.SumoNetwork
+        A road network to use instead of parsing xodr.
+
+    Attributes
+    ----------
+    opendrive : opencda.headless.opendrive.OpenDriveMap
+        The parsed road network, or the SumoNetwork given.
+    """
+
+    def __init__(self, name, xodr=None, network=None):
+        self.name = name
+        self.opendrive = network if network is not None \
+            else OpenDriveMap(xodr, name)
+        self._lane_info = {}
+        self._samples = {}
+
+    def lane_info(self, node):
+        if node not in self._lane_info:
+            self._lane_info[node] = _LaneInfo(self.opendrive, node)
+        return self._lane_info[node]
+
+    def lane_samples(self, lane_type=LaneType.Driving):
+        """
+        The lane samples of the lanes matching lane_type, built on first
+        use.
+        """
+        lane_type = int(lane_type)
+        if lane_type not in self._samples:
+            nodes = [node for node in self.opendrive.lanes()
+                     if int(self.lane_info(node).lane_type) & lane_type]
+            self._samples[lane_type] = _LaneSamples(self.opendrive, nodes)
+        return self._samples[lane_type]
+
+    def locate(self, location):
+        """
+        The (lane node, s) of the driving lane closest to a location.
+        """
+        samples = self.lane_samples()
+        indices, s, _, _ = samples.project(
+            [location.x, location.y, location.z])
+        return samples.nodes[samples.node_index[indices[0]]], float(s[0])
+
+    def advance(self, node, s, distance, forward):
+        """
+        Waypoints at distance along the lane graph, in or against the
+        driving direction.
+        """
+        opendrive = self.opendrive
+        results = []
+        pending = [(node, s, distance)]
+        # bounded so that zero length lanes cannot loop forever
+        for _ in range(256):
+            if not pending:
+                break
+            node, s, distance = pending.pop()
+            direction = opendrive.direction(node) * (1 if forward else -1)
+            s_start, s_end = opendrive.lane_range(node)
+            remaining = s_end - s if direction > 0 else s - s_start
+            if distance <= remaining:
+                results.append(Waypoint(self, node, s + direction * distance))
+                continue
+            following = opendrive.successors(node) if forward \
+                else opendrive.predecessors(node)
+            for lane in reversed(following):
+                lane_start, lane_end = opendrive.lane_range(lane)
+                enters_at_start = \
+                    (opendrive.direction(lane) > 0) == forward
+                pending.append((lane, lane_start if enters_at_start
+                                else lane_end, distance - remaining))
+        return results
+
+    def _lane_end(self, node, end):
+        s_start, s_end = self.opendrive.lane_range(node)
+        at_start = (self.opendrive.direction(node) > 0) != end
+        return Waypoint(self, node, s_start if at_start else s_end)
+
+    def get_waypoint(self, location, project_to_road=True,
+                     lane_type=LaneType.Driving):
+        samples = self.lane_samples(lane_type)
+        if samples.tree is None:
+            return None
+        indices, s, _, lateral = samples.project(
+            [location.x, location.y, location.z])
+        i = indices[0]
+        if not project_to_road and abs(lateral[0]) > samples.width[i] / 2:
+            return None
+        return Waypoint(self, samples.nodes[samples.node_index[i]], s[0])
+
+    def get_waypoint_xodr(self, road_id, lane_id, s):
+        road = self.opendrive.roads.get(road_id)
+        if road is None:
+            return None
+        for section in road.sections:
+            if section.s <= s <= section.s_end and lane_id in section.lanes:
+                return Waypoint(self, (road_id, section.index, lane_id), s)
+        return None
+
+    def generate_waypoints(self, distance):
+        waypoints = []
+        for node in self.lane_samples().nodes:
+            s_start, s_end = self.opendrive.lane_range(node)
+            s = np.arange(s_start, s_end, distance)
+            if len(s) == 0:
+                continue
+            poses = np.stack(self.opendrive.carla_pose(node, s), axis=1)
+            waypoints.extend(Waypoint(self, node, s[k], poses[k].tolist())
+                             for k in range(len(s)))
+        return waypoints
+
+    def get_topology(self):
+        """
+        Pairs of waypoints at the start of every driving lane and at the
+        start of each of its successors.
+        """
+        topology = []
+        for node in self.lane_samples().nodes:
+            for following in self.opendrive.successors(node):
+                if self.lane_info(following).lane_type != LaneType.Driving:
+                    continue
+                topology.append((self._lane_end(node, False),
+                                 self._lane_end(following, False)))
+        return topology
+
+    def get_spawn_points(self):
+        spawn_points = []
+        for node in self.lane_samples().nodes:
+            if self.lane_info(node).is_junction:
+                continue
+            s_start, s_end = self.opendrive.lane_range(node)
+            for s in np.arange(s_start + 5.0, s_end - 5.0,
+                               _SPAWN_POINT_STEP):
+                transform = Waypoint(self, node, s).transform
+                transform.location.z += 0.5
+                spawn_points.append(transform)
+        return spawn_points
+
+    def transform_to_geolocation(self, location):
+        lat_0, lon_0 = self.opendrive.geo_reference
+        scale = math.cos(math.radians(lat_0))
+        mx = scale * math.radians(lon_0) * _EARTH_RADIUS_EQUA + location.x
+        my = scale * _EARTH_RADIUS_EQUA * \
+            math.log(math.tan((90 + lat_0) * math.pi / 360)) - location.y
+        longitude = mx * 180 / (math.pi * _EARTH_RADIUS_EQUA * scale)
+        latitude = 360 / math.pi * \
+            math.atan(math.exp(my / (_EARTH_RADIUS_EQUA * scale))) - 90
+        return GeoLocation(latitude, longitude, location.z)
+
+    def to_opendrive(self):
+        return self.opendrive.xodr
+
+    def get_all_landmarks(self):
+        return []
+
+    def get_all_landmarks_of_type(self, landmark_type):
+        return []
+
+    def get_all_landmarks_from_id(self, opendrive_id):
+        return []
+
+    def get_crosswalks(self):
+        return []
+
+
+# ---------------------------------------------------------------------------
+# blueprints
+# ---------------------------------------------------------------------------
+
+class ActorAttribute(object):
+    def __init__(self, attribute_id, value, recommended_values=(),
+                 is_modifiable=True):
+        self.id = attribute_id
+        self.value = str(value)
+        self.recommended_values = list(recommended_values)
+        self.is_modifiable = is_modifiable
+
+    def __str__(self):
+        return self.value
+
+    def __eq__(self, other):
+        return self.value == str(other)
+
+    def __ne__(self, other):
+        return not self == other
+
+    __hash__ = object.__hash__
+
+    def as_bool(self):
+        return self.value.lower() == 'true'
+
+    def as_int(self):
+        return int(self.value)
+
+    def as_float(self):
+        return float(self.value)
+
+    def as_str(self):
+        return self.value
+
+    def as_color(self):
+        return Color(*[int(c) for c in self.value.split(',')])
+
+
+class ActorBlueprint(object):
+    def __init__(self, blueprint_id, attributes, tags=()):
+        self.id = blueprint_id
+        self.tags = list(tags)
+        self._attributes = {}
+        for name, value in attributes.items():
+            recommended = _VEHICLE_COLORS if name == 'color' else ()
+            self._attributes[name] = ActorAttribute(name, value, recommended)
+
+    def copy(self):
+        blueprint = ActorBlueprint(self.id, {}, self.tags)
+        for name, attribute in self._attributes.items():
+            blueprint._attributes[name] = ActorAttribute(
+                name, attribute.value, attribute.recommended_values,
+                attribute.is_modifiable)
+        return blueprint
+
+    def has_attribute(self, attribute_id):
+        return attribute_id in self._attributes
+
+    def get_attribute(self, attribute_id):
+        if attribute_id not in self._attributes:
+            raise IndexError('attribute %r not found' % attribute_id)
+        return self._attributes[attribute_id]
+
+    def set_attribute(self, attribute_id, value):
+        if attribute_id in self._attributes:
+            self._attributes[attribute_id].value = str(value)
+        else:
+            self._attributes[attribute_id] = \
+                ActorAttribute(attribute_id, value)
+
+    def has_tag(self, tag):
+        return tag in self.tags
+
+    def match_tags(self, wildcard_pattern):
+        return any(fnmatch.fnmatch(tag, wildcard_pattern)
+                   for tag in self.tags)
+
+    def __iter__(self):
+        return iter(list(self._attributes.values()))
+
+    def __len__(self):
+        return len(self._attributes)
+
+    def __repr__(self):
+        return 'ActorBlueprint(id=%s)' % self.id
+
+
+def _vehicle_blueprint(blueprint_id):
+    return ActorBlueprint(blueprint_id,
+                          {'color': _VEHICLE_COLORS[0],
+                           'role_name': 'autopilot',
+                           'number_of_wheels': '4',
+                           'generation': '1',
+                           'sticky_control': 'true'},
+                          blueprint_id.split('.')[1:])
+
+
+class BlueprintLibrary(object):
+    """
+    The blueprints the world can spawn. find accepts any vehicle.* id, with
+    the default extent for models it does not know.
+    """
+
+    def __init__(self, blueprints):
+        self._blueprints = list(blueprints)
+
+    def find(self, blueprint_id):
+        for blueprint in self._blueprints:
+            if blueprint.id == blueprint_id:
+                return blueprint.copy()
+        if blueprint_id.startswith('vehicle.'):
+            return _vehicle_blueprint(blueprint_id)
+        raise IndexError('blueprint %r not found' % blueprint_id)
+
+    def filter(self, wildcard_pattern):
+        return BlueprintLibrary(
+            b.copy() for b in self._blueprints
+            if fnmatch.fnmatch(b.id, wildcard_pattern) or
+            b.match_tags(wildcard_pattern))
+
+    def __iter__(self):
+        return iter(self._blueprints)
+
+    def __len__(self):
+        return len(self._blueprints)
+
+    def __getitem__(self, index):
+        return self._blueprints[index]
+
+
+def _default_blueprints():
+    blueprints = [_vehicle_blueprint(b) for b in _VEHICLE_BLUEPRINTS]
+    blueprints.extend(ActorBlueprint(b, attributes, b.split('.')[1:])
+                      for b, attributes in sorted(_SENSOR_ATTRIBUTES.items()))
+    return blueprints
+
+
+# ---------------------------------------------------------------------------
+# actors
+# ---------------------------------------------------------------------------
+
+class Actor(object):
+    def __init__(self, world, actor_id, blueprint, transform, parent=None,
+                 attachment_type=AttachmentType.Rigid):
+        self.id = actor_id
+        self.type_id = blueprint.id if blueprint is not None else 'spectator'
+        self.attributes = {a.id: a.value for a in blueprint} \
+            if blueprint is not None else {}
+        self.semantic_tags = []
+        self.parent = parent
+        self.attachment_type = attachment_type
+        self.is_alive = True
+        self.bounding_box = BoundingBox()
+        self._world = world
+        self._transform = _copy_transform(transform)
+
+    def __repr__(self):
+        return 'Actor(id=%d, type=%s)' % (self.id, self.type_id)
+
+    def get_world(self):
+        return self._world
+
+    def get_transform(self):
+        if self.parent is None:
+            return _copy_transform(self._transform)
+        parent = self.parent.get_transform()
+        rotation = self._transform.rotation
+        return Transform(parent.transform(self._transform.location),
+                         Rotation(parent.rotation.pitch + rotation.pitch,
+                                  parent.rotation.yaw + rotation.yaw,
+                                  parent.rotation.roll + rotation.roll))
+
+    def get_location(self):
+        return self.get_transform().location
+
+    def set_transform(self, transform):
+        self._transform = _copy_transform(transform)
+
+    def set_location(self, location):
+        self._transform.location = Location(location.x, location.y,
+                                            location.z)
+
+    def get_velocity(self):
+        return self.parent.get_velocity() if self.parent is not None \
+            else Vector3D()
+
+    def get_angular_velocity(self):
+        return self.parent.get_angular_velocity() \
+            if self.parent is not None else Vector3D()
+
+    def get_acceleration(self):
+        return self.parent.get_acceleration() if self.parent is not None \
+            else Vector3D()
+
+    def set_simulate_physics(self, enabled=True):
+        pass
+
+    def set_target_velocity(self, velocity):
+        pass
+
+    def set_target_angular_velocity(self, angular_velocity):
+        pass
+
+    def destroy(self):
+        return self._world.destroy_actor(self)
+
+
+class Vehicle(Actor):
+    """
+    A vehicle whose state lives in the world's BicycleModel slot.
+    """
+
+    def __init__(self, world, actor_id, blueprint, transform):
+        super(Vehicle, self).__init__(world, actor_id, blueprint, transform)
+        extent = _VEHICLE_EXTENTS.get(blueprint.id, _DEFAULT_EXTENT)
+        self.bounding_box = BoundingBox(Location(0.0, 0.0, extent[2]),
+                                        Vector3D(*extent))
+        self.slot = world.model.add(transform.location.x,
+                                    transform.location.y,
+                                    transform.location.z,
+                                    math.radians(transform.rotation.yaw),
+                                    extent[0], extent[1], _MAX_STEER)
+        world.model.pitch[self.slot] = math.radians(transform.rotation.pitch)
+        self._control = VehicleControl()
+        self._autopilot_port = None
+        self._simulate_physics = True
+        self._light_state = VehicleLightState.NONE
+
+    def get_transform(self):
+        model, i = self._world.model, self.slot
+        return Transform(Location(model.x[i], model.y[i], model.z[i]),
+                         Rotation(pitch=math.degrees(model.pitch[i]),
+                                  yaw=math.degrees(model.yaw[i])))
+
+    def set_transform(self, transform):
+        model, i = self._world.model, self.slot
+        model.x[i] = transform.location.x
+        model.y[i] = transform.location.y
+        model.z[i] = transform.location.z
+        model.yaw[i] = math.radians(transform.rotation.yaw)
+        model.pitch[i] = math.radians(transform.rotation.pitch)
+        if self._autopilot_port is not None:
+            self._world.get_traffic_manager(
+                self._autopilot_port).forget_lane(self)
+
+    def set_location(self, location):
+        transform = self.get_transform()
+        transform.location = location
+        self.set_transform(transform)
+
+    def get_velocity(self):
+        model, i = self._world.model, self.slot
+        horizontal = model.speed[i] * math.cos(model.pitch[i])
+        return Vector3D(horizontal * math.cos(model.yaw[i]),
+                        horizontal * math.sin(model.yaw[i]),
+                        model.speed[i] * math.sin(model.pitch[i]))
+
+    def get_angular_velocity(self):
+        return Vector3D(0.0, 0.0,
+                        math.degrees(self._world.model.yaw_rate[self.slot]))
+
+    def get_acceleration(self):
+        model, i = self._world.model, self.slot
+        # longitudinal plus centripetal acceleration
+        longitudinal = model.acceleration[i]
+        lateral = model.speed[i] * model.yaw_rate[i]
+        cos, sin = math.cos(model.yaw[i]), math.sin(model.yaw[i])
+        return Vector3D(longitudinal * cos - lateral * sin,
+                        longitudinal * sin + lateral * cos, 0.0)
+
+    def set_target_velocity(self, velocity):
+        model, i = self._world.model, self.slot
+        model.speed[i] = velocity.x * math.cos(model.yaw[i]) + \
+            velocity.y * math.sin(model.yaw[i])
+
+    # CARLA 0.9.11 name
+    set_velocity = set_target_velocity
+
+    def apply_control(self, control):
+        self._control = control
+        model, i = self._world.model, self.slot
+        model.throttle[i] = control.throttle
+        model.steer[i] = control.steer
+        model.brake[i] = 1.0 if control.hand_brake else control.brake
+        model.reverse[i] = control.reverse
+
+    def get_control(self):
+        return self._control
+
+    def set_autopilot(self, enabled=True, tm_port=8000):
+        if self._autopilot_port is not None:
+            self._world.get_traffic_manager(
+                self._autopilot_port).unregister(self)
+            self._autopilot_port = None
+        if enabled:
+            self._autopilot_port = tm_port
+            self._world.get_traffic_manager(tm_port).register(self)
+        self._world.model.physics[self.slot] = \
+            self._simulate_physics and not enabled
+
+    def set_simulate_physics(self, enabled=True):
+        self._simulate_physics = enabled
+        self._world.model.physics[self.slot] = \
+            enabled and self._autopilot_port is None
+
+    def get_speed_limit(self):
+        world_map = self._world.get_map()
+        node, _ = world_map.locate(self.get_location())
+        return speed_limit(world_map.opendrive, node) * 3.6
+
+    def get_traffic_light_state(self):
+        return TrafficLightState.Green
+
+    def get_traffic_light(self):
+        return None
+
+    def is_at_traffic_light(self):
+        return False
+
+    def set_light_state(self, light_state):
+        self._light_state = light_state
+
+    def get_light_state(self):
+        return self._light_state
+
+
+class SensorData(object):
+    def __init__(self, frame, timestamp, transform):
+        self.frame = frame
+        self.frame_number = frame
+        self.timestamp = timestamp
+        self.transform = transform
+
+
+class GnssMeasurement(SensorData):
+    def __init__(self, frame, timestamp, transform, latitude, longitude,
+                 altitude):
+        super(GnssMeasurement, self).__init__(frame, timestamp, transform)
+        self.latitude = latitude
+        self.longitude = longitude
+        self.altitude = altitude
+
+
+class IMUMeasurement(SensorData):
+    def __init__(self, frame, timestamp, transform, accelerometer,
+                 gyroscope, compass):
+        super(IMUMeasurement, self).__init__(frame, timestamp, transform)
+        self.accelerometer = accelerometer
+        self.gyroscope = gyroscope
+        self.compass = compass
+
+
+class Sensor(Actor):
+    """
+    A sensor that can be listened to but never reports data.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super(Sensor, self).__init__(*args, **kwargs)
+        self._callback = None
+        self._sensor_tick = float(self.attributes.get('sensor_tick', 0.0))
+        self._last_measurement = None
+
+    @property
+    def is_listening(self):
+        return self._callback is not None
+
+    def listen(self, callback):
+        self._callback = callback
+
+    def stop(self):
+        self._callback = None
+
+    def tick(self, frame, timestamp):
+        """
+        Report a measurement to the listener if one is due.
+        """
+        if self._callback is None:
+            return
+        if self._last_measurement is not None and \
+                timestamp - self._last_measurement < self._sensor_tick - 1e-9:
+            return
+        data = self._measure(frame, timestamp)
+        if data is not None:
+            self._last_measurement = timestamp
+            self._callback(data)
+
+    def _measure(self, frame, timestamp):
+        return None
+
+
+class GnssSensor(Sensor):
+    def __init__(self, *args, **kwargs):
+        super(GnssSensor, self).__init__(*args, **kwargs)
+        self._rng = np.random.RandomState(int(self.attributes['noise_seed']))
+
+    def _noise(self, name):
+        stddev = float(self.attributes['noise_%s_stddev' % name])
+        bias = float(self.attributes['noise_%s_bias' % name])
+        return bias + (self._rng.normal(0.0, stddev) if stddev > 0 else 0.0)
+
+    def _measure(self, frame, timestamp):
+        transform = self.get_transform()
+        geo = self._world.get_map().transform_to_geolocation(
+            transform.location)
+        return GnssMeasurement(frame, timestamp, transform,
+                               geo.latitude + self._noise('lat'),
+                               geo.longitude + self._noise('lon'),
+                               geo.altitude + self._noise('alt'))
+
+
+class ImuSensor(Sensor):
+    def _measure(self, frame, timestamp):
+        if self.parent is None:
+            return None
+        transform = self.get_transform()
+        acceleration = self.parent.get_acceleration()
+        yaw = math.radians(transform.rotation.yaw)
+        cos, sin = math.cos(yaw), math.sin(yaw)
+        accelerometer = Vector3D(
+            acceleration.x * cos + acceleration.y * sin,
+            -acceleration.x * sin + acceleration.y * cos, 9.81)
+        gyroscope = Vector3D(
+            0.0, 0.0, math.radians(self.parent.get_angular_velocity().z))
+        # the compass points north, which is -y in CARLA
+        compass = (yaw + math.pi / 2) % (2 * math.pi)
+        return IMUMeasurement(frame, timestamp, transform, accelerometer,
+                              gyroscope, compass)
+
+
+_SENSOR_CLASSES = {'sensor.other.gnss': GnssSensor,
+                   'sensor.other.imu': ImuSensor}
+
+
+class ActorList(list):
+    def filter(self, wildcard_pattern):
+        return ActorList(a for a in self
+                         if fnmatch.fnmatch(a.type_id, wildcard_pattern))
+
+    def find(self, actor_id):
+        for actor in self:
+            if actor.id == actor_id:
+                return actor
+        return None
+
+
+# ---------------------------------------------------------------------------
+# world
+# ---------------------------------------------------------------------------
+
+class Timestamp(object):
+    def __init__(self, frame, elapsed_seconds, delta_seconds):
+        self.frame = frame
+        self.elapsed_seconds = elapsed_seconds
+        self.delta_seconds = delta_seconds
+        self.platform_timestamp = time.time()
+
+
+class ActorSnapshot(object):
+    def __init__(self, actor):
+        self.id = actor.id
+        self._transform = actor.get_transform()
+        self._velocity = actor.get_velocity()
+        self._angular_velocity = actor.get_angular_velocity()
+        self._acceleration = actor.get_acceleration()
+
+    def get_transform(self):
+        return self._transform
+
+    def get_velocity(self):
+        return self._velocity
+
+    def get_angular_velocity(self):
+        return self._angular_velocity
+
+    def get_acceleration(self):
+        return self._acceleration
+
+
+class WorldSnapshot(object):
+    def __init__(self, world_id, timestamp, actors):
+        self.id = world_id
+        self.frame = timestamp.frame
+        self.timestamp = timestamp
+        self._actors = {a.id: ActorSnapshot(a) for a in actors}
+
+    def find(self, actor_id):
+        return self._actors.get(actor_id)
+
+    def has_actor(self, actor_id):
+        return actor_id in self._actors
+
+    def __iter__(self):
+        return iter(list(self._actors.values()))
+
+    def __len__(self):
+        return len(self._actors)
+
+
+class DebugHelper(object):
+    """
+    Drawing is not rendered without a server; all calls are ignored.
+    """
+
+    def draw_point(self, *args, **kwargs):
+        pass
+
+    def draw_line(self, *args, **kwargs):
+        pass
+
+    def draw_arrow(self, *args, **kwargs):
+        pass
+
+    def draw_box(self, *args, **kwargs):
+        pass
+
+    def draw_string(self, *args, **kwargs):
+        pass
+
+
+def _boxes_overlap(a, b):
+    """
+    Separating axis test of two oriented 2D boxes (x, y, yaw, half length,
+    half width).
+    """
+    def axes(box):
+        c, s = math.cos(box[2]), math.sin(box[2])
+        return [(c, s), (-s, c)]
+
+    def radius(box, axis):
+        (fx, fy), (rx, ry) = axes(box)
+        return box[3] * abs(fx * axis[0] + fy * axis[1]) + \
+            box[4] * abs(rx * axis[0] + ry * axis[1])
+
+    dx, dy = b[0] - a[0], b[1] - a[1]
+    for axis in axes(a) + axes(b):
+        if abs(dx * axis[0] + dy * axis[1]) > \
+                radius(a, axis) + radius(b, axis):
+            return False
+    return True
+
+
+class World(object):
+    """
+    The headless simulation world.
+
+    Each tick moves the autopilot vehicles with the traffic managers,
+    integrates the other vehicles with the bicycle model, puts them on the
+    road surface and lets the sensors report.
+
+    Parameters
+    ----------
+    carla_map : Map
+        The road network.
+
+    Attributes
+    ----------
+    model : BicycleModel
+        State of every vehicle.
+
+    debug : DebugHelper
+        Drawing helper, which draws nothing.
+    """
+
+    _next_world_id = 1
+
+    def __init__(self, carla_map):
+        self.id = World._next_world_id
+        World._next_world_id += 1
+        self.model = BicycleModel()
+        self.debug = DebugHelper()
+        self._map = carla_map
+        self._settings = WorldSettings()
+        self._weather = WeatherParameters()
+        self._blueprints = _default_blueprints()
+        self._actors = {}
+        self._next_actor_id = 1
+        self._traffic_managers = {}
+        self._on_tick = {}
+        self._timestamp = Timestamp(0, 0.0, 0.0)
+        self._spectator = self._add_actor(
+            lambda i: Actor(self, i, None, Transform()))
+
+    def _add_actor(self, factory):
+        actor = factory(self._next_actor_id)
+        self._next_actor_id += 1
+        self._actors[actor.id] = actor
+        return actor
+
+    def get_map(self):
+        return self._map
+
+    def get_settings(self):
+        return WorldSettings(**vars(self._settings))
+
+    def apply_settings(self, settings):
+        self._settings = WorldSettings(**vars(settings))
+        return self._timestamp.frame
+
+    def get_weather(self):
+        return self._weather
+
+    def set_weather(self, weather):
+        self._weather = weather
+
+    def get_spectator(self):
+        return self._spectator
+
+    def get_blueprint_library(self):
+        return BlueprintLibrary(self._blueprints)
+
+    def get_traffic_manager(self, port=8000):
+        if port not in self._traffic_managers:
+            self._traffic_managers[port] = TrafficManager(self, port)
+        return self._traffic_managers[port]
+
+    def get_actors(self, actor_ids=None):
+        if actor_ids is None:
+            return ActorList(self._actors.values())
+        return ActorList(self._actors[i] for i in actor_ids
+                         if i in self._actors)
+
+    def get_actor(self, actor_id):
+        return self._actors.get(actor_id)
+
+    def get_traffic_lights(self):
+        return ActorList()
+
+    def get_snapshot(self):
+        return WorldSnapshot(self.id, self._timestamp,
+                             self._actors.values())
+
+    def _check_spawn(self, blueprint, transform):
+        extent = _VEHICLE_EXTENTS.get(blueprint.id, _DEFAULT_EXTENT)
+        box = (transform.location.x, transform.location.y,
+               math.radians(transform.rotation.yaw), extent[0], extent[1])
+        model = self.model
+        others = np.flatnonzero(model.active)
+        near = others[np.hypot(model.x[others] - box[0],
+                               model.y[others] - box[1]) <
+                      np.hypot(model.half_length[others],
+                               model.half_width[others]) +
+                      math.hypot(extent[0], extent[1])]
+        for i in near:
+            if abs(model.z[i] - transform.location.z) < 2 * extent[2] and \
+                    _boxes_overlap(box, (model.x[i], model.y[i],
+                                         model.yaw[i], model.half_length[i],
+                                         model.half_width[i])):
+                raise RuntimeError(_COLLISION_ERROR)
+
+    def spawn_actor(self, blueprint, transform, attach_to=None,
+                    attachment_type=AttachmentType.Rigid):
+        if blueprint.id.startswith('vehicle.'):
+            self._check_spawn(blueprint, transform)
+            return self._add_actor(
+                lambda i: Vehicle(self, i, blueprint, transform))
+        if blueprint.id.startswith('sensor.'):
+            sensor_class = _SENSOR_CLASSES.get(blueprint.id, Sensor)
+            return self._add_actor(
+                lambda i: sensor_class(self, i, blueprint, transform,
+                                       attach_to, attachment_type))
+        return self._add_actor(
+            lambda i: Actor(self, i, blueprint, transform, attach_to,
+                            attachment_type))
+
+    def try_spawn_actor(self, blueprint, transform, attach_to=None,
+                        attachment_type=AttachmentType.Rigid):
+        try:
+            return self.spawn_actor(blueprint, transform, attach_to,
+                                    attachment_type)
+        except RuntimeError:
+            return None
+
+    def destroy_actor(self, actor):
+        if self._actors.pop(actor.id, None) is None:
+            return False
+        actor.is_alive = False
+        if isinstance(actor, Vehicle):
+            if actor._autopilot_port is not None:
+                self.get_traffic_manager(
+                    actor._autopilot_port).unregister(actor)
+            self.model.remove(actor.slot)
+        return True
+
+    def on_tick(self, callback):
+        callback_id = len(self._on_tick) + 1
+        self._on_tick[callback_id] = callback
+        return callback_id
+
+    def remove_on_tick(self, callback_id):
+        self._on_tick.pop(callback_id, None)
+
+    def _snap_to_road(self):
+        """
+        Put the vehicles integrated by the bicycle model on the road
+        surface.
+        """
+        model = self.model
+        slots = np.flatnonzero(model.active & model.physics)
+        samples = self._map.lane_samples()
+        if len(slots) == 0 or samples.tree is None:
+            return
+        indices, _, z, lateral = samples.project(
+            np.stack([model.x[slots], model.y[slots], model.z[slots]], axis=1))
+        on_road = np.abs(lateral) < samples.width[indices]
+        # the lane pitch is signed along the lane, the vehicle may face
+        # either way
+        facing = np.cos(model.yaw[slots] - samples.yaw[indices])
+        model.z[slots[on_road]] = z[on_road]
+        model.pitch[slots[on_road]] = \
+            (samples.pitch[indices] * np.sign(facing))[on_road]
+
+    def tick(self, seconds=10.0):
+        """
+        Advance the simulation by one step.
+        """
+        dt = self._settings.fixed_delta_seconds or 0.05
+        for traffic_manager in self._traffic_managers.values():
+            traffic_manager.run_step(dt)
+        self.model.step(dt)
+        self._snap_to_road()
+
+        self._timestamp = Timestamp(self._timestamp.frame + 1,
+                                    self._timestamp.elapsed_seconds + dt, dt)
+        for actor in list(self._actors.values()):
+            if isinstance(actor, Sensor) and actor.is_alive:
+                actor.tick(self._timestamp.frame,
+                           self._timestamp.elapsed_seconds)
+        if self._on_tick:
+            snapshot = self.get_snapshot()
+            for callback in list(self._on_tick.values()):
+                callback(snapshot)
+        return self._timestamp.frame
+
+    def wait_for_tick(self, seconds=10.0):
+        self.tick(seconds)
+        return self.get_snapshot()
+
+
+# ---------------------------------------------------------------------------
+# client
+# ---------------------------------------------------------------------------
+
+def _map_directories():
+    directories = list(MAP_SEARCH_PATH)
+    directories.extend(p for p in os.environ.get(
+        'OPENCDA_HEADLESS_MAPS', '').split(os.pathsep) if p)
+    directories.append(os.path.join(
+        os.path.dirname(os.path.dirname(os.path.realpath(__file__))),
+        'assets'))
+    if 'CARLA_ROOT' in os.environ:
+        directories.append(os.path.join(
+            os.environ['CARLA_ROOT'], 'CarlaUE4', 'Content', 'Carla',
+            'Maps', 'OpenDrive'))
+    return directories
+
+
+def find_map(map_name):
+    """
+    Path of <map_name>.xodr in the map directories, searched recursively,
+    else of the SUMO network <map_name>.net.xml, or None.
+    """
+    name = os.path.basename(map_name)
+    for suffix in _MAP_SUFFIXES:
+        for directory in _map_directories():
+            matches = glob.glob(os.path.join(directory, '**', name + suffix),
+                                recursive=True)
+            if matches:
+                return sorted(matches)[0]
+    return None
+
+
+def load_map(path, name):
+    """
+    The Map of an .xodr file or of a SUMO .net.xml.
+    """
+    with open(path) as f:
+        content = f.read()
+    if path.endswith('.net.xml'):
+        return Map(name, network=SumoNetwork(content, name))
+    return Map(name, content)
+
+
+class _Simulator(object):
+    """
+    The in-process stand-in for the server, shared by all clients.
+    """
+    world = None
+
+
+class Client(object):
+    def __init__(self, host='localhost', port=2000, worker_threads=0):
+        self.host = host
+        self.port = port
+        self._timeout = 10.0
+
+    def set_timeout(self, seconds):
+        self._timeout = seconds
+
+    def get_timeout(self):
+        return self._timeout
+
+    def get_client_version(self):
+        return '0.9.12'
+
+    def get_server_version(self):
+        return '0.9.12'
+
+    def get_world(self):
+        if _Simulator.world is None:
+            raise RuntimeError('no map has been loaded in the headless world')
+        return _Simulator.world
+
+    def get_available_maps(self):
+        names = set()
+        for suffix in _MAP_SUFFIXES:
+            for directory in _map_directories():
+                for path in glob.glob(
+                        os.path.join(directory, '**', '*' + suffix),
+                        recursive=True):
+                    names.add(os.path.basename(path)[:-len(suffix)])
+        return sorted(names)
+
+    def load_world(self, map_name, reset_settings=True, map_layers=None):
+        path = find_map(map_name)
+        if path is None:
+            raise RuntimeError('map not found: %s' % map_name)
+        _Simulator.world = World(load_map(path, os.path.basename(map_name)))
+        return _Simulator.world
+
+    def reload_world(self, reset_settings=True):
+        world = self.get_world()
+        _Simulator.world = World(world.get_map())
+        return _Simulator.world
+
+    def generate_opendrive_world(self, opendrive, parameters=None,
+                                 reset_settings=True):
+        _Simulator.world = World(Map('OpenDrive', opendrive))
+        return _Simulator.world
+
+    def get_trafficmanager(self, client_connection=8000):
+        return self.get_world().get_traffic_manager(client_connection)
+
+    def apply_batch(self, commands):
+        self.apply_batch_sync(commands)
+
+    def apply_batch_sync(self, commands, due_tick_cue=False):
+        world = self.get_world()
+        responses = []
+        for batch_command in commands:
+            actor_id, error = batch_command._run(world)
+            responses.append(command.Response(actor_id, error))
+        if due_tick_cue:
+            world.tick()
+        return responses
+
+    def start_recorder(self, filename, additional_data=False):
+        return ''
+
+    def stop_recorder(self):
+        pass
@@ -0,0 +1,156 @@
+# -*- coding: utf-8 -*-
+"""
+Batch commands of the headless backend, mirroring carla.command.
+"""
+# License: TDG-Attribution-NonCommercial-NoDistrib
+
+
+class _FutureActor(object):
+    """
+    Placeholder for the id of the actor spawned by the parent SpawnActor.
+    """
+
+    def __repr__(self):
+        return 'FutureActor'
+
+
+FutureActor = _FutureActor()
+
+
+class Response(object):
+    """
+    Result of one command of a batch.
+    """
+
+    def __init__(self, actor_id=0, error=''):
+        self.actor_id = actor_id
+        self.error = error
+
+    def has_error(self):
+        return bool(self.error)
+
+
+class _ActorCommand(object):
+    """
+    Base class of the commands applied to an existing actor.
+    """
+
+    def __init__(self, actor):
+        self.actor_id = actor
+
+    def _actor(self, world, future_id):
+        actor = self.actor_id
+        if actor is FutureActor:
+            actor = future_id
+        elif hasattr(actor, 'id'):
+            actor = actor.id
+        return world.get_actor(actor)
+
+    def _run(self, world, future_id=None):
+        actor = self._actor(world, future_id)
+        if actor is None:
+            return 0, 'actor not found'
+        self._apply(actor)
+        return actor.id, ''
+
+    def _apply(self, actor):
+        raise NotImplementedError
+
+
+class SpawnActor(object):
+    def __init__(self, blueprint, transform, parent=None):
+        self.blueprint = blueprint
+        self.transform = transform
+        self.parent_id = parent
+        self._then = []
+
+    def then(self, command):
+        """
+        Chain a command applied to the spawned actor, which it refers to as
+        FutureActor.
+        """
+        self._then.append(command)
+        return self
+
+    def _run(self, world, future_id=None):
+        parent = self.parent_id
+        if parent is not None and not hasattr(parent, 'id'):
+            parent = world.get_actor(future_id if parent is FutureActor
+                                     else parent)
+        try:
+            actor = world.spawn_actor(self.blueprint, self.transform,
+                                      attach_to=parent)
+        except RuntimeError as e:
+            return 0, str(e)
+        for command in self._then:
+            command._run(world, actor.id)
+        return actor.id, ''
+
+
+class DestroyActor(_ActorCommand):
+    def _apply(self, actor):
+        actor.destroy()
+
+
+class ApplyTransform(_ActorCommand):
+    def __init__(self, actor, transform):
+        super(ApplyTransform, self).__init__(actor)
+        self.transform = transform
+
+    def _apply(self, actor):
+        actor.set_transform(self.transform)
+
+
+class ApplyLocation(_ActorCommand):
+    def __init__(self, actor, location):
+        super(ApplyLocation, self).__init__(actor)
+        self.location = location
+
+    def _apply(self, actor):
+        actor.set_location(self.location)
+
+
+class ApplyVehicleControl(_ActorCommand):
+    def __init__(self, actor, control):
+        super(ApplyVehicleControl, self).__init__(actor)
+        self.control = control
+
+    def _apply(self, actor):
+        actor.apply_control(self.control)
+
+
+class ApplyTargetVelocity(_ActorCommand):
+    def __init__(self, actor, velocity):
+        super(ApplyTargetVelocity, self).__init__(actor)
+        self.velocity = velocity
+
+    def _apply(self, actor):
+        actor.set_target_velocity(self.velocity)
+
+
+class SetAutopilot(_ActorCommand):
+    def __init__(self, actor, enabled, tm_port=8000):
+        super(SetAutopilot, self).__init__(actor)
+        self.enabled = enabled
+        self.port = tm_port
+
+    def _apply(self, actor):
+        actor.set_autopilot(self.enabled, self.port)
+
+
+class SetSimulatePhysics(_ActorCommand):
+    def __init__(self, actor, enabled):
+        super(SetSimulatePhysics, self).__init__(actor)
+        self.enabled = enabled
+
+    def _apply(self, actor):
+        actor.set_simulate_physics(self.enabled)
+
+
+class SetVehicleLightState(_ActorCommand):
+    def __init__(self, actor, light_state):
+        super(SetVehicleLightState, self).__init__(actor)
+        self.light_state = light_state
+
+    def _apply(self, actor):
+        actor.set_light_state(self.light_state)
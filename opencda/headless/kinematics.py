@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*-
+"""
+Batched kinematic bicycle model for the vehicles of the headless backend.
+"""
+# License: TDG-Attribution-NonCommercial-NoDistrib
+
+import numpy as np
+
+# peak acceleration (m/s^2) at full throttle from standstill
+MAX_ACCELERATION = 4.0
+# deceleration (m/s^2) at full brake
+MAX_DECELERATION = 8.0
+# speed (m/s) at which full throttle no longer accelerates
+MAX_SPEED = 60.0
+# rolling resistance (m/s^2) and aerodynamic drag (1/m)
+ROLLING_RESISTANCE = 0.1
+DRAG = 3e-4
+
+
+class BicycleModel(object):
+    """
+    Kinematic bicycle model integrating every vehicle of the world at once.
+
+    The state lives in numpy arrays indexed by slot; a vehicle keeps its
+    slot for its lifetime and freed slots are reused. Angles are in radians
+    in the CARLA frame, where a positive yaw rate turns right.
+
+    Parameters
+    ----------
+    capacity : int
+        Initial number of slots. The arrays grow when they are full.
+
+    Attributes
+    ----------
+    x, y, z, yaw, pitch : np.ndarray
+        Pose of every slot.
+
+    speed : np.ndarray
+        Signed speed (m/s) along the vehicle heading.
+
+    acceleration, yaw_rate : np.ndarray
+        Longitudinal acceleration (m/s^2) and yaw rate (rad/s) of the last
+        step.
+
+    throttle, steer, brake : np.ndarray
+        The latest control applied to every slot.
+
+    reverse : np.ndarray
+        Whether the vehicle is in reverse gear.
+
+    wheelbase, max_steer : np.ndarray
+        Vehicle parameters: wheelbase (m) and front wheel angle (rad) at
+        full steer.
+
+    half_length, half_width : np.ndarray
+        Bounding box extent (m) of every slot.
+
+    physics : np.ndarray
+        Whether the slot is integrated. Vehicles driven by the traffic
+        manager or with physics disabled only move when set explicitly.
+
+    active : np.ndarray
+        Whether the slot is in use.
+    """
+
+    _FIELDS = ('x', 'y', 'z', 'yaw', 'pitch', 'speed', 'acceleration',
+               'yaw_rate', 'throttle', 'steer', 'brake', 'wheelbase',
+               'max_steer', 'half_length', 'half_width')
+    _FLAGS = ('reverse', 'physics', 'active')
+
+    def __init__(self, capacity=64):
+        for name in self._FIELDS:
+            setattr(self, name, np.zeros(capacity))
+        for name in self._FLAGS:
+            setattr(self, name, np.zeros(capacity, dtype=bool))
+        self._free = list(range(capacity - 1, -1, -1))
+
+    def _grow(self):
+        capacity = len(self.x)
+        for name in self._FIELDS + self._FLAGS:
+            array = getattr(self, name)
+            setattr(self, name, np.concatenate(
+                [array, np.zeros(capacity, dtype=array.dtype)]))
+        self._free = list(range(2 * capacity - 1, capacity - 1, -1))
+
+    def add(self, x, y, z, yaw, half_length, half_width, max_steer):
+        """
+        Add a vehicle at rest and return its slot. The wheelbase is taken
+        as 60% of the vehicle length.
+        """
+        if not self._free:
+            self._grow()
+        i = self._free.pop()
+        for name in self._FIELDS:
+            getattr(self, name)[i] = 0.0
+        self.x[i], self.y[i], self.z[i], self.yaw[i] = x, y, z, yaw
+        self.half_length[i], self.half_width[i] = half_length, half_width
+        self.wheelbase[i] = 1.2 * half_length
+        self.max_steer[i] = max_steer
+        self.reverse[i] = False
+        self.physics[i] = True
+        self.active[i] = True
+        return i
+
+    def remove(self, i):
+        self.active[i] = False
+        self.physics[i] = False
+        self._free.append(i)
+
+    def step(self, dt):
+        """
+        Integrate the slots with physics enabled over dt seconds.
+        """
+        m = self.active & self.physics
+        if not np.any(m):
+            return
+
+        speed = self.speed[m]
+        direction = np.where(self.reverse[m], -1.0, 1.0)
+        brake = np.clip(self.brake[m], 0.0, 1.0)
+        throttle = np.clip(self.throttle[m], 0.0, 1.0)
+
+        drive = direction * throttle * MAX_ACCELERATION * \
+            np.clip(1.0 - np.abs(speed) / MAX_SPEED, 0.0, 1.0)
+        # braking and resistance only slow the vehicle down, they never
+        # make it move in the opposite direction
+        resist = brake * MAX_DECELERATION + ROLLING_RESISTANCE + \
+            DRAG * speed ** 2
+        moving = np.abs(speed) > 1e-6
+        new_speed = speed + drive * dt
+        slowed = np.where(moving, np.sign(speed), np.sign(drive))
+        decel = np.minimum(resist * dt, np.abs(new_speed))
+        new_speed = new_speed - slowed * decel
+        acceleration = (new_speed - speed) / dt
+
+        # rear axle bicycle model, integrated at the mean speed of the step
+        mean_speed = (speed + new_speed) / 2
+        delta = np.clip(self.steer[m], -1.0, 1.0) * self.max_steer[m]
+        yaw_rate = mean_speed * np.tan(delta) / self.wheelbase[m]
+        yaw = self.yaw[m] + yaw_rate * dt / 2
+        self.x[m] += mean_speed * np.cos(yaw) * dt
+        self.y[m] += mean_speed * np.sin(yaw) * dt
+        self.yaw[m] = np.arctan2(np.sin(self.yaw[m] + yaw_rate * dt),
+                                 np.cos(self.yaw[m] + yaw_rate * dt))
+        self.speed[m] = new_speed
+        self.acceleration[m] = acceleration
+        self.yaw_rate[m] = yaw_rate
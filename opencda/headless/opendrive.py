@@ -0,0 +1,556 @@
+# -*- coding: utf-8 -*-
+"""
+OpenDRIVE road network for the headless backend.
+
+Parses the plan view, elevation, lane offsets and lane sections of a .xodr
+file and evaluates lane centerlines along s. Coordinates are returned in the
+OpenDRIVE frame (right-handed, y to the left), or in the CARLA frame by
+OpenDriveMap.carla_pose.
+"""
+# License: TDG-Attribution-NonCommercial-NoDistrib
+
+import math
+import re
+import xml.etree.ElementTree as ET
+
+import numpy as np
+
+# sampling step (m) of the geometries that are evaluated from a table
+_TABLE_STEP = 0.05
+
+# conversion of the OpenDRIVE speed units to m/s
+_SPEED_UNITS = {'m/s': 1.0, 'km/h': 1 / 3.6, 'mph': 0.44704}
+
+
+def _float(element, name, default=0.0):
+    value = element.get(name)
+    return float(value) if value is not None else default
+
+
+def _cubic_records(elements, start_name):
+    """
+    Read a list of cubic polynomial records (start, a, b, c, d) sorted by
+    their start position.
+    """
+    records = [(_float(e, start_name), _float(e, 'a'), _float(e, 'b'),
+                _float(e, 'c'), _float(e, 'd')) for e in elements]
+    records.sort(key=lambda r: r[0])
+    return np.array(records, dtype=np.float64).reshape(-1, 5)
+
+
+def _eval_cubic(records, s):
+    """
+    Evaluate piecewise cubic records at s, returning the value and its
+    derivative. Positions before the first record use the first record.
+    """
+    s = np.asarray(s, dtype=np.float64)
+    if len(records) == 0:
+        return np.zeros_like(s), np.zeros_like(s)
+    i = np.clip(np.searchsorted(records[:, 0], s, side='right') - 1,
+                0, len(records) - 1)
+    start, a, b, c, d = records[i].T
+    ds = s - start
+    return a + ds * (b + ds * (c + ds * d)), b + ds * (2 * c + ds * 3 * d)
+
+
+def _speed_limit(speed):
+    """
+    Speed limit (m/s) of a speed record, or None.
+    """
+    if speed is None:
+        return None
+    try:
+        return float(speed.get('max')) * \
+            _SPEED_UNITS.get(speed.get('unit', 'm/s'), 1.0)
+    except (TypeError, ValueError):
+        # 'no limit' and 'undefined' are valid values too
+        return None
+
+
+def geo_reference(proj):
+    """
+    The (lat_0, lon_0) of a PROJ.4 string, 0 where missing.
+    """
+    proj = proj or ''
+    lat = re.search(r'\+lat_0=([-+0-9.eE]+)', proj)
+    lon = re.search(r'\+lon_0=([-+0-9.eE]+)', proj)
+    return float(lat.group(1)) if lat else 0.0, \
+        float(lon.group(1)) if lon else 0.0
+
+
+class _Geometry(object):
+    """
+    One plan view record of a road reference line.
+    """
+
+    def __init__(self, element):
+        self.s = _float(element, 's')
+        self.x = _float(element, 'x')
+        self.y = _float(element, 'y')
+        self.hdg = _float(element, 'hdg')
+        self.length = _float(element, 'length')
+        self.kind = 'line'
+        self.curvature = 0.0
+        self._table = None
+
+        shape = element[0] if len(element) else None
+        if shape is None or shape.tag == 'line':
+            return
+        self.kind = shape.tag
+        if shape.tag == 'arc':
+            self.curvature = _float(shape, 'curvature')
+        elif shape.tag == 'spiral':
+            self._table = self._spiral_table(_float(shape, 'curvStart'),
+                                             _float(shape, 'curvEnd'))
+        elif shape.tag == 'poly3':
+            self._table = self._poly3_table(
+                _float(shape, 'a'), _float(shape, 'b'),
+                _float(shape, 'c'), _float(shape, 'd'))
+        elif shape.tag == 'paramPoly3':
+            self._table = self._param_poly3_table(shape)
+        else:
+            raise ValueError('unsupported OpenDRIVE geometry %s' % shape.tag)
+
+    def _spiral_table(self, curv_start, curv_end):
+        n = max(int(math.ceil(self.length / _TABLE_STEP)), 1) + 1
+        ds = np.linspace(0.0, self.length, n)
+        rate = (curv_end - curv_start) / self.length if self.length else 0.0
+        hdg = self.hdg + curv_start * ds + rate * ds ** 2 / 2
+        step = np.diff(ds)
+        x = self.x + np.concatenate(
+            [[0.0], np.cumsum((np.cos(hdg[1:]) + np.cos(hdg[:-1])) / 2 * step)])
+        y = self.y + np.concatenate(
+            [[0.0], np.cumsum((np.sin(hdg[1:]) + np.sin(hdg[:-1])) / 2 * step)])
+        return ds, x, y, hdg
+
+    def _local_curve_table(self, u, v, du, dv):
+        """
+        Turn a local (u, v) curve sampled along its parameter into a table
+        indexed by arc length, scaled to the declared geometry length.
+        """
+        arc = np.concatenate(
+            [[0.0], np.cumsum(np.hypot(np.diff(u), np.diff(v)))])
+        if arc[-1] > 0:
+            arc *= self.length / arc[-1]
+        cos_h, sin_h = math.cos(self.hdg), math.sin(self.hdg)
+        x = self.x + u * cos_h - v * sin_h
+        y = self.y + u * sin_h + v * cos_h
+        hdg = self.hdg + np.unwrap(np.arctan2(dv, du))
+        return arc, x, y, hdg
+
+    def _poly3_table(self, a, b, c, d):
+        # grow the u range until the curve is as long as the geometry
+        u_max = max(self.length, _TABLE_STEP)
+        for _ in range(20):
+            u = np.linspace(0.0, u_max,
+                            max(int(math.ceil(u_max / _TABLE_STEP)), 1) + 1)
+            v = a + u * (b + u * (c + u * d))
+            arc = np.sum(np.hypot(np.diff(u), np.diff(v)))
+            if arc >= self.length:
+                break
+            u_max *= 1.5
+        arc = np.concatenate(
+            [[0.0], np.cumsum(np.hypot(np.diff(u), np.diff(v)))])
+        keep = np.searchsorted(arc, self.length) + 1
+        u, v = u[:keep], v[:keep]
+        dv = b + u * (2 * c + u * 3 * d)
+        return self._local_curve_table(u, v, np.ones_like(u), dv)
+
+    def _param_poly3_table(self, shape):
+        coefficients = {name: _float(shape, name) for name in
+                        ('aU', 'bU', 'cU', 'dU', 'aV', 'bV', 'cV', 'dV')}
+        p_max = self.length if shape.get('pRange') == 'arcLength' else 1.0
+        n = max(int(math.ceil(self.length / _TABLE_STEP)), 1) + 1
+        p = np.linspace(0.0, p_max, n)
+
+        def cubic(prefix):
+            a, b, c, d = (coefficients[k + prefix] for k in 'abcd')
+            return a + p * (b + p * (c + p * d)), b + p * (2 * c + p * 3 * d)
+
+        u, du = cubic('U')
+        v, dv = cubic('V')
+        return self._local_curve_table(u, v, du, dv)
+
+    def evaluate(self, ds):
+        """
+        Reference line pose at distances ds from the geometry start.
+
+        Returns
+        -------
+        x, y, hdg : np.ndarray
+        """
+        ds = np.asarray(ds, dtype=np.float64)
+        if self.kind == 'line':
+            return self.x + ds * math.cos(self.hdg), \
+                self.y + ds * math.sin(self.hdg), \
+                np.full_like(ds, self.hdg)
+        if self.kind == 'arc':
+            k = self.curvature
+            hdg = self.hdg + k * ds
+            if abs(k) < 1e-12:
+                return self.x + ds * math.cos(self.hdg), \
+                    self.y + ds * math.sin(self.hdg), hdg
+            return self.x + (np.sin(hdg) - math.sin(self.hdg)) / k, \
+                self.y - (np.cos(hdg) - math.cos(self.hdg)) / k, hdg
+        table_s, table_x, table_y, table_hdg = self._table
+        return np.interp(ds, table_s, table_x), \
+            np.interp(ds, table_s, table_y), \
+            np.interp(ds, table_s, table_hdg)
+
+
+class Lane(object):
+    """
+    A lane of one lane section.
+
+    Attributes
+    ----------
+    id : int
+        Lane id; negative on the right of the reference line.
+
+    type : str
+        OpenDRIVE lane type, e.g. 'driving'.
+
+    widths : np.ndarray
+        Width polynomials (sOffset, a, b, c, d) relative to the section.
+
+    predecessor, successor : int
+        Linked lane ids in the neighbouring sections or roads, or None.
+
+    lane_change : str
+        The laneChange attribute of the lane's outer road mark, or a value
+        derived from its type ('both' for broken lines, 'none' otherwise).
+
+    speed_limit : float
+        Speed limit (m/s) of the first lane speed record, or None.
+    """
+
+    def __init__(self, element):
+        self.id = int(element.get('id'))
+        self.type = element.get('type', 'none')
+        self.widths = _cubic_records(element.findall('width'), 'sOffset')
+        self.speed_limit = _speed_limit(element.find('speed'))
+        link = element.find('link')
+        self.predecessor = self.successor = None
+        if link is not None:
+            if link.find('predecessor') is not None:
+                self.predecessor = int(link.find('predecessor').get('id'))
+            if link.find('successor') is not None:
+                self.successor = int(link.find('successor').get('id'))
+
+        self.lane_change = 'none'
+        road_mark = element.find('roadMark')
+        if road_mark is not None:
+            lane_change = road_mark.get('laneChange')
+            if lane_change is None:
+                lane_change = 'both' \
+                    if road_mark.get('type', '').startswith('broken') \
+                    else 'none'
+            self.lane_change = lane_change
+
+
+class LaneSection(object):
+    def __init__(self, element, index):
+        self.index = index
+        self.s = _float(element, 's')
+        self.s_end = None
+        self.lanes = {}
+        self.center_lane_change = 'none'
+        for side in ('left', 'right'):
+            group = element.find(side)
+            if group is None:
+                continue
+            for lane_element in group.findall('lane'):
+                lane = Lane(lane_element)
+                self.lanes[lane.id] = lane
+        center = element.find('center')
+        if center is not None and center.find('lane') is not None:
+            self.center_lane_change = Lane(center.find('lane')).lane_change
+
+
+class Road(object):
+    def __init__(self, element):
+        self.id = int(element.get('id'))
+        self.length = _float(element, 'length')
+        self.junction = int(element.get('junction', '-1'))
+        self.predecessor = self.successor = None
+        link = element.find('link')
+        if link is not None:
+            for name in ('predecessor', 'successor'):
+                e = link.find(name)
+                if e is not None:
+                    setattr(self, name, (e.get('elementType'),
+                                         int(e.get('elementId')),
+                                         e.get('contactPoint')))
+
+        self.speed_limit = _speed_limit(element.find('type/speed'))
+
+        self.geometries = [_Geometry(g) for g in
+                           element.find('planView').findall('geometry')]
+        self.geometries.sort(key=lambda g: g.s)
+        self._geometry_s = np.array([g.s for g in self.geometries])
+
+        profile = element.find('elevationProfile')
+        self.elevations = _cubic_records(
+            profile.findall('elevation') if profile is not None else [], 's')
+        lanes = element.find('lanes')
+        self.lane_offsets = _cubic_records(lanes.findall('laneOffset'), 's')
+        self.sections = [LaneSection(e, i) for i, e in
+                         enumerate(lanes.findall('laneSection'))]
+        for section, following in zip(self.sections, self.sections[1:]):
+            section.s_end = following.s
+        if self.sections:
+            self.sections[-1].s_end = self.length
+
+    def reference(self, s):
+        """
+        Reference line pose at s.
+
+        Returns
+        -------
+        x, y, hdg : np.ndarray
+        """
+        s = np.clip(np.asarray(s, dtype=np.float64), 0.0, self.length)
+        i = np.clip(np.searchsorted(self._geometry_s, s, side='right') - 1,
+                    0, len(self.geometries) - 1)
+        x, y, hdg = np.zeros_like(s), np.zeros_like(s), np.zeros_like(s)
+        for g in np.unique(i):
+            mask = i == g
+            geometry = self.geometries[g]
+            x[mask], y[mask], hdg[mask] = \
+                geometry.evaluate(s[mask] - geometry.s)
+        return x, y, hdg
+
+    def lane_t(self, section, lane_id, s):
+        """
+        Lateral offset of a lane center from the reference line, and the
+        lane width, at s.
+        """
+        s = np.asarray(s, dtype=np.float64)
+        offset, _ = _eval_cubic(self.lane_offsets, s)
+        ds = s - section.s
+        sign = -1 if lane_id < 0 else 1
+        inner = np.zeros_like(s)
+        for k in range(1, abs(lane_id)):
+            lane = section.lanes.get(sign * k)
+            if lane is not None:
+                inner += _eval_cubic(lane.widths, ds)[0]
+        width = _eval_cubic(section.lanes[lane_id].widths, ds)[0]
+        return offset + sign * (inner + width / 2), width
+
+
+class Junction(object):
+    def __init__(self, element):
+        self.id = int(element.get('id'))
+        self.connections = []
+        for connection in element.findall('connection'):
+            self.connections.append((
+                int(connection.get('incomingRoad')),
+                int(connection.get('connectingRoad')),
+                connection.get('contactPoint', 'start'),
+                [(int(l.get('from')), int(l.get('to')))
+                 for l in connection.findall('laneLink')]))
+
+
+class OpenDriveMap(object):
+    """
+    Road network of an OpenDRIVE map, with a lane graph in driving direction.
+
+    A lane is identified by a node (road_id, section_index, lane_id). Lanes
+    with a negative id are driven towards increasing s.
+
+    Parameters
+    ----------
+    xodr : str
+        Content of the .xodr file.
+
+    name : str
+        The map name.
+
+    Attributes
+    ----------
+    roads : dict
+        Road objects keyed by road id.
+
+    geo_reference : tuple
+        (lat_0, lon_0) of the map origin.
+    """
+
+    def __init__(self, xodr, name='OpenDrive'):
+        self.name = name
+        self.xodr = xodr
+        root = ET.fromstring(xodr)
+
+        self.geo_reference = (0.0, 0.0)
+        header = root.find('header')
+        if header is not None and header.find('geoReference') is not None:
+            self.geo_reference = geo_reference(
+                header.find('geoReference').text)
+
+        self.roads = {}
+        for element in root.findall('road'):
+            road = Road(element)
+            self.roads[road.id] = road
+        self.junctions = {}
+        for element in root.findall('junction'):
+            junction = Junction(element)
+            self.junctions[junction.id] = junction
+
+        self._successors = {node: [] for node in self.lanes()}
+        self._predecessors = {node: [] for node in self.lanes()}
+        for node in self.lanes():
+            for following in self._find_successors(node):
+                if following in self._successors and \
+                        following not in self._successors[node]:
+                    self._successors[node].append(following)
+                    self._predecessors[following].append(node)
+
+    def lanes(self, lane_type=None):
+        """
+        Iterate over the lane nodes, optionally of one lane type only.
+        """
+        for road in self.roads.values():
+            for section in road.sections:
+                for lane in section.lanes.values():
+                    if lane_type is None or lane.type == lane_type:
+                        yield road.id, section.index, lane.id
+
+    def lane(self, node):
+        road_id, section_index, lane_id = node
+        return self.roads[road_id].sections[section_index].lanes[lane_id]
+
+    def section(self, node):
+        return self.roads[node[0]].sections[node[1]]
+
+    def lane_range(self, node):
+        """
+        The (start, end) s of a lane.
+        """
+        section = self.section(node)
+        return section.s, section.s_end
+
+    @staticmethod
+    def direction(node):
+        """
+        +1 if the lane is driven towards increasing s, -1 otherwise.
+        """
+        return 1 if node[2] < 0 else -1
+
+    def _road_entry(self, road_id, contact_point, lane_id):
+        road = self.roads.get(road_id)
+        if road is None or lane_id is None or not road.sections:
+            return None
+        section = road.sections[0] if contact_point == 'start' \
+            else road.sections[-1]
+        if lane_id not in section.lanes:
+            return None
+        return road_id, section.index, lane_id
+
+    def _find_successors(self, node):
+        road_id, section_index, lane_id = node
+        road = self.roads[road_id]
+        lane = self.lane(node)
+        forward = self.direction(node) > 0
+
+        if forward and section_index + 1 < len(road.sections):
+            following = road.sections[section_index + 1]
+            target = lane.successor if lane.successor is not None \
+                else lane_id
+            return [(road_id, following.index, target)] \
+                if target in following.lanes else []
+        if not forward and section_index > 0:
+            previous = road.sections[section_index - 1]
+            target = lane.predecessor if lane.predecessor is not None \
+                else lane_id
+            return [(road_id, previous.index, target)] \
+                if target in previous.lanes else []
+
+        link = road.successor if forward else road.predecessor
+        lane_link = lane.successor if forward else lane.predecessor
+        if link is None:
+            return []
+        element_type, element_id, contact_point = link
+        if element_type == 'road':
+            entry = self._road_entry(element_id, contact_point, lane_link)
+            return [entry] if entry is not None else []
+
+        junction = self.junctions.get(element_id)
+        if junction is None:
+            return []
+        successors = []
+        for incoming, connecting, contact_point, lane_links in \
+                junction.connections:
+            if incoming != road_id:
+                continue
+            for from_id, to_id in lane_links:
+                if from_id == lane_id:
+                    entry = self._road_entry(connecting, contact_point,
+                                             to_id)
+                    if entry is not None:
+                        successors.append(entry)
+        return successors
+
+    def successors(self, node):
+        return self._successors.get(node, [])
+
+    def predecessors(self, node):
+        return self._predecessors.get(node, [])
+
+    def lane_pose(self, node, s):
+        """
+        Pose of a lane center at s, in the OpenDRIVE frame.
+
+        Returns
+        -------
+        x, y, z : np.ndarray
+            Center location.
+
+        heading : np.ndarray
+            Heading (rad) of the lane in its driving direction.
+
+        pitch : np.ndarray
+            Slope (rad) of the lane in its driving direction.
+
+        width : np.ndarray
+            Lane width (m).
+        """
+        road = self.roads[node[0]]
+        section = self.section(node)
+        s = np.asarray(s, dtype=np.float64)
+        x, y, hdg = road.reference(s)
+        t, width = road.lane_t(section, node[2], s)
+        # heading change caused by a lane offset or width that varies
+        eps = 0.01
+        dt = (road.lane_t(section, node[2], s + eps)[0] -
+              road.lane_t(section, node[2], s - eps)[0]) / (2 * eps)
+        z, dz = _eval_cubic(road.elevations, s)
+
+        heading = hdg + np.arctan(dt)
+        pitch = np.arctan(dz)
+        if self.direction(node) < 0:
+            heading = heading + math.pi
+            pitch = -pitch
+        return x - t * np.sin(hdg), y + t * np.cos(hdg), z, heading, pitch, \
+            width
+
+    def carla_pose(self, node, s):
+        """
+        Pose of a lane center at s, in the CARLA frame (left-handed, y to
+        the right), with the yaw and pitch in radians.
+        """
+        x, y, z, heading, pitch, width = self.lane_pose(node, s)
+        yaw = np.arctan2(np.sin(-heading), np.cos(-heading))
+        return x, -y, z, yaw, pitch, width
+
+    def lane_change(self, node):
+        """
+        Lane change permission of the (left, right) markings of a lane,
+        relative to its driving direction, as OpenDRIVE laneChange values.
+        """
+        section = self.section(node)
+        lane = self.lane(node)
+        inner_id = node[2] + 1 if node[2] < 0 else node[2] - 1
+        inner = section.center_lane_change if inner_id == 0 \
+            else section.lanes[inner_id].lane_change \
+            if inner_id in section.lanes else 'none'
+        # the inner marking is on the left of the driving direction
+        return inner, lane.lane_change
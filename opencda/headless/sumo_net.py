@@ -0,0 +1,305 @@
+# -*- coding: utf-8 -*-
+"""
+SUMO road network for the headless backend.
+
+Reads a SUMO .net.xml into the lane graph interface of OpenDriveMap, so the
+maps shipped only as the SUMO network netconvert generated from their .xodr
+(e.g. opencda/assets/Town06) can be loaded. Every SUMO edge is a road with
+one lane section. Its lanes get the ids -n..-1 from the rightmost lane to
+the leftmost one, so all of them are driven towards increasing s, which is
+the distance along the lane shape.
+"""
+# License: TDG-Attribution-NonCommercial-NoDistrib
+
+import xml.etree.ElementTree as ET
+
+import numpy as np
+
+from opencda.headless.opendrive import geo_reference
+
+# the lane type of the lanes netconvert did not import from OpenDRIVE
+_DEFAULT_LANE_TYPE = 'driving'
+
+# edges that do not carry vehicles
+_PEDESTRIAN_EDGES = ('crossing', 'walkingarea')
+
+
+def _vertex_values(segment_values):
+    """
+    Values at the vertices of a polyline from the values of its segments,
+    averaging the two segments meeting at inner vertices.
+    """
+    if len(segment_values) == 0:
+        return np.zeros(1)
+    return np.concatenate([segment_values[:1],
+                           (segment_values[1:] + segment_values[:-1]) / 2,
+                           segment_values[-1:]])
+
+
+class Lane(object):
+    """
+    A lane of a SUMO edge.
+
+    Attributes
+    ----------
+    id : int
+        Lane id, from -n for the rightmost of the n lanes of the edge to -1.
+
+    sumo_id : str
+        Id of the lane in the SUMO network.
+
+    type : str
+        Lane type, e.g. 'driving' for the lanes netconvert imported from
+        OpenDRIVE. Internal lanes take the type of the lane leading into
+        them.
+
+    speed_limit : float
+        Speed limit (m/s).
+
+    width : float
+        Lane width (m).
+
+    length : float
+        Length (m) of the lane shape.
+    """
+
+    def __init__(self, element, lane_count):
+        self.sumo_id = element.get('id')
+        self.id = int(element.get('index')) - lane_count
+        self.type = element.get('type')
+        self.speed_limit = float(element.get('speed'))
+        self.width = float(element.get('width', 3.2))
+
+        # points are x,y or x,y,z
+        points = np.array([([float(v) for v in point.split(',')] + [0.0])[:3]
+                           for point in element.get('shape').split()])
+        step = np.hypot(*np.diff(points[:, :2], axis=0).T)
+        # netconvert may repeat a point, which has no heading
+        points = points[np.concatenate([[True], step > 1e-6])]
+        delta = np.diff(points, axis=0)
+        step = np.hypot(delta[:, 0], delta[:, 1])
+
+        self.points = points
+        self.s = np.concatenate([[0.0], np.cumsum(step)])
+        self.length = float(self.s[-1])
+        # heading and slope at the vertices, interpolated in between
+        self.heading = np.unwrap(_vertex_values(
+            np.arctan2(delta[:, 1], delta[:, 0])))
+        self.slope = _vertex_values(delta[:, 2] / step if len(step)
+                                    else step)
+
+    def pose(self, s):
+        """
+        Pose of the lane center at s, in the SUMO frame.
+
+        Returns
+        -------
+        x, y, z, heading, pitch : np.ndarray
+        """
+        s = np.asarray(s, dtype=np.float64)
+        return np.interp(s, self.s, self.points[:, 0]), \
+            np.interp(s, self.s, self.points[:, 1]), \
+            np.interp(s, self.s, self.points[:, 2]), \
+            np.interp(s, self.s, self.heading), \
+            np.arctan(np.interp(s, self.s, self.slope))
+
+
+class LaneSection(object):
+    def __init__(self, lanes, length):
+        self.index = 0
+        self.s = 0.0
+        self.s_end = length
+        self.lanes = {lane.id: lane for lane in lanes}
+
+
+class Road(object):
+    """
+    A SUMO edge.
+
+    Attributes
+    ----------
+    id : int
+        Index of the edge in the network file.
+
+    sumo_id : str
+        Id of the edge in the SUMO network.
+
+    junction : int
+        Index of the junction the edge crosses, -1 otherwise.
+    """
+
+    def __init__(self, road_id, element, junction):
+        self.id = road_id
+        self.sumo_id = element.get('id')
+        self.junction = junction
+        self.speed_limit = None
+        lane_elements = element.findall('lane')
+        lanes = [Lane(e, len(lane_elements)) for e in lane_elements]
+        self.length = max(lane.length for lane in lanes)
+        self.sections = [LaneSection(lanes, self.length)]
+
+
+class SumoNetwork(object):
+    """
+    Road network of a SUMO .net.xml, with the interface of OpenDriveMap.
+
+    A lane is identified by a node (road_id, 0, lane_id). Poses are
+    converted to the frame of the OpenDRIVE map the network was generated
+    from by removing the network offset.
+
+    Parameters
+    ----------
+    net_xml : str
+        Content of the .net.xml file.
+
+    name : str
+        The map name.
+
+    Attributes
+    ----------
+    roads : dict
+        Road objects keyed by road id.
+
+    geo_reference : tuple
+        (lat_0, lon_0) of the map origin.
+
+    xodr : str
+        Content of the .net.xml file, which identifies the map in place of
+        an OpenDRIVE file.
+    """
+
+    def __init__(self, net_xml, name='OpenDrive'):
+        self.name = name
+        self.xodr = net_xml
+        root = ET.fromstring(net_xml)
+
+        self.offset = np.zeros(2)
+        self.geo_reference = (0.0, 0.0)
+        location = root.find('location')
+        if location is not None:
+            self.offset = np.array(
+                [float(v) for v in location.get('netOffset', '0,0').split(',')])
+            self.geo_reference = geo_reference(location.get('projParameter'))
+
+        self.roads = {}
+        junctions = {}
+        nodes = {}
+        for element in root.findall('edge'):
+            function = element.get('function')
+            if function in _PEDESTRIAN_EDGES or \
+                    not element.findall('lane'):
+                continue
+            junction = -1
+            # netconvert also joins consecutive lane sections of a road with
+            # internal edges, which have no OpenDRIVE connecting road
+            if function == 'internal' and \
+                    element.find('lane/param[@key="origId"]') is not None:
+                # internal edges are named :<junction id>_<index>
+                junction = junctions.setdefault(
+                    element.get('id')[1:].rsplit('_', 1)[0], len(junctions))
+            road = Road(len(self.roads), element, junction)
+            self.roads[road.id] = road
+            for lane in road.sections[0].lanes.values():
+                nodes[lane.sumo_id] = (road.id, 0, lane.id)
+
+        self._successors = {node: [] for node in self.lanes()}
+        self._predecessors = {node: [] for node in self.lanes()}
+        for connection in root.findall('connection'):
+            node = nodes.get('%s_%s' % (connection.get('from'),
+                                        connection.get('fromLane')))
+            # connections across a junction lead to its internal lane
+            following = nodes.get(connection.get('via')) \
+                if connection.get('via') else \
+                nodes.get('%s_%s' % (connection.get('to'),
+                                     connection.get('toLane')))
+            if node is None or following is None or \
+                    following in self._successors[node]:
+                continue
+            self._successors[node].append(following)
+            self._predecessors[following].append(node)
+
+        self._resolve_lane_types()
+
+    def _resolve_lane_types(self):
+        untyped = [node for node in self.lanes()
+                   if self.lane(node).type is None]
+        while untyped:
+            remaining = []
+            for node in untyped:
+                types = [self.lane(p).type for p in self._predecessors[node]
+                         if self.lane(p).type is not None]
+                if types:
+                    self.lane(node).type = types[0]
+                else:
+                    remaining.append(node)
+            if len(remaining) == len(untyped):
+                for node in remaining:
+                    self.lane(node).type = _DEFAULT_LANE_TYPE
+                break
+            untyped = remaining
+
+    def lanes(self, lane_type=None):
+        """
+        Iterate over the lane nodes, optionally of one lane type only.
+        """
+        for road in self.roads.values():
+            for lane in road.sections[0].lanes.values():
+                if lane_type is None or lane.type == lane_type:
+                    yield road.id, 0, lane.id
+
+    def lane(self, node):
+        road_id, section_index, lane_id = node
+        return self.roads[road_id].sections[section_index].lanes[lane_id]
+
+    def section(self, node):
+        return self.roads[node[0]].sections[node[1]]
+
+    def lane_range(self, node):
+        """
+        The (start, end) s of a lane.
+        """
+        return 0.0, self.lane(node).length
+
+    @staticmethod
+    def direction(node):
+        """
+        +1 if the lane is driven towards increasing s, which all SUMO lanes
+        are.
+        """
+        return 1
+
+    def successors(self, node):
+        return self._successors.get(node, [])
+
+    def predecessors(self, node):
+        return self._predecessors.get(node, [])
+
+    def carla_pose(self, node, s):
+        """
+        Pose of a lane center at s, in the CARLA frame (left-handed, y to
+        the right), with the yaw and pitch in radians.
+        """
+        lane = self.lane(node)
+        x, y, z, heading, pitch = lane.pose(s)
+        yaw = np.arctan2(np.sin(-heading), np.cos(-heading))
+        return x - self.offset[0], self.offset[1] - y, z, yaw, pitch, \
+            np.full_like(x, lane.width)
+
+    def lane_change(self, node):
+        """
+        Lane change permission of the (left, right) markings of a lane, as
+        OpenDRIVE laneChange values. Neighbouring driving lanes may be
+        changed to outside junctions.
+        """
+        road = self.roads[node[0]]
+        lanes = self.section(node).lanes
+        lane = lanes[node[2]]
+
+        def permission(neighbour):
+            if road.junction != -1 or neighbour is None or \
+                    lane.type != 'driving' or neighbour.type != 'driving':
+                return 'none'
+            return 'both'
+
+        return permission(lanes.get(node[2] + 1)), \
+            permission(lanes.get(node[2] - 1))
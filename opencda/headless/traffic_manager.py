@@ -0,0 +1,256 @@
+# -*- coding: utf-8 -*-
+"""
+Autopilot of the headless backend, standing in for the CARLA traffic
+manager.
+"""
+# License: TDG-Attribution-NonCommercial-NoDistrib
+
+import random
+from collections import OrderedDict, defaultdict
+
+import numpy as np
+
+# speed limit (m/s) of the roads that do not define one
+DEFAULT_SPEED_LIMIT = 30 / 3.6
+# intelligent driver model parameters
+TIME_HEADWAY = 1.0
+MAX_ACCELERATION = 2.0
+COMFORTABLE_DECELERATION = 3.0
+MAX_DECELERATION = 8.0
+# lateral clearance (m) under which a vehicle ahead counts as a leader
+LATERAL_CLEARANCE = 0.3
+
+
+def speed_limit(opendrive, node):
+    """
+    Speed limit (m/s) of a lane, from its own record, its road or the
+    default.
+    """
+    limit = opendrive.lane(node).speed_limit
+    if limit is None:
+        limit = opendrive.roads[node[0]].speed_limit
+    return limit if limit is not None else DEFAULT_SPEED_LIMIT
+
+
+def advance_along_lane(opendrive, node, s, distance, rng):
+    """
+    Move a distance along the lane graph in driving direction, picking a
+    random successor when a lane ends.
+
+    Returns
+    -------
+    node : tuple
+        The lane reached.
+
+    s : float
+        The s reached.
+
+    moving : bool
+        False if a dead end stopped the move.
+    """
+    # bounded so that zero length lanes cannot loop forever
+    for _ in range(64):
+        direction = opendrive.direction(node)
+        s_start, s_end = opendrive.lane_range(node)
+        remaining = s_end - s if direction > 0 else s - s_start
+        if distance <= remaining:
+            return node, s + direction * distance, True
+        successors = opendrive.successors(node)
+        if not successors:
+            return node, s_end if direction > 0 else s_start, False
+        distance -= remaining
+        node = rng.choice(successors)
+        s_start, s_end = opendrive.lane_range(node)
+        s = s_start if opendrive.direction(node) > 0 else s_end
+    return node, s, False
+
+
+class TrafficManager(object):
+    """
+    Drives the vehicles with autopilot enabled.
+
+    Vehicles follow the center of their lane at the road speed limit
+    lowered by their speed difference, keep their distance to the vehicle
+    ahead with the intelligent driver model and take a random successor
+    lane at junctions. Lane changes, traffic lights and signs are not
+    simulated; the corresponding settings are accepted and stored.
+
+    Parameters
+    ----------
+    world : opencda.headless.carla.World
+        The world of the vehicles.
+
+    port : int
+        Port the traffic manager is reached on.
+    """
+
+    def __init__(self, world, port=8000):
+        self._world = world
+        self._port = port
+        self._vehicles = OrderedDict()
+        # (lane node, s) of every vehicle, dropped when it is teleported
+        self._lanes = {}
+
+        self._global_speed_difference = 30.0
+        self._global_distance = 2.0
+        self._speed_difference = {}
+        self._distance = {}
+        self._auto_lane_change = {}
+        self._ignore_lights = {}
+        self._synchronous_mode = False
+        self._osm_mode = False
+        self._hybrid_physics_mode = False
+        self._rng = random.Random()
+
+    def get_port(self):
+        return self._port
+
+    def set_synchronous_mode(self, mode=True):
+        self._synchronous_mode = mode
+
+    def set_osm_mode(self, mode=True):
+        self._osm_mode = mode
+
+    def set_hybrid_physics_mode(self, enabled=False):
+        self._hybrid_physics_mode = enabled
+
+    def set_hybrid_physics_radius(self, radius=50.0):
+        pass
+
+    def set_random_device_seed(self, seed):
+        self._rng.seed(seed)
+
+    def set_global_distance_to_leading_vehicle(self, distance):
+        self._global_distance = distance
+
+    def distance_to_leading_vehicle(self, actor, distance):
+        self._distance[actor.id] = distance
+
+    def global_percentage_speed_difference(self, percentage):
+        self._global_speed_difference = percentage
+
+    def vehicle_percentage_speed_difference(self, actor, percentage):
+        self._speed_difference[actor.id] = percentage
+
+    def auto_lane_change(self, actor, enable):
+        self._auto_lane_change[actor.id] = enable
+
+    def force_lane_change(self, actor, direction):
+        pass
+
+    def ignore_lights_percentage(self, actor, percentage):
+        self._ignore_lights[actor.id] = percentage
+
+    def ignore_signs_percentage(self, actor, percentage):
+        pass
+
+    def ignore_vehicles_percentage(self, actor, percentage):
+        pass
+
+    def ignore_walkers_percentage(self, actor, percentage):
+        pass
+
+    def register(self, vehicle):
+        self._vehicles[vehicle.id] = vehicle
+
+    def unregister(self, vehicle):
+        self._vehicles.pop(vehicle.id, None)
+        self._lanes.pop(vehicle.id, None)
+
+    def forget_lane(self, vehicle):
+        """
+        Locate the vehicle again at the next step, e.g. after a teleport.
+        """
+        self._lanes.pop(vehicle.id, None)
+
+    def _target_speeds(self, vehicles, opendrive):
+        speeds = np.empty(len(vehicles))
+        for k, vehicle in enumerate(vehicles):
+            limit = speed_limit(opendrive, self._lanes[vehicle.id][0])
+            percentage = self._speed_difference.get(
+                vehicle.id, self._global_speed_difference)
+            speeds[k] = limit * (1 - percentage / 100.0)
+        return np.maximum(speeds, 0.1)
+
+    def run_step(self, dt):
+        """
+        Move the autopilot vehicles by one step of dt seconds.
+        """
+        vehicles = [v for v in self._vehicles.values() if v.is_alive]
+        if not vehicles:
+            return
+        world_map = self._world.get_map()
+        opendrive = world_map.opendrive
+        model = self._world.model
+
+        for vehicle in vehicles:
+            if vehicle.id not in self._lanes:
+                self._lanes[vehicle.id] = \
+                    world_map.locate(vehicle.get_location())
+
+        slots = np.array([v.slot for v in vehicles])
+        others = np.flatnonzero(model.active)
+        yaw = model.yaw[slots]
+        cos, sin = np.cos(yaw)[:, np.newaxis], np.sin(yaw)[:, np.newaxis]
+
+        # closest vehicle ahead of each autopilot vehicle that overlaps its
+        # lane, in the frame of the autopilot vehicle
+        dx = model.x[others][np.newaxis, :] - model.x[slots][:, np.newaxis]
+        dy = model.y[others][np.newaxis, :] - model.y[slots][:, np.newaxis]
+        longitudinal = dx * cos + dy * sin
+        lateral = -dx * sin + dy * cos
+        ahead = (longitudinal > 0) & \
+            (np.abs(lateral) < model.half_width[slots][:, np.newaxis] +
+             model.half_width[others][np.newaxis, :] + LATERAL_CLEARANCE) & \
+            (others[np.newaxis, :] != slots[:, np.newaxis])
+        gaps = np.where(ahead,
+                        longitudinal -
+                        model.half_length[slots][:, np.newaxis] -
+                        model.half_length[others][np.newaxis, :],
+                        np.inf)
+        leaders = np.argmin(gaps, axis=1)
+        gap = gaps[np.arange(len(slots)), leaders]
+        leader_speed = model.speed[others[leaders]] * \
+            np.cos(model.yaw[others[leaders]] - yaw)
+
+        speed = model.speed[slots]
+        minimum_gap = np.array([self._distance.get(v.id,
+                                                   self._global_distance)
+                                for v in vehicles])
+        desired_gap = minimum_gap + np.maximum(
+            0.0, speed * TIME_HEADWAY + speed * (speed - leader_speed) /
+            (2 * np.sqrt(MAX_ACCELERATION * COMFORTABLE_DECELERATION)))
+        interaction = np.where(np.isfinite(gap),
+                               (desired_gap / np.maximum(gap, 0.1)) ** 2,
+                               0.0)
+        free_road = 1 - (speed / self._target_speeds(vehicles, opendrive)) ** 4
+        acceleration = np.clip(MAX_ACCELERATION * (free_road - interaction),
+                               -MAX_DECELERATION, MAX_ACCELERATION)
+        new_speed = np.maximum(speed + acceleration * dt, 0.0)
+        distance = (speed + new_speed) / 2 * dt
+
+        by_lane = defaultdict(list)
+        for k, vehicle in enumerate(vehicles):
+            node, s = self._lanes[vehicle.id]
+            node, s, moving = advance_along_lane(opendrive, node, s,
+                                                 distance[k], self._rng)
+            if not moving:
+                new_speed[k] = 0.0
+            self._lanes[vehicle.id] = (node, s)
+            by_lane[node].append(k)
+
+        # evaluate the poses one lane at a time
+        x, y, z = np.empty(len(slots)), np.empty(len(slots)), \
+            np.empty(len(slots))
+        new_yaw, pitch = np.empty(len(slots)), np.empty(len(slots))
+        for node, ks in by_lane.items():
+            s = np.array([self._lanes[vehicles[k].id][1] for k in ks])
+            x[ks], y[ks], z[ks], new_yaw[ks], pitch[ks], _ = \
+                opendrive.carla_pose(node, s)
+
+        model.x[slots], model.y[slots], model.z[slots] = x, y, z
+        model.yaw[slots], model.pitch[slots] = new_yaw, pitch
+        model.yaw_rate[slots] = np.arctan2(np.sin(new_yaw - yaw),
+                                           np.cos(new_yaw - yaw)) / dt
+        model.acceleration[slots] = (new_speed - speed) / dt
+        model.speed[slots] = new_speed
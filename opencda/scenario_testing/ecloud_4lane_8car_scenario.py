@@ -82,5 +82,4 @@ def run_scenario(opt, config_yaml):
         scenario_manager.close(single_cav_list[0])
         for platoon in platoon_list:
             platoon.destroy()
-        for v in bg_veh_list:
-            v.destroy()
+        scenario_manager.destroy_actors(bg_veh_list)
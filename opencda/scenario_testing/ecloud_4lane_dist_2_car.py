@@ -114,9 +114,4 @@ def run_scenario(opt, config_yaml):
 
         scenario_manager.close(single_cav_list[0])
   
-        for v in bg_veh_list:
-            print("destroying background vehicle")
-            try:
-                v.destroy()
-            except:
-                print("failed to destroy background vehicle")  
+        scenario_manager.destroy_actors(bg_veh_list)
@@ -97,5 +97,4 @@ def run_scenario(opt, config_yaml):
 
         scenario_manager.close(single_cav_list[0])
 
-        for v in bg_veh_list:
-            v.destroy()
+        scenario_manager.destroy_actors(bg_veh_list)
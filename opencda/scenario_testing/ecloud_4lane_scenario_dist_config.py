@@ -28,6 +28,8 @@ from opencda.scenario_testing.utils.yaml_utils import load_yaml
 from opencda.core.common.cav_world import CavWorld
 from opencda.scenario_testing.evaluations.evaluate_manager import \
     EvaluationManager
+from opencda.scenario_testing.evaluations.benchmark import \
+    build_run_report, save_report
 # ONLY *required* for 2 Lane highway scenarios
 # import opencda.scenario_testing.utils.customized_map_api as map_api
 
@@ -38,9 +40,13 @@ LOG_NAME = "ecloud_4lane.log" # data drive from file name?
 SCENARIO_NAME = "ecloud_4lane_scenario" # data drive from file name?
 TOWN = 'Town06'
 STEP_COUNT = 600
+# opencda.py options honored beyond the common ones: --steps, --report, and
+# running a distributed yaml sequentially, as --headless does
+SCENARIO_OPTIONS = ('steps', 'report', 'sequential')
 
 def run_scenario(opt, config_yaml):
     step = 0
+    step_count = opt.steps if getattr(opt, 'steps', None) else STEP_COUNT
     try:
         scenario_params = load_yaml(config_yaml)
 
@@ -76,11 +82,19 @@ def run_scenario(opt, config_yaml):
                 start_recorder(LOG_NAME, True)
 
         
+        # sequential runs can step the vehicles on local worker processes
+        parallel_workers = 0 if run_distributed else \
+            scenario_manager.ecloud_config.get_parallel_workers()
+
         # create single cavs        
         if run_distributed:
             asyncio.get_event_loop().run_until_complete(scenario_manager.run_comms())
             single_cav_list = \
                 scenario_manager.create_distributed_vehicle_manager(application=['single']) 
+        elif parallel_workers > 0:
+            single_cav_list = \
+                scenario_manager.create_parallel_vehicle_manager(application=['single'],
+                                                                 num_workers=parallel_workers)
         else:    
             single_cav_list = \
                 scenario_manager.create_vehicle_manager(application=['single'])
@@ -107,10 +121,14 @@ def run_scenario(opt, config_yaml):
             else:    
                 # non-dist will break automatically; don't need to set flag
                 pre_client_tick_time = time.time()
-                for i, single_cav in enumerate(single_cav_list):
-                    single_cav.update_info()
-                    control = single_cav.run_step()
-                    single_cav.vehicle.apply_control(control)
+                if parallel_workers > 0:
+                    scenario_manager.tick_parallel_vehicles()
+                else:
+                    for i, single_cav in enumerate(single_cav_list):
+                        single_cav.update_info()
+                        control = single_cav.run_step()
+                        single_cav.apply_control(control, scenario_manager.command_batch)
+                    scenario_manager.command_batch.flush()
                 post_client_tick_time = time.time()
                 print("Client tick completion time: %s" %(post_client_tick_time - pre_client_tick_time))
                 if step > 0: # discard the first tick as startup is a major outlier
@@ -130,17 +148,23 @@ def run_scenario(opt, config_yaml):
                     pitch=world_pitch)))   
 
             step = step + 1
-            if step > STEP_COUNT:
+            if step > step_count:
                 if run_distributed:
                     flag = scenario_manager.broadcast_message(ecloud.Command.REQUEST_DEBUG_INFO)
+                elif parallel_workers > 0:
+                    scenario_manager.parallel_executor.collect_debug_info()
                 break             
 
     finally:
         if run_distributed:
             scenario_manager.end() # only dist requires explicit scenario end call
 
-        if step >= STEP_COUNT:
+        if step >= step_count:
             eval_manager.evaluate()
+            if getattr(opt, 'report', None):
+                save_report(build_run_report(scenario_manager.debug_helper,
+                                             len(single_cav_list)),
+                            opt.report)
 
         if opt.record:
             scenario_manager.client.stop_recorder()
@@ -151,9 +175,4 @@ def run_scenario(opt, config_yaml):
             for v in single_cav_list:
                 v.destroy()
 
-        for v in bg_veh_list:
-            print("destroying background vehicle")
-            try:
-                v.destroy()
-            except:
-                print("failed to destroy background vehicle")  
+        scenario_manager.destroy_actors(bg_veh_list)
@@ -151,9 +151,4 @@ def run_scenario(opt, config_yaml):
             for v in single_cav_list:
                 v.destroy()
 
-        for v in bg_veh_list:
-            print("destroying background vehicle")
-            try:
-                v.destroy()
-            except:
-                print("failed to destroy background vehicle")  
+        scenario_manager.destroy_actors(bg_veh_list)
@@ -0,0 +1,182 @@
+# -*- coding: utf-8 -*-
+"""
+Machine readable timing reports of scale benchmark runs and their
+comparison against a baseline.
+"""
+# License: TDG-Attribution-NonCommercial-NoDistrib
+
+import json
+
+import numpy as np
+
+# relative slowdown tolerated before a metric is reported as a regression
+DEFAULT_TOLERANCE = 0.1
+
+
+def summarize(values):
+    """
+    Summary statistics of a list of timings.
+
+    Parameters
+    ----------
+    values : list
+        Timings in ms.
+
+    Returns
+    -------
+    summary : dict
+        count, mean, p50, p95 and max of the timings; all but count are
+        None when there are none.
+    """
+    values = np.asarray(values, dtype=float)
+    if values.size == 0:
+        return {'count': 0, 'mean': None, 'p50': None, 'p95': None,
+                'max': None}
+    return {'count': int(values.size),
+            'mean': float(np.mean(values)),
+            'p50': float(np.percentile(values, 50)),
+            'p95': float(np.percentile(values, 95)),
+            'max': float(np.max(values))}
+
+
+def run_key(run):
+    """
+    The sweep point a run was made at, used to pair runs of two reports.
+    """
+    return run['num_cars'], run['num_processes'], run['perception']
+
+
+def build_run_report(debug_helper, num_cars):
+    """
+    Timing report of one scenario run.
+
+    The first world tick is discarded, as the clients do with theirs, and
+    ticks are paired in order so that the trailing debug data request of
+    distributed runs is left out.
+
+    Parameters
+    ----------
+    debug_helper : opencda.sim_debug_helper.SimDebugHelper
+        The debug helper of the scenario manager after the run.
+
+    num_cars : int
+        Number of simulated vehicles.
+
+    Returns
+    -------
+    report : dict
+        Per tick world, client step and step latency times, summaries of
+        those and of the client process and idle times, and the throughput
+        in vehicle steps per second. The step latency of a tick is its step
+        time less the duration of the last client to reply, so it covers
+        the eCloud round trip of that client rather than the tick fan-out
+        alone.
+    """
+    world_ms = list(debug_helper.world_tick_time_list[0][1:])
+    step_ms = list(debug_helper.client_tick_time_list[0])
+    ticks = min(len(world_ms), len(step_ms))
+    world_ms, step_ms = world_ms[:ticks], step_ms[:ticks]
+    latency_ms = [debug_helper.network_time_dict[tick_id] for tick_id in
+                  sorted(debug_helper.network_time_dict)][:ticks]
+    process_ms = sum(debug_helper.client_process_time_dict.values(), [])
+    idle_ms = sum(debug_helper.idle_time_dict.values(), [])
+
+    tick_time_s = (sum(world_ms) + sum(step_ms)) / 1000
+    throughput = num_cars * ticks / tick_time_s if tick_time_s > 0 else 0.0
+
+    return {'num_cars': num_cars,
+            'ticks': ticks,
+            'throughput': throughput,
+            'world_time_ms': summarize(world_ms),
+            'step_time_ms': summarize(step_ms),
+            'step_latency_ms': summarize(latency_ms),
+            'client_process_time_ms': summarize(process_ms),
+            'idle_time_ms': summarize(idle_ms),
+            'startup_time_ms': debug_helper.startup_time_ms,
+            'per_tick': {'world_time_ms': world_ms,
+                         'step_time_ms': step_ms,
+                         'step_latency_ms': latency_ms}}
+
+
+def save_report(report, path):
+    with open(path, 'w') as f:
+        json.dump(report, f, indent=2)
+
+
+def load_report(path):
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+def compare_reports(baseline, current, tolerance=DEFAULT_TOLERANCE):
+    """
+    Find the scaling regressions of a benchmark report against a baseline.
+
+    A run regresses when its throughput drops, or the p95 of its world
+    time, step time or step latency grows, by more than the tolerance
+    relative to the run of the baseline at the same sweep point. A failed
+    run, which carries an error instead of timings, and a successful
+    baseline run missing from the current report are regressions too.
+
+    Parameters
+    ----------
+    baseline : dict
+        The baseline benchmark report.
+
+    current : dict
+        The benchmark report to check.
+
+    tolerance : float
+        Tolerated relative change.
+
+    Returns
+    -------
+    regressions : list
+        One dict per regressed metric with the sweep point, the metric and
+        the baseline and current values. The metric of a failed run is
+        'error', with the error as current value, and that of a missing run
+        'missing', with None as current value.
+    """
+    baseline_runs = {run_key(run): run for run in baseline['runs']
+                     if 'error' not in run}
+    regressions = []
+
+    current_keys = {run_key(run) for run in current['runs']}
+    for key, base in baseline_runs.items():
+        if key not in current_keys:
+            regressions.append({'run': key,
+                                'metric': 'missing',
+                                'baseline': base['throughput'],
+                                'current': None})
+
+    for run in current['runs']:
+        base = baseline_runs.get(run_key(run))
+        if 'error' in run:
+            regressions.append({'run': run_key(run),
+                                'metric': 'error',
+                                'baseline': None if base is None else base['throughput'],
+                                'current': run['error']})
+            continue
+        if base is None:
+            continue
+
+        if base['throughput'] > 0 and \
+                run['throughput'] < base['throughput'] * (1 - tolerance):
+            regressions.append({'run': run_key(run),
+                                'metric': 'throughput',
+                                'baseline': base['throughput'],
+                                'current': run['throughput']})
+
+        for metric in ['world_time_ms', 'step_time_ms', 'step_latency_ms']:
+            if metric not in base: # baseline written before the metric was added
+                continue
+            before, after = base[metric]['p95'], run[metric]['p95']
+            if before is None or after is None:
+                continue
+            if after > before * (1 + tolerance):
+                regressions.append({'run': run_key(run),
+                                    'metric': metric + '.p95',
+                                    'baseline': before,
+                                    'current': after})
+
+    return regressions
@@ -88,5 +88,4 @@ def run_scenario(opt, config_yaml):
             platoon.destroy()
         for cav in single_cav_list:
             cav.destroy()
-        for v in bg_veh_list:
-            v.destroy()
+        scenario_manager.destroy_actors(bg_veh_list)
@@ -168,5 +168,4 @@ def run_scenario(opt, config_yaml):
         for platoon in platoon_list:
             platoon.destroy()
 
-        for v in bg_veh_list:
-            v.destroy()
+        scenario_manager.destroy_actors(bg_veh_list)
@@ -73,6 +73,5 @@ def run_scenario(opt, config_yaml):
 
         for v in single_cav_list:
             v.destroy()
-        for v in bg_veh_list:
-            v.destroy()
+        scenario_manager.destroy_actors(bg_veh_list)
 
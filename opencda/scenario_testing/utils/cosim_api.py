@@ -159,12 +159,14 @@ class CoScenarioManager(ScenarioManager):
             else:
                 self.sumo.unsubscribe(sumo_actor_id)
 
-        # Destroying sumo arrived actors in carla.
+        # Destroying sumo arrived actors and updating the remaining sumo
+        # actors in carla all go in one command batch.
         for sumo_actor_id in self.sumo.destroyed_actors:
             if sumo_actor_id in self.sumo2carla_ids:
-                self.destroy_actor(self.sumo2carla_ids.pop(sumo_actor_id))
+                self.command_batch.destroy(
+                    self.sumo2carla_ids.pop(sumo_actor_id))
 
-        # Updating sumo actors in carla.
+        first_update = len(self.command_batch)
         for sumo_actor_id in self.sumo2carla_ids:
             carla_actor_id = self.sumo2carla_ids[sumo_actor_id]
 
@@ -173,8 +175,12 @@ class CoScenarioManager(ScenarioManager):
             carla_transform = \
                 BridgeHelper.get_carla_transform(sumo_actor.transform,
                                                  sumo_actor.extent)
-            assert self.synchronize_vehicle(carla_actor_id,
-                                            carla_transform)
+            self.synchronize_vehicle(carla_actor_id, carla_transform,
+                                     self.command_batch)
+
+        # arrived actors may already be gone, but every update must land
+        responses = self.command_batch.flush()
+        assert not any(r.has_error() for r in responses[first_update:])
 
         # -----------------
         # carla-->sumo sync
@@ -285,7 +291,7 @@ class CoScenarioManager(ScenarioManager):
 
         return response.actor_id
 
-    def synchronize_vehicle(self, vehicle_id, transform):
+    def synchronize_vehicle(self, vehicle_id, transform, command_batch=None):
         """
         The key function of co-simulation. Given the updated location in sumo,
         carla will move the corresponding vehicle to the same location.
@@ -298,11 +304,19 @@ class CoScenarioManager(ScenarioManager):
         transform : carla.Transform
             The new vehicle transform.
 
+        command_batch : opencda.core.common.command_batch.CommandBatch
+            If given, the update is queued on the batch and its success is
+            only known from the batch responses.
+
         Returns
         -------
         success : bool
             Whether update is successful.
         """
+        if command_batch is not None:
+            command_batch.apply_transform(vehicle_id, transform)
+            return True
+
         vehicle = self.world.get_actor(vehicle_id)
         if vehicle is None:
             return False
@@ -333,8 +347,7 @@ class CoScenarioManager(ScenarioManager):
 
         # Destroying synchronized actors.
         print('destroying carla actor')
-        for carla_actor_id in self.sumo2carla_ids.values():
-            self.destroy_actor(carla_actor_id)
+        self.destroy_actors(list(self.sumo2carla_ids.values()))
 
         print('destroying sumo actor')
         for sumo_actor_id in self.carla2sumo_ids.values():
@@ -0,0 +1,521 @@
+# -*- coding: utf-8 -*-
+"""
+Local process pool stepping the CAVs of a sequential (non-distributed)
+scenario.
+
+The vehicles are split into contiguous shards of vehicle indices, each owned
+by a worker process with its own carla client. Every tick the scenario
+process publishes the world snapshot in shared memory, the workers step
+their vehicles and send the controls back, and the scenario process applies
+them in vehicle index order, so a run does not depend on the worker count
+or on which worker answers first.
+"""
+# License: TDG-Attribution-NonCommercial-NoDistrib
+
+import logging
+import multiprocessing as mp
+import time
+import traceback
+from types import SimpleNamespace
+
+import carla
+import numpy as np
+
+import ecloud_pb2 as ecloud
+
+from opencda.client_debug_helper import ClientDebugHelper
+from opencda.core.common.cav_world import CavWorld
+from opencda.core.common.ecloud_config import eLocationType
+from opencda.core.common.vehicle_manager import VehicleManager
+from opencda.core.common.world_snapshot import SNAPSHOT_COLUMNS, \
+    WorldActorSnapshot
+from opencda.core.plan.planer_debug_helper import PlanDebugHelper
+from opencda.core.sensing.localization.localization_debug_helper import \
+    LocDebugHelper
+from opencda.scenario_testing.utils.yaml_utils import load_yaml
+
+logger = logging.getLogger(__name__)
+
+cloud_config = load_yaml("cloud_config.yaml")
+CARLA_IP = cloud_config["carla_server_public_ip"]
+
+# worker commands
+SPAWN = 'spawn'
+START = 'start'
+STEP = 'step'
+DEBUG = 'debug'
+CLOSE = 'close'
+
+# time (s) a worker gets to destroy its vehicles before it is terminated
+CLOSE_TIMEOUT_S = 30
+
+# time (s) a worker waits for its carla client to receive a frame
+FRAME_TIMEOUT_S = 10.0
+
+
+class SharedSnapshotBuffer(object):
+    """
+    The vehicle rows of the latest world snapshot in shared memory, written
+    by the process ticking the world and read by local worker processes so
+    the snapshot is not rebuilt from the server by every one of them.
+
+    Parameters
+    ----------
+    capacity : int
+        Maximum number of vehicles.
+
+    name : str
+        Name of an existing buffer to attach to; None creates a new one.
+    """
+
+    # frame and vehicle count
+    HEADER = 2
+
+    def __init__(self, capacity=4096, name=None):
+        # imported here as shared_memory only exists from Python 3.8 on
+        from multiprocessing import shared_memory
+
+        self.capacity = capacity
+        self._owner = name is None
+        size = (self.HEADER + capacity * SNAPSHOT_COLUMNS) * 8
+        self._memory = shared_memory.SharedMemory(name=name,
+                                                  create=self._owner,
+                                                  size=size)
+        self._array = np.ndarray((self.HEADER + capacity * SNAPSHOT_COLUMNS,),
+                                 dtype=np.float64, buffer=self._memory.buf)
+        if self._owner:
+            self._array[:self.HEADER] = [-1, -1]
+
+    @property
+    def name(self):
+        return self._memory.name
+
+    def write(self, world_snapshot):
+        """
+        Publish a snapshot. Readers must be signalled afterwards.
+
+        Returns
+        -------
+        written : bool
+            False if the snapshot has more vehicles than the capacity, in
+            which case readers get no snapshot.
+        """
+        rows = world_snapshot.to_array()
+        if len(rows) > self.capacity:
+            self._array[:self.HEADER] = [world_snapshot.frame, -1]
+            return False
+        self._array[self.HEADER:self.HEADER + rows.size] = rows.ravel()
+        self._array[:self.HEADER] = [world_snapshot.frame, len(rows)]
+        return True
+
+    def read(self, traffic_lights=()):
+        """
+        Rebuild the published snapshot.
+
+        Parameters
+        ----------
+        traffic_lights : list
+            (carla.TrafficLight, carla.Location) pairs of the world.
+
+        Returns
+        -------
+        world_snapshot : WorldActorSnapshot
+            None if nothing was published.
+        """
+        frame, count = int(self._array[0]), int(self._array[1])
+        if count < 0:
+            return None
+        rows = self._array[self.HEADER:self.HEADER + count * SNAPSHOT_COLUMNS]
+        return WorldActorSnapshot.from_array(
+            frame, rows.reshape(count, SNAPSHOT_COLUMNS).copy(), traffic_lights)
+
+    def close(self):
+        self._array = None
+        self._memory.close()
+        if self._owner:
+            self._memory.unlink()
+
+
+def shard_indices(vehicle_count, num_workers):
+    """
+    Split the vehicle indices into contiguous shards of near equal size.
+
+    Parameters
+    ----------
+    vehicle_count : int
+        Number of vehicles.
+
+    num_workers : int
+        Number of worker processes.
+
+    Returns
+    -------
+    shards : list
+        One list of vehicle indices per worker; empty shards are dropped.
+    """
+    shards = []
+    start = 0
+    for worker_id in range(num_workers):
+        size = vehicle_count // num_workers + \
+            (1 if worker_id < vehicle_count % num_workers else 0)
+        if size > 0:
+            shards.append(list(range(start, start + size)))
+        start += size
+    return shards
+
+
+def pack_control(control):
+    """
+    carla.VehicleControl as a picklable tuple; None stays None.
+    """
+    if control is None:
+        return None
+    return (control.throttle, control.steer, control.brake,
+            control.hand_brake, control.reverse, control.manual_gear_shift,
+            control.gear)
+
+
+def unpack_control(packed):
+    if packed is None:
+        return None
+    throttle, steer, brake, hand_brake, reverse, manual_gear_shift, gear = \
+        packed
+    return carla.VehicleControl(throttle=throttle, steer=steer, brake=brake,
+                                hand_brake=hand_brake, reverse=reverse,
+                                manual_gear_shift=manual_gear_shift,
+                                gear=gear)
+
+
+def wait_for_frame(world, frame, timeout=FRAME_TIMEOUT_S):
+    """
+    Block until a client that does not tick the world itself has received
+    a frame, so its actor queries see the same state as the ticking process.
+
+    Parameters
+    ----------
+    world : carla.World
+        The world of the waiting client.
+
+    frame : int
+        The frame to wait for.
+
+    timeout : float
+        Seconds to wait before giving up.
+    """
+    deadline = time.time() + timeout
+    # the tick may arrive between the frame check and wait_for_tick, so wait
+    # in short slices rather than for one tick
+    while world.get_snapshot().frame < frame:
+        remaining = deadline - time.time()
+        if remaining <= 0:
+            raise RuntimeError("timed out waiting for frame %s" % frame)
+        try:
+            world.wait_for_tick(min(remaining, 0.1))
+        except RuntimeError:
+            pass
+
+
+def serialize_debug_info(vehicle_manager):
+    """
+    The debug data of a vehicle as a serialized ecloud.VehicleUpdate.
+    """
+    vehicle_update = ecloud.VehicleUpdate()
+    vehicle_update.vehicle_index = vehicle_manager.vehicle_index
+    vehicle_manager.agent.debug_helper.serialize_debug_info(
+        vehicle_update.planer_debug_helper)
+    vehicle_manager.localizer.debug_helper.serialize_debug_info(
+        vehicle_update.loc_debug_helper)
+    vehicle_manager.debug_helper.serialize_debug_info(
+        vehicle_update.client_debug_helper)
+    return vehicle_update.SerializeToString()
+
+
+def _worker_main(conn, vehicle_indices, scenario_params, application,
+                 location_type, apply_ml, snapshot_name, snapshot_capacity):
+    """
+    Worker process loop: owns the vehicle managers of one shard and answers
+    the commands of the ParallelVehicleExecutor until told to close.
+    """
+    client = carla.Client(CARLA_IP, scenario_params['world']['client_port'])
+    client.set_timeout(10.0)
+    world = client.get_world()
+    carla_map = world.get_map()
+    cav_world = CavWorld(apply_ml)
+    snapshot_buffer = SharedSnapshotBuffer(snapshot_capacity,
+                                           name=snapshot_name)
+    # traffic lights never move, so they are not part of the shared snapshot
+    traffic_lights = \
+        [(tl, tl.get_location()) for tl in
+         world.get_actors().filter('traffic.traffic_light*')]
+    vehicle_managers = []
+
+    try:
+        while True:
+            command = conn.recv()
+            if isinstance(command, tuple):
+                command, frame = command
+
+            if command == SPAWN:
+                for vehicle_index in vehicle_indices:
+                    vehicle_manager = VehicleManager(
+                        vehicle_index=vehicle_index, carla_world=world,
+                        config_yaml=scenario_params, application=application,
+                        carla_map=carla_map, cav_world=cav_world,
+                        current_time=scenario_params['current_time'],
+                        location_type=location_type,
+                        perception_active=apply_ml)
+                    vehicle_manager.v2x_manager.set_platoon(None)
+                    vehicle_managers.append(vehicle_manager)
+                conn.send((True, [(vm.vehicle_index, vm.vehicle.id, vm.vid)
+                                  for vm in vehicle_managers]))
+
+            elif command == START:
+                for vehicle_manager in vehicle_managers:
+                    vehicle_manager.update_info()
+                    vehicle_manager.set_destination(
+                        vehicle_manager.vehicle.get_location(),
+                        vehicle_manager.destination_location,
+                        clean=True)
+                conn.send((True, None))
+
+            elif command == STEP:
+                # the vehicles still query their own client, e.g. for the
+                # ego transform, so it must have caught up with the frame
+                wait_for_frame(world, frame)
+                world_snapshot = snapshot_buffer.read(traffic_lights)
+                if world_snapshot is not None:
+                    cav_world.set_world_snapshot(world_snapshot)
+                controls = []
+                for vehicle_manager in vehicle_managers:
+                    vehicle_manager.update_info()
+                    controls.append(pack_control(vehicle_manager.run_step()))
+                conn.send((True, controls))
+
+            elif command == DEBUG:
+                conn.send((True, [serialize_debug_info(vm)
+                                  for vm in vehicle_managers]))
+
+            elif command == CLOSE:
+                break
+
+    except Exception:
+        conn.send((False, traceback.format_exc()))
+
+    finally:
+        for vehicle_manager in vehicle_managers:
+            try:
+                vehicle_manager.destroy()
+            except RuntimeError:
+                logger.error("failed to destroy vehicle %s",
+                             vehicle_manager.vehicle_index)
+        snapshot_buffer.close()
+        conn.close()
+
+
+class ParallelVehicle(object):
+    """
+    Stand-in for a VehicleManager owned by a worker process. It holds the
+    vehicle actor, for spectating and evaluation, and the debug helpers
+    filled from the worker by ParallelVehicleExecutor.collect_debug_info.
+
+    Parameters
+    ----------
+    vehicle_index : int
+        The index of the vehicle in the scenario.
+
+    vid : str
+        The uuid of the worker's VehicleManager.
+
+    vehicle : carla.Vehicle
+        The vehicle actor.
+
+    cav_config : dict
+        The yaml configuration of the vehicle.
+    """
+
+    def __init__(self, vehicle_index, vid, vehicle, cav_config):
+        self.vehicle_index = vehicle_index
+        self.vid = vid
+        self.vehicle = vehicle
+
+        self.localizer = SimpleNamespace(debug_helper=LocDebugHelper(
+            cav_config['sensing']['localization']['debug_helper'],
+            vehicle.id))
+        self.agent = SimpleNamespace(debug_helper=PlanDebugHelper(vehicle.id))
+        self.debug_helper = ClientDebugHelper(0)
+
+    def merge_debug_info(self, vehicle_update):
+        self.localizer.debug_helper.deserialize_debug_info(
+            vehicle_update.loc_debug_helper)
+        self.agent.debug_helper.deserialize_debug_info(
+            vehicle_update.planer_debug_helper)
+        self.debug_helper.deserialize_debug_info(
+            vehicle_update.client_debug_helper)
+
+    def destroy(self):
+        # the worker process owns the vehicle and destroys it on close
+        pass
+
+
+class ParallelVehicleExecutor(object):
+    """
+    Steps the single CAVs of a sequential scenario on a pool of local worker
+    processes.
+
+    Parameters
+    ----------
+    scenario_params : dict
+        The scenario configuration.
+
+    application : list
+        The application purpose, e.g. ['single'].
+
+    vehicle_count : int
+        Number of vehicles.
+
+    num_workers : int
+        Number of worker processes.
+
+    location_type : eLocationType
+        How the vehicles' spawn and destination locations are chosen.
+
+    apply_ml : bool
+        Whether the vehicles run perception models.
+
+    snapshot_capacity : int
+        Maximum number of vehicles in the shared world snapshot. Workers
+        fall back to querying the server in larger worlds.
+    """
+
+    def __init__(self, scenario_params, application, vehicle_count,
+                 num_workers, location_type=eLocationType.EXPLICIT,
+                 apply_ml=False, snapshot_capacity=4096):
+        self.scenario_params = scenario_params
+        self.location_type = location_type
+        self.shards = shard_indices(vehicle_count, num_workers)
+        self.snapshot_buffer = SharedSnapshotBuffer(snapshot_capacity)
+        self.vehicles = []
+
+        # spawn rather than fork: the parent holds a carla client and grpc
+        # channels that must not be shared with the workers
+        context = mp.get_context('spawn')
+        self._connections = []
+        self._workers = []
+        for vehicle_indices in self.shards:
+            parent_conn, child_conn = context.Pipe()
+            worker = context.Process(
+                target=_worker_main,
+                args=(child_conn, vehicle_indices, scenario_params,
+                      application, location_type, apply_ml,
+                      self.snapshot_buffer.name, snapshot_capacity),
+                daemon=True)
+            worker.start()
+            child_conn.close()
+            self._connections.append(parent_conn)
+            self._workers.append(worker)
+
+        logger.info("stepping %s vehicles on %s worker processes",
+                    vehicle_count, len(self._workers))
+
+    def _broadcast(self, command):
+        """
+        Send a command to every worker and gather the replies in worker
+        order.
+        """
+        for conn in self._connections:
+            conn.send(command)
+
+        replies = []
+        for worker_id, conn in enumerate(self._connections):
+            try:
+                ok, reply = conn.recv()
+            except EOFError:
+                raise RuntimeError("vehicle worker %s exited unexpectedly"
+                                   % worker_id)
+            if not ok:
+                raise RuntimeError("vehicle worker %s failed:\n%s"
+                                   % (worker_id, reply))
+            replies.append(reply)
+        return replies
+
+    def spawn(self, world):
+        """
+        Spawn the vehicles in the workers.
+
+        Parameters
+        ----------
+        world : carla.World
+            The world of the scenario process, used to look up the actors.
+
+        Returns
+        -------
+        vehicles : list
+            ParallelVehicle for every vehicle, in vehicle index order.
+        """
+        for reply in self._broadcast(SPAWN):
+            for vehicle_index, actor_id, vid in reply:
+                cav_config = self.scenario_params['scenario'][
+                    'single_cav_list'][
+                    vehicle_index if self.location_type ==
+                    eLocationType.EXPLICIT else 0]
+                self.vehicles.append(
+                    ParallelVehicle(vehicle_index, vid,
+                                    world.get_actor(actor_id), cav_config))
+        return self.vehicles
+
+    def start(self):
+        """
+        Localize the spawned vehicles and plan their routes. The world must
+        have been ticked since spawn.
+        """
+        self._broadcast(START)
+
+    def step(self, world_snapshot):
+        """
+        Step every vehicle for the current frame.
+
+        Parameters
+        ----------
+        world_snapshot : WorldActorSnapshot
+            The snapshot of the current frame.
+
+        Returns
+        -------
+        controls : list
+            carla.VehicleControl, or None, for every vehicle in vehicle
+            index order.
+        """
+        self.snapshot_buffer.write(world_snapshot)
+        return [unpack_control(packed) for reply in
+                self._broadcast((STEP, world_snapshot.frame))
+                for packed in reply]
+
+    def collect_debug_info(self):
+        """
+        Copy the debug data of the workers' vehicles into the
+        ParallelVehicle stand-ins.
+        """
+        updates = [update for reply in self._broadcast(DEBUG)
+                   for update in reply]
+        for vehicle, serialized in zip(self.vehicles, updates):
+            vehicle_update = ecloud.VehicleUpdate()
+            vehicle_update.ParseFromString(serialized)
+            vehicle.merge_debug_info(vehicle_update)
+
+    def close(self):
+        """
+        Stop the workers, which destroy their vehicles.
+        """
+        for conn in self._connections:
+            try:
+                conn.send(CLOSE)
+            except (BrokenPipeError, OSError):
+                pass
+        for worker in self._workers:
+            worker.join(CLOSE_TIMEOUT_S)
+            if worker.is_alive():
+                logger.warning("terminating vehicle worker %s", worker.pid)
+                worker.terminate()
+        for conn in self._connections:
+            conn.close()
+        self.snapshot_buffer.close()
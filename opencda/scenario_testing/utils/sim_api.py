@@ -52,6 +52,7 @@ from opencda.core.common.vehicle_manager import VehicleManager
 from opencda.core.application.platooning.platooning_manager import \
     PlatooningManager
 from opencda.core.common.cav_world import CavWorld
+from opencda.core.common.command_batch import CommandBatch
 from opencda.scenario_testing.utils.customized_map_api import \
     load_customized_world, bcolors
 from opencda.core.application.edge.edge_manager import \
@@ -64,6 +65,7 @@ import opencda.core.plan.drive_profile_plotting as open_plt
 # TODO: make base ecloud folder
 from opencda.core.common.ecloud_config import EcloudConfig
 from opencda.ecloud_server.ecloud_comms import EcloudClient, EcloudPushServer, ecloud_run_push_server
+from opencda.ecloud_server.packed_state import unpack_vehicle_states
 
 logger = logging.getLogger(__name__)
 coloredlogs.install(level='DEBUG', logger=logger)
@@ -212,25 +214,45 @@ class ScenarioManager:
     debug_helper = SimDebugHelper(0)
     sm_start_tstamp = Timestamp()
     SPECTATOR_INDEX = 0
+    debug_chunk_ids = {} # vehicle_index -> id of the last merged incremental debug chunk
+
+    def server_merge_debug_info(self, vehicle_update):
+        """
+        Apply a vehicle's uploaded debug info to its proxy. Full uploads
+        replace what the proxy holds; incremental chunks are appended.
+        """
+        vehicle_index = vehicle_update.vehicle_index
+        append = vehicle_update.debug_chunk_id > 0
+        if append:
+            last_chunk_id = self.debug_chunk_ids.get(vehicle_index, 0)
+            if vehicle_update.debug_chunk_id <= last_chunk_id:
+                logger.warning("dropping duplicate debug chunk %s from vehicle %s", vehicle_update.debug_chunk_id, vehicle_index)
+                return
+            if vehicle_update.debug_chunk_id != last_chunk_id + 1:
+                logger.warning("vehicle %s debug chunks %s-%s were lost", vehicle_index, last_chunk_id + 1, vehicle_update.debug_chunk_id - 1)
+            self.debug_chunk_ids[vehicle_index] = vehicle_update.debug_chunk_id
+
+        vehicle_manager_proxy = self.vehicle_managers[ vehicle_index ]
+        vehicle_manager_proxy.localizer.debug_helper.deserialize_debug_info( vehicle_update.loc_debug_helper, append )
+        vehicle_manager_proxy.agent.debug_helper.deserialize_debug_info( vehicle_update.planer_debug_helper, append )
+        vehicle_manager_proxy.debug_helper.deserialize_debug_info( vehicle_update.client_debug_helper, append )
 
     async def server_unpack_debug_data(self, stub_):
         logger.info("fetching vehicle updates")
         vehicle_updates_list = []
-        while True:
-            ecloud_update = await stub_.Server_GetVehicleUpdates(ecloud.Empty())
-            if len(ecloud_update.vehicle_update) == 0:
-                break
-            for v in ecloud_update.vehicle_update:
-                u = ecloud.VehicleUpdate()
-                u.CopyFrom(v)
-                vehicle_updates_list.append(u)
-            await asyncio.sleep(0.1)
-        #logger.debug("%s", ecloud_update)
+        # server drains every pending update in one call - one streamed message per vehicle
+        async for vehicle_update in stub_.Server_StreamVehicleUpdates(ecloud.Empty()):
+            vehicle_updates_list.append(vehicle_update)
+        logger.info("received %s vehicle updates", len(vehicle_updates_list))
+
+        # vehicles that streamed incremental chunks may have finished (and been drained) long before now
+        debug_vehicle_indices = set(self.debug_chunk_ids.keys())
         for vehicle_update in vehicle_updates_list:
-            vehicle_manager_proxy = self.vehicle_managers[ vehicle_update.vehicle_index ]
-            vehicle_manager_proxy.localizer.debug_helper.deserialize_debug_info( vehicle_update.loc_debug_helper )
-            vehicle_manager_proxy.agent.debug_helper.deserialize_debug_info( vehicle_update.planer_debug_helper )
-            vehicle_manager_proxy.debug_helper.deserialize_debug_info(vehicle_update.client_debug_helper)
+            self.server_merge_debug_info(vehicle_update)
+            debug_vehicle_indices.add(vehicle_update.vehicle_index)
+
+        for vehicle_index in sorted(debug_vehicle_indices):
+            vehicle_manager_proxy = self.vehicle_managers[ vehicle_index ]
 
             latencies_by_tick = self.debug_helper.network_time_dict
             overall_steps_by_tick = self.debug_helper.client_tick_time_dict
@@ -247,6 +269,11 @@ class ScenarioManager:
                     logger.info('idle time: %sms', round(idle_time_ms, 2))
                     self.debug_helper.update_idle_time_timestamp(vehicle_manager_proxy.vehicle_index, idle_time_ms) # this inferred
                     self.debug_helper.update_client_process_time_timestamp(vehicle_manager_proxy.vehicle_index, client_process_time_ms) # how long client actually was active
+                    if timestamps.HasField('worker_end_tstamp'):
+                        # a worker hosting several vehicles steps them one after the other
+                        worker_time_ms = (timestamps.worker_end_tstamp.ToNanoseconds() - timestamps.worker_start_tstamp.ToNanoseconds()) * NSEC_TO_MSEC
+                        logger.info('worker time: %sms', round(worker_time_ms, 2))
+                        self.debug_helper.update_worker_time_timestamp(vehicle_manager_proxy.vehicle_index, worker_time_ms)
 
                     # dupe the data since it makes evaluation simpler
                     self.debug_helper.update_network_time_per_client_timestamp(vehicle_manager_proxy.vehicle_index, latencies_by_tick[timestamps.tick_id])
@@ -258,6 +285,13 @@ class ScenarioManager:
         logger.debug("getting vehicle updates")
         ecloud_update = await stub_.Server_GetVehicleUpdates(ecloud.Empty())
         logger.debug("unpacking vehicle updates")
+        if len(ecloud_update.packed_states) > 0:
+            self.server_unpack_packed_states(ecloud_update.packed_states)
+
+        for vehicle_update in ecloud_update.vehicle_update:
+            if vehicle_update.debug_chunk_id > 0:
+                self.server_merge_debug_info(vehicle_update)
+
         try:
             for vehicle_update in ecloud_update.vehicle_update:
                 if not vehicle_update.HasField('transform') or not vehicle_update.HasField('velocity'):
@@ -288,6 +322,19 @@ class ScenarioManager:
             raise
         logger.debug("vehicle updates unpacked")
 
+    def server_unpack_packed_states(self, packed_states):
+        states = unpack_vehicle_states(packed_states)
+        if not self.is_edge:
+            states = states[states['vehicle_index'] == ScenarioManager.SPECTATOR_INDEX]
+
+        for vehicle_index, x, y, z, roll, pitch, yaw, vx, vy, vz in states.tolist():
+            vehicle_manager_proxy = self.vehicle_managers[vehicle_index]
+            if hasattr( vehicle_manager_proxy.vehicle, 'is_proxy' ):
+                vehicle_manager_proxy.vehicle.set_velocity(carla.Vector3D(x=vx, y=vy, z=vz))
+                vehicle_manager_proxy.vehicle.set_transform(carla.Transform(
+                    carla.Location(x=x, y=y, z=z),
+                    carla.Rotation(yaw=yaw, roll=roll, pitch=pitch)))
+
     async def server_push_waypoints(self, stub_, wps_):
         empty = await stub_.Server_PushEdgeWaypoints(wps_)
 
@@ -304,14 +351,16 @@ class ScenarioManager:
         # the first tick time is dramatically slower due to startup, so we don't want it to skew runtime data
         if self.tick_id == 1:
             self.debug_helper.startup_time_ms = ( snapshot_t - self.sm_start_tstamp.ToNanoseconds() ) * NSEC_TO_MSEC
-            return empty
-
-        overall_step_time_ms = ( snapshot_t - self.sm_start_tstamp.ToNanoseconds() ) * NSEC_TO_MSEC # barrier sync means this is the same for ALL vehicles per tick
-        step_latency_ms = overall_step_time_ms - ( tick.last_client_duration_ns * NSEC_TO_MSEC ) # we care about the worst case per tick - how much did we affect the final vehicle to report. This captures both delay in getting that vehicle started and in it reporting its completion
-        logger.info("timestamps: overall_step_time_ms - %sms | step_latency_ms - %sms", round(overall_step_time_ms, 2), round(step_latency_ms, 2))
-        self.debug_helper.update_network_time_timestamp(tick.tick_id, step_latency_ms) # same for all vehicles *per tick*
-        self.debug_helper.update_overall_step_time_timestamp(tick.tick_id, overall_step_time_ms)
 
+        else:
+            overall_step_time_ms = ( snapshot_t - self.sm_start_tstamp.ToNanoseconds() ) * NSEC_TO_MSEC # barrier sync means this is the same for ALL vehicles per tick
+            step_latency_ms = overall_step_time_ms - ( tick.last_client_duration_ns * NSEC_TO_MSEC ) # we care about the worst case per tick - how much did we affect the final vehicle to report. This captures both delay in getting that vehicle started and in it reporting its completion
+            logger.info("timestamps: overall_step_time_ms - %sms | step_latency_ms - %sms", round(overall_step_time_ms, 2), round(step_latency_ms, 2))
+            self.debug_helper.update_network_time_timestamp(tick.tick_id, step_latency_ms) # same for all vehicles *per tick*
+            self.debug_helper.update_overall_step_time_timestamp(tick.tick_id, overall_step_time_ms)
+
+        # the server keeps only the latest update of each vehicle, so even the startup tick is drained;
+        # otherwise a debug chunk or TICK_DONE sent on it is overwritten by the next tick
         if update_.command == ecloud.Command.REQUEST_DEBUG_INFO:
             await self.server_unpack_debug_data(stub_)
 
@@ -428,6 +477,9 @@ class ScenarioManager:
         self.cav_world = cav_world
         self.carla_map = self.world.get_map()
         self.apply_ml = apply_ml
+        self.parallel_executor = None
+        # controls, spawns and destroys of many actors go in one round trip
+        self.command_batch = CommandBatch(self.client)
 
         # eCLOUD BEGIN
 
@@ -569,6 +621,58 @@ class ScenarioManager:
 
         return single_cav_list
 
+    def create_parallel_vehicle_manager(self, application, num_workers):
+        """
+        Create a list of single CAVs stepped on local worker processes.
+
+        Parameters
+        ----------
+        application : list
+            The application purpose, only ['single'] is supported since
+            platoon and edge members coordinate across vehicles.
+        num_workers : int
+            Number of worker processes.
+        Returns
+        -------
+        single_cav_list : list
+            A list contains a ParallelVehicle for every CAV.
+        """
+        assert application == ['single'], "parallel workers only run single CAVs"
+        if getattr(carla, '__headless__', False):
+            sys.exit('ERROR: the headless world cannot be shared with worker processes')
+
+        # imported here so sequential runs without workers do not need
+        # multiprocessing.shared_memory, which only exists from Python 3.8 on
+        from opencda.scenario_testing.utils.parallel_executor import \
+            ParallelVehicleExecutor
+
+        logger.info('Creating single CAVs on %s worker processes.', num_workers)
+        self.parallel_executor = ParallelVehicleExecutor(
+            self.scenario_params, application, self.vehicle_count, num_workers,
+            location_type=self.ecloud_config.get_location_type(),
+            apply_ml=self.apply_ml)
+
+        single_cav_list = self.parallel_executor.spawn(self.world)
+        self.world.tick()
+        self.parallel_executor.start()
+
+        for vehicle in single_cav_list:
+            self.cav_world.update_vehicle_manager(vehicle)
+
+        return single_cav_list
+
+    def tick_parallel_vehicles(self):
+        """
+        Step the CAVs created by create_parallel_vehicle_manager for the
+        current frame and apply their controls in vehicle index order.
+        """
+        world_snapshot = self.cav_world.get_world_snapshot(self.world)
+        controls = self.parallel_executor.step(world_snapshot)
+        for vehicle, control in zip(self.parallel_executor.vehicles, controls):
+            if control is not None:
+                self.command_batch.apply_control(vehicle.vehicle, control)
+        self.command_batch.flush()
+
     def create_platoon_manager(self, map_helper=None, data_dump=False):
         """
         Create a list of platoons.
@@ -602,7 +706,8 @@ class ScenarioManager:
         # create platoons
         for i, platoon in enumerate(
                 self.scenario_params['scenario']['platoon_list']):
-            platoon_manager = PlatooningManager(platoon, self.cav_world)
+            platoon_manager = PlatooningManager(platoon, self.cav_world,
+                                                command_batch=CommandBatch(self.client))
             for j, cav in enumerate(platoon['members']):
                 if 'spawn_special' not in cav:
                     spawn_transform = carla.Transform(
@@ -647,6 +752,38 @@ class ScenarioManager:
 
         return platoon_list
 
+    def get_spawned_actors(self, responses):
+        """
+        Look up the actors spawned by a command batch in one request.
+
+        Parameters
+        ----------
+        responses : list
+            The responses of CommandBatch.flush.
+
+        Returns
+        -------
+        actors : dict
+            The spawned actors keyed by actor id; failed spawns are left out.
+        """
+        actor_ids = [r.actor_id for r in responses if not r.has_error()]
+        return {actor.id: actor for actor in self.world.get_actors(actor_ids)}
+
+    def destroy_actors(self, actors):
+        """
+        Destroy actors, e.g. the background traffic, in one batch.
+
+        Parameters
+        ----------
+        actors : list
+            The carla actors.
+        """
+        for actor in actors:
+            self.command_batch.destroy(actor)
+        failed = [r for r in self.command_batch.flush() if r.has_error()]
+        if failed:
+            logger.error("failed to destroy %s of %s actors", len(failed), len(actors))
+
     def spawn_vehicles_by_list(self, tm, traffic_config, bg_list):
         """
         Spawn the traffic vehicles by the given list.
@@ -677,6 +814,7 @@ class ScenarioManager:
             if self.carla_version == '0.9.11' else 'vehicle.lincoln.mkz_2017'
         ego_vehicle_bp = blueprint_library.find(default_model)
 
+        # spawn every vehicle and hand it to the traffic manager in one batch
         for i, vehicle_config in enumerate(traffic_config['vehicle_list']):
             spawn_transform = carla.Transform(
                 carla.Location(
@@ -698,8 +836,17 @@ class ScenarioManager:
                     ego_vehicle_bp.get_attribute('color').recommended_values)
                 ego_vehicle_bp.set_attribute('color', color)
 
-            vehicle = self.world.spawn_actor(ego_vehicle_bp, spawn_transform)
-            vehicle.set_autopilot(True, 8000)
+            self.command_batch.spawn(ego_vehicle_bp, spawn_transform,
+                                     autopilot=True, tm_port=8000)
+
+        responses = self.command_batch.flush()
+        vehicles = self.get_spawned_actors(responses)
+
+        for vehicle_config, response in zip(traffic_config['vehicle_list'],
+                                            responses):
+            if response.has_error():
+                continue
+            vehicle = vehicles[response.actor_id]
 
             if 'vehicle_speed_perc' in vehicle_config:
                 tm.vehicle_percentage_speed_difference(
@@ -742,6 +889,7 @@ class ScenarioManager:
         spawn_ranges = traffic_config['range']
         spawn_set = set()
         spawn_num = 0
+        grid_points = []
 
         for spawn_range in spawn_ranges:
             spawn_num += spawn_range[6]
@@ -751,65 +899,70 @@ class ScenarioManager:
 
             for x in range(x_min, x_max, int(spawn_range[4])):
                 for y in range(y_min, y_max, int(spawn_range[5])):
-                    location = carla.Location(x=x, y=y, z=0.3)
-                    way_point = self.carla_map.get_waypoint(location).transform
-
-                    spawn_set.add((way_point.location.x,
-                                   way_point.location.y,
-                                   way_point.location.z,
-                                   way_point.rotation.roll,
-                                   way_point.rotation.yaw,
-                                   way_point.rotation.pitch))
+                    grid_points.append((x, y, 0.3))
+
+        # project every grid point onto its lane in one batch
+        if grid_points:
+            lane_index = self.cav_world.get_lane_index(self.carla_map)
+            indices, locations, _ = lane_index.project_array(grid_points)
+            for i, (x, y, z) in zip(indices, locations):
+                spawn_set.add((x, y, z,
+                               lane_index.rolls[i],
+                               lane_index.yaws[i],
+                               lane_index.pitches[i]))
         count = 0
         spawn_list = list(spawn_set)
         shuffle(spawn_list)
 
-        while count < spawn_num:
-            if len(spawn_list) == 0:
-                break
-
-            coordinates = spawn_list[0]
-            spawn_list.pop(0)
-
-            spawn_transform = carla.Transform(carla.Location(x=coordinates[0],
-                                                             y=coordinates[1],
-                                                             z=coordinates[
-                                                                   2] + 0.3),
-                                              carla.Rotation(
-                                                  roll=coordinates[3],
-                                                  yaw=coordinates[4],
-                                                  pitch=coordinates[5]))
-            if not traffic_config['random']:
-                ego_vehicle_bp.set_attribute('color', '0, 255, 0')
+        # spawn as many vehicles as are still missing in one batch per round;
+        # occupied spawn points fail and are replaced in the next round
+        while count < spawn_num and spawn_list:
+            spawn_round = spawn_list[:spawn_num - count]
+            spawn_list = spawn_list[spawn_num - count:]
+
+            for coordinates in spawn_round:
+                spawn_transform = carla.Transform(
+                    carla.Location(x=coordinates[0],
+                                   y=coordinates[1],
+                                   z=coordinates[2] + 0.3),
+                    carla.Rotation(roll=coordinates[3],
+                                   yaw=coordinates[4],
+                                   pitch=coordinates[5]))
+                if not traffic_config['random']:
+                    ego_vehicle_bp.set_attribute('color', '0, 255, 0')
 
-            else:
-                ego_vehicle_bp = random.choice(ego_vehicle_random_list)
+                else:
+                    ego_vehicle_bp = random.choice(ego_vehicle_random_list)
 
-                color = random.choice(
-                    ego_vehicle_bp.get_attribute('color').recommended_values)
-                ego_vehicle_bp.set_attribute('color', color)
+                    color = random.choice(
+                        ego_vehicle_bp.get_attribute('color').recommended_values)
+                    ego_vehicle_bp.set_attribute('color', color)
 
-            vehicle = \
-                self.world.try_spawn_actor(ego_vehicle_bp, spawn_transform)
+                self.command_batch.spawn(ego_vehicle_bp, spawn_transform,
+                                         autopilot=True, tm_port=8000)
 
-            if not vehicle:
-                continue
+            responses = self.command_batch.flush(log_level=logging.DEBUG)
+            vehicles = self.get_spawned_actors(responses)
 
-            vehicle.set_autopilot(True, 8000)
-            tm.auto_lane_change(vehicle, traffic_config['auto_lane_change'])
+            for response in responses:
+                if response.has_error():
+                    continue
+                vehicle = vehicles[response.actor_id]
 
-            if 'ignore_lights_percentage' in traffic_config:
-                tm.ignore_lights_percentage(vehicle,
-                                            traffic_config[
-                                                'ignore_lights_percentage'])
+                tm.auto_lane_change(vehicle, traffic_config['auto_lane_change'])
 
-            # each vehicle have slight different speed
-            tm.vehicle_percentage_speed_difference(
-                vehicle,
-                traffic_config['global_speed_perc'] + random.randint(-30, 30))
+                if 'ignore_lights_percentage' in traffic_config:
+                    tm.ignore_lights_percentage(vehicle,
+                                                traffic_config[
+                                                    'ignore_lights_percentage'])
 
-            bg_list.append(vehicle)
-            count += 1
+                # each vehicle have slight different speed
+                tm.vehicle_percentage_speed_difference(
+                    vehicle,
+                    traffic_config['global_speed_perc'] + random.randint(-30, 30))
+
+                bg_list.append(vehicle)
+                count += 1
 
         return bg_list
 
@@ -853,6 +1006,9 @@ class ScenarioManager:
         """
         Simulation close.
         """
+        if self.parallel_executor is not None:
+            self.parallel_executor.close()
+
         # restore to origin setting
         if self.run_distributed:
             if spectator != None:
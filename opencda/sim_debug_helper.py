@@ -40,6 +40,7 @@ class SimDebugHelper(PlanDebugHelper):
         self.client_tick_time_dict_per_client = {}   
         self.idle_time_dict = {}
         self.client_process_time_dict = {}    
+        self.worker_time_dict = {}
 
     def update_world_tick(self, tick_time_step=None):
         self.world_tick_time_list[0].append(tick_time_step)
@@ -75,4 +76,9 @@ class SimDebugHelper(PlanDebugHelper):
         if vehicle_index not in self.client_process_time_dict:
           self.client_process_time_dict[vehicle_index] = []
         self.client_process_time_dict[vehicle_index].append(time_step)
+
+    def update_worker_time_timestamp(self, vehicle_index, time_step=None):
+        if vehicle_index not in self.worker_time_dict:
+          self.worker_time_dict[vehicle_index] = []
+        self.worker_time_dict[vehicle_index].append(time_step)
         
\ No newline at end of file
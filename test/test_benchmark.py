@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+"""
+Unit test for the benchmark reports.
+"""
+# License: MIT
+
+import os
+import sys
+import unittest
+
+# temporary solution for relative imports in case opencda is not installed
+# if opencda is installed, no need to use the following line
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from opencda.sim_debug_helper import SimDebugHelper
+from opencda.scenario_testing.evaluations.benchmark import \
+    build_run_report, compare_reports, summarize
+
+
+class TestBenchmark(unittest.TestCase):
+    def setUp(self):
+        self.debug_helper = SimDebugHelper(0)
+        # the first world tick is a startup outlier
+        for world_ms in [500.0, 10.0, 10.0, 10.0, 10.0]:
+            self.debug_helper.update_world_tick(world_ms)
+        # the last client tick is the debug data request
+        for step_ms in [40.0, 40.0, 40.0, 40.0, 900.0]:
+            self.debug_helper.update_client_tick(step_ms)
+        for tick_id in range(2, 7):
+            self.debug_helper.update_network_time_timestamp(tick_id, 5.0)
+        for vehicle_index in range(2):
+            for _ in range(4):
+                self.debug_helper.update_client_process_time_timestamp(
+                    vehicle_index, 30.0)
+                self.debug_helper.update_idle_time_timestamp(vehicle_index,
+                                                             5.0)
+
+    def run_report(self, num_cars=2, num_processes=2, throughput=None):
+        report = build_run_report(self.debug_helper, num_cars)
+        report.update(num_processes=num_processes, perception=False)
+        if throughput is not None:
+            report['throughput'] = throughput
+        return report
+
+    def test_summarize(self):
+        summary = summarize([1.0, 2.0, 3.0, 4.0])
+        assert summary['count'] == 4
+        assert summary['mean'] == 2.5
+        assert summary['max'] == 4.0
+        assert summarize([])['p95'] is None
+
+    def test_run_report(self):
+        report = self.run_report()
+        assert report['ticks'] == 4
+        assert report['per_tick']['world_time_ms'] == [10.0] * 4
+        assert report['per_tick']['step_time_ms'] == [40.0] * 4
+        assert report['step_latency_ms']['count'] == 4
+        assert report['client_process_time_ms']['count'] == 8
+        # 2 vehicles * 4 ticks in 4 * 50ms
+        self.assertAlmostEqual(report['throughput'], 40.0)
+
+    def test_compare(self):
+        baseline = {'runs': [self.run_report()]}
+        assert compare_reports(baseline, baseline) == []
+
+        slower = {'runs': [self.run_report(throughput=30.0),
+                           self.run_report(num_cars=4, num_processes=4)]}
+        regressions = compare_reports(baseline, slower)
+        assert len(regressions) == 1
+        assert regressions[0]['metric'] == 'throughput'
+        assert regressions[0]['run'] == (2, 2, False)
+
+    def test_compare_latency(self):
+        baseline = {'runs': [self.run_report()]}
+        for tick_id in range(2, 7):
+            self.debug_helper.update_network_time_timestamp(tick_id, 8.0)
+        regressions = compare_reports(baseline, {'runs': [self.run_report()]})
+        assert [r['metric'] for r in regressions] == ['step_latency_ms.p95']
+
+        # a baseline from before the metric was named step_latency_ms
+        del baseline['runs'][0]['step_latency_ms']
+        assert compare_reports(baseline, {'runs': [self.run_report()]}) == []
+
+    def test_compare_failed(self):
+        baseline = {'runs': [self.run_report()]}
+        failed = {'runs': [{'num_cars': 2, 'num_processes': 2,
+                            'perception': False, 'error': 'no report'},
+                           {'num_cars': 4, 'num_processes': 4,
+                            'perception': False, 'error': 'no report'}]}
+        regressions = compare_reports(baseline, failed)
+        # with or without a baseline run at the same sweep point
+        assert [r['run'] for r in regressions] == [(2, 2, False), (4, 4, False)]
+        assert all(r['metric'] == 'error' for r in regressions)
+        assert regressions[0]['current'] == 'no report'
+
+    def test_compare_missing(self):
+        baseline = {'runs': [self.run_report(),
+                             self.run_report(num_cars=4, num_processes=4),
+                             {'num_cars': 8, 'num_processes': 8,
+                              'perception': False, 'error': 'no report'}]}
+        current = {'runs': [self.run_report()]}
+        regressions = compare_reports(baseline, current)
+        # a run that failed in the baseline too is not reported missing
+        assert len(regressions) == 1
+        assert regressions[0]['metric'] == 'missing'
+        assert regressions[0]['run'] == (4, 4, False)
+        assert compare_reports(baseline, {'runs': []})[0]['run'] == (2, 2, False)
+
+
+if __name__ == '__main__':
+    unittest.main()
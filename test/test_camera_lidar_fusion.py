@@ -0,0 +1,323 @@
+# -*- coding: utf-8 -*-
+"""
+Unit test for the camera-LiDAR fusion.
+"""
+# License: MIT
+
+import os
+import sys
+import unittest
+from unittest import mock
+
+import numpy as np
+
+# temporary solution for relative imports in case opencda is not installed
+# if opencda is installed, no need to use the following line
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '.')))
+
+import mocked_carla as mcarla
+from opencda.headless import carla, command
+
+try:
+    with mock.patch.dict(sys.modules, {'carla': carla,
+                                       'carla.command': command}):
+        from opencda.core.sensing.perception import o3d_lidar_libs
+except ImportError:
+    o3d_lidar_libs = None
+
+
+class Detections(object):
+    """
+    The part of the yolov5 result tensor the fusion reads,
+    rows of [x1, y1, x2, y2, confidence, label].
+    """
+    is_cuda = False
+
+    def __init__(self, rows):
+        # no detections is a (0, 6) tensor too
+        self.rows = np.array(rows, dtype=np.float32).reshape(-1, 6)
+
+    def detach(self):
+        return self
+
+    def numpy(self):
+        return self.rows
+
+
+def random_frame(seed, num_points=300, num_boxes=6):
+    """
+    Seeded lidar points, their projection to a 160x120 image and yolo
+    boxes. A third of the points sit on integer image columns, so some
+    fall exactly on a box edge, which excludes them.
+    """
+    rng = np.random.RandomState(seed)
+    lidar_3d = np.c_[rng.uniform(-15, 15, size=(num_points, 3)),
+                     rng.uniform(0, 1, num_points)]
+    columns = np.where(rng.rand(num_points) < 0.3,
+                       rng.randint(0, 160, num_points),
+                       rng.uniform(0, 160, num_points))
+    projected_lidar = np.c_[columns,
+                            rng.uniform(0, 120, num_points),
+                            rng.uniform(-2, 10, num_points)]
+
+    x1 = rng.randint(0, 120, num_boxes)
+    y1 = rng.randint(0, 80, num_boxes)
+    boxes = np.c_[x1, y1,
+                  x1 + rng.randint(5, 60, num_boxes),
+                  y1 + rng.randint(5, 60, num_boxes),
+                  rng.uniform(0.5, 1, num_boxes),
+                  rng.choice([0, 2, 7, 9], num_boxes)]
+    return boxes, lidar_3d, projected_lidar
+
+
+def edge_case_frame():
+    """
+    Boxes the fusion has to skip, and one whose |x| mode is a tie.
+    """
+    # (lidar x, y, z, projected column, row, depth)
+    points = np.array([
+        # box 0: |x| of 1 and 5 are both the most common integer, the
+        # smaller one wins and the points around 5 are outliers
+        (1.2, 0.5, 0.1, 10.5, 10.5, 4.0),
+        (-1.7, 0.6, 0.2, 11.5, 11.5, 4.0),
+        (5.1, 0.7, 0.3, 12.5, 12.5, 4.0),
+        (-5.3, 0.8, 0.4, 13.5, 13.5, 4.0),
+        # box 1: only points behind the camera
+        (3.0, 3.0, 0.0, 40.5, 10.5, -1.0),
+        (3.5, 3.5, 0.0, 41.5, 11.5, -1.0),
+        # box 2: a single inlier is not enough for a box
+        (2.0, 2.0, 0.0, 60.5, 10.5, 2.0),
+        (9.0, 9.0, 0.0, 61.5, 11.5, 2.0),
+        # on the edges of box 0, so in none of them
+        (4.0, 4.0, 0.0, 10.0, 12.0, 4.0),
+        (4.0, 4.0, 0.0, 12.0, 10.0, 4.0),
+    ])
+    lidar_3d = np.c_[points[:, :3], np.ones(len(points))]
+    projected_lidar = np.ascontiguousarray(points[:, 3:])
+    boxes = [(10, 10, 20, 20, 0.9, 2),
+             (40, 10, 50, 20, 0.9, 2),
+             (60, 10, 70, 20, 0.9, 0),
+             # no points at all
+             (100, 100, 110, 110, 0.9, 2),
+             # x2 < x1
+             (20, 10, 10, 20, 0.9, 2)]
+    return boxes, lidar_3d, projected_lidar
+
+
+def lidar_sensor():
+    lidar = mcarla.Lidar({'channels': 32, 'range': 50})
+    lidar.transform = mcarla.Transform(x=2.0, y=-3.0, z=1.5,
+                                       pitch=2.0, yaw=30.0, roll=1.0)
+    return lidar
+
+
+# (key, Open3D min bound, Open3D max bound, world corners) of the obstacles
+# of random_frame(seed) and edge_case_frame(), in the order they are added,
+# recorded with the original one-mask-per-box implementation
+EXPECTED_OBSTACLES = {
+    0: [
+        ('vehicles',
+         (-6.642200, -4.088677, -5.688575),
+         (7.547596, 4.127481, 9.391616),
+         [(10.012224, -3.209256, -3.881121),
+          (-2.269014, -10.299832, -4.376338),
+          (5.909105, 3.907563, -4.024425),
+          (9.424919, -3.244436, 11.187588),
+          (-6.959438, -3.218193, 10.549067),
+          (5.321800, 3.872383, 11.044284),
+          (-2.856318, -10.335012, 10.692372),
+          (-6.372133, -3.183013, -4.519642)]),
+        ('vehicles',
+         (-2.726183, -4.516791, 2.035380),
+         (0.407687, 2.229757, 8.444388),
+         [(6.535906, -5.554923, 3.707754),
+          (3.823549, -7.120903, 3.598383),
+          (3.166704, 0.288924, 3.590082),
+          (6.286304, -5.569874, 10.111882),
+          (0.204745, -1.292007, 9.884840),
+          (2.917102, 0.273973, 9.994210),
+          (3.573947, -7.135854, 10.002511),
+          (0.454347, -1.277056, 3.480711)]),
+        ('vehicles',
+         (6.480001, -7.847602, -13.294558),
+         (9.565471, 8.656365, 0.435382),
+         [(0.828400, -13.004589, -11.873708),
+          (-1.842068, -14.546385, -11.981389),
+          (-7.413622, 1.291115, -12.161567),
+          (0.293681, -13.036619, 1.845778),
+          (-10.618808, -0.282711, 1.450238),
+          (-7.948340, 1.259084, 1.557920),
+          (-2.376787, -14.578415, 1.738097),
+          (-10.084090, -0.250681, -12.269248)]),
+        ('static',
+         (-9.358157, -2.962215, -7.667232),
+         (11.685687, -0.618464, 14.398870),
+         [(11.877388, -0.871750, -5.783133),
+          (-6.336013, -11.387262, -6.517553),
+          (10.706927, 1.158403, -5.824012),
+          (11.018014, -0.923227, 16.266168),
+          (-8.365849, -9.408587, 15.490869),
+          (9.847553, 1.106926, 16.225289),
+          (-7.195388, -11.438739, 15.531748),
+          (-7.506474, -9.357109, -6.558432)]),
+        ('vehicles',
+         (1.389095, -1.924052, 11.757701),
+         (3.973144, 1.097376, 11.900139),
+         [(1.300697, -5.388164, 13.233829),
+          (-0.935792, -6.679401, 13.143647),
+          (-0.208193, -2.771008, 13.181130),
+          (1.295150, -5.388496, 13.376158),
+          (-2.450230, -4.062578, 13.233277),
+          (-0.213740, -2.771340, 13.323459),
+          (-0.941339, -6.679733, 13.285976),
+          (-2.444682, -4.062246, 13.090948)]),
+    ],
+    1: [
+        ('static',
+         (-10.906256, -8.806378, -12.714336),
+         (11.035166, 10.550156, 14.531504),
+         [(16.332380, -5.148601, -10.670434),
+          (-2.657873, -16.112629, -11.436178),
+          (6.665797, 11.617991, -11.008046),
+          (15.271278, -5.212162, 16.554661),
+          (-13.385558, 0.590403, 15.451304),
+          (5.604695, 11.554431, 16.217049),
+          (-3.718975, -16.176189, 15.788917),
+          (-12.324456, 0.653964, -11.773790)]),
+        ('vehicles',
+         (-12.278796, -2.973788, -11.599742),
+         (12.998250, -1.242486, -7.504480),
+         [(14.564128, 0.586829, -9.610518),
+          (-7.313101, -12.043995, -10.492675),
+          (13.699522, 2.086480, -9.640715),
+          (14.404636, 0.577276, -5.518374),
+          (-8.337199, -10.553898, -6.430727),
+          (13.540030, 2.076926, -5.548571),
+          (-7.472593, -12.053548, -6.400530),
+          (-8.177707, -10.544344, -10.522872)]),
+        ('static',
+         (-10.749415, -4.838759, -3.069695),
+         (10.821710, 9.221739, 5.941717),
+         [(13.839605, -1.812729, -1.107812),
+          (-4.830157, -12.591721, -1.860633),
+          (6.817843, 10.366447, -1.353052),
+          (13.488652, -1.833752, 7.896739),
+          (-12.202872, -0.433568, 6.898678),
+          (6.466890, 10.345424, 7.651499),
+          (-5.181110, -12.612744, 7.143918),
+          (-11.851918, -0.412545, -2.105873)]),
+        ('static',
+         (-13.426468, -10.947625, -6.987839),
+         (14.166500, 12.161770, 0.169865),
+         [(19.359928, -5.757365, -4.822996),
+          (-4.521726, -19.545445, -5.785977),
+          (7.819180, 14.259947, -5.226065),
+          (19.081168, -5.774063, 2.329259),
+          (-16.341234, 0.455170, 0.963209),
+          (7.540420, 14.243249, 1.926190),
+          (-4.800486, -19.562143, 1.366278),
+          (-16.062474, 0.471868, -6.189046)]),
+        ('static',
+         (0.292394, -3.525976, -14.534002),
+         (2.064547, 2.973309, 9.094900),
+         [(4.073826, -6.166396, -12.971641),
+          (2.540032, -7.051933, -13.033488),
+          (0.828107, -0.536728, -13.085000),
+          (3.153588, -6.221519, 10.639270),
+          (-1.625926, -1.477387, 10.464064),
+          (-0.092131, -0.591851, 10.525911),
+          (1.619793, -7.107056, 10.577423),
+          (-0.705688, -1.422264, -13.146847)]),
+    ],
+    'edge': [
+        ('vehicles',
+         (-1.200000, 0.500000, 0.100000),
+         (1.700000, 0.600000, 0.200000),
+         [(2.785005, -1.967500, 1.633082),
+          (0.275061, -3.416616, 1.531874),
+          (2.735065, -1.880880, 1.631338),
+          (2.781110, -1.967733, 1.733006),
+          (0.221227, -3.330230, 1.630054),
+          (2.731171, -1.881113, 1.731262),
+          (0.271166, -3.416850, 1.631798),
+          (0.225121, -3.329997, 1.530130)]),
+    ],
+}
+
+
+@unittest.skipIf(o3d_lidar_libs is None, 'open3d is not installed')
+class TestCameraLidarFusion(unittest.TestCase):
+    def fuse(self, frame, objects=None):
+        """
+        Run the fusion on a frame and return the objects and the
+        (key, corners, Open3D box) every obstacle was built from.
+        """
+        boxes, lidar_3d, projected_lidar = frame
+        built = []
+
+        def record(key, obstacle_class):
+            def build(corner, aabb):
+                built.append((key, corner, aabb))
+                return obstacle_class(corner, aabb)
+            return build
+
+        with mock.patch.object(o3d_lidar_libs, 'ObstacleVehicle',
+                               record('vehicles',
+                                      o3d_lidar_libs.ObstacleVehicle)), \
+                mock.patch.object(o3d_lidar_libs, 'StaticObstacle',
+                                  record('static',
+                                         o3d_lidar_libs.StaticObstacle)):
+            objects = o3d_lidar_libs.o3d_camera_lidar_fusion(
+                {} if objects is None else objects, Detections(boxes),
+                lidar_3d, projected_lidar, lidar_sensor())
+        return objects, built
+
+    def check(self, frame, expected):
+        objects, built = self.fuse(frame)
+        assert [key for key, _, _ in built] == \
+            [key for key, _, _, _ in expected]
+        for (_, corner, aabb), (_, min_bound, max_bound, corners) in \
+                zip(built, expected):
+            np.testing.assert_allclose(aabb.get_min_bound(), min_bound,
+                                       atol=1e-5)
+            np.testing.assert_allclose(aabb.get_max_bound(), max_bound,
+                                       atol=1e-5)
+            # corners follow the get_box_points order of the Open3D box
+            np.testing.assert_allclose(corner, corners, atol=1e-5)
+
+        # each obstacle is listed under its key, in the order it was built
+        for key in ['vehicles', 'static']:
+            assert [obstacle.o3d_bbx for obstacle in objects.get(key, [])] \
+                == [aabb for k, _, aabb in built if k == key]
+
+    def test_random_frames(self):
+        for seed in [0, 1]:
+            self.check(random_frame(seed), EXPECTED_OBSTACLES[seed])
+
+    def test_edge_cases(self):
+        # only the tie-mode box gives an obstacle
+        self.check(edge_case_frame(), EXPECTED_OBSTACLES['edge'])
+
+    def test_no_obstacles(self):
+        boxes, lidar_3d, projected_lidar = edge_case_frame()
+        objects = {'vehicles': []}
+        fused, built = self.fuse((boxes[1:], lidar_3d, projected_lidar),
+                                 objects)
+        assert fused is objects
+        assert objects == {'vehicles': []}
+        assert built == []
+
+        fused, built = self.fuse(([], lidar_3d, projected_lidar))
+        assert fused == {}
+
+    def test_appends(self):
+        existing = object()
+        objects, built = self.fuse(edge_case_frame(),
+                                   {'vehicles': [existing]})
+        assert objects['vehicles'][0] is existing
+        assert len(objects['vehicles']) == 2
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+"""
+Unit test for the CavWorld v2x spatial index.
+"""
+# License: MIT
+
+import os
+import sys
+import unittest
+
+import numpy as np
+
+# temporary solution for relative imports in case opencda is not installed
+# if opencda is installed, no need to use the following line
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '.')))
+
+import mocked_carla as mcarla
+from opencda.core.common.cav_world import CavWorld
+
+
+class TestCavWorld(unittest.TestCase):
+    def setUp(self):
+        self.cav_world = CavWorld()
+        rng = np.random.RandomState(0)
+        self.positions = {}
+        for i in range(200):
+            x, y = rng.uniform(-300, 300, 2)
+            self.positions[str(i)] = mcarla.Location(x=x, y=y, z=0.3)
+            self.cav_world.update_v2x_position(str(i), self.positions[str(i)])
+
+    def brute_force(self, location, radius):
+        return sorted(vid for vid, loc in self.positions.items()
+                      if np.hypot(loc.x - location.x, loc.y - location.y)
+                      < radius)
+
+    def test_search_matches_brute_force(self):
+        for radius in [10, 35, 120, 1000]:
+            for vid in ['0', '17', '199']:
+                center = self.positions[vid]
+                assert sorted(self.cav_world.search_v2x_nearby(
+                    center, radius)) == self.brute_force(center, radius)
+
+    def test_update_moves_cell(self):
+        far = mcarla.Location(x=5000, y=5000, z=0.3)
+        self.cav_world.update_v2x_position('3', far)
+        self.positions['3'] = far
+
+        assert self.cav_world.search_v2x_nearby(far, 1) == ['3']
+        origin = mcarla.Location(x=0, y=0, z=0.3)
+        assert sorted(self.cav_world.search_v2x_nearby(origin, 100)) == \
+            self.brute_force(origin, 100)
+        assert sum(len(b) for b in self.cav_world._v2x_grid.values()) == 200
+
+    def test_remove(self):
+        center = self.positions['5']
+        self.cav_world.remove_v2x_position('5')
+        del self.positions['5']
+
+        assert '5' not in self.cav_world.search_v2x_nearby(center, 1000)
+        assert sorted(self.cav_world.search_v2x_nearby(center, 100)) == \
+            self.brute_force(center, 100)
+        assert sum(len(b) for b in self.cav_world._v2x_grid.values()) == 199
+
+        # removing twice, or a CAV that never broadcast, is a no-op
+        self.cav_world.remove_v2x_position('5')
+        self.cav_world.remove_v2x_position('unknown')
+
+        # the last CAV of a cell takes the cell with it
+        far = mcarla.Location(x=5000, y=5000, z=0.3)
+        self.cav_world.update_v2x_position('3', far)
+        cells = len(self.cav_world._v2x_grid)
+        self.cav_world.remove_v2x_position('3')
+        assert len(self.cav_world._v2x_grid) == cells - 1
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+"""
+Unit test for the edge traffic tracker.
+"""
+# License: MIT
+
+import contextlib
+import io
+import os
+import sys
+import unittest
+
+import numpy as np
+
+# temporary solution for relative imports in case opencda is not installed
+# if opencda is installed, no need to use the following line
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+try:
+    from opencda.core.application.edge.collab_sandbox import Traffic
+except ImportError:
+    Traffic = None
+
+
+def tracker_state(tracker):
+    return [(car.pos_x, car.lane, car.v, car.target_velocity, car.intentions,
+             car.target_lane, car.changed_roads, car.scrolled, car.slice)
+            for car in tracker.cars_on_road]
+
+
+@unittest.skipIf(Traffic is None, 'sklearn is not installed')
+class TestTraffic(unittest.TestCase):
+    def random_states(self, rng, numcars):
+        return (rng.uniform(0, 190, numcars).tolist(),
+                rng.randint(0, 4, numcars).tolist(),
+                rng.uniform(0, 25, numcars).tolist())
+
+    def plan(self, tracker, rng):
+        for car in tracker.cars_on_road:
+            car.target_velocity = 15.0
+            r = rng.rand()
+            if r < 0.1 and car.lane < 3:
+                car.intentions = 'Lane Change 1'
+            elif r < 0.2 and car.lane > 0:
+                car.intentions = 'Lane Change -1'
+        # time_tick reports every lane change
+        with contextlib.redirect_stdout(io.StringIO()):
+            tracker.time_tick(mode='Graph')
+
+    def test_respawn_matches_new_tracker(self):
+        for seed in range(100):
+            rng = np.random.RandomState(seed)
+            numcars = rng.choice([4, 8, 16])
+            tracker = Traffic(2.0, 4, numcars, 200,
+                              *self.random_states(rng, numcars))
+            for tick in range(5):
+                # the respawned tracker carries the previous tick's plan
+                self.plan(tracker, np.random.RandomState([seed, tick]))
+                states = self.random_states(rng, numcars)
+                tracker.respawn_vehicles(*states)
+                expected = Traffic(2.0, 4, numcars, 200, *states)
+
+                assert tracker_state(tracker) == tracker_state(expected)
+                np.testing.assert_array_equal(tracker.lane_vehicles,
+                                              expected.lane_vehicles)
+                assert tracker.time == expected.time
+
+                self.plan(tracker, np.random.RandomState([seed, tick, 1]))
+                self.plan(expected, np.random.RandomState([seed, tick, 1]))
+                assert tracker_state(tracker) == tracker_state(expected)
+
+    def test_respawn_count(self):
+        x, y, v = self.random_states(np.random.RandomState(0), 4)
+        tracker = Traffic(2.0, 4, 4, 200, x, y, v)
+        with self.assertRaises(AssertionError):
+            tracker.respawn_vehicles(x[:3], y[:3], v[:3])
+
+
+if __name__ == '__main__':
+    unittest.main()
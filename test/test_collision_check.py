@@ -0,0 +1,181 @@
+# -*- coding: utf-8 -*-
+"""
+Unit test for the circle collision check.
+"""
+# License: MIT
+
+import math
+import os
+import sys
+import types
+import unittest
+from unittest import mock
+
+import numpy as np
+from scipy import spatial
+
+# temporary solution for relative imports in case opencda is not installed
+# if opencda is installed, no need to use the following line
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '.')))
+
+import mocked_carla as mcarla
+from opencda.headless import carla, command
+
+with mock.patch.dict(sys.modules, {'carla': carla, 'carla.command': command}):
+    from opencda.core.plan.collision_check import CollisionChecker
+
+
+class Vehicle(object):
+    def __init__(self, x, y, extent_x, extent_y):
+        self.location = mcarla.Location(x, y, 0)
+        self.bounding_box = mcarla.BoundingBox(np.array(
+            [[sx * extent_x, sy * extent_y, sz]
+             for sx in (-1, 1) for sy in (-1, 1) for sz in (0, 1)]))
+
+    def get_location(self):
+        return self.location
+
+
+class Map(object):
+    """
+    Lane yaw varying with the location, counting the waypoint lookups.
+    """
+
+    def __init__(self):
+        self.lookups = 0
+
+    def get_waypoint(self, location):
+        self.lookups += 1
+        return types.SimpleNamespace(transform=mcarla.Transform(
+            0, 0, 0, yaw=(location.x + location.y) % 360))
+
+
+def loop_collision_check(checker, path_x, path_y, path_yaw, obstacle_vehicle,
+                         speed, carla_map, adjacent_check=False):
+    """
+    The per-vehicle, per-point check the batch check replaced.
+    """
+    collision_free = True
+    distance_check = min(max(int(checker.time_ahead * speed / 0.1), 90),
+                         len(path_x)) \
+        if not adjacent_check else len(path_x)
+
+    obstacle_vehicle_loc = obstacle_vehicle.get_location()
+    obstacle_vehicle_yaw = \
+        carla_map.get_waypoint(obstacle_vehicle_loc).transform.rotation.yaw
+
+    for i in range(0, distance_check, 10):
+        ptx, pty, yaw = path_x[i], path_y[i], path_yaw[i]
+
+        circle_locations = np.zeros((len(checker._circle_offsets), 2))
+        circle_offsets = np.array(checker._circle_offsets)
+        circle_locations[:, 0] = ptx + circle_offsets * math.cos(yaw)
+        circle_locations[:, 1] = pty + circle_offsets * math.sin(yaw)
+
+        corrected_extent_x = obstacle_vehicle.bounding_box.extent.x * \
+            math.cos(math.radians(obstacle_vehicle_yaw))
+        corrected_extent_y = obstacle_vehicle.bounding_box.extent.y * \
+            math.sin(math.radians(obstacle_vehicle_yaw))
+
+        x, y = obstacle_vehicle_loc.x, obstacle_vehicle_loc.y
+        obstacle_vehicle_bbx_array = \
+            np.array([[x - corrected_extent_x, y - corrected_extent_y],
+                      [x - corrected_extent_x, y + corrected_extent_y],
+                      [x, y],
+                      [x + corrected_extent_x, y - corrected_extent_y],
+                      [x + corrected_extent_x, y + corrected_extent_y]])
+
+        collision_dists = spatial.distance.cdist(
+            obstacle_vehicle_bbx_array, circle_locations)
+
+        collision_dists = np.subtract(collision_dists,
+                                      checker._circle_radius)
+        collision_free = collision_free and not np.any(collision_dists < 0)
+
+        if not collision_free:
+            break
+
+    return collision_free
+
+
+class TestCollisionCheck(unittest.TestCase):
+    def setUp(self):
+        self.checker = CollisionChecker()
+        self.carla_map = Map()
+
+    def random_case(self, rng):
+        # a curved path of 0.1m steps
+        n = rng.randint(20, 400)
+        yaw0 = rng.uniform(-np.pi, np.pi)
+        path_yaw = yaw0 + np.cumsum(rng.normal(0, 0.005, n))
+        path_x = np.cumsum(0.1 * np.cos(path_yaw)) + rng.uniform(-50, 50)
+        path_y = np.cumsum(0.1 * np.sin(path_yaw)) + rng.uniform(-50, 50)
+
+        obstacle_vehicles = []
+        for _ in range(rng.randint(0, 12)):
+            # mostly near the path so both outcomes are exercised
+            i = rng.randint(n)
+            obstacle_vehicles.append(Vehicle(path_x[i] + rng.normal(0, 3),
+                                             path_y[i] + rng.normal(0, 3),
+                                             rng.uniform(1.5, 2.5),
+                                             rng.uniform(0.8, 1.2)))
+        speed = rng.uniform(0, 30)
+        return list(path_x), list(path_y), list(path_yaw), \
+            obstacle_vehicles, speed
+
+    def test_batch_matches_loop(self):
+        rng = np.random.RandomState(0)
+        outcomes = set()
+        for _ in range(300):
+            path_x, path_y, path_yaw, obstacle_vehicles, speed = \
+                self.random_case(rng)
+            for adjacent_check in [False, True]:
+                collision_free, clearance = \
+                    self.checker.collision_circle_check_batch(
+                        path_x, path_y, path_yaw, obstacle_vehicles, speed,
+                        self.carla_map, adjacent_check=adjacent_check)
+                expected = [loop_collision_check(
+                    self.checker, path_x, path_y, path_yaw, v, speed,
+                    self.carla_map, adjacent_check=adjacent_check)
+                    for v in obstacle_vehicles]
+                assert list(collision_free) == expected
+                assert np.all((clearance >= 0) == collision_free)
+                outcomes.update(expected)
+
+                for v, free in zip(obstacle_vehicles, expected):
+                    assert self.checker.collision_circle_check(
+                        path_x, path_y, path_yaw, v, speed, self.carla_map,
+                        adjacent_check=adjacent_check) == free
+        assert outcomes == {True, False}
+
+    def test_obstacle_cache(self):
+        rng = np.random.RandomState(1)
+        path_x, path_y, path_yaw, _, speed = self.random_case(rng)
+        obstacle_vehicles = [Vehicle(path_x[0] + i, path_y[0], 2.0, 1.0)
+                             for i in range(5)]
+
+        self.checker.collision_circle_check_batch(
+            path_x, path_y, path_yaw, obstacle_vehicles, speed,
+            self.carla_map)
+        assert self.carla_map.lookups == 5
+
+        # single-vehicle checks do not evict the batch's obstacle arrays
+        self.checker.collision_circle_check(
+            path_x, path_y, path_yaw, obstacle_vehicles[0], speed,
+            self.carla_map)
+        assert self.carla_map.lookups == 6
+        self.checker.collision_circle_check_batch(
+            path_x, path_y, path_yaw, obstacle_vehicles, speed,
+            self.carla_map)
+        assert self.carla_map.lookups == 6
+
+        # a new tick's obstacle list is looked up again
+        self.checker.collision_circle_check_batch(
+            path_x, path_y, path_yaw, list(obstacle_vehicles), speed,
+            self.carla_map)
+        assert self.carla_map.lookups == 11
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+"""
+Unit test for the batched carla command submission.
+"""
+# License: MIT
+
+import os
+import sys
+import time
+import unittest
+from unittest import mock
+
+# temporary solution for relative imports in case opencda is not installed
+# if opencda is installed, no need to use the following line
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from opencda.headless import carla, command
+
+# the batch builds its commands from the headless backend
+with mock.patch.dict(sys.modules, {'carla': carla, 'carla.command': command}):
+    from opencda.core.common.command_batch import CommandBatch
+
+
+class Client(carla.Client):
+    def __init__(self, *args):
+        super(Client, self).__init__(*args)
+        self.batches = 0
+
+    def apply_batch_sync(self, commands, due_tick_cue=False):
+        self.batches += 1
+        return super(Client, self).apply_batch_sync(commands, due_tick_cue)
+
+
+class TestCommandBatch(unittest.TestCase):
+    def setUp(self):
+        self.client = Client('localhost', 2000)
+        self.world = self.client.load_world('2lane_freeway_simplified')
+        settings = self.world.get_settings()
+        settings.synchronous_mode = True
+        settings.fixed_delta_seconds = 0.05
+        self.world.apply_settings(settings)
+        self.blueprint = self.world.get_blueprint_library().find(
+            'vehicle.lincoln.mkz2017')
+        self.spawn_points = self.world.get_map().get_spawn_points()[:2]
+        self.batch = CommandBatch(self.client)
+
+    def spawn(self):
+        for spawn_point in self.spawn_points:
+            self.batch.spawn(self.blueprint, spawn_point)
+        responses = self.batch.flush()
+        return [self.world.get_actor(r.actor_id) for r in responses]
+
+    def test_spawn(self):
+        for spawn_point in self.spawn_points:
+            self.batch.spawn(self.blueprint, spawn_point, autopilot=True)
+        # the second spawn at the first point collides
+        self.batch.spawn(self.blueprint, self.spawn_points[0])
+        assert len(self.batch) == 3
+
+        responses = self.batch.flush()
+        assert self.client.batches == 1
+        assert len(self.batch) == 0
+        assert [r.has_error() for r in responses] == [False, False, True]
+        assert 'collision' in responses[2].error
+        assert len(self.world.get_actors().filter('*vehicle*')) == 2
+
+        for _ in range(20):
+            self.world.tick()
+        assert self.world.get_actor(
+            responses[0].actor_id).get_velocity().length() > 1.0
+
+    def test_controls(self):
+        vehicles = self.spawn()
+        for vehicle in vehicles:
+            self.batch.apply_control(vehicle,
+                                     carla.VehicleControl(throttle=1.0))
+        assert self.batch.flush() and self.client.batches == 2
+        assert self.batch.flush() == []
+        assert self.client.batches == 2
+
+        for _ in range(20):
+            self.world.tick()
+        for vehicle in vehicles:
+            assert vehicle.get_velocity().length() > 1.0
+
+    def test_flush_callback(self):
+        vehicles = self.spawn()
+        flush_times = []
+        apply_batch_sync = self.client.apply_batch_sync
+
+        def slow_apply_batch_sync(*args):
+            time.sleep(0.02)
+            return apply_batch_sync(*args)
+
+        self.client.apply_batch_sync = slow_apply_batch_sync
+        for vehicle in vehicles:
+            self.batch.apply_control(vehicle,
+                                     carla.VehicleControl(throttle=1.0))
+            self.batch.add_flush_callback(flush_times.append)
+        assert flush_times == []
+
+        # every queued control is timed by the round trip that sent it
+        self.batch.flush()
+        assert len(flush_times) == 2
+        assert flush_times[0] == flush_times[1] >= 20.0
+        self.batch.apply_control(vehicles[0], carla.VehicleControl())
+        self.batch.flush()
+        assert len(flush_times) == 2
+
+    def test_transform_and_destroy(self):
+        vehicles = self.spawn()
+        target = carla.Transform(carla.Location(x=5.0, y=5.0, z=0.3))
+        self.batch.apply_transform(vehicles[0].id, target)
+        for vehicle in vehicles:
+            self.batch.destroy(vehicle)
+        self.batch.destroy(vehicles[0])
+
+        responses = self.batch.flush()
+        assert [r.has_error() for r in responses] == [False, False, False,
+                                                      True]
+        assert len(self.world.get_actors().filter('*vehicle*')) == 0
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,266 @@
+# -*- coding: utf-8 -*-
+"""
+Unit test for the incremental (delta) debug info upload.
+"""
+# License: MIT
+
+import asyncio
+import os
+import sys
+import types
+import unittest
+
+from google.protobuf.timestamp_pb2 import Timestamp
+
+# temporary solution for relative imports in case opencda is not installed
+# if opencda is installed, no need to use the following line
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import ecloud_pb2 as ecloud
+
+from opencda.client_debug_helper import ClientDebugHelper
+from opencda.core.common.delta_tracker import DeltaTracker
+from opencda.core.plan.planer_debug_helper import PlanDebugHelper
+from opencda.core.sensing.localization.localization_debug_helper import LocDebugHelper
+from opencda.sim_debug_helper import SimDebugHelper
+
+try:
+    from opencda.scenario_testing.utils.sim_api import ScenarioManager
+except ImportError:
+    ScenarioManager = None
+
+
+def plan_debug_helper():
+    helper = PlanDebugHelper(0)
+    # skip the spawn-time samples update() filters out
+    helper.count = 100
+    return helper
+
+
+def loc_debug_helper():
+    return LocDebugHelper(config_yaml={'show_animation': False,
+                                       'x_scale': 1.0,
+                                       'y_scale': 1.0},
+                          actor_id=0)
+
+
+class TestDeltaTracker(unittest.TestCase):
+    def test_full(self):
+        tracker = DeltaTracker()
+        items = [1, 2, 3]
+        assert tracker.unsent('a', items, False) == [1, 2, 3]
+        tracker.confirm()
+        assert tracker.unsent('a', items, False) == [1, 2, 3]
+
+    def test_confirm(self):
+        tracker = DeltaTracker()
+        items = [1, 2]
+        assert tracker.unsent('a', items, True) == [1, 2]
+        tracker.confirm()
+        items.append(3)
+        assert tracker.unsent('a', items, True) == [3]
+        tracker.confirm()
+        assert tracker.unsent('a', items, True) == []
+
+    def test_discard(self):
+        tracker = DeltaTracker()
+        items = [1, 2]
+        assert tracker.unsent('a', items, True) == [1, 2]
+        tracker.discard()
+        items.append(3)
+        # the lost chunk goes out again with the next one
+        assert tracker.unsent('a', items, True) == [1, 2, 3]
+
+    def test_keys(self):
+        tracker = DeltaTracker()
+        assert tracker.unsent('a', [1, 2], True) == [1, 2]
+        tracker.confirm()
+        assert tracker.unsent('b', [1, 2], True) == [1, 2]
+        assert tracker.unsent('a', [1, 2, 3], True) == [3]
+
+
+class TestDeltaSerialization(unittest.TestCase):
+    def serialize(self, helper, proto_type, delta=True, delivered=True):
+        proto = proto_type()
+        helper.serialize_debug_info(proto, delta)
+        if delivered:
+            helper.delta_tracker.confirm()
+        else:
+            helper.delta_tracker.discard()
+        return proto
+
+    def test_plan_delta(self):
+        helper = plan_debug_helper()
+        helper.update(10, 1)
+        helper.update(20, 2)
+        helper.agent_step_list[3].append(0.5)
+
+        proto = self.serialize(helper, ecloud.PlanerDebugHelper)
+        assert len(proto.speed_list) == 2
+        assert list(proto.agent_step_list[3].time_list) == [0.5]
+
+        helper.update(30, 3)
+        proto = self.serialize(helper, ecloud.PlanerDebugHelper)
+        assert len(proto.speed_list) == 1
+        assert list(proto.ttc_list) == [3]
+        assert len(proto.agent_step_list) == len(helper.agent_step_list)
+        assert len(proto.agent_step_list[3].time_list) == 0
+
+        # a full upload is unaffected by what was sent as deltas
+        proto = self.serialize(helper, ecloud.PlanerDebugHelper, delta=False)
+        assert list(proto.ttc_list) == [1, 2, 3]
+
+    def test_plan_lost_chunk(self):
+        helper = plan_debug_helper()
+        helper.update(10, 1)
+        self.serialize(helper, ecloud.PlanerDebugHelper, delivered=False)
+        helper.update(20, 2)
+        proto = self.serialize(helper, ecloud.PlanerDebugHelper)
+        assert list(proto.ttc_list) == [1, 2]
+
+    def test_loc_delta(self):
+        helper = loc_debug_helper()
+        helper.gnss_x.extend([1.0, 2.0])
+        helper.gt_spd.append(5.0)
+        proto = self.serialize(helper, ecloud.LocDebugHelper)
+        assert list(proto.gnss_x) == [1.0, 2.0]
+        assert list(proto.gt_spd) == [5.0]
+
+        helper.gnss_x.append(3.0)
+        proto = self.serialize(helper, ecloud.LocDebugHelper)
+        assert list(proto.gnss_x) == [3.0]
+        assert len(proto.gt_spd) == 0
+
+    def test_client_delta(self):
+        helper = ClientDebugHelper(0)
+        helper.count = 100
+        helper.perception_time_list.extend([1.0, 2.0])
+        helper.speed_list[0].append(10.0)
+        self.serialize(helper, ecloud.ClientDebugHelper)
+
+        helper.perception_time_list.append(3.0)
+        proto = self.serialize(helper, ecloud.ClientDebugHelper)
+        assert list(proto.perception_time_list) == [3.0]
+
+    def test_append(self):
+        sender = plan_debug_helper()
+        receiver = PlanDebugHelper(0)
+        for speed in [10, 20, 30]:
+            sender.update(speed, speed / 10)
+            receiver.deserialize_debug_info(
+                self.serialize(sender, ecloud.PlanerDebugHelper), append=True)
+        assert receiver.ttc_list[0] == [1, 2, 3]
+        assert len(receiver.speed_list[0]) == len(sender.speed_list[0])
+
+        # a full upload replaces what was merged before
+        receiver.deserialize_debug_info(
+            self.serialize(sender, ecloud.PlanerDebugHelper, delta=False))
+        assert receiver.ttc_list[0] == [1, 2, 3]
+
+    def test_loc_append(self):
+        sender = loc_debug_helper()
+        receiver = loc_debug_helper()
+        for x in [1.0, 2.0]:
+            sender.gnss_x.append(x)
+            receiver.deserialize_debug_info(
+                self.serialize(sender, ecloud.LocDebugHelper), append=True)
+        assert receiver.gnss_x == [1.0, 2.0]
+
+        receiver.deserialize_debug_info(
+            self.serialize(sender, ecloud.LocDebugHelper, delta=False))
+        assert receiver.gnss_x == [1.0, 2.0]
+
+
+@unittest.skipIf(ScenarioManager is None, 'sim_api dependencies are not installed')
+class TestServerMergeDebugInfo(unittest.TestCase):
+    def setUp(self):
+        self.sender = plan_debug_helper()
+        self.proxy = types.SimpleNamespace(
+            localizer=types.SimpleNamespace(debug_helper=loc_debug_helper()),
+            agent=types.SimpleNamespace(debug_helper=PlanDebugHelper(0)),
+            debug_helper=ClientDebugHelper(0))
+        self.scenario_manager = types.SimpleNamespace(
+            debug_chunk_ids={}, vehicle_managers={0: self.proxy})
+
+    def merge(self, debug_chunk_id, delta=True):
+        vehicle_update = ecloud.VehicleUpdate()
+        vehicle_update.vehicle_index = 0
+        vehicle_update.debug_chunk_id = debug_chunk_id
+        self.sender.serialize_debug_info(vehicle_update.planer_debug_helper, delta)
+        self.sender.delta_tracker.confirm()
+        ScenarioManager.server_merge_debug_info(self.scenario_manager, vehicle_update)
+        return self.proxy.agent.debug_helper.ttc_list[0]
+
+    def test_chunks(self):
+        self.sender.update(10, 1)
+        assert self.merge(1) == [1]
+        self.sender.update(20, 2)
+        assert self.merge(2) == [1, 2]
+        assert self.scenario_manager.debug_chunk_ids[0] == 2
+
+    def test_duplicate(self):
+        self.sender.update(10, 1)
+        assert self.merge(1) == [1]
+        self.sender.update(20, 2)
+        # a resent chunk id is dropped
+        assert self.merge(1) == [1]
+
+    def test_gap(self):
+        self.sender.update(10, 1)
+        assert self.merge(1) == [1]
+        self.sender.update(20, 2)
+        with self.assertLogs(level='WARNING'):
+            assert self.merge(3) == [1, 2]
+        assert self.scenario_manager.debug_chunk_ids[0] == 3
+
+    def test_full(self):
+        self.sender.update(10, 1)
+        assert self.merge(1) == [1]
+        self.sender.update(20, 2)
+        assert self.merge(0, delta=False) == [1, 2]
+        assert self.scenario_manager.debug_chunk_ids[0] == 1
+
+
+@unittest.skipIf(ScenarioManager is None, 'sim_api dependencies are not installed')
+class TestServerDoTick(unittest.TestCase):
+    def do_tick(self, tick_id):
+        drained = []
+
+        class Stub(object):
+            async def Server_DoTick(self, tick):
+                # the eCloud server pushes the tick back once every vehicle replied
+                asyncio.get_event_loop().call_soon(
+                    scenario_manager.push_q.put_nowait,
+                    ecloud.Tick(tick_id=tick_id))
+                return ecloud.Empty()
+
+        async def unpack_vehicle_updates(stub_):
+            drained.append(tick_id)
+
+        async def run(scenario_manager):
+            scenario_manager.push_q = asyncio.Queue()
+            await ScenarioManager.server_do_tick(
+                scenario_manager, Stub(),
+                ecloud.Tick(tick_id=tick_id, command=ecloud.Command.TICK))
+
+        start = Timestamp()
+        start.GetCurrentTime()
+        scenario_manager = types.SimpleNamespace(
+            tick_id=tick_id, debug_helper=SimDebugHelper(0),
+            sm_start_tstamp=start,
+            server_unpack_vehicle_updates=unpack_vehicle_updates)
+        asyncio.run(run(scenario_manager))
+        return scenario_manager.debug_helper, drained
+
+    def test_startup_tick(self):
+        # the startup tick is left out of the timings but still drained
+        debug_helper, drained = self.do_tick(1)
+        assert drained == [1]
+        assert debug_helper.startup_time_ms >= 0
+        assert debug_helper.network_time_dict == {}
+
+    def test_tick(self):
+        debug_helper, drained = self.do_tick(2)
+        assert drained == [2]
+        assert list(debug_helper.network_time_dict) == [2]
+
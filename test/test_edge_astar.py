@@ -0,0 +1,220 @@
+# -*- coding: utf-8 -*-
+"""
+Regression test for the edge slice A* planner.
+"""
+# License: MIT
+
+import os
+import sys
+import unittest
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor
+from unittest import mock
+
+import numpy as np
+
+# temporary solution for relative imports in case opencda is not installed
+# if opencda is installed, no need to use the following line
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from opencda.headless import carla, command
+
+try:
+    with mock.patch.dict(sys.modules,
+                         {'carla': carla, 'carla.command': command}):
+        from opencda.core.application.edge import \
+            astar_test_groupcaps_transform as astar
+        # the modules the planner was imported with, which its objects are
+        # pickled against for the worker processes
+        PLANNER_MODULES = {name: module
+                           for name, module in sys.modules.items()
+                           if name.split('.')[0] in ('carla', 'opencda')}
+except ImportError:
+    astar = None
+
+
+def random_slice(seed, slice_sizes=(1, 2, 3)):
+    """
+    Traffic around a slice of the given sizes, with targets and intentions
+    drawn from seed. Odd seeds put the slice off the grid cells.
+    """
+    rng = np.random.RandomState(seed)
+    size = int(rng.choice(slice_sizes))
+    numcars = size + int(rng.randint(0, 4))
+    tracker = astar.Traffic(2.0, 4, numcars, 200,
+                            rng.uniform(0, 60, numcars).tolist(),
+                            rng.randint(0, 4, numcars).tolist(),
+                            rng.uniform(0, 25, numcars).tolist())
+    intentions = ['None', 'Lane Change 1', 'Lane Change -1']
+    for car in tracker.cars_on_road:
+        car.target_velocity = float(rng.choice([20.0, 22.2,
+                                                rng.uniform(5, 25)]))
+        car.intentions = intentions[rng.randint(3)]
+    for k, carnum in enumerate(rng.permutation(numcars)):
+        tracker.cars_on_road[carnum].slice = 0 if k < size else 1 + k
+    cars = [car for car in tracker.cars_on_road if car.slice == 0]
+    if seed % 2:
+        for car in cars:
+            car.pos_x = float(car.pos_x) + 0.25 * (seed % 4)
+    return cars, tracker.cars_on_road
+
+
+def sliced_traffic(seed, numcars=8, slice_size=2):
+    """
+    Traffic drawn from seed, split into slices of slice_size cars.
+    """
+    rng = np.random.RandomState(seed)
+    tracker = astar.Traffic(2.0, 4, numcars, 200,
+                            rng.uniform(0, 60, numcars).tolist(),
+                            rng.randint(0, 4, numcars).tolist(),
+                            rng.uniform(0, 25, numcars).tolist())
+    for k, carnum in enumerate(rng.permutation(numcars)):
+        car = tracker.cars_on_road[carnum]
+        car.target_velocity = float(rng.uniform(15, 25))
+        car.slice = k // slice_size
+    return tracker.cars_on_road, list(range(numcars // slice_size))
+
+
+def plan(seed, ov, oy, slice_sizes=(1, 2, 3)):
+    cars, cars_on_road = random_slice(seed, slice_sizes)
+    planner = astar.AStarPlanner(cars, ov, oy, 1, 1.0, cars_on_road, 0)
+    rv, ry, _ = planner.planning()
+    return [list(v) for v in rv], [list(y) for y in ry]
+
+
+# velocities and lanes along the plan of random_slice(seed), as found by
+# the planner before its open set became a heap
+EXPECTED_PLANS = {
+    0: ([[13.0], [12.0], [11.0], [10.0]],
+        [[0], [0], [0], [0]]),
+    1: ([[11.0, 16.0], [10.0, 15.0], [9.0, 14.0], [8.0, 13.0]],
+        [[1, 0], [1, 0], [1, 0], [1, 0]]),
+    2: ([[16.0], [16.0], [16.0], [15.0]],
+        [[2], [2], [2], [2]]),
+    3: ([[3.0, 4.0, 9.0], [2.0, 3.0, 8.0], [1.0, 2.0, 7.0], [0.0, 1.0, 6.0]],
+        [[1, 3, 2], [1, 3, 2], [1, 3, 2], [1, 3, 2]]),
+    4: ([[23.0, 16.0, 9.0]],
+        [[3, 1, 3]]),
+    5: ([[19.0, 9.0, 8.0], [18.0, 8.0, 7.0], [17.0, 7.0, 6.0], [16.0, 6.0, 5.0]],
+        [[1, 0, 0], [1, 0, 0], [1, 0, 0], [0, 0, 1]]),
+    6: ([[13.0, 19.0, 14.0], [12.0, 18.0, 13.0], [11.0, 17.0, 12.0], [10.0, 16.0, 11.0]],
+        [[1, 3, 1], [1, 3, 1], [1, 3, 1], [1, 3, 1]]),
+    7: ([[5.0], [5.0], [6.0], [7.0]],
+        [[0], [0], [0], [0]]),
+    8: ([[18.0], [17.0], [16.0], [15.0]],
+        [[0], [0], [0], [0]]),
+    9: ([[22.0, 6.0, 6.0], [22.0, 5.0, 5.0], [22.0, 4.0, 4.0], [22.0, 3.0, 3.0]],
+        [[0, 1, 2], [0, 1, 2], [0, 1, 2], [1, 1, 2]]),
+    10: ([[1.0, 7.0]],
+        [[1, 0]]),
+    11: ([[22.0, 18.0]],
+        [[0, 0]]),
+    12: ([[22.0, 6.0, 18.0], [22.0, 5.0, 17.0], [23.0, 4.0, 16.0], [24.0, 3.0, 15.0]],
+        [[0, 1, 1], [0, 1, 1], [0, 1, 1], [0, 1, 1]]),
+    13: ([[16.0, 18.0, 19.0], [17.0, 17.0, 19.0], [18.0, 16.0, 19.0], [19.0, 15.0, 20.0]],
+        [[0, 2, 3], [0, 2, 3], [0, 2, 3], [0, 2, 3]]),
+    14: ([[2.0], [1.0], [0.0]],
+        [[3], [2], [1]]),
+    15: ([[16.0], [15.0], [14.0], [13.0]],
+        [[3], [3], [3], [3]]),
+}
+
+# plans of random_slice(seed, (4,)), whose 81 joint actions per expansion
+# are checked as one batch
+EXPECTED_FOUR_CAR_PLANS = {
+    0: ([[10.0, 4.0, 10.0, 15.0], [9.0, 3.0, 9.0, 14.0], [8.0, 2.0, 8.0, 13.0], [7.0, 1.0, 7.0, 12.0]],
+        [[3, 1, 2, 0], [3, 1, 2, 0], [3, 1, 2, 0], [3, 1, 2, 0]]),
+    1: ([[13.0, 16.0, 13.0, 20.0], [12.0, 15.0, 12.0, 19.0], [11.0, 14.0, 11.0, 18.0], [10.0, 13.0, 10.0, 17.0]],
+        [[2, 0, 3, 1], [2, 0, 3, 1], [2, 0, 3, 1], [1, 0, 3, 1]]),
+    2: ([[20.0, 6.0, 15.0, 19.0], [19.0, 5.0, 14.0, 18.0], [18.0, 4.0, 13.0, 17.0], [17.0, 3.0, 12.0, 16.0]],
+        [[3, 2, 1, 3], [3, 2, 1, 3], [3, 2, 1, 3], [3, 2, 1, 3]]),
+    3: ([[4.0, 11.0, 5.0, 12.0]],
+        [[2, 1, 3, 0]]),
+    4: ([[19.0, 3.0, 18.0, 13.0], [18.0, 2.0, 17.0, 12.0], [17.0, 1.0, 16.0, 11.0], [16.0, 0.0, 15.0, 10.0]],
+        [[1, 2, 1, 0], [1, 2, 1, 0], [1, 2, 1, 0], [1, 2, 1, 0]]),
+    5: ([[19.0, 14.0, 7.0, 10.0], [19.0, 13.0, 6.0, 9.0], [19.0, 12.0, 5.0, 8.0], [18.0, 11.0, 4.0, 7.0]],
+        [[0, 2, 0, 1], [0, 2, 0, 1], [0, 2, 0, 1], [0, 3, 0, 1]]),
+}
+
+
+@unittest.skipIf(astar is None, 'edge planner dependencies are not installed')
+class TestEdgeAStar(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.ov, cls.oy = astar.generate_limits_grid()
+
+    def check_plans(self, expected_plans, slice_sizes):
+        for seed, (expected_rv, expected_ry) in expected_plans.items():
+            rv, ry = plan(seed, self.ov, self.oy, slice_sizes)
+            np.testing.assert_allclose(np.array(rv, dtype=float),
+                                       np.array(expected_rv, dtype=float),
+                                       err_msg='seed %s' % seed)
+            np.testing.assert_array_equal(np.array(ry), np.array(expected_ry),
+                                          err_msg='seed %s' % seed)
+
+    def test_expected_plans(self):
+        self.check_plans(EXPECTED_PLANS, (1, 2, 3))
+
+    def test_expected_four_car_plans(self):
+        self.check_plans(EXPECTED_FOUR_CAR_PLANS, (4,))
+
+    def plan_slices(self, cars_on_road, slices, planned=None,
+                    planning_budget=None, pool=None):
+        lanechange_command = [['lanes %s' % i] for i in slices]
+        vel_array = [['velocities %s' % i] for i in slices]
+        planned = slices if planned is None else planned
+        over_budget = astar.plan_slices(cars_on_road, planned,
+                                        lanechange_command, vel_array,
+                                        self.ov, self.oy, 1, 1.0,
+                                        planning_budget, pool)
+        return over_budget, lanechange_command, vel_array
+
+    def test_pooled_plans(self):
+        # fork so the workers inherit the modules the test imported
+        with mock.patch.dict(sys.modules, PLANNER_MODULES), \
+                ProcessPoolExecutor(
+                    2, mp_context=mp.get_context('fork')) as pool:
+            for seed in range(3):
+                cars_on_road, slices = sliced_traffic(seed)
+                over_budget, expected_lanes, expected_velocities = \
+                    self.plan_slices(cars_on_road, slices)
+                assert over_budget == []
+                # every slice got a plan in place of its placeholder
+                assert not any(isinstance(v, list)
+                               for v in expected_velocities)
+
+                over_budget, lanes, velocities = \
+                    self.plan_slices(cars_on_road, slices, pool=pool)
+                assert over_budget == []
+                for i in slices:
+                    np.testing.assert_array_equal(
+                        lanes[i], expected_lanes[i],
+                        err_msg='seed %s' % seed)
+                    np.testing.assert_array_equal(
+                        velocities[i], expected_velocities[i],
+                        err_msg='seed %s' % seed)
+
+    def test_expired_budget(self):
+        cars_on_road, slices = sliced_traffic(0)
+        # a budget already spent when the search starts
+        assert astar.plan_slice(cars_on_road, 0, self.ov, self.oy, 1, 1.0,
+                                planning_budget=-1.0) is None
+
+        over_budget, lanechange_command, vel_array = \
+            self.plan_slices(cars_on_road, slices, planning_budget=-1.0)
+        assert over_budget == slices
+        assert lanechange_command == [['lanes %s' % i] for i in slices]
+        assert vel_array == [['velocities %s' % i] for i in slices]
+
+        # only the slices planned get an entry
+        over_budget, lanechange_command, vel_array = \
+            self.plan_slices(cars_on_road, slices, slices[1:],
+                             planning_budget=60.0)
+        assert over_budget == []
+        assert lanechange_command[0] == ['lanes 0']
+        assert vel_array[0] == ['velocities 0']
+        assert not isinstance(lanechange_command[1], list)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,189 @@
+# -*- coding: utf-8 -*-
+"""
+Unit test for the global route planner route cache and batched routing.
+"""
+# License: MIT
+
+import os
+import sys
+import unittest
+from unittest import mock
+
+import networkx as nx
+import numpy as np
+
+# temporary solution for relative imports in case opencda is not installed
+# if opencda is installed, no need to use the following line
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from opencda.headless import carla, command
+
+with mock.patch.dict(sys.modules, {'carla': carla, 'carla.command': command}):
+    from opencda.core.plan.global_route_planner import GlobalRoutePlanner, \
+        RouteCache
+
+
+def random_graph(seed, nodes=60, edges=150):
+    """
+    Sparse directed graph with small integer lengths, so many node pairs
+    have several shortest paths, and some are not connected at all. The
+    node vertices are less than one apart, which keeps the A* distance
+    heuristic admissible.
+    """
+    rng = np.random.RandomState(seed)
+    graph = nx.DiGraph()
+    for node in range(nodes):
+        graph.add_node(node, vertex=tuple(rng.rand(3) * 0.5))
+    while graph.number_of_edges() < edges:
+        u, v = rng.randint(nodes, size=2)
+        if u != v:
+            graph.add_edge(u, v, length=int(rng.randint(1, 4)))
+    return graph
+
+
+def route_length(graph, route):
+    """
+    Length of a route up to its end edge, or None if there is no route.
+    """
+    if route is None:
+        return None
+    return sum(graph.edges[u, v]['length']
+               for u, v in zip(route[:-2], route[1:-1]))
+
+
+def planner(graph, route_cache=None):
+    route_planner = GlobalRoutePlanner(None, route_cache)
+    route_planner.set_graph(graph, {}, {})
+    return route_planner
+
+
+class TestRouteCache(unittest.TestCase):
+    def test_hit_and_miss(self):
+        cache = RouteCache(maxsize=2)
+        assert cache.get('a') is None
+        cache.put('a', [1, 2])
+        assert cache.get('a') == (1, 2)
+        assert len(cache) == 1
+        cache.clear()
+        assert cache.get('a') is None
+
+    def test_least_recently_used_eviction(self):
+        cache = RouteCache(maxsize=2)
+        cache.put('a', [1])
+        cache.put('b', [2])
+        # reading a makes b the least recently used
+        assert cache.get('a') == (1,)
+        cache.put('c', [3])
+        assert len(cache) == 2
+        assert cache.get('b') is None
+        assert cache.get('a') == (1,)
+        assert cache.get('c') == (3,)
+
+        # re-putting a key refreshes it too
+        cache.put('a', [1])
+        cache.put('d', [4])
+        assert cache.get('c') is None
+        assert cache.get('a') == (1,)
+
+    def test_planner_cache(self):
+        graph = random_graph(0)
+        edges = list(graph.edges)
+        start = edges[0]
+        end = next(e for e in edges[1:]
+                   if e[0] != start[0] and nx.has_path(graph, start[0], e[0]))
+        route_planner = planner(graph, RouteCache(maxsize=1))
+
+        with mock.patch.object(nx, 'astar_path',
+                               wraps=nx.astar_path) as search:
+            route = route_planner._edge_route(start, end)
+            assert route_planner._edge_route(start, end) == route
+            assert search.call_count == 1
+            # the returned route is a copy
+            route.append(-1)
+            assert route_planner._edge_route(start, end)[-1] == end[1]
+
+            # the batch call is served from the same cache
+            assert route_planner._edge_routes([(start, end)]) == [route[:-1]]
+            assert search.call_count == 1
+
+
+class TestEdgeRoutes(unittest.TestCase):
+    def pairs(self, graph, rng, count):
+        edges = list(graph.edges)
+        pairs = [(edges[i], edges[j])
+                 for i, j in rng.randint(len(edges), size=(count, 2))]
+        # repeated start nodes with many ends exercise the shared trees
+        start = edges[0]
+        pairs += [(start, edges[j]) for j in rng.randint(len(edges), size=10)]
+        return pairs
+
+    def test_batch_matches_single(self):
+        reachable = set()
+        for seed in range(20):
+            graph = random_graph(seed)
+            rng = np.random.RandomState(seed)
+            pairs = self.pairs(graph, rng, 40)
+
+            routes = planner(graph)._edge_routes(pairs)
+            single_planner = planner(graph)
+            for pair, route in zip(pairs, routes):
+                try:
+                    expected = single_planner._edge_route(*pair)
+                except nx.NetworkXNoPath:
+                    expected = None
+                assert route_length(graph, route) == \
+                    route_length(graph, expected)
+                if route is not None:
+                    assert route[0] == pair[0][0]
+                    assert route[-2:] == list(pair[1])
+                reachable.add(route is not None)
+        # both outcomes occur, and an unreachable pair does not fail the batch
+        assert reachable == {True, False}
+
+    def test_single_end_groups(self):
+        # a start node with one end is searched with A*, like _edge_route
+        graph = random_graph(0)
+        edges = list(graph.edges)
+        start = edges[0]
+        ends = [e for e in edges[1:] if e[0] != start[0]]
+        route_planner = planner(graph)
+        with mock.patch.object(nx, 'astar_path',
+                               wraps=nx.astar_path) as search, \
+                mock.patch.object(nx, 'single_source_dijkstra_path',
+                                  wraps=nx.single_source_dijkstra_path) \
+                as tree:
+            route_planner._edge_routes([(start, ends[0])])
+            assert search.call_count == 1
+            assert tree.call_count == 0
+
+            route_planner._edge_routes([(start, ends[1]), (start, ends[2])])
+            assert tree.call_count == (ends[1][0] != ends[2][0])
+
+    def test_shared_cache_order(self):
+        # whichever call fills the cache first, a pair gets a shortest route
+        # and keeps it once cached
+        for seed in range(20):
+            graph = random_graph(seed)
+            pairs = self.pairs(graph, np.random.RandomState(seed), 40)
+
+            batch_first = planner(graph)
+            batch_routes = batch_first._edge_routes(pairs)
+
+            single_first = planner(graph)
+            for pair in pairs:
+                try:
+                    single_first._edge_route(*pair)
+                except nx.NetworkXNoPath:
+                    pass
+            single_routes = single_first._edge_routes(pairs)
+            assert [route_length(graph, r) for r in single_routes] == \
+                [route_length(graph, r) for r in batch_routes]
+            assert single_first._edge_routes(pairs) == single_routes
+
+            for pair, route in zip(pairs, batch_routes):
+                if route is not None:
+                    assert batch_first._edge_route(*pair) == route
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,245 @@
+# -*- coding: utf-8 -*-
+"""
+Unit test for the headless world backend.
+"""
+# License: MIT
+
+import os
+import sys
+import unittest
+
+import numpy as np
+
+# temporary solution for relative imports in case opencda is not installed
+# if opencda is installed, no need to use the following line
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from opencda.headless import carla, sequential_config
+from opencda.headless.sumo_net import SumoNetwork
+from opencda.core.sensing.localization.coordinate_transform import \
+    geo_to_transform
+from opencda.scenario_testing.utils.yaml_utils import load_yaml
+
+CONFIG_DIR = os.path.join(os.path.dirname(__file__), '..', 'opencda',
+                          'scenario_testing', 'config_yaml')
+
+# an edge of two lanes joined to the next edge through a junction, with the
+# network offset of Town06
+NET_XML = """<net>
+  <location netOffset="357.36,403.33" projParameter="+proj=tmerc +lat_0=0 +lon_0=0"/>
+  <edge id=":j_0" function="internal">
+    <lane id=":j_0_0" index="0" speed="13.89" length="10.00" width="3.50" shape="457.36,400.00 467.36,400.00">
+      <param key="origId" value="3_-1"/>
+    </lane>
+  </edge>
+  <edge id="a" from="i" to="j">
+    <lane id="a_0" index="0" speed="13.89" length="100.00" width="3.50" shape="357.36,400.00 457.36,400.00" type="driving"/>
+    <lane id="a_1" index="1" speed="13.89" length="100.00" width="3.00" shape="357.36,403.50 457.36,403.50" type="driving"/>
+  </edge>
+  <edge id="b" from="j" to="k">
+    <lane id="b_0" index="0" speed="20.00" length="50.00" width="3.50" shape="467.36,400.00 467.36,450.00" type="driving"/>
+  </edge>
+  <connection from="a" to="b" fromLane="0" toLane="0" via=":j_0_0"/>
+  <connection from=":j_0" to="b" fromLane="0" toLane="0"/>
+</net>
+"""
+
+
+class TestHeadless(unittest.TestCase):
+    def setUp(self):
+        self.client = carla.Client('localhost', 2000)
+        self.world = self.client.load_world('2lane_freeway_simplified')
+        settings = self.world.get_settings()
+        settings.synchronous_mode = True
+        settings.fixed_delta_seconds = 0.05
+        self.world.apply_settings(settings)
+        self.map = self.world.get_map()
+        self.blueprint = self.world.get_blueprint_library().find(
+            'vehicle.lincoln.mkz2017')
+        self.spawn_point = self.map.get_spawn_points()[0]
+
+    def test_waypoint_projection(self):
+        waypoint = self.map.get_waypoint(self.spawn_point.location)
+        location = self.spawn_point.location
+        assert waypoint.transform.location.distance(
+            carla.Location(location.x, location.y, 0.0)) < 1e-6
+        assert waypoint.lane_type == carla.LaneType.Driving
+
+        # a point off the lane center projects onto the center
+        right = waypoint.transform.get_right_vector()
+        projected = self.map.get_waypoint(
+            waypoint.transform.location + right * 0.8)
+        assert projected.lane_id == waypoint.lane_id
+        assert projected.transform.location.distance(
+            waypoint.transform.location) < 1e-6
+
+    def test_next_previous(self):
+        waypoint = self.map.get_waypoint(self.spawn_point.location)
+        following = waypoint.next(5.0)
+        assert len(following) >= 1
+        back = following[0].previous(5.0)
+        assert min(w.transform.location.distance(waypoint.transform.location)
+                   for w in back) < 1e-3
+
+    def test_spawn_collision(self):
+        self.world.spawn_actor(self.blueprint, self.spawn_point)
+        with self.assertRaises(RuntimeError) as context:
+            self.world.spawn_actor(self.blueprint, self.spawn_point)
+        assert 'collision at spawn position' in str(context.exception)
+        assert self.world.try_spawn_actor(self.blueprint,
+                                          self.spawn_point) is None
+
+    def test_vehicle_control(self):
+        vehicle = self.world.spawn_actor(self.blueprint, self.spawn_point)
+        start = vehicle.get_location()
+        vehicle.apply_control(carla.VehicleControl(throttle=1.0))
+        for _ in range(20):
+            self.world.tick()
+        assert vehicle.get_velocity().length() > 1.0
+        forward = self.spawn_point.get_forward_vector()
+        assert (vehicle.get_location() - start).dot(forward) > 1.0
+
+    def test_autopilot(self):
+        vehicle = self.world.spawn_actor(self.blueprint, self.spawn_point)
+        vehicle.set_autopilot(True, 8000)
+        lane_id = self.map.get_waypoint(vehicle.get_location()).lane_id
+        for _ in range(40):
+            self.world.tick()
+        assert vehicle.get_velocity().length() > 1.0
+        assert self.map.get_waypoint(vehicle.get_location()).lane_id == \
+            lane_id
+        assert vehicle.get_location().distance(
+            self.spawn_point.location) > 1.0
+
+    def test_snapshot(self):
+        vehicle = self.world.spawn_actor(self.blueprint, self.spawn_point)
+        self.world.tick()
+        snapshot = self.world.get_snapshot()
+        assert snapshot.frame == 1
+        assert snapshot.find(vehicle.id).get_transform().location == \
+            vehicle.get_location()
+        assert len(self.world.get_actors().filter('*vehicle*')) == 1
+
+    def test_gnss(self):
+        vehicle = self.world.spawn_actor(self.blueprint, self.spawn_point)
+        gnss = self.world.spawn_actor(
+            self.world.get_blueprint_library().find('sensor.other.gnss'),
+            carla.Transform(), attach_to=vehicle)
+        events = []
+        gnss.listen(events.append)
+        self.world.tick()
+        assert len(events) == 1
+
+        geo_ref = self.map.transform_to_geolocation(carla.Location())
+        x, y, _ = geo_to_transform(events[0].latitude, events[0].longitude,
+                                   events[0].altitude, geo_ref.latitude,
+                                   geo_ref.longitude, 0.0)
+        location = vehicle.get_location()
+        np.testing.assert_allclose([x, y], [location.x, location.y],
+                                   atol=1e-3)
+
+
+class TestSumoNetwork(unittest.TestCase):
+    def setUp(self):
+        self.network = SumoNetwork(NET_XML, 'test')
+        self.junction, self.a, self.b = \
+            [(road.id, 0, -1) for road in self.network.roads.values()][:3]
+
+    def test_lanes(self):
+        roads = self.network.roads
+        assert [road.sumo_id for road in roads.values()] == [':j_0', 'a', 'b']
+        assert roads[self.junction[0]].junction == 0
+        assert roads[self.a[0]].junction == -1
+        # the rightmost lane has the lowest id
+        assert sorted(roads[self.a[0]].sections[0].lanes) == [-2, -1]
+        assert self.network.lane((self.a[0], 0, -2)).sumo_id == 'a_0'
+        # the internal lane takes the type of the lane leading into it
+        assert self.network.lane(self.junction).type == 'driving'
+        assert self.network.lane_range(self.b) == (0.0, 50.0)
+
+    def test_graph(self):
+        right = (self.a[0], 0, -2)
+        assert self.network.successors(right) == [self.junction]
+        assert self.network.successors(self.junction) == [self.b]
+        assert self.network.predecessors(self.b) == [self.junction]
+        assert self.network.successors(self.a) == []
+
+    def test_carla_pose(self):
+        x, y, z, yaw, pitch, width = self.network.carla_pose(
+            (self.a[0], 0, -2), np.array([0.0, 40.0]))
+        np.testing.assert_allclose(x, [0.0, 40.0])
+        np.testing.assert_allclose(y, [3.33, 3.33])
+        np.testing.assert_allclose(yaw, [0.0, 0.0], atol=1e-12)
+        np.testing.assert_allclose(width, [3.5, 3.5])
+        # b heads north in SUMO, which is -y in CARLA
+        x, y, _, yaw, _, _ = self.network.carla_pose(self.b, 20.0)
+        np.testing.assert_allclose([x, y, yaw], [110.0, -16.67, -np.pi / 2])
+
+    def test_lane_change(self):
+        assert self.network.lane_change((self.a[0], 0, -2)) == \
+            ('both', 'none')
+        assert self.network.lane_change(self.a) == ('none', 'both')
+        assert self.network.lane_change(self.junction) == ('none', 'none')
+
+
+class TestTown06(unittest.TestCase):
+    """
+    Town06 is shipped as the SUMO network generated from its .xodr.
+    """
+
+    def setUp(self):
+        self.world = carla.Client('localhost', 2000).load_world('Town06')
+        self.map = self.world.get_map()
+
+    def test_find_map(self):
+        assert carla.find_map('Town06').endswith('Town06.net.xml')
+        assert 'Town06' in carla.Client().get_available_maps()
+
+    def test_spawn_positions(self):
+        params = load_yaml(os.path.join(
+            CONFIG_DIR, 'ecloud_4lane_scenario_dist_16_car.yaml'))
+        for cav in params['scenario']['single_cav_list']:
+            x, y, z = cav['spawn_position'][:3]
+            waypoint = self.map.get_waypoint(carla.Location(x, y, z))
+            assert waypoint.lane_type == carla.LaneType.Driving
+            assert waypoint.transform.location.distance(
+                carla.Location(x, y, 0.0)) < waypoint.lane_width / 2
+            # the highway runs along +x
+            assert abs(waypoint.transform.rotation.yaw) < 5.0
+            assert waypoint.next(50.0)
+
+    def test_drive(self):
+        blueprint = self.world.get_blueprint_library().find(
+            'vehicle.lincoln.mkz2017')
+        transform = self.map.get_waypoint(
+            carla.Location(47.7194, 139.51, 0.3)).transform
+        transform.location.z += 0.5
+        vehicle = self.world.spawn_actor(blueprint, transform)
+        vehicle.set_autopilot(True, 8000)
+        for _ in range(200):
+            self.world.tick()
+        assert vehicle.get_location().x > transform.location.x + 20.0
+        waypoint = self.map.get_waypoint(vehicle.get_location(),
+                                         project_to_road=False)
+        assert waypoint is not None
+
+
+class TestSequentialConfig(unittest.TestCase):
+    def test_distributed(self):
+        config_yaml = os.path.join(CONFIG_DIR,
+                                   'ecloud_4lane_scenario_dist_16_car.yaml')
+        path = sequential_config(config_yaml)
+        self.addCleanup(os.remove, path)
+        assert path != config_yaml
+        params = load_yaml(path)
+        assert params['distributed'] is False
+        assert params['scenario']['single_cav_list'] == \
+            load_yaml(config_yaml)['scenario']['single_cav_list']
+
+    def test_sequential(self):
+        config_yaml = os.path.join(CONFIG_DIR, 'single_town06_carla.yaml')
+        assert sequential_config(config_yaml) == config_yaml
+
+
+if __name__ == '__main__':
+    unittest.main()
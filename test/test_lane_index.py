@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+"""
+Unit test for the lane centerline index.
+"""
+# License: MIT
+
+import os
+import sys
+import unittest
+
+import numpy as np
+
+# temporary solution for relative imports in case opencda is not installed
+# if opencda is installed, no need to use the following line
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '.')))
+
+import mocked_carla as mcarla
+from opencda.core.plan.lane_index import LaneIndex
+
+
+class Waypoint(object):
+    def __init__(self, road_id, lane_id, s, x, y, yaw, lane_width=3.5):
+        self.road_id = road_id
+        self.section_id = 0
+        self.lane_id = lane_id
+        self.s = s
+        self.lane_width = lane_width
+        self.transform = mcarla.Transform(x=x, y=y, z=0, yaw=yaw)
+
+
+class Map(object):
+    """
+    Two lanes of road 1 running along +x at y=0 and y=3.5, and one lane of
+    road 2 running along -y at x=100. As in CARLA, the positive lane is
+    driven against the direction of s, so its s decreases along its yaw.
+    """
+    name = 'Town00'
+
+    def generate_waypoints(self, distance):
+        waypoints = []
+        for s in np.arange(0, 50, distance):
+            waypoints.append(Waypoint(1, -1, s, s, 0.0, 0.0))
+            waypoints.append(Waypoint(1, -2, s, s, 3.5, 0.0))
+            waypoints.append(Waypoint(2, 1, 50 - s, 100.0, -s, -90.0))
+        return waypoints
+
+
+class TestLaneIndex(unittest.TestCase):
+    def setUp(self):
+        self.lane_index = LaneIndex(Map(), resolution=1.0)
+
+    def test_project(self):
+        projection = self.lane_index.project(mcarla.Location(10.3, 2.5, 0.5))
+        assert projection.road_id == 1 and projection.lane_id == -2
+        np.testing.assert_allclose([projection.x, projection.y, projection.s],
+                                   [10.3, 3.5, 10.3])
+        assert projection.lane_width == 3.5
+
+    def test_project_positive_lane(self):
+        projection = self.lane_index.project(mcarla.Location(99, -20.2, 0))
+        assert projection.road_id == 2 and projection.lane_id == 1
+        assert projection.yaw == -90.0
+        # 20.2m along the lane from its start at s=50
+        np.testing.assert_allclose([projection.x, projection.y, projection.s],
+                                   [100.0, -20.2, 29.8])
+
+    def test_project_array(self):
+        points = np.array([[5.0, 0.4, 0], [5.0, 3.0, 0], [101.0, -7.0, 0]])
+        indices, locations, _ = self.lane_index.project_array(points)
+        np.testing.assert_array_equal(self.lane_index.lane_ids[indices],
+                                      [-1, -2, 1])
+        np.testing.assert_allclose(locations[:, :2],
+                                   [[5.0, 0.0], [5.0, 3.5], [100.0, -7.0]])
+        np.testing.assert_array_equal(self.lane_index.lane_ids_of(points),
+                                      [-1, -2, 1])
+
+
+if __name__ == '__main__':
+    unittest.main()
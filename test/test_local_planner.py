@@ -0,0 +1,198 @@
+# -*- coding: utf-8 -*-
+"""
+Unit test for the local planner trajectory buffer.
+"""
+# License: MIT
+
+import math
+import os
+import statistics
+import sys
+import types
+import unittest
+from collections import deque
+from unittest import mock
+
+import numpy as np
+
+# temporary solution for relative imports in case opencda is not installed
+# if opencda is installed, no need to use the following line
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from opencda.headless import carla, command
+
+with mock.patch.dict(sys.modules, {'carla': carla, 'carla.command': command}):
+    from opencda.core.plan.local_planner_behavior import LocalPlanner
+    from opencda.core.plan.trajectory_buffer import TrajectoryBuffer
+
+
+def list_generate_trajectory(rx, ry, rk, target_speed, current_speed, dt, z):
+    """
+    The per-sample, deque-based trajectory generation the arrays replaced.
+    """
+    trajectory_buffer = deque(maxlen=30)
+    ds = 0.1
+    sample_num = 2.0 // dt
+
+    break_flag = False
+    current_speed = current_speed / 3.6
+    sample_resolution = 0
+
+    mean_k = 0.0001 if len(rk) < 2 else abs(statistics.mean(rk))
+    target_speed = min(target_speed, np.sqrt(5.0 / (mean_k + 10e-6)) * 3.6)
+
+    max_acc = 3.5
+    acceleration = max(
+        min(max_acc, (target_speed / 3.6 - current_speed) / dt), -6.5)
+
+    for i in range(1, int(sample_num) + 1):
+        sample_resolution += current_speed * dt + \
+                             0.5 * acceleration * dt ** 2
+        current_speed += acceleration * dt
+
+        if int(sample_resolution // ds - 1) >= len(rx):
+            sample_x = rx[-1]
+            sample_y = ry[-1]
+            break_flag = True
+        else:
+            sample_x = rx[max(0, int(sample_resolution // ds - 1))]
+            sample_y = ry[max(0, int(sample_resolution // ds - 1))]
+
+        trajectory_buffer.append(
+            (carla.Transform(carla.Location(sample_x, sample_y, z)),
+             target_speed))
+        if break_flag:
+            break
+    return trajectory_buffer
+
+
+def list_pop_buffer(trajectory_buffer, vehicle_transform, min_distance):
+    """
+    The per-point trajectory pop the vectorized distance check replaced.
+    """
+    max_index = -1
+    for i, (waypoint, _,) in enumerate(trajectory_buffer):
+        loc = vehicle_transform.location
+        if math.hypot(waypoint.location.x - loc.x,
+                      waypoint.location.y - loc.y) < \
+                max(min_distance - 1, 1):
+            max_index = i
+    if max_index >= 0:
+        for i in range(max_index + 1):
+            trajectory_buffer.popleft()
+
+
+def points(trajectory):
+    return [(t.location.x, t.location.y, t.location.z)
+            for t, _ in trajectory]
+
+
+def speeds(trajectory):
+    return np.array([speed for _, speed in trajectory])
+
+
+class TestTrajectoryBuffer(unittest.TestCase):
+    def test_deque_interface(self):
+        rng = np.random.RandomState(0)
+        for _ in range(50):
+            n = rng.randint(1, 60)
+            trajectory = [(carla.Transform(carla.Location(*rng.uniform(-9, 9, 3))),
+                           rng.uniform(0, 50)) for _ in range(n)]
+            expected = deque(trajectory, maxlen=30)
+            buffer = TrajectoryBuffer(maxlen=30)
+            buffer.assign(trajectory)
+
+            assert len(buffer) == len(expected)
+            assert points(buffer) == points(expected)
+            assert points([buffer[0], buffer[-1]]) == \
+                points([expected[0], expected[-1]])
+
+            pops = rng.randint(1, len(expected) + 1)
+            popped = buffer.popleft(pops)
+            for _ in range(pops):
+                last = expected.popleft()
+            assert points([popped]) == points([last])
+            assert points(buffer) == points(expected)
+            assert bool(buffer) == bool(expected)
+            assert points(buffer.copy()) == points(expected)
+            assert list(speeds(buffer)) == list(speeds(expected))
+
+        with self.assertRaises(IndexError):
+            buffer[len(buffer)]
+        buffer.clear()
+        assert len(buffer) == 0
+        with self.assertRaises(IndexError):
+            buffer.popleft()
+
+
+class TestLocalPlanner(unittest.TestCase):
+    def setUp(self):
+        config_yaml = {'min_dist': 3, 'buffer_size': 8,
+                       'trajectory_update_freq': 15,
+                       'waypoint_update_freq': 9, 'trajectory_dt': 0.2,
+                       'debug': False, 'debug_trajectory': False}
+        self.planner = LocalPlanner(types.SimpleNamespace(vehicle=None),
+                                    None, config_yaml)
+        self.z = 0.3
+        # far enough never to be reached by pop_buffer
+        waypoint = types.SimpleNamespace(
+            transform=carla.Transform(carla.Location(1e6, 0, self.z)),
+            is_junction=False)
+        self.planner._waypoint_buffer.append((waypoint, None))
+
+    def random_path(self, rng):
+        n = rng.randint(2, 500)
+        yaw = rng.uniform(-np.pi, np.pi) + np.cumsum(rng.normal(0, 0.01, n))
+        rx = np.cumsum(0.1 * np.cos(yaw))
+        ry = np.cumsum(0.1 * np.sin(yaw))
+        rk = np.clip(rng.normal(0, 0.05, n), -0.2, 0.2)
+        return rx, ry, rk
+
+    def test_generate_trajectory(self):
+        rng = np.random.RandomState(0)
+        for _ in range(300):
+            rx, ry, rk = self.random_path(rng)
+            self.planner.dt = rng.choice([0.1, 0.2, 0.25])
+            self.planner._target_speed = rng.uniform(0, 120)
+            self.planner._ego_speed = rng.uniform(0, 120)
+
+            self.planner._trajectory_buffer.clear()
+            self.planner.generate_trajectory(rx, ry, rk)
+            expected = list_generate_trajectory(
+                rx.tolist(), ry.tolist(), rk.tolist(),
+                self.planner._target_speed, self.planner._ego_speed,
+                self.planner.dt, self.z + 0.5)
+
+            assert points(self.planner._trajectory_buffer) == points(expected)
+            # np.mean and statistics.mean of the curvature differ in the
+            # last bit, and so may the speed limit derived from it
+            np.testing.assert_allclose(
+                speeds(self.planner._trajectory_buffer), speeds(expected),
+                rtol=1e-12)
+
+    def test_pop_buffer(self):
+        rng = np.random.RandomState(1)
+        popped = set()
+        for _ in range(300):
+            rx, ry, rk = self.random_path(rng)
+            self.planner.dt = 0.1
+            self.planner._target_speed = rng.uniform(20, 120)
+            self.planner._ego_speed = rng.uniform(0, 120)
+            self.planner.generate_trajectory(rx, ry, rk)
+            expected = deque(self.planner._trajectory_buffer, maxlen=30)
+            generated = len(expected)
+
+            i = rng.randint(min(len(rx), 100))
+            vehicle_transform = carla.Transform(carla.Location(
+                rx[i] + rng.normal(0, 2), ry[i] + rng.normal(0, 2), 0))
+            self.planner.pop_buffer(vehicle_transform)
+            list_pop_buffer(expected, vehicle_transform,
+                            self.planner._min_distance)
+
+            assert points(self.planner._trajectory_buffer) == points(expected)
+            popped.add(len(expected) < generated)
+        assert popped == {True, False}
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+"""
+Unit test for packed vehicle state encoding.
+"""
+# License: MIT
+
+import os
+import sys
+import unittest
+
+import numpy as np
+
+# temporary solution for relative imports in case opencda is not installed
+# if opencda is installed, no need to use the following line
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '.')))
+
+import mocked_carla as mcarla
+from opencda.ecloud_server.packed_state import PACKED_STATE_DTYPE, \
+    pack_vehicle_state, unpack_vehicle_states
+
+
+class TestPackedState(unittest.TestCase):
+    def setUp(self):
+        self.transforms = [mcarla.Transform(x=i, y=2 * i, z=0.5, pitch=1, yaw=90 + i, roll=-1)
+                           for i in range(4)]
+        self.velocities = [mcarla.Vector3D(x=i, y=-i, z=0) for i in range(4)]
+
+    def test_record_size(self):
+        record = pack_vehicle_state(3, self.transforms[0], self.velocities[0])
+        assert len(record) == PACKED_STATE_DTYPE.itemsize
+
+    def test_round_trip(self):
+        blob = b''.join(pack_vehicle_state(i, t, v) for i, (t, v) in
+                        enumerate(zip(self.transforms, self.velocities)))
+        states = unpack_vehicle_states(blob)
+
+        assert states.shape == (4,)
+        np.testing.assert_array_equal(states['vehicle_index'], np.arange(4))
+        np.testing.assert_allclose(states['x'], [0, 1, 2, 3])
+        np.testing.assert_allclose(states['y'], [0, 2, 4, 6])
+        np.testing.assert_allclose(states['yaw'], [90, 91, 92, 93])
+        np.testing.assert_allclose(states['roll'], -1)
+        np.testing.assert_allclose(states['vy'], [0, -1, -2, -3])
+
+    def test_empty(self):
+        assert unpack_vehicle_states(b'').shape == (0,)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,273 @@
+# -*- coding: utf-8 -*-
+"""
+Unit test for the local process pool stepping sequential-mode CAVs.
+"""
+# License: MIT
+
+import os
+import sys
+import threading
+import time
+import types
+import unittest
+import multiprocessing as mp
+from unittest import mock
+
+import numpy as np
+
+# temporary solution for relative imports in case opencda is not installed
+# if opencda is installed, no need to use the following line
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from opencda.headless import carla, command
+from opencda.core.common.world_snapshot import SNAPSHOT_COLUMNS, \
+    WorldActorSnapshot
+
+try:
+    with mock.patch.dict(sys.modules,
+                         {'carla': carla, 'carla.command': command}):
+        from opencda.scenario_testing.utils import parallel_executor
+except ImportError:
+    parallel_executor = None
+
+
+class Server(object):
+    """
+    The frame of the world, advanced by the process ticking it.
+    """
+
+    def __init__(self):
+        self.frame = 0
+
+
+class World(object):
+    """
+    The world as seen by a worker's client, which only catches up with the
+    server one tick at a time.
+    """
+
+    def __init__(self, server):
+        self.server = server
+        self.frame = 0
+
+    def get_snapshot(self):
+        return types.SimpleNamespace(frame=self.frame)
+
+    def wait_for_tick(self, seconds):
+        if self.frame >= self.server.frame:
+            time.sleep(seconds)
+            raise RuntimeError('time-out of %ss while waiting for the '
+                               'simulator' % seconds)
+        time.sleep(0.001)
+        self.frame += 1
+
+    def get_map(self):
+        return None
+
+    def get_actors(self):
+        return types.SimpleNamespace(filter=lambda pattern: [])
+
+    def get_actor(self, actor_id):
+        return types.SimpleNamespace(id=actor_id)
+
+
+class Client(object):
+    server = None
+
+    def __init__(self, host, port):
+        self.world = World(self.server)
+
+    def set_timeout(self, seconds):
+        pass
+
+    def get_world(self):
+        return self.world
+
+
+class VehicleManager(object):
+    """
+    Vehicle whose control depends on its index and on the world snapshot
+    its cav world hands out.
+    """
+
+    def __init__(self, vehicle_index, carla_world, cav_world, **kwargs):
+        self.vehicle_index = vehicle_index
+        self.vid = str(vehicle_index)
+        self.world = carla_world
+        self.cav_world = cav_world
+        self.location = carla.Location(x=10.0 * vehicle_index)
+        self.vehicle = types.SimpleNamespace(
+            id=1000 + vehicle_index, get_location=lambda: self.location)
+        self.v2x_manager = types.SimpleNamespace(
+            set_platoon=lambda platoon: None)
+        self.destination_location = None
+        self.rng = np.random.RandomState(vehicle_index)
+
+    def update_info(self):
+        pass
+
+    def set_destination(self, start_location, end_location, clean=False):
+        pass
+
+    def run_step(self):
+        # shuffle the order the workers answer in
+        time.sleep(self.rng.uniform(0, 0.003))
+        world_snapshot = self.cav_world.get_world_snapshot(self.world)
+        neighbours = world_snapshot.vehicles_in_range(self.location, 25.0)
+        return carla.VehicleControl(
+            throttle=self.vehicle_index / 100.0,
+            steer=len(neighbours) / 100.0,
+            brake=float(world_snapshot.vehicle_locations[:, 0].sum()),
+            gear=self.world.get_snapshot().frame * 1000 +
+            world_snapshot.frame)
+
+    def destroy(self):
+        pass
+
+
+class ThreadConnection(object):
+    """
+    The worker's end of a pipe. The executor closes its copy of that end
+    once the worker started, which a thread shares, so that is ignored.
+    """
+
+    def __init__(self, connection):
+        self.connection = connection
+
+    def __getattr__(self, name):
+        return getattr(self.connection, name)
+
+    def close(self):
+        pass
+
+
+class ThreadProcess(threading.Thread):
+    """
+    Worker running in a thread, so the fakes above need not be pickled.
+    """
+
+    pid = None
+
+    def __init__(self, target, args, daemon):
+        super().__init__(target=target, args=args, daemon=daemon)
+        self.connection = args[0].connection
+
+    def run(self):
+        super().run()
+        self.connection.close()
+
+    def terminate(self):
+        pass
+
+
+class ThreadContext(object):
+    Process = ThreadProcess
+
+    @staticmethod
+    def Pipe():
+        parent_conn, child_conn = mp.Pipe()
+        return parent_conn, ThreadConnection(child_conn)
+
+
+def world_snapshot(frame, rng, vehicle_count=12):
+    rows = np.zeros((vehicle_count, SNAPSHOT_COLUMNS))
+    rows[:, 0] = np.arange(vehicle_count)
+    rows[:, 1:3] = rng.uniform(-10, 80, (vehicle_count, 2))
+    rows[:, 13:16] = [2.4, 1.0, 0.7]
+    return WorldActorSnapshot.from_array(frame, rows)
+
+
+@unittest.skipIf(parallel_executor is None,
+                 'vehicle manager dependencies are not installed')
+class TestParallelExecutor(unittest.TestCase):
+    def setUp(self):
+        patchers = [mock.patch.dict(sys.modules, {'carla': carla,
+                                                  'carla.command': command}),
+                    mock.patch.object(parallel_executor.carla, 'Client',
+                                      Client),
+                    mock.patch.object(parallel_executor, 'VehicleManager',
+                                      VehicleManager),
+                    mock.patch.object(parallel_executor.mp, 'get_context',
+                                      return_value=ThreadContext)]
+        for patcher in patchers:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.scenario_params = {'world': {'client_port': 2000},
+                                'current_time': '',
+                                'scenario': {'single_cav_list': [
+                                    {'sensing': {'localization': {
+                                        'debug_helper': {
+                                            'show_animation': False,
+                                            'x_scale': 1.0,
+                                            'y_scale': 1.0}}}}] * 7}}
+
+    def test_shard_indices(self):
+        assert parallel_executor.shard_indices(7, 3) == \
+            [[0, 1, 2], [3, 4], [5, 6]]
+        assert parallel_executor.shard_indices(2, 4) == [[0], [1]]
+        assert parallel_executor.shard_indices(0, 2) == []
+        for vehicle_count in range(12):
+            for num_workers in range(1, 6):
+                shards = parallel_executor.shard_indices(vehicle_count,
+                                                         num_workers)
+                assert sum(shards, []) == list(range(vehicle_count))
+                sizes = [len(shard) for shard in shards]
+                assert len(shards) <= num_workers
+                assert not sizes or max(sizes) - min(sizes) <= 1
+
+    def test_pack_control(self):
+        control = carla.VehicleControl(throttle=0.4, steer=-0.25, brake=0.1,
+                                       hand_brake=True, reverse=True,
+                                       manual_gear_shift=True, gear=2)
+        unpacked = parallel_executor.unpack_control(
+            parallel_executor.pack_control(control))
+        for field in ['throttle', 'steer', 'brake', 'hand_brake', 'reverse',
+                      'manual_gear_shift', 'gear']:
+            assert getattr(unpacked, field) == getattr(control, field)
+        assert parallel_executor.pack_control(None) is None
+        assert parallel_executor.unpack_control(None) is None
+
+    def run_workers(self, num_workers, frames=5):
+        Client.server = Server()
+        executor = parallel_executor.ParallelVehicleExecutor(
+            self.scenario_params, ['single'], 7, num_workers,
+            snapshot_capacity=16)
+        rng = np.random.RandomState(0)
+        steps = []
+        try:
+            vehicles = executor.spawn(World(Client.server))
+            assert [v.vehicle_index for v in vehicles] == list(range(7))
+            executor.start()
+            for _ in range(frames):
+                # the workers' clients lag up to a few ticks behind
+                Client.server.frame += rng.randint(1, 4)
+                controls = executor.step(
+                    world_snapshot(Client.server.frame, rng))
+                steps.append([parallel_executor.pack_control(control)
+                              for control in controls])
+        finally:
+            executor.close()
+        return steps
+
+    def test_worker_equivalence(self):
+        expected = self.run_workers(1)
+        for num_workers in [2, 3, 7]:
+            assert self.run_workers(num_workers) == expected
+
+    def test_wait_for_frame(self):
+        for packed in self.run_workers(3):
+            gears = {control[-1] for control in packed}
+            assert len(gears) == 1
+            # every worker's client reached the frame of the shared
+            # snapshot, which was used rather than rebuilt
+            client_frame, snapshot_frame = divmod(gears.pop(), 1000)
+            assert client_frame == snapshot_frame > 0
+
+    def test_frame_timeout(self):
+        world = World(Server())
+        with self.assertRaises(RuntimeError):
+            parallel_executor.wait_for_frame(world, 1, timeout=0.2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -73,6 +73,60 @@ class TestSensorTransformation(unittest.TestCase):
         assert project_lidar_to_camera(self.lidar, self.camera, self.point_cloud, self.rgb_image)[0].shape == \
                self.rgb_image.shape
 
+    def test_lidar_camera_projection(self):
+        # rotated sensors, and points in front of the camera, away from
+        # its image plane where the normalization is ill-conditioned
+        self.lidar.transform = mcarla.Transform(x=10, y=10, z=10, pitch=-5,
+                                                yaw=30, roll=2)
+        self.camera.transform = mcarla.Transform(x=11, y=9, z=11, pitch=-10,
+                                                 yaw=20, roll=0)
+        point_cloud = np.random.uniform(-10, 10, size=(200, 4))
+        point_cloud[:, 0] += 30
+
+        # the chain of the per-call projection: lidar to world, world to
+        # camera, UE4 to camera axes and the intrinsic
+        local_points = np.ones((4, len(point_cloud)))
+        local_points[:3] = point_cloud[:, :3].T
+        world_points = np.dot(
+            x_to_world_transformation(self.lidar.get_transform()),
+            local_points)
+        sensor_points = world_to_sensor(world_points,
+                                        self.camera.get_transform())
+        camera_points = np.array([sensor_points[1],
+                                  sensor_points[2] * -1,
+                                  sensor_points[0]])
+        expected = np.dot(get_camera_intrinsic(self.camera), camera_points)
+        expected = np.array([expected[0, :] / expected[2, :],
+                             expected[1, :] / expected[2, :],
+                             expected[2, :]]).T
+
+        projection = LidarCameraProjection(self.lidar, self.camera)
+        np.testing.assert_allclose(projection.project(point_cloud), expected,
+                                   rtol=1e-9, atol=1e-9)
+        np.testing.assert_allclose(
+            project_lidar_to_camera(self.lidar, self.camera, point_cloud,
+                                    self.rgb_image.copy())[1],
+            expected, rtol=1e-9, atol=1e-9)
+
+        # the matrix is only rebuilt when a sensor moves
+        matrix = projection.matrix()
+        assert projection.matrix() is matrix
+        self.lidar.transform = mcarla.Transform(x=12, y=11, z=11)
+        assert projection.matrix() is not matrix
+
+    def test_draw_lidar_points(self):
+        rgb_image = np.zeros((800, 600, 3), dtype='uint8')
+        points_2d = np.array([[10.5, 20.5, 5.0],
+                              [10.5, 20.5, -5.0],
+                              [0.5, 20.5, 5.0],
+                              [700.0, 20.5, 5.0]])
+        intensity = np.ones(4)
+        draw_lidar_points(rgb_image, points_2d, intensity)
+        # only the first point is in front of the camera, inside the image
+        # and off its first column
+        assert np.count_nonzero(rgb_image.any(axis=2)) == 4
+        assert rgb_image[19:21, 9:11].any(axis=2).all()
+
 
 if __name__ == '__main__':
     unittest.main()
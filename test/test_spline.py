@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+"""
+Unit test for the cubic spline planner.
+"""
+# License: MIT
+
+import os
+import sys
+import unittest
+
+import numpy as np
+import scipy.linalg
+
+# temporary solution for relative imports in case opencda is not installed
+# if opencda is installed, no need to use the following line
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '.')))
+
+from opencda.core.plan.spline import Spline, Spline2D, calc_spline_course
+
+
+class TestSpline(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.RandomState(0)
+        self.x = list(np.cumsum(rng.uniform(1, 5, 20)))
+        self.y = list(rng.uniform(-3, 3, 20))
+        self.sp = Spline2D(self.x, self.y)
+
+    def test_natural_spline_system(self):
+        sp = Spline(self.x, self.y)
+        h = np.diff(self.x)
+        n = len(self.x)
+        A = np.zeros((n, n))
+        A[0, 0] = A[-1, -1] = 1.0
+        B = np.zeros(n)
+        for i in range(1, n - 1):
+            A[i, i - 1], A[i, i], A[i, i + 1] = \
+                h[i - 1], 2.0 * (h[i - 1] + h[i]), h[i]
+            B[i] = 3.0 * (self.y[i + 1] - self.y[i]) / h[i] - \
+                3.0 * (self.y[i] - self.y[i - 1]) / h[i - 1]
+        np.testing.assert_allclose(sp.c, scipy.linalg.solve(A, B), atol=1e-9)
+
+    def test_interpolates_knots(self):
+        x, y = self.sp.calc_position_array(np.array(self.sp.s))
+        np.testing.assert_allclose(x, self.x)
+        np.testing.assert_allclose(y, self.y)
+
+    def test_scalar_matches_array(self):
+        s = np.arange(0, self.sp.s[-1], 0.37)
+        x, y = self.sp.calc_position_array(s)
+        yaw = self.sp.calc_yaw_array(s)
+        k = self.sp.calc_curvature_array(s)
+        for i in range(0, len(s), 7):
+            assert self.sp.calc_position(s[i]) == (x[i], y[i])
+            assert self.sp.calc_yaw(s[i]) == yaw[i]
+            assert self.sp.calc_curvature(s[i]) == k[i]
+
+    def test_out_of_range(self):
+        assert self.sp.calc_position(-1.0) == (None, None)
+        assert self.sp.sx.calc(self.sp.s[-1]) is not None
+        x, _ = self.sp.calc_position_array([-1.0, self.sp.s[-1] + 1])
+        assert np.all(np.isnan(x))
+
+    def test_spline_course(self):
+        rx, ry, ryaw, rk, s = calc_spline_course([0, 1, 3], [0, 1, 0])
+        assert len(rx) == len(ry) == len(ryaw) == len(rk) == len(s)
+        assert rx[0] == 0 and ry[0] == 0
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,179 @@
+# -*- coding: utf-8 -*-
+"""
+Regression test for the array transforms of the edge transform_processor.
+"""
+# License: MIT
+
+import os
+import sys
+import unittest
+from unittest import mock
+
+import numpy as np
+
+# temporary solution for relative imports in case opencda is not installed
+# if opencda is installed, no need to use the following line
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from opencda.headless import carla, command
+
+try:
+    with mock.patch.dict(sys.modules,
+                         {'carla': carla, 'carla.command': command}):
+        from opencda.core.application.edge import transform_utils
+except ImportError:
+    transform_utils = None
+
+
+def road_waypoints(heading=0.3, lane_spacing=3.5):
+    """
+    Waypoints of four parallel lanes, keyed by lane as the edge does.
+    """
+    direction = np.array([[np.cos(heading)], [np.sin(heading)]])
+    normal = np.array([[-np.sin(heading)], [np.cos(heading)]])
+    s = np.linspace(0, 300, 31)
+    waypoints = {}
+    for lane in range(1, 5):
+        points = direction * s + normal * lane_spacing * (lane - 1) + \
+            np.array([[100.0], [-50.0]])
+        waypoints[lane] = {'x': list(points[0]), 'y': list(points[1])}
+    return waypoints
+
+
+def forward_reference(processor, waypoint_x, waypoint_y):
+    """
+    The per point forward transform, on the scalar transform.
+    """
+    np_waypoint = transform_utils.transform(waypoint_x, waypoint_y,
+                                            processor.rotation_mat,
+                                            processor.offset)
+    lane_number = -int(np_waypoint[1, 0] / processor.lanewidth)
+    lane_number = min(max(lane_number, 0), 3)
+    return np_waypoint[0, 0], lane_number
+
+
+def back_reference(processor, x, lane_number):
+    """
+    The per point back transform, on the scalar inverse_transform.
+    """
+    y = lane_number
+    if lane_number != 0:
+        y = (lane_number + 1) / processor.scaling[int(lane_number)]
+    return transform_utils.inverse_transform(x, y,
+                                             processor.inverse_rotation_mat,
+                                             -processor.offset)
+
+
+@unittest.skipIf(transform_utils is None,
+                 'the edge transform_utils dependencies are not installed')
+class TestTransformProcessor(unittest.TestCase):
+    def setUp(self):
+        self.processor = transform_utils.transform_processor(road_waypoints())
+
+    def world_points(self, x, y):
+        """
+        World positions of points given in the road frame.
+        """
+        return transform_utils.inverse_transform_array(
+            x, y, self.processor.inverse_rotation_mat, -self.processor.offset)
+
+    def test_forward_random(self):
+        rng = np.random.RandomState(0)
+        waypoints_x = rng.uniform(50, 400, (5, 40))
+        waypoints_y = rng.uniform(-80, 120, (5, 40))
+
+        x, lane_number = self.processor.process_waypoints_forward(
+            waypoints_x, waypoints_y)
+
+        self.assertEqual(x.shape, (5, 40))
+        self.assertEqual(lane_number.shape, (5, 40))
+        for index in np.ndindex(waypoints_x.shape):
+            self.assertEqual(
+                (x[index], lane_number[index]),
+                forward_reference(self.processor, waypoints_x[index],
+                                  waypoints_y[index]))
+
+    def test_forward_edge_cases(self):
+        # road frame points away from the integer boundaries, so that the
+        # round trip through the world frame cannot move them across one
+        road_x = np.array([-10.7, -10.3, 5.6, -0.4, -50.5, -120.2, -7.5,
+                           -3.5])
+        road_y = np.array([0.5, -2.9, -3.2, -5.9, -20.5, 7.4, -9.5, -11.6])
+        # x and y truncate toward zero, the lane is clipped to 0..3
+        expected_x = [-10, -10, 5, 0, -50, -120, -7, -3]
+        expected_lane = [0, 0, 1, 1, 3, 0, 3, 3]
+
+        waypoints_x, waypoints_y = self.world_points(road_x, road_y)
+        x, lane_number = self.processor.process_waypoints_forward(
+            waypoints_x, waypoints_y)
+
+        self.assertEqual(x.tolist(), expected_x)
+        self.assertEqual(lane_number.tolist(), expected_lane)
+        for i in range(len(road_x)):
+            self.assertEqual(
+                (x[i], lane_number[i]),
+                forward_reference(self.processor, waypoints_x[i],
+                                  waypoints_y[i]))
+            self.assertEqual(
+                self.processor.process_single_waypoint_forward(
+                    waypoints_x[i], waypoints_y[i]),
+                (expected_x[i], expected_lane[i]))
+
+    def test_forward_lanes(self):
+        waypoints = road_waypoints()
+        for lane in waypoints:
+            _, lane_number = self.processor.process_waypoints_forward(
+                waypoints[lane]['x'][1:], waypoints[lane]['y'][1:])
+            np.testing.assert_array_equal(lane_number, lane - 1)
+
+    def test_back(self):
+        rng = np.random.RandomState(1)
+        x = rng.uniform(-300, 10, (4, 12))
+        lane_number = rng.randint(0, 4, (4, 12)).astype(float)
+        # the unscaled lane 0 is included
+        lane_number[:, 0] = 0
+
+        waypoints_x, waypoints_y = self.processor.process_waypoints_back(
+            x, lane_number)
+
+        self.assertEqual(waypoints_x.shape, (4, 12))
+        self.assertEqual(waypoints_y.shape, (4, 12))
+        for index in np.ndindex(x.shape):
+            expected = back_reference(self.processor, x[index],
+                                      lane_number[index])
+            np.testing.assert_allclose(
+                [waypoints_x[index], waypoints_y[index]], expected[:, 0],
+                rtol=0, atol=1e-9)
+
+    def test_back_lane_zero(self):
+        x = np.array([-40.0, 0.0, 12.5])
+        waypoints_x, waypoints_y = self.processor.process_waypoints_back(
+            x, np.zeros(3))
+
+        # lane 0 is not scaled, so it maps back onto the road frame y = 0
+        expected_x, expected_y = self.world_points(x, np.zeros(3))
+        np.testing.assert_allclose(waypoints_x, expected_x, atol=1e-9)
+        np.testing.assert_allclose(waypoints_y, expected_y, atol=1e-9)
+
+    def test_process_back(self):
+        rng = np.random.RandomState(2)
+        processed = [np.array([[rng.uniform(-300, 10)], [float(lane)]])
+                     for lane in (0, 1, 2, 3, 0, 2)]
+        original = [point.copy() for point in processed]
+
+        back = self.processor.process_back(processed)
+
+        self.assertEqual(len(back), len(processed))
+        for point, inverted in zip(original, back):
+            self.assertEqual(inverted.shape, (2, 1))
+            np.testing.assert_allclose(
+                inverted, back_reference(self.processor, point[0, 0],
+                                         point[1, 0]),
+                rtol=0, atol=1e-9)
+        # the input is not rescaled in place
+        for point, before in zip(processed, original):
+            np.testing.assert_array_equal(point, before)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,196 @@
+# -*- coding: utf-8 -*-
+"""
+Unit test for the shared world actor snapshot.
+"""
+# License: MIT
+
+import os
+import sys
+import unittest
+from unittest import mock
+
+import numpy as np
+
+# temporary solution for relative imports in case opencda is not installed
+# if opencda is installed, no need to use the following line
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '.')))
+
+import mocked_carla as mcarla
+from opencda.headless import carla as headless_carla
+from opencda.headless import command as headless_command
+from opencda.core.common.cav_world import CavWorld
+
+try:
+    with mock.patch.dict(sys.modules, {'carla': headless_carla,
+                                       'carla.command': headless_command}):
+        from opencda.scenario_testing.utils.parallel_executor import \
+            SharedSnapshotBuffer
+except ImportError:
+    SharedSnapshotBuffer = None
+
+
+class BoundingBox(object):
+    def __init__(self):
+        self.location = mcarla.Location(0, 0, 0.7)
+        self.extent = mcarla.Vector3D(2.4, 1.0, 0.7)
+
+
+class Actor(object):
+    def __init__(self, actor_id, type_id, x, y):
+        self.id = actor_id
+        self.type_id = type_id
+        self.bounding_box = BoundingBox()
+        self.transform = mcarla.Transform(x=x, y=y, z=0)
+        self.velocity = mcarla.Vector3D(x, 0, 0)
+
+    def get_location(self):
+        return self.transform.location
+
+    def get_transform(self):
+        return self.transform
+
+    def get_velocity(self):
+        return self.velocity
+
+
+class ActorList(list):
+    def filter(self, pattern):
+        key = pattern.strip('*').rstrip('*')
+        return ActorList(a for a in self if key in a.type_id)
+
+
+class Snapshot(object):
+    def __init__(self, frame, actors):
+        self.frame = frame
+        self._actors = {a.id: a for a in actors}
+
+    def __iter__(self):
+        return iter(self._actors.values())
+
+    def find(self, actor_id):
+        return self._actors.get(actor_id)
+
+
+class World(object):
+    def __init__(self):
+        self.frame = 0
+        self.actors = ActorList(
+            [Actor(i, 'vehicle.tesla.model3', 10 * i, 0) for i in range(10)] +
+            [Actor(100, 'traffic.traffic_light', 15, 5)])
+        self.get_actors_calls = 0
+
+    def get_actors(self):
+        self.get_actors_calls += 1
+        return self.actors
+
+    def get_snapshot(self):
+        return Snapshot(self.frame, self.actors)
+
+
+class TestWorldSnapshot(unittest.TestCase):
+    def setUp(self):
+        self.world = World()
+        self.cav_world = CavWorld()
+
+    def test_vehicles_in_range(self):
+        snapshot = self.cav_world.get_world_snapshot(self.world)
+        vehicles = snapshot.vehicles_in_range(mcarla.Location(30, 0, 0),
+                                              25, exclude_id=3)
+        assert sorted(v.id for v in vehicles) == [1, 2, 4, 5]
+        assert vehicles[0].get_velocity().x == 10 * vehicles[0].id
+        np.testing.assert_allclose(snapshot.vehicle_extents[0],
+                                   [2.4, 1.0, 0.7])
+
+    def test_traffic_lights_in_range(self):
+        snapshot = self.cav_world.get_world_snapshot(self.world)
+        assert len(snapshot.traffic_lights_in_range(
+            mcarla.Location(0, 0, 0), 10)) == 0
+        traffic_lights = snapshot.traffic_lights_in_range(
+            mcarla.Location(10, 0, 0), 10)
+        assert [tl.id for tl, _ in traffic_lights] == [100]
+
+    def test_cached_per_frame(self):
+        first = self.cav_world.get_world_snapshot(self.world)
+        assert self.cav_world.get_world_snapshot(self.world) is first
+
+        self.world.frame += 1
+        self.world.actors[0].transform = mcarla.Transform(x=500, y=0, z=0)
+        second = self.cav_world.get_world_snapshot(self.world)
+        assert second is not first
+        assert second.vehicle_locations[0, 0] == 500
+        # no actor was spawned or destroyed, so the actor list is reused
+        assert self.world.get_actors_calls == 1
+
+        self.world.frame += 1
+        self.world.actors.append(Actor(11, 'vehicle.audi.tt', 0, 50))
+        third = self.cav_world.get_world_snapshot(self.world)
+        assert self.world.get_actors_calls == 2
+        assert len(third.vehicles) == 11
+
+    def test_spawned_after_snapshot(self):
+        snapshot = self.world.get_snapshot()
+        self.world.get_snapshot = lambda: snapshot
+        # e.g. an asynchronous or batched spawn between the two queries
+        self.world.actors.append(Actor(11, 'vehicle.audi.tt', 0, 50))
+
+        first = self.cav_world.get_world_snapshot(self.world)
+        assert len(first.vehicles) == 10
+        assert 11 not in first.vehicle_ids
+        assert len(first.vehicle_extents) == 10
+        assert first.to_array().shape[0] == 10
+
+        del self.world.get_snapshot
+        self.world.frame += 1
+        second = self.cav_world.get_world_snapshot(self.world)
+        assert 11 in second.vehicle_ids
+        assert len(second.vehicles) == 11
+
+    def test_injected_ahead_of_client(self):
+        injected = self.cav_world.get_world_snapshot(self.world)
+        self.world.frame = injected.frame - 1
+        self.cav_world.set_world_snapshot(injected)
+        # a lagging client does not replace the newer injected snapshot
+        assert self.cav_world.get_world_snapshot(self.world) is injected
+
+        self.world.frame = injected.frame + 1
+        assert self.cav_world.get_world_snapshot(self.world) is not injected
+
+    @unittest.skipIf(SharedSnapshotBuffer is None,
+                     'vehicle manager dependencies are not installed')
+    def test_shared_buffer(self):
+        snapshot = self.cav_world.get_world_snapshot(self.world)
+        writer = SharedSnapshotBuffer(capacity=16)
+        reader = SharedSnapshotBuffer(capacity=16, name=writer.name)
+        try:
+            assert reader.read() is None
+            assert writer.write(snapshot)
+            traffic_lights = [(tl, tl.get_location()) for tl in
+                              self.world.actors.filter('traffic_light')]
+            with mock.patch.dict(sys.modules, {'carla': headless_carla}):
+                shared = reader.read(traffic_lights)
+
+            assert shared.frame == snapshot.frame
+            np.testing.assert_array_equal(shared.vehicle_ids,
+                                          snapshot.vehicle_ids)
+            np.testing.assert_allclose(shared.to_array(), snapshot.to_array())
+            vehicles = shared.vehicles_in_range(mcarla.Location(30, 0, 0),
+                                                25, exclude_id=3)
+            assert sorted(v.id for v in vehicles) == [1, 2, 4, 5]
+            assert [tl.id for tl, _ in shared.traffic_lights_in_range(
+                mcarla.Location(10, 0, 0), 10)] == [100]
+
+            self.cav_world.set_world_snapshot(shared)
+            assert self.cav_world.get_world_snapshot(self.world) is shared
+
+            small = SharedSnapshotBuffer(capacity=4)
+            assert not small.write(snapshot)
+            assert small.read() is None
+            small.close()
+        finally:
+            reader.close()
+            writer.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
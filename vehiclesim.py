@@ -23,11 +23,13 @@ import coloredlogs
 
 from opencda.version import __version__
 from opencda.core.common.cav_world import CavWorld
+from opencda.core.common.command_batch import CommandBatch
 from opencda.core.common.vehicle_manager import VehicleManager
 from opencda.scenario_testing.utils.yaml_utils import load_yaml
 from opencda.core.application.edge.networking import NetworkEmulator
 from opencda.core.common.ecloud_config import EcloudConfig, eDoneBehavior
 from opencda.ecloud_server.ecloud_comms import EcloudClient, ecloud_run_push_server
+from opencda.ecloud_server.packed_state import pack_vehicle_state
 
 import grpc
 from google.protobuf.json_format import MessageToJson
@@ -46,6 +48,7 @@ CARLA_IP = cloud_config["carla_server_public_ip"]
 ECLOUD_IP = cloud_config["ecloud_server_public_ip"]
 VEHICLE_IP = cloud_config["vehicle_client_public_ip"]
 ECLOUD_PUSH_BASE_PORT = 50101 # TODO: config
+SPECTATOR_INDEX = 0
 
 if cloud_config["log_level"] == "error":
     logger.setLevel(logging.ERROR)
@@ -55,27 +58,47 @@ elif cloud_config["log_level"] == "info":
     logger.setLevel(logging.INFO)
 
 #TODO: move to eCloudClient
-def serialize_debug_info(vehicle_update, vehicle_manager) -> None:
+def serialize_debug_info(vehicle_update, vehicle_manager, debug_chunk_id=0) -> None:
+    '''
+    debug_chunk_id > 0 sends only the debug data gathered since the previous chunk
+    '''
+    delta = debug_chunk_id > 0
+    vehicle_update.debug_chunk_id = debug_chunk_id
+
     planer_debug_helper = vehicle_manager.agent.debug_helper
     planer_debug_helper_msg = ecloud.PlanerDebugHelper()
-    planer_debug_helper.serialize_debug_info(planer_debug_helper_msg)
+    planer_debug_helper.serialize_debug_info(planer_debug_helper_msg, delta)
     vehicle_update.planer_debug_helper.CopyFrom( planer_debug_helper_msg )
 
     loc_debug_helper = vehicle_manager.localizer.debug_helper
     loc_debug_helper_msg = ecloud.LocDebugHelper()
-    loc_debug_helper.serialize_debug_info(loc_debug_helper_msg)
+    loc_debug_helper.serialize_debug_info(loc_debug_helper_msg, delta)
     vehicle_update.loc_debug_helper.CopyFrom( loc_debug_helper_msg )
 
     client_debug_helper = vehicle_manager.debug_helper
     #logger.debug(vehicle_manager.debug_helper.perception_time_list)
     client_debug_helper_msg = ecloud.ClientDebugHelper()
-    client_debug_helper.serialize_debug_info(client_debug_helper_msg)
+    client_debug_helper.serialize_debug_info(client_debug_helper_msg, delta)
     vehicle_update.client_debug_helper.CopyFrom(client_debug_helper_msg)
 
+def confirm_debug_info(vehicle_manager, delivered) -> None:
+    '''
+    settles the last incremental debug chunk of a vehicle once its push has completed:
+    delivered chunks advance the sent offsets, lost ones are resent with the next chunk
+    '''
+    for debug_helper in [vehicle_manager.agent.debug_helper,
+                         vehicle_manager.localizer.debug_helper,
+                         vehicle_manager.debug_helper]:
+        if delivered:
+            debug_helper.delta_tracker.confirm()
+        else:
+            debug_helper.delta_tracker.discard()
+
 #TODO: move to eCloudClient
-async def send_registration_to_ecloud_server(stub_, push_port) -> ecloud.SimulationInfo:
+async def send_registration_to_ecloud_server(stub_, push_port, use_tick_stream=False, vehicle_count=1) -> ecloud.SimulationInfo:
     request = ecloud.RegistrationInfo()
     request.vehicle_state = ecloud.VehicleState.REGISTERING
+    request.vehicle_count = vehicle_count
     try:
         request.container_name = os.environ["HOSTNAME"]
     except Exception as e:
@@ -83,10 +106,11 @@ async def send_registration_to_ecloud_server(stub_, push_port) -> ecloud.Simulat
 
     request.vehicle_ip = VEHICLE_IP
     request.vehicle_port = push_port
+    request.use_tick_stream = use_tick_stream
 
     sim_info = await stub_.Client_RegisterVehicle(request)
 
-    logger.info("vehicle ID %s received...", sim_info.vehicle_index)
+    logger.info("vehicle IDs %s received...", list(sim_info.vehicle_indices))
 
     return sim_info
 
@@ -108,13 +132,6 @@ async def send_carla_data_to_opencda(stub_, vehicle_index, actor_id, vid) -> ecl
 
     return sim_info
 
-#TODO: move to eCloudClient
-async def send_vehicle_update(stub_, vehicle_update_):
-    logger.debug("send_vehicle_update: sending")
-    empty = await stub_.Client_SendUpdate(vehicle_update_)
-    logger.debug("send_vehicle_update: send complete")
-    return empty
-
 def arg_parse():
     parser = argparse.ArgumentParser(description="OpenCDA Vehicle Simulation.")
     parser.add_argument("--apply_ml",
@@ -131,19 +148,164 @@ def arg_parse():
                             help="Make no noise")
     parser.add_argument('-c',"--container_id", type=int, default=0,
                         help="container ID #. Used as the counter from the base port for the eCloud push service")
+    parser.add_argument('-s', "--tick_stream", action="store_true",
+                        help="receive ticks over a single stream to the eCloud server instead of running a push server")
+    parser.add_argument('-k', "--vehicles", type=int, default=1,
+                        help="number of vehicles hosted by this process. They share one CARLA client, map, route graph "
+                             "and world snapshot and are stepped together every tick. [Default: 1]")
 
     opt = parser.parse_args()
     return opt
 
+class HostedVehicle(object):
+    '''
+    per-vehicle state of one of the vehicles hosted by this process
+    '''
+
+    def __init__(self, vehicle_manager, network_emulator=None):
+        self.vehicle_manager = vehicle_manager
+        self.vehicle_index = vehicle_manager.vehicle_index
+        self.network_emulator = network_emulator
+        self.debug_chunk_id = 0
+        self.step_timestamps = None # the vehicle's own span of the current tick, set when it replies TICK_OK
+        self.reported_done = False
+        self.exited = False
+
+    def exit(self):
+        self.vehicle_manager.destroy()
+        self.exited = True
+
+def begin_tick(vehicles, is_edge) -> dict:
+    '''
+    runs the part of a tick that precedes planning for every hosted vehicle
+    update info runs BEFORE waypoint injection; the edge waypoints of all the vehicles are then
+    applied together so the routes of vehicles sent to a new destination are searched in one batch
+    returns vehicle_index -> update_info time of the vehicle in ns
+    '''
+    update_info_durations_ns = {}
+    for vehicle in vehicles:
+        vehicle_manager = vehicle.vehicle_manager
+        update_info_start_time_ns = time.time_ns()
+        vehicle_manager.update_info()
+        update_info_duration_ns = time.time_ns() - update_info_start_time_ns
+        update_info_durations_ns[vehicle.vehicle_index] = update_info_duration_ns
+        vehicle_manager.debug_helper.update_update_info_time(update_info_duration_ns / 1e6)
+        logger.debug("update_info complete")
+
+    if is_edge:
+        NetworkEmulator.update_waypoints_batch([vehicle.network_emulator for vehicle in vehicles])
+
+    return update_info_durations_ns
+
+def build_vehicle_update(vehicle, pong, tick_id, target_speed, is_edge, done_behavior, packed_state, debug_flush_ticks, command_batch=None, update_info_duration_ns=0) -> ecloud.VehicleUpdate:
+    '''
+    runs a received command for one hosted vehicle and returns its reply
+    ticks continue from begin_tick, which returned update_info_duration_ns
+    controls are queued on command_batch, if given, for the caller to flush
+    a TICK_OK reply is completed by end_tick once every hosted vehicle was stepped
+    '''
+    vehicle_manager = vehicle.vehicle_manager
+    vehicle_index = vehicle.vehicle_index
+    vehicle_update = ecloud.VehicleUpdate()
+
+    # HANDLE DEBUG DATA REQUEST
+    if pong.command == ecloud.Command.REQUEST_DEBUG_INFO:
+        vehicle_update.vehicle_state = ecloud.VehicleState.DEBUG_INFO_UPDATE
+        if debug_flush_ticks > 0:
+            vehicle.debug_chunk_id += 1
+        serialize_debug_info(vehicle_update, vehicle_manager, vehicle.debug_chunk_id)
+
+    # HANDLE TICK
+    elif pong.command == ecloud.Command.TICK:
+        if vehicle.reported_done:
+            target_speed = 0
+        step_start_time_ns = time.time_ns()
+        control = vehicle_manager.run_step(target_speed=target_speed)
+        logger.debug("run_step complete")
+
+        vehicle_update.tick_id = tick_id
+
+        if control is None or vehicle_manager.is_close_to_scenario_destination():
+            vehicle_update.vehicle_state = ecloud.VehicleState.TICK_DONE
+            if not vehicle.reported_done:
+                if debug_flush_ticks > 0:
+                    vehicle.debug_chunk_id += 1
+                serialize_debug_info(vehicle_update, vehicle_manager, vehicle.debug_chunk_id)
+
+            if control is not None and done_behavior == eDoneBehavior.CONTROL:
+                vehicle_manager.apply_control(control, command_batch)
+
+        else:
+            vehicle_manager.apply_control(control, command_batch)
+            logger.debug("apply_control complete")
+
+            # the client span is the vehicle's own work: its update_info plus this step
+            # the other hosted vehicles run in between, so the start is set back from the end instead of read
+            step_timestamps = ecloud.Timestamps()
+            step_timestamps.tick_id = tick_id
+            step_timestamps.client_end_tstamp.GetCurrentTime()
+            client_duration_ns = update_info_duration_ns + time.time_ns() - step_start_time_ns
+            step_timestamps.client_start_tstamp.FromNanoseconds(step_timestamps.client_end_tstamp.ToNanoseconds() - client_duration_ns)
+            vehicle.step_timestamps = step_timestamps
+
+            vehicle_update.vehicle_state = ecloud.VehicleState.TICK_OK
+            vehicle_update.duration_ns = client_duration_ns
+
+        if ( is_edge or vehicle_index == SPECTATOR_INDEX ) and packed_state:
+            vehicle_update.packed_state = pack_vehicle_state(vehicle_index,
+                                                             vehicle_manager.vehicle.get_transform(),
+                                                             vehicle_manager.vehicle.get_velocity())
+
+        elif is_edge or vehicle_index == SPECTATOR_INDEX:
+            velocity = vehicle_manager.vehicle.get_velocity()
+            pv = ecloud.Velocity()
+            pv.x = velocity.x
+            pv.y = velocity.y
+            pv.z = velocity.z
+            vehicle_update.velocity.CopyFrom(pv)
+
+            transform = vehicle_manager.vehicle.get_transform()
+            pt = ecloud.Transform()
+            pt.location.x = transform.location.x
+            pt.location.y = transform.location.y
+            pt.location.z = transform.location.z
+            pt.rotation.roll = transform.rotation.roll
+            pt.rotation.yaw = transform.rotation.yaw
+            pt.rotation.pitch = transform.rotation.pitch
+            vehicle_update.transform.CopyFrom(pt)
+
+        # vehicle_update.vehicle_state = ecloud.VehicleState.ERROR # TODO: handle error status
+        # logger.error("ecloud_client error")
+
+    vehicle_update.tick_id = tick_id
+    vehicle_update.vehicle_index = vehicle_index
+    return vehicle_update
+
+def end_tick(vehicle, vehicle_update, tick_id, debug_flush_ticks, worker_start_timestamp, worker_end_timestamp) -> None:
+    '''
+    completes the TICK_OK reply of a hosted vehicle once all of them were stepped
+    records the vehicle's own span together with the worker span, then adds the periodic debug chunk
+    '''
+    step_timestamps = vehicle.step_timestamps
+    step_timestamps.worker_start_tstamp.CopyFrom(worker_start_timestamp)
+    step_timestamps.worker_end_tstamp.CopyFrom(worker_end_timestamp)
+    vehicle.vehicle_manager.debug_helper.update_timestamp(step_timestamps)
+    vehicle.step_timestamps = None
+
+    # the eCloud server takes the duration of the last reply as the client share of the tick;
+    # for this process that is the time to step every hosted vehicle
+    vehicle_update.duration_ns = worker_end_timestamp.ToNanoseconds() - worker_start_timestamp.ToNanoseconds()
+
+    if debug_flush_ticks > 0 and tick_id % debug_flush_ticks == 0:
+        vehicle.debug_chunk_id += 1
+        serialize_debug_info(vehicle_update, vehicle.vehicle_manager, vehicle.debug_chunk_id)
+
 async def main():
     #TODO: move to eCloudConfig
     # default params which can be over-written from the simulation controller
-    SPECTATOR_INDEX = 0
-
     application = ["single"]
     version = "0.9.12"
     tick_id = 0
-    reported_done = False
     push_q = asyncio.Queue()
 
     opt = arg_parse()
@@ -152,19 +314,23 @@ async def main():
     elif opt.quiet:
         logger.setLevel(logging.WARNING)
     logger.info("OpenCDA Version: %s", version)
+    assert( opt.vehicles >= 1 )
 
     logging.basicConfig()
 
-    # spawn push server
-    push_port = ECLOUD_PUSH_BASE_PORT + opt.container_id
-    push_server = asyncio.create_task(ecloud_run_push_server(push_port, push_q))
+    # spawn push server - not needed when ticks arrive over the tick stream
+    push_port = 0
+    push_server = None
+    if not opt.tick_stream:
+        push_port = ECLOUD_PUSH_BASE_PORT + opt.container_id
+        push_server = asyncio.create_task(ecloud_run_push_server(push_port, push_q))
 
-    await asyncio.sleep(1)
+        await asyncio.sleep(1)
 
-    push_port = await push_q.get() # make sure we get the actual port - try logic may have altered it.
-    push_q.task_done()
+        push_port = await push_q.get() # make sure we get the actual port - try logic may have altered it.
+        push_q.task_done()
 
-    logger.info("push server spun up on port %s", push_port)
+        logger.info("push server spun up on port %s", push_port)
 
     # TODO: move to eCloudClient
     channel = grpc.aio.insecure_channel(
@@ -176,10 +342,17 @@ async def main():
             ("grpc.service_config", EcloudClient.retry_opts),],
         )
 
-    ecloud_server = ecloud_rpc.EcloudStub(channel)
-    ecloud_update = await send_registration_to_ecloud_server(ecloud_server, push_port)
-    vehicle_index = ecloud_update.vehicle_index
-    assert( vehicle_index != None )
+    ecloud_client = EcloudClient(channel)
+    ecloud_server = ecloud_client.stub
+    ecloud_update = await send_registration_to_ecloud_server(ecloud_server, push_port, opt.tick_stream, opt.vehicles)
+    vehicle_indices = list(ecloud_update.vehicle_indices)
+    assert( len(vehicle_indices) == opt.vehicles )
+
+    if opt.tick_stream:
+        # the stream is identified by the first hosted vehicle and carries the ticks of all of them
+        await ecloud_client.open_tick_stream(vehicle_indices[0])
+        push_server = asyncio.create_task(ecloud_client.run(push_q))
+        logger.info("tick stream opened for vehicles %s", vehicle_indices)
 
     test_scenario = ecloud_update.test_scenario
     application = ecloud_update.application
@@ -188,11 +361,9 @@ async def main():
     logger.debug("main - application: %s", application)
     logger.debug("main - version: %s", version)
 
-    # create CAV world
+    # create CAV world - shared by the hosted vehicles, so is their route graph and world snapshot
     cav_world = CavWorld(opt.apply_ml)
 
-    logger.info("eCloud debug: creating VehicleManager vehicle_index: %s", vehicle_index)
-
     scenario_yaml = json.loads(test_scenario) #load_yaml(test_scenario)
     if 'debug_scenario' in scenario_yaml:
         logger.debug("main - test_scenario: %s", test_scenario)
@@ -206,11 +377,11 @@ async def main():
 
     location_type = ecloud_config.get_location_type()
     done_behavior = ecloud_config.get_done_behavior()
+    packed_state = ecloud_config.get_packed_state()
+    debug_flush_ticks = ecloud_config.get_debug_flush_ticks()
 
     target_speed = None
-    edge_sets_destination = False
     is_edge = False # TODO: added this to the actual protobuf message
-    network_emulator = None
     edge_sets_destination = False
     if 'edge_list' in scenario_yaml['scenario']:
         is_edge = True
@@ -220,149 +391,139 @@ async def main():
             if 'edge_sets_destination' in scenario_yaml['scenario']['edge_list'][0] else False
 
     if opt.apply_ml:
-        await asyncio.sleep(vehicle_index + 1)
+        await asyncio.sleep(vehicle_indices[0] + 1)
 
-    vehicle_manager = VehicleManager(vehicle_index=vehicle_index, config_yaml=scenario_yaml, application=application, cav_world=cav_world, \
-                                     carla_version=version, location_type=location_type, run_distributed=True, is_edge=is_edge, perception_active=opt.apply_ml)
+    # one CARLA client and map for every hosted vehicle
+    carla_client = carla.Client(CARLA_IP, scenario_yaml['world']['client_port'])
+    carla_client.set_timeout(10.0)
+    carla_world = carla_client.get_world()
+    carla_map = carla_world.get_map()
+    # the controls of all hosted vehicles go to CARLA in one batch per tick
+    command_batch = CommandBatch(carla_client)
 
-    if is_edge:
-        network_emulator = NetworkEmulator(edge_sets_destination=edge_sets_destination,
-                                            vehicle_manager=vehicle_manager)
+    vehicles = []
+    for vehicle_index in vehicle_indices:
+        logger.info("eCloud debug: creating VehicleManager vehicle_index: %s", vehicle_index)
+
+        vehicle_manager = VehicleManager(vehicle_index=vehicle_index, config_yaml=scenario_yaml, application=application, cav_world=cav_world, \
+                                         carla_version=version, location_type=location_type, run_distributed=True, is_edge=is_edge, perception_active=opt.apply_ml, \
+                                         carla_world=carla_world, carla_map=carla_map)
+
+        network_emulator = None
+        if is_edge:
+            network_emulator = NetworkEmulator(edge_sets_destination=edge_sets_destination,
+                                                vehicle_manager=vehicle_manager)
 
-    actor_id = vehicle_manager.vehicle.id
-    vid = vehicle_manager.vid
+        vehicles.append(HostedVehicle(vehicle_manager, network_emulator))
 
-    await send_carla_data_to_opencda(ecloud_server, vehicle_index, actor_id, vid)
+        await send_carla_data_to_opencda(ecloud_server, vehicle_index, vehicle_manager.vehicle.id, vehicle_manager.vid)
 
     assert(push_q.empty())
     pong = await push_q.get()
     push_q.task_done()
 
-    vehicle_manager.update_info()
-    vehicle_manager.set_destination(
-                vehicle_manager.vehicle.get_location(),
-                vehicle_manager.destination_location,
-                clean=True)
+    for vehicle in vehicles:
+        vehicle.vehicle_manager.update_info()
+        vehicle.vehicle_manager.set_destination(
+                    vehicle.vehicle_manager.vehicle.get_location(),
+                    vehicle.vehicle_manager.destination_location,
+                    clean=True)
 
-    logger.info("vehicle %s beginning scenario tick flow", vehicle_index)
+    logger.info("vehicles %s beginning scenario tick flow", vehicle_indices)
     while pong.command != ecloud.Command.END:
 
-        vehicle_update = ecloud.VehicleUpdate()
         if pong.command != ecloud.Command.TICK: # don't print tick message since there are too many
             logger.info("Vehicle: received cmd %s", pong.command)
 
-        # HANDLE DEBUG DATA REQUEST
-        if pong.command == ecloud.Command.REQUEST_DEBUG_INFO:
-            vehicle_update.vehicle_state = ecloud.VehicleState.DEBUG_INFO_UPDATE
-            serialize_debug_info(vehicle_update, vehicle_manager)
-
-        # HANDLE TICK
-        elif pong.command == ecloud.Command.TICK:
-            client_start_timestamp = Timestamp()
-            client_start_timestamp.GetCurrentTime()
-            # update info runs BEFORE waypoint injection
-            update_info_start_time = time.time()
-            vehicle_manager.update_info()
-            update_info_end_time = time.time()
-            vehicle_manager.debug_helper.update_update_info_time((update_info_end_time-update_info_start_time)*1000)
-            logger.debug("update_info complete")
-
-            if is_edge:
-                network_emulator.update_waypoints()
-
-            if reported_done:
-                target_speed = 0
-            control = vehicle_manager.run_step(target_speed=target_speed)
-            logger.debug("run_step complete")
-
-            vehicle_update.tick_id = tick_id
-
-            if control is None or vehicle_manager.is_close_to_scenario_destination():
-                vehicle_update.vehicle_state = ecloud.VehicleState.TICK_DONE
-                if not reported_done:
-                    serialize_debug_info(vehicle_update, vehicle_manager)
-
-                if control is not None and done_behavior == eDoneBehavior.CONTROL:
-                    vehicle_manager.apply_control(control)
-
-            else:
-                vehicle_manager.apply_control(control)
-                logger.debug("apply_control complete")
-
-                step_timestamps = ecloud.Timestamps()
-                step_timestamps.tick_id = tick_id
-                step_timestamps.client_end_tstamp.GetCurrentTime()
-                step_timestamps.client_start_tstamp.CopyFrom(client_start_timestamp)
-                vehicle_manager.debug_helper.update_timestamp(step_timestamps)
-
-                vehicle_update.vehicle_state = ecloud.VehicleState.TICK_OK
-                vehicle_update.duration_ns = step_timestamps.client_end_tstamp.ToNanoseconds() - step_timestamps.client_start_tstamp.ToNanoseconds()
-
-            if is_edge or vehicle_index == SPECTATOR_INDEX:
-                velocity = vehicle_manager.vehicle.get_velocity()
-                pv = ecloud.Velocity()
-                pv.x = velocity.x
-                pv.y = velocity.y
-                pv.z = velocity.z
-                vehicle_update.velocity.CopyFrom(pv)
-
-                transform = vehicle_manager.vehicle.get_transform()
-                pt = ecloud.Transform()
-                pt.location.x = transform.location.x
-                pt.location.y = transform.location.y
-                pt.location.z = transform.location.z
-                pt.rotation.roll = transform.rotation.roll
-                pt.rotation.yaw = transform.rotation.yaw
-                pt.rotation.pitch = transform.rotation.pitch
-                vehicle_update.transform.CopyFrom(pt)
-
-            # vehicle_update.vehicle_state = ecloud.VehicleState.ERROR # TODO: handle error status
-            # logger.error("ecloud_client error")
-
-            #cur_location = vehicle_manager.vehicle.get_location()
-            #logger.debug("send OK and location for vehicle_%s - is - x: %s, y: %s", vehicle_index, cur_location.x, cur_location.y)
-
-        # block waiting for a response
-        if not reported_done or done_behavior == eDoneBehavior.CONTROL:
-            if not reported_done:
-                vehicle_update.tick_id = tick_id
-                vehicle_update.vehicle_index = vehicle_index
-                logger.debug('VEHICLE_UPDATE_DBG: \n vehicle_index: %s \n tick_id: %s \n %s', vehicle_index, tick_id, vehicle_update)
-                ecloud_update = await send_vehicle_update(ecloud_server, vehicle_update)
+        # the hosted vehicles are stepped one after the other
+        worker_start_timestamp = Timestamp()
+        worker_start_timestamp.GetCurrentTime()
+        vehicle_updates = []
+        ticked_vehicles = []
+        live_vehicles = []
+        for vehicle in vehicles:
+            if vehicle.exited:
+                continue
+
+            if vehicle.reported_done and done_behavior != eDoneBehavior.CONTROL:
+                logger.info("EXIT destroy-on-done vehicle actor %s", vehicle.vehicle_index)
+                vehicle.exit()
+                continue
+
+            live_vehicles.append(vehicle)
+
+        update_info_durations_ns = {}
+        if pong.command == ecloud.Command.TICK:
+            update_info_durations_ns = begin_tick(live_vehicles, is_edge)
+
+        for vehicle in live_vehicles:
+            vehicle_update = build_vehicle_update(vehicle, pong, tick_id, target_speed, is_edge,
+                                                  done_behavior, packed_state, debug_flush_ticks, command_batch,
+                                                  update_info_durations_ns.get(vehicle.vehicle_index, 0))
+            if not vehicle.reported_done:
+                vehicle_updates.append(vehicle_update)
+            if vehicle_update.vehicle_state == ecloud.VehicleState.TICK_OK:
+                ticked_vehicles.append((vehicle, vehicle_update))
 
             if vehicle_update.vehicle_state == ecloud.VehicleState.TICK_DONE or vehicle_update.vehicle_state == ecloud.VehicleState.DEBUG_INFO_UPDATE:
                 if vehicle_update.vehicle_state == ecloud.VehicleState.DEBUG_INFO_UPDATE and pong.command == ecloud.Command.REQUEST_DEBUG_INFO:
                     # we were asked for debug data and provided it, so NOW we exit
                     # TODO: this is better handled by done
-                    logger.info("pushed DEBUG_INFO_UPDATE")
+                    logger.info("pushed DEBUG_INFO_UPDATE for vehicle %s", vehicle.vehicle_index)
+
+                vehicle.reported_done = True
+                logger.info("vehicle %s reported_done", vehicle.vehicle_index)
 
-                reported_done = True
-                logger.info("reported_done")
+        command_batch.flush()
 
-            assert(push_q.empty())
-            pong = await push_q.get()
-            push_q.task_done()
-            assert( pong.tick_id != tick_id )
-            tick_id = pong.tick_id
+        worker_end_timestamp = Timestamp()
+        worker_end_timestamp.GetCurrentTime()
+        for vehicle, vehicle_update in ticked_vehicles:
+            end_tick(vehicle, vehicle_update, tick_id, debug_flush_ticks, worker_start_timestamp, worker_end_timestamp)
 
-            if pong.command == ecloud.Command.PULL_WAYPOINTS_AND_TICK:
+        # block waiting for a response
+        logger.debug("send_vehicle_updates: sending %s", len(vehicle_updates))
+        sent_indices = {update.vehicle_index for update in vehicle_updates}
+        sent_vehicles = [vehicle for vehicle in vehicles if vehicle.vehicle_index in sent_indices]
+        try:
+            await ecloud_client.send_vehicle_updates(vehicle_updates)
+        except grpc.RpcError:
+            for vehicle in sent_vehicles:
+                confirm_debug_info(vehicle.vehicle_manager, False)
+            raise
+        for vehicle in sent_vehicles:
+            confirm_debug_info(vehicle.vehicle_manager, True)
+        logger.debug("send_vehicle_updates: send complete")
+
+        if all(vehicle.exited for vehicle in vehicles):
+            break
+
+        assert(push_q.empty())
+        pong = await push_q.get()
+        push_q.task_done()
+        assert( pong.tick_id != tick_id )
+        tick_id = pong.tick_id
+
+        if pong.command == ecloud.Command.PULL_WAYPOINTS_AND_TICK:
+            for vehicle in vehicles:
+                if vehicle.exited:
+                    continue
                 wp_request = ecloud.WaypointRequest()
-                wp_request.vehicle_index = vehicle_index
+                wp_request.vehicle_index = vehicle.vehicle_index
                 waypoint_proto = await ecloud_server.Client_GetWaypoints(wp_request)
-                network_emulator.enqueue_wp(waypoint_proto)
-                pong.command = ecloud.Command.TICK
-
-            # HANDLE END
-            elif pong.command == ecloud.Command.END:
-                logger.critical("END received")
-                break
+                vehicle.network_emulator.enqueue_wp(waypoint_proto)
+            pong.command = ecloud.Command.TICK
 
-        else: # done
-            logger.info("EXIT destroy-on-done vehicle actor")
+        # HANDLE END
+        elif pong.command == ecloud.Command.END:
+            logger.critical("END received")
             break
 
     # end while
-    vehicle_manager.destroy()
+    for vehicle in vehicles:
+        if not vehicle.exited:
+            vehicle.exit()
+    await ecloud_client.close_tick_stream()
     push_server.cancel()
     logger.info("scenario complete. exiting.")
     sys.exit(0)